@@ -0,0 +1,5 @@
+"""
+Performance benchmarks for the Productline 3D Data Retrieval API.
+Kept outside tests/ so pytest does not collect them; run them as modules,
+e.g. `python -m benchmarks.api_benchmark --help`.
+"""
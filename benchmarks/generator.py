@@ -0,0 +1,135 @@
+"""
+Synthetic productline generator.
+Seeds a reproducible productline into the configured database: N objects
+laid out along production lines, their current coordinates and M history
+records per object moving along their line. The same seed always gives
+the same data, so benchmark runs compare like with like.
+"""
+
+import math
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+from src.database import db
+from src.models.productline_object import ProductlineObject
+from src.models.coordinates import Coordinates
+from src.models.object_history import ObjectHistory
+
+KINDS = ('Robot Arm', 'Conveyor', 'Press', 'Welder', 'Inspection Station', 'AGV')
+STATUSES = ('active', 'active', 'active', 'processing', 'inactive', 'error')
+
+# History starts here and is spaced `interval` seconds per object
+HISTORY_START = datetime(2025, 1, 1)
+
+def object_id(index):
+    """Get the ID of the generated object at `index`."""
+    return f"OBJ_{index:06d}"
+
+def generate_objects(count, seed=42, lines=10):
+    """Generate (object, coordinates) column-keyed dict pairs."""
+    rng = random.Random(seed)
+    for index in range(count):
+        line = index % lines
+        kind = KINDS[rng.randrange(len(KINDS))]
+        rotation = rng.uniform(0.0, 360.0)
+        yield {
+            'id': object_id(index),
+            'name': f"{kind} {index}",
+            'status': STATUSES[rng.randrange(len(STATUSES))],
+            'object_metadata': {'line': f"L{line:02d}", 'kind': kind, 'station': index // lines},
+            'created_at': HISTORY_START,
+            'updated_at': HISTORY_START
+        }, {
+            'object_id': object_id(index),
+            'position_x': (index // lines) * 2.5,
+            'position_y': line * 8.0,
+            'position_z': 0.0,
+            'height': rng.uniform(0.5, 3.0),
+            'direction_x': math.cos(math.radians(rotation)),
+            'direction_y': math.sin(math.radians(rotation)),
+            'direction_z': 0.0,
+            'rotation': rotation,
+            'updated_at': HISTORY_START
+        }
+
+def generate_history(count, per_object, seed=42, interval=60.0, lines=10):
+    """Generate `per_object` column-keyed history dicts for each of `count` objects.
+    
+    Objects record at the same interval, staggered so timestamps rarely tie.
+    """
+    rng = random.Random(seed + 1)
+    for index in range(count):
+        line = index % lines
+        offset = rng.uniform(0.0, interval)
+        x = (index // lines) * 2.5
+        for step in range(per_object):
+            x += rng.uniform(-0.2, 0.4)
+            rotation = (step * 3.0 + index) % 360.0
+            yield {
+                'object_id': object_id(index),
+                'timestamp': HISTORY_START + timedelta(seconds=offset + step * interval),
+                'position_x': x,
+                'position_y': line * 8.0 + rng.uniform(-0.1, 0.1),
+                'position_z': 0.0,
+                'height': 1.5,
+                'direction_x': math.cos(math.radians(rotation)),
+                'direction_y': math.sin(math.radians(rotation)),
+                'direction_z': 0.0,
+                'rotation': rotation,
+                'status': 'active',
+                'object_metadata': None,
+                'created_at': HISTORY_START
+            }
+
+def history_end(per_object, interval=60.0):
+    """Get the moment after which no generated history is recorded."""
+    return HISTORY_START + timedelta(seconds=(per_object + 1) * interval)
+
+def create_schema(reset=False):
+    """Create the tables, dropping them first if `reset` is set.
+    
+    SQLite index names are global to the database while the models reuse
+    names such as idx_updated_at across tables, so duplicated names are
+    prefixed with their table on SQLite.
+    """
+    if db.engine.dialect.name == 'sqlite':
+        names = Counter(index.name for table in db.metadata.sorted_tables for index in table.indexes)
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                if names[index.name] > 1:
+                    index.name = f"{table.name}_{index.name}"
+    if reset:
+        db.drop_all()
+    db.create_all()
+
+def _insert(table, rows, batch_size):
+    """Insert column-keyed dicts in committed executemany batches, returning the count."""
+    inserted, batch = 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(table.insert(), batch)
+            db.session.commit()
+            inserted += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+        inserted += len(batch)
+    return inserted
+
+def seed_productline(objects, history_per_object, seed=42, interval=60.0, batch_size=5000):
+    """Seed objects, coordinates and history into empty tables; returns the row counts.
+    
+    Must run in an app context.
+    """
+    pairs = list(generate_objects(objects, seed))
+    return {
+        'objects': _insert(ProductlineObject.__table__, (pair[0] for pair in pairs), batch_size),
+        'coordinates': _insert(Coordinates.__table__, (pair[1] for pair in pairs), batch_size),
+        'history': _insert(
+            ObjectHistory.__table__,
+            generate_history(objects, history_per_object, seed, interval),
+            batch_size
+        )
+    }
@@ -0,0 +1,194 @@
+"""
+Micro-benchmarks for the per-object hot paths of every response.
+Times the model serializers, timestamp formatting, request validation and
+direction normalization, and compares them against stored baseline
+results, failing when any case is slower than its baseline by more than
+a threshold percentage. Cases that look regressed are measured again
+and keep their best time, so a single noisy round does not fail the gate.
+
+Times are stored as ratios to the reference case, plain stdlib timestamp
+formatting, so a baseline carries over between machines of different
+speed. Re-record it after changing the cases or the Python version:
+
+    python -m benchmarks.micro_benchmark --save-baseline
+    python -m benchmarks.micro_benchmark --threshold 10
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from datetime import datetime
+from src.services.validation import validate_object_id, validate_timestamp
+from src.models.coordinates import Coordinates
+from src.models.object_history import ObjectHistory
+from src.models.productline_object import ProductlineObject
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'micro_baseline.json')
+
+# Case every other case is timed relative to
+REFERENCE_CASE = 'isoformat_z'
+
+def build_cases():
+    """Build the benchmark cases as name -> zero-argument callable."""
+    moment = datetime(2025, 1, 1, 12, 30, 15, 250000)
+    
+    obj = ProductlineObject('OBJ_000001', name='Robot Arm 1', status='active',
+                            metadata={'line': 'L01', 'kind': 'Robot Arm', 'station': 0})
+    obj.created_at = moment
+    obj.updated_at = moment
+    
+    coordinates = Coordinates('OBJ_000001', position_x=10.5, position_y=8.0, position_z=0.0, height=1.5,
+                              direction_x=0.6, direction_y=0.8, direction_z=0.0, rotation=53.13)
+    coordinates.updated_at = moment
+    
+    history = ObjectHistory('OBJ_000001', moment, position_x=10.5, position_y=8.0, position_z=0.0,
+                            height=1.5, direction_x=0.6, direction_y=0.8, direction_z=0.0,
+                            rotation=53.13, status='active')
+    history.created_at = moment
+    
+    return {
+        'productline_object_to_dict': obj.to_dict,
+        'coordinates_to_dict': coordinates.to_dict,
+        'object_history_to_dict': history.to_dict,
+        'isoformat_z': lambda: moment.isoformat() + 'Z',
+        'validate_object_id': lambda: validate_object_id('OBJ_000001'),
+        'validate_object_id_invalid': lambda: validate_object_id('OBJ-000001'),
+        'validate_timestamp_iso': lambda: validate_timestamp('2025-01-01T12:30:15.250Z'),
+        'validate_timestamp_unix': lambda: validate_timestamp('1735734615.25'),
+        'coordinates_normalize_direction': coordinates._normalize_direction
+    }
+
+def measure(function, repeat=7, min_time=0.2):
+    """Get the best time per call of a function in nanoseconds.
+    
+    Each of `repeat` rounds runs as many calls as take at least
+    `min_time` seconds; the fastest round is the least disturbed by noise.
+    """
+    timer = timeit.Timer(function)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(number, int(number * min_time / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+def normalize(results, reference=REFERENCE_CASE):
+    """Convert nanoseconds per call to ratios of the reference case's time."""
+    return {name: round(nanoseconds / results[reference], 4) for name, nanoseconds in results.items()}
+
+def compare(results, baseline, threshold, reference=REFERENCE_CASE):
+    """Compare results in nanoseconds per call against baseline ratios.
+    
+    Returns {name: {'ns', 'ratio', 'baseline_ratio', 'change_pct', 'status'}}
+    where the status is 'regressed' when the ratio grew by more than
+    `threshold` percent, else 'ok', 'new' for cases without a baseline, or
+    'reference' for the reference case itself.
+    """
+    ratios = normalize(results, reference)
+    comparison = {}
+    for name, nanoseconds in results.items():
+        entry = {'ns': nanoseconds, 'ratio': ratios[name]}
+        previous = baseline.get(name)
+        if name == reference:
+            entry.update({'baseline_ratio': previous, 'change_pct': None, 'status': 'reference'})
+        elif previous is None:
+            entry.update({'baseline_ratio': None, 'change_pct': None, 'status': 'new'})
+        else:
+            change = (ratios[name] - previous) / previous * 100.0
+            entry.update({
+                'baseline_ratio': previous,
+                'change_pct': round(change, 1),
+                'status': 'regressed' if change > threshold else 'ok'
+            })
+        comparison[name] = entry
+    return comparison
+
+def environment():
+    """Describe the machine the results were measured on."""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine()
+    }
+
+def load_baseline(path):
+    """Load a stored baseline, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as handle:
+        return json.load(handle)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline results file")
+    parser.add_argument('--save-baseline', action='store_true', help="Store the results as the new baseline")
+    parser.add_argument('--threshold', type=float,
+                        default=float(os.environ.get('MICRO_BENCHMARK_THRESHOLD', 15.0)),
+                        help="Percentage slowdown that fails a case (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=7, help="Timing rounds per case")
+    parser.add_argument('--min-time', type=float, default=0.2, help="Minimum seconds per round")
+    parser.add_argument('--retries', type=int, default=2,
+                        help="Extra measurements of cases that look regressed")
+    parser.add_argument('--cases', help="Comma-separated cases to run; defaults to all")
+    args = parser.parse_args(argv)
+    if args.threshold < 0 or args.repeat < 1 or args.min_time <= 0 or args.retries < 0:
+        parser.error("--threshold, --repeat, --min-time and --retries must be positive")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    cases = build_cases()
+    if args.cases:
+        names = [name.strip() for name in args.cases.split(',') if name.strip()]
+        unknown = sorted(set(names) - set(cases))
+        if unknown:
+            print(f"Unknown cases: {', '.join(unknown)}", file=sys.stderr)
+            return 2
+        cases = {name: cases[name] for name in [REFERENCE_CASE] + names}
+    
+    results = {name: round(measure(function, args.repeat, args.min_time), 1) for name, function in cases.items()}
+    
+    if args.save_baseline:
+        ratios = normalize(results)
+        stored = load_baseline(args.baseline) or {}
+        merged = dict(stored.get('ratios', {}), **ratios) if args.cases else ratios
+        with open(args.baseline, 'w') as handle:
+            json.dump({'environment': environment(), 'reference': REFERENCE_CASE, 'ratios': merged},
+                      handle, indent=2, sort_keys=True)
+            handle.write('\n')
+        print(json.dumps({'saved': args.baseline, 'reference': REFERENCE_CASE, 'ratios': ratios}, indent=2))
+        return 0
+    
+    stored = load_baseline(args.baseline)
+    if stored is None or stored.get('reference') != REFERENCE_CASE:
+        print(f"No baseline relative to {REFERENCE_CASE} at {args.baseline}; "
+              f"record one with --save-baseline", file=sys.stderr)
+        return 2
+    
+    baseline = stored.get('ratios', {})
+    comparison = compare(results, baseline, args.threshold)
+    regressed = sorted(name for name, entry in comparison.items() if entry['status'] == 'regressed')
+    for _ in range(args.retries):
+        if not regressed:
+            break
+        for name in regressed:
+            results[name] = min(results[name], round(measure(cases[name], args.repeat, args.min_time), 1))
+        comparison = compare(results, baseline, args.threshold)
+        regressed = sorted(name for name, entry in comparison.items() if entry['status'] == 'regressed')
+    print(json.dumps({
+        'environment': environment(),
+        'baseline_environment': stored.get('environment'),
+        'reference': REFERENCE_CASE,
+        'threshold_pct': args.threshold,
+        'cases': comparison,
+        'regressed': regressed
+    }, indent=2))
+    if regressed:
+        print(f"Regressed by more than {args.threshold}%: {', '.join(regressed)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -28,7 +28,7 @@ class DevelopmentConfig:
     
     # CORS configuration
     CORS_ORIGINS = ['*']
-    CORS_METHODS = ['GET', 'POST', 'OPTIONS']
+    CORS_METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'OPTIONS']
     CORS_HEADERS = ['Content-Type', 'Authorization']
     
     # Logging
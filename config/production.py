@@ -29,7 +29,7 @@ class ProductionConfig:
     
     # CORS configuration
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '').split(',')
-    CORS_METHODS = ['GET', 'POST', 'OPTIONS']
+    CORS_METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'OPTIONS']
     CORS_HEADERS = ['Content-Type', 'Authorization']
     
     # Logging
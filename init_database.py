@@ -16,6 +16,8 @@ from src.database import db
 from src.models.productline_object import ProductlineObject
 from src.models.coordinates import Coordinates
 from src.models.object_history import ObjectHistory
+from src.models.scene_checkpoint import SceneCheckpoint
+from src.models.history_rollup import HistoryRollup
 from datetime import datetime
 
 def init_database():
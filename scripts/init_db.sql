@@ -7,6 +7,9 @@ CREATE DATABASE IF NOT EXISTS productline_3d CHARACTER SET utf8mb4 COLLATE utf8m
 -- Use the database
 USE productline_3d;
 
+-- Partition bounds are Unix seconds of UTC midnights
+SET time_zone = '+00:00';
+
 -- Create ProductlineObject table
 CREATE TABLE IF NOT EXISTS productline_objects (
     id VARCHAR(100) PRIMARY KEY,
@@ -36,11 +39,46 @@ CREATE TABLE IF NOT EXISTS coordinates (
     INDEX idx_updated_at (updated_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
--- Create ObjectHistory table
-CREATE TABLE IF NOT EXISTS object_history (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+-- Create ObjectHistory table, range partitioned by day on timestamp.
+-- Partitioned tables cannot have foreign keys and their primary key must
+-- include the partitioning column. p_initial ends after the creation date;
+-- the history maintenance thread splits the following days off pmax ahead
+-- of time and drops expired ones.
+SET @create_history = CONCAT(
+    'CREATE TABLE IF NOT EXISTS object_history (',
+    'id BIGINT NOT NULL AUTO_INCREMENT, ',
+    'object_id VARCHAR(100) NOT NULL, ',
+    'timestamp TIMESTAMP NOT NULL, ',
+    'position_x FLOAT, ',
+    'position_y FLOAT, ',
+    'position_z FLOAT, ',
+    'height FLOAT, ',
+    'direction_x FLOAT, ',
+    'direction_y FLOAT, ',
+    'direction_z FLOAT, ',
+    'rotation FLOAT, ',
+    'status ENUM(''active'', ''inactive'', ''processing'', ''error''), ',
+    'metadata JSON, ',
+    'created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, ',
+    'PRIMARY KEY (id, timestamp), ',
+    'INDEX idx_object_timestamp (object_id, timestamp), ',
+    'INDEX idx_timestamp (timestamp)',
+    ') ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci ',
+    'PARTITION BY RANGE (UNIX_TIMESTAMP(timestamp)) (',
+    'PARTITION p_initial VALUES LESS THAN (', UNIX_TIMESTAMP(CURDATE() + INTERVAL 1 DAY), '), ',
+    'PARTITION pmax VALUES LESS THAN MAXVALUE)'
+);
+PREPARE create_history FROM @create_history;
+EXECUTE create_history;
+DEALLOCATE PREPARE create_history;
+
+-- Create HistoryRollup table holding the last state per object and bucket
+-- of each tier (60 and 3600 second buckets)
+CREATE TABLE IF NOT EXISTS object_history_rollups (
+    tier INT NOT NULL,
     object_id VARCHAR(100) NOT NULL,
-    timestamp TIMESTAMP NOT NULL,
+    bucket DATETIME NOT NULL,
+    timestamp DATETIME NOT NULL,
     position_x FLOAT,
     position_y FLOAT,
     position_z FLOAT,
@@ -50,12 +88,21 @@ CREATE TABLE IF NOT EXISTS object_history (
     direction_z FLOAT,
     rotation FLOAT,
     status ENUM('active', 'inactive', 'processing', 'error'),
-    metadata JSON,
+    object_metadata JSON,
+    sample_count INT NOT NULL DEFAULT 1,
+    PRIMARY KEY (tier, object_id, bucket),
+    INDEX idx_rollup_tier_bucket (tier, bucket),
+    INDEX idx_rollup_tier_object_timestamp (tier, object_id, timestamp)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Create SceneCheckpoint table
+CREATE TABLE IF NOT EXISTS scene_checkpoints (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    taken_at DATETIME NOT NULL UNIQUE,
+    object_count INT NOT NULL DEFAULT 0,
+    payload LONGBLOB NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (object_id) REFERENCES productline_objects(id) ON DELETE CASCADE,
-    INDEX idx_object_timestamp (object_id, timestamp),
-    INDEX idx_timestamp (timestamp),
-    INDEX idx_object_id (object_id)
+    INDEX idx_checkpoint_created_at (created_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Create trigger to ensure direction vector normalization
@@ -0,0 +1,58 @@
+-- Migrate object_history to daily range partitions and add history rollup tiers
+-- For databases created before history tiers; new databases get this schema
+-- from init_db.sql.
+--
+-- Rebuilding object_history copies the whole table. On large tables run the
+-- ALTER statements through an online schema change tool, or in a
+-- maintenance window.
+
+USE productline_3d;
+
+-- Partition bounds are Unix seconds of UTC midnights
+SET time_zone = '+00:00';
+
+-- Create HistoryRollup table holding the last state per object and bucket
+-- of each tier (60 and 3600 second buckets)
+CREATE TABLE IF NOT EXISTS object_history_rollups (
+    tier INT NOT NULL,
+    object_id VARCHAR(100) NOT NULL,
+    bucket DATETIME NOT NULL,
+    timestamp DATETIME NOT NULL,
+    position_x FLOAT,
+    position_y FLOAT,
+    position_z FLOAT,
+    height FLOAT,
+    direction_x FLOAT,
+    direction_y FLOAT,
+    direction_z FLOAT,
+    rotation FLOAT,
+    status ENUM('active', 'inactive', 'processing', 'error'),
+    object_metadata JSON,
+    sample_count INT NOT NULL DEFAULT 1,
+    PRIMARY KEY (tier, object_id, bucket),
+    INDEX idx_rollup_tier_bucket (tier, bucket),
+    INDEX idx_rollup_tier_object_timestamp (tier, object_id, timestamp)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Partitioned tables cannot have foreign keys; history of deleted objects
+-- now expires with its partition instead of cascading
+ALTER TABLE object_history DROP FOREIGN KEY object_history_ibfk_1;
+
+-- idx_object_id duplicates the prefix of idx_object_timestamp, and the
+-- primary key must include the partitioning column
+ALTER TABLE object_history
+    DROP INDEX idx_object_id,
+    MODIFY id BIGINT NOT NULL AUTO_INCREMENT,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, timestamp);
+
+-- Keep all existing history in p_initial so pmax starts empty; the history
+-- maintenance thread splits the following days off pmax
+SET @partition_history = CONCAT(
+    'ALTER TABLE object_history PARTITION BY RANGE (UNIX_TIMESTAMP(timestamp)) (',
+    'PARTITION p_initial VALUES LESS THAN (', UNIX_TIMESTAMP(CURDATE() + INTERVAL 1 DAY), '), ',
+    'PARTITION pmax VALUES LESS THAN MAXVALUE)'
+);
+PREPARE partition_history FROM @partition_history;
+EXECUTE partition_history;
+DEALLOCATE PREPARE partition_history;
@@ -1,5 +1,9 @@
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, Response, jsonify, current_app
 from src.database import test_database_connection
+from src.services.cache import get_object_cache, get_history_cache
+from src.services.write_behind import get_write_behind
+from src.middleware.metrics import get_metrics
+from src.middleware.query_profiler import get_query_profiler
 from src.app_logging import get_logger
 import time
 import psutil
@@ -21,6 +25,19 @@ def health_check():
         # Get system information
         system_info = get_system_info()
         
+        # Get cache counters
+        cache_info = {}
+        for name, cache in (('objects', get_object_cache()), ('history', get_history_cache())):
+            cache_info[name] = cache.stats() if cache is not None else {'enabled': False}
+        
+        # Get write-behind queue depth and flush latency
+        write_behind = get_write_behind()
+        write_behind_info = write_behind.stats() if write_behind is not None else {'enabled': False}
+        
+        # Get query profiling counters
+        query_profiler = get_query_profiler()
+        query_profiler_info = query_profiler.stats() if query_profiler is not None else {'enabled': False}
+        
         # Calculate response time
         response_time = (time.time() - start_time) * 1000  # Convert to milliseconds
         
@@ -37,7 +54,10 @@ def health_check():
                 'status': 'connected' if db_success else 'disconnected',
                 'message': db_message
             },
-            'system': system_info
+            'system': system_info,
+            'cache': cache_info,
+            'write_behind': write_behind_info,
+            'query_profiler': query_profiler_info
         }
         
         # Log health check
@@ -94,6 +114,19 @@ def liveness_check():
             'error': str(e)
         }), 503
 
+@health_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Request metrics in the Prometheus text exposition format."""
+    request_metrics = get_metrics()
+    if request_metrics is None:
+        return jsonify({
+            'error': 'Not Found',
+            'code': 'METRICS_DISABLED',
+            'message': 'Request metrics are disabled'
+        }), 404
+    
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
 def get_system_info():
     """Get system information for health check."""
     try:
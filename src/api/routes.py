@@ -1,14 +1,72 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from src.services.data_service import DataService
 from src.services.history_service import HistoryService
+from src.services.samples import parse_timestamp, to_utc_naive
 from src.services.batch_service import BatchService
-from src.api.validation import validate_object_id, validate_timestamp, validate_batch_request
+from src.services.spatial_service import SpatialService
+from src.services.coordinate_snapshot import CoordinateSnapshotService
+from src.services.scene_service import SceneService
+from src.services.change_service import ChangeService, InvalidCursorError
+from src.services.live_updates import client_disconnected, get_live_updates
+from src.services.trajectory_service import TrajectoryService, DOWNSAMPLE_MODES
+from src.services.ingest_service import HistoryIngestService
+from src.services.coordinate_write_service import CoordinateWriteService, InvalidCoordinatesError
+from src.services.write_behind import get_write_behind
+from src.services.wire_format import MIMETYPES, negotiate_format, encode_body, decode_msgpack
+from src.middleware.metrics import serialization_timer
+from src.services.validation import (
+    STATUSES, validate_object_id, validate_timestamp, validate_batch_request, validate_status,
+    validate_interpolation,
+    parse_bbox, parse_point
+)
 from src.app_logging import get_logger
 
 # Create API blueprint
 api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
 logger = get_logger(__name__)
 
+def negotiated_response(payload, objects):
+    """Encode a response in the wire format named by the Accept header."""
+    wire_format = negotiate_format(request.accept_mimetypes)
+    if wire_format == 'json':
+        response = jsonify(payload)
+    else:
+        with serialization_timer():
+            body = encode_body(payload, objects, wire_format)
+        response = Response(body, mimetype=MIMETYPES[wire_format])
+    response.vary.add('Accept')
+    return response
+
+def request_payload():
+    """Decode a JSON or MessagePack request body, or None if it is malformed."""
+    if request.mimetype in (MIMETYPES['msgpack'], 'application/x-msgpack'):
+        try:
+            return decode_msgpack(request.get_data())
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Malformed MessagePack body", error=str(e))
+            return None
+    return request.get_json(silent=True)
+
+def queued_response(write_behind, kind, items, replace=False):
+    """Queue writes behind the response, answering 202 or 503 if the queue is full."""
+    result = write_behind.enqueue(kind, items, replace=replace)
+    if not result['queued'] and not result['spilled']:
+        response = jsonify({
+            'error': 'Write queue full',
+            'code': 'WRITE_QUEUE_FULL',
+            'message': 'Too many pending writes, retry later'
+        })
+        response.headers['Retry-After'] = str(max(1, int(write_behind.flush_interval)))
+        return response, 503
+    
+    logger.info(f"Bulk writes queued", kind=kind, queued=result['queued'],
+               spilled=result['spilled'])
+    return jsonify({
+        'received': len(items),
+        'queued': result['queued'],
+        'spilled': result['spilled']
+    }), 202
+
 @api_bp.route('/objects/<object_id>', methods=['GET'])
 def get_object(object_id):
     """Get object data by ID with optional timestamp."""
@@ -30,10 +88,19 @@ def get_object(object_id):
                 'message': 'Timestamp must be valid ISO 8601 format'
             }), 400
         
+        # Get interpolation mode
+        interpolate = request.args.get('interpolate')
+        if interpolate is not None and (not timestamp or not validate_interpolation(interpolate)):
+            return jsonify({
+                'error': 'Invalid interpolation',
+                'code': 'INVALID_INTERPOLATION',
+                'message': 'interpolate must be linear or slerp and requires a timestamp'
+            }), 400
+        
         # Get object data
         if timestamp:
             data_service = HistoryService()
-            result = data_service.get_object_at_timestamp(object_id, timestamp)
+            result = data_service.get_object_at_timestamp(object_id, timestamp, interpolate=interpolate)
         else:
             data_service = DataService()
             result = data_service.get_object(object_id)
@@ -46,7 +113,7 @@ def get_object(object_id):
             }), 404
         
         logger.info(f"Retrieved object {object_id}", object_id=object_id, timestamp=timestamp)
-        return jsonify(result), 200
+        return negotiated_response(result, [result]), 200
         
     except Exception as e:
         logger.error(f"Error retrieving object {object_id}", error=str(e), object_id=object_id)
@@ -79,14 +146,15 @@ def get_objects_batch():
         batch_service = BatchService()
         result = batch_service.get_objects_batch(
             data.get('object_ids', []),
-            data.get('timestamp')
+            data.get('timestamp'),
+            interpolate=data.get('interpolate')
         )
         
         logger.info(f"Batch request processed", 
                    object_count=len(data.get('object_ids', [])),
                    timestamp=data.get('timestamp'))
         
-        return jsonify(result), 200
+        return negotiated_response(result, result['objects']), 200
         
     except Exception as e:
         logger.error(f"Error processing batch request", error=str(e))
@@ -96,6 +164,465 @@ def get_objects_batch():
             'message': 'An unexpected error occurred'
         }), 500
 
+@api_bp.route('/objects/spatial', methods=['GET'])
+def get_objects_spatial():
+    """Find objects inside a bounding box or nearest to a point."""
+    try:
+        max_results = current_app.config.get('SPATIAL_QUERY_MAX_RESULTS', 10000)
+        spatial_service = SpatialService()
+        
+        near = request.args.get('near')
+        if near is not None:
+            # Nearest-N query
+            point = parse_point(near)
+            n = request.args.get('n', default=10, type=int)
+            max_distance = request.args.get('max_distance', type=float)
+            if point is None or n is None or not 1 <= n <= max_results:
+                return jsonify({
+                    'error': 'Invalid nearest query',
+                    'code': 'INVALID_SPATIAL_QUERY',
+                    'message': f'near must be x,y,z and n between 1 and {max_results}'
+                }), 400
+            
+            objects = spatial_service.find_nearest(point, n=n, max_distance=max_distance)
+            return jsonify({
+                'near': {'x': point[0], 'y': point[1], 'z': point[2]},
+                'count': len(objects),
+                'objects': objects
+            }), 200
+        
+        # Bounding box query
+        bbox = parse_bbox(request.args.get('bbox'))
+        limit = request.args.get('limit', default=max_results, type=int)
+        if bbox is None or limit is None or not 1 <= limit <= max_results:
+            return jsonify({
+                'error': 'Invalid bounding box',
+                'code': 'INVALID_SPATIAL_QUERY',
+                'message': 'bbox must be min_x,min_y,min_z,max_x,max_y,max_z '
+                           f'and limit between 1 and {max_results}'
+            }), 400
+        
+        objects = spatial_service.find_in_box(bbox, limit=limit)
+        return jsonify({
+            'bbox': {
+                'min': {'x': bbox[0], 'y': bbox[1], 'z': bbox[2]},
+                'max': {'x': bbox[3], 'y': bbox[4], 'z': bbox[5]}
+            },
+            'count': len(objects),
+            'objects': objects
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error processing spatial query", error=str(e))
+        return jsonify({
+            'error': 'Internal server error',
+            'code': 'INTERNAL_ERROR',
+            'message': 'An unexpected error occurred'
+        }), 500
+
+@api_bp.route('/objects/<object_id>/neighbors', methods=['GET'])
+def get_object_neighbors(object_id):
+    """Get the nearest neighbours of an object."""
+    try:
+        # Validate object ID
+        if not validate_object_id(object_id):
+            return jsonify({
+                'error': 'Invalid object ID format',
+                'code': 'INVALID_OBJECT_ID',
+                'message': 'Object ID must be 1-100 characters'
+            }), 400
+        
+        # Validate k and radius
+        max_results = current_app.config.get('SPATIAL_QUERY_MAX_RESULTS', 10000)
+        radius = request.args.get('radius', type=float)
+        k = request.args.get('k', default=10 if radius is None else max_results, type=int)
+        if (k is None or not 1 <= k <= max_results
+                or (radius is not None and not radius >= 0)
+                or ('radius' in request.args and radius is None)):
+            return jsonify({
+                'error': 'Invalid neighbors query',
+                'code': 'INVALID_SPATIAL_QUERY',
+                'message': f'k must be between 1 and {max_results} and radius must be non-negative'
+            }), 400
+        
+        spatial_service = SpatialService()
+        result = spatial_service.find_neighbors(object_id, k=k, radius=radius)
+        
+        if result is None:
+            return jsonify({
+                'error': 'Object not found',
+                'code': 'OBJECT_NOT_FOUND',
+                'message': f'Object with ID \'{object_id}\' has no coordinates'
+            }), 404
+        
+        return jsonify(result), 200
+        
+    except Exception as e:
+        logger.error(f"Error finding neighbors of {object_id}", error=str(e), object_id=object_id)
+        return jsonify({
+            'error': 'Internal server error',
+            'code': 'INTERNAL_ERROR',
+            'message': 'An unexpected error occurred'
+        }), 500
+
+@api_bp.route('/objects/<object_id>/trajectory', methods=['GET'])
+def get_object_trajectory(object_id):
+    """Get an object's trajectory over a time range, paginated or downsampled."""
+    try:
+        # Validate object ID
+        if not validate_object_id(object_id):
+            return jsonify({
+                'error': 'Invalid object ID format',
+                'code': 'INVALID_OBJECT_ID',
+                'message': 'Object ID must be 1-100 characters'
+            }), 400
+        
+        # Validate time range
+        start = request.args.get('start')
+        end = request.args.get('end')
+        if not validate_timestamp(start) or not validate_timestamp(end):
+            return jsonify({
+                'error': 'Invalid timestamp format',
+                'code': 'INVALID_TIMESTAMP',
+                'message': 'start and end must be valid ISO 8601 format'
+            }), 400
+        
+        # Validate paging and downsampling
+        config = current_app.config
+        max_limit = config.get('TRAJECTORY_MAX_PAGE_SIZE', 10000)
+        max_points_limit = config.get('TRAJECTORY_MAX_POINTS', 10000)
+        limit = request.args.get('limit', default=config.get('TRAJECTORY_PAGE_SIZE', 1000), type=int)
+        downsample = request.args.get('downsample')
+        max_points = request.args.get('max_points', default=1000, type=int)
+        tolerance = request.args.get('tolerance', default=0.0, type=float)
+        if (limit is None or not 1 <= limit <= max_limit
+                or (downsample is not None and downsample not in DOWNSAMPLE_MODES)
+                or max_points is None or not 2 <= max_points <= max_points_limit
+                or tolerance is None or not tolerance >= 0):
+            return jsonify({
+                'error': 'Invalid trajectory query',
+                'code': 'INVALID_TRAJECTORY_QUERY',
+                'message': f'limit must be between 1 and {max_limit}, downsample one of '
+                           f'{", ".join(DOWNSAMPLE_MODES)}, max_points between 2 and '
+                           f'{max_points_limit} and tolerance non-negative'
+            }), 400
+        
+        trajectory_service = TrajectoryService(
+            batch_size=config.get('TRAJECTORY_BATCH_SIZE', 5000),
+            rdp_max_input=config.get('TRAJECTORY_RDP_MAX_INPUT', 50000)
+        )
+        try:
+            result = trajectory_service.get_trajectory(
+                object_id, start=start, end=end, cursor=request.args.get('cursor'),
+                limit=limit, downsample=downsample, max_points=max_points, tolerance=tolerance
+            )
+        except InvalidCursorError:
+            return jsonify({
+                'error': 'Invalid cursor',
+                'code': 'INVALID_CURSOR',
+                'message': 'cursor must be a cursor returned by this endpoint'
+            }), 400
+        
+        if result is None:
+            return jsonify({
+                'error': 'Object not found',
+                'code': 'OBJECT_NOT_FOUND',
+                'message': f'Object with ID \'{object_id}\' does not exist'
+            }), 404
+        
+        logger.info(f"Retrieved trajectory of {object_id}", object_id=object_id,
+                   point_count=result['count'], downsample=downsample)
+        return jsonify(result), 200
+        
+    except Exception as e:
+        logger.error(f"Error retrieving trajectory of {object_id}", error=str(e), object_id=object_id)
+        return jsonify({
+            'error': 'Internal server error',
+            'code': 'INTERNAL_ERROR',
+            'message': 'An unexpected error occurred'
+        }), 500
+
+@api_bp.route('/coordinates', methods=['GET'])
+def get_coordinates_snapshot():
+    """Export every object's current coordinates in columnar form."""
+    try:
+        snapshot_service = CoordinateSnapshotService()
+        result = snapshot_service.get_columns()
+        
+        logger.info(f"Coordinate snapshot exported", object_count=result['count'])
+        return jsonify(result), 200
+        
+    except Exception as e:
+        logger.error(f"Error exporting coordinate snapshot", error=str(e))
+        return jsonify({
+            'error': 'Internal server error',
+            'code': 'INTERNAL_ERROR',
+            'message': 'An unexpected error occurred'
+        }), 500
+
+def coordinate_write_service():
+    """Build the coordinate write service from the app configuration."""
+    return CoordinateWriteService(
+        coalesce_window=current_app.config.get('COORDINATE_COALESCE_WINDOW', 1.0),
+        mutable_horizon=current_app.config.get('HISTORY_CACHE_MUTABLE_HORIZON', 300.0)
+    )
+
+@api_bp.route('/objects/<object_id>/coordinates', methods=['PUT', 'PATCH'])
+def update_object_coordinates(object_id):
+    """Replace (PUT) or partially update (PATCH) an object's coordinates."""
+    try:
+        # Validate object ID
+        if not validate_object_id(object_id):
+            return jsonify({
+                'error': 'Invalid object ID format',
+                'code': 'INVALID_OBJECT_ID',
+                'message': 'Object ID must be 1-100 characters'
+            }), 400
+        
+        replace = request.method == 'PUT'
+        try:
+            result = coordinate_write_service().update_coordinates(
+                object_id, request_payload(), replace=replace
+            )
+        except InvalidCoordinatesError as e:
+            return jsonify({
+                'error': 'Invalid timestamp' if e.code == 'INVALID_TIMESTAMP' else 'Invalid coordinates',
+                'code': e.code,
+                'message': str(e)
+            }), 400
+        
+        if result is None:
+            return jsonify({
+                'error': 'Object not found',
+                'code': 'OBJECT_NOT_FOUND',
+                'message': f'Object with ID \'{object_id}\' does not exist'
+            }), 404
+        
+        logger.info(f"Coordinates updated for {object_id}", object_id=object_id,
+                   replace=replace, history_action=result['history']['action'])
+        return negotiated_response(result, [result]), 200
+        
+    except Exception as e:
+        logger.error(f"Error updating coordinates of {object_id}", error=str(e), object_id=object_id)
+        return jsonify({
+            'error': 'Internal server error',
+            'code': 'INTERNAL_ERROR',
+            'message': 'An unexpected error occurred'
+        }), 500
+
+@api_bp.route('/coordinates/bulk', methods=['PUT', 'PATCH'])
+def update_coordinates_bulk():
+    """Update the coordinates of many objects in one transaction."""
+    try:
+        max_updates = current_app.config.get('COORDINATE_BULK_MAX_UPDATES', 1000)
+        data = request_payload()
+        updates = data.get('updates') if isinstance(data, dict) else None
+        if not isinstance(updates, list) or not updates:
+            return jsonify({
+                'error': 'Invalid bulk request',
+                'code': 'INVALID_BULK_REQUEST',
+                'message': 'Request must contain a non-empty updates array'
+            }), 400
+        if len(updates) > max_updates:
+            return jsonify({
+                'error': 'Too many updates',
+                'code': 'BULK_TOO_LARGE',
+                'message': f'A request may contain at most {max_updates} updates'
+            }), 413
+        
+        write_behind = get_write_behind()
+        if write_behind is not None:
+            return queued_response(write_behind, 'coordinates', updates,
+                                   replace=request.method == 'PUT')
+        
+        result = coordinate_write_service().update_many(updates, replace=request.method == 'PUT')
+        
+        logger.info(f"Bulk coordinates updated", updated=result['updated'],
+                   coalesced=result['coalesced'], rejected=result['rejected'])
+        return jsonify(result), 200
+        
+    except Exception as e:
+        logger.error(f"Error updating coordinates in bulk", error=str(e))
+        return jsonify({
+            'error': 'Internal server error',
+            'code': 'INTERNAL_ERROR',
+            'message': 'An unexpected error occurred'
+        }), 500
+
+@api_bp.route('/scene', methods=['GET'])
+def get_scene():
+    """Stream every object with its coordinates, optionally filtered by status or at a past timestamp."""
+    try:
+        status = request.args.get('status')
+        if status is not None and not validate_status(status):
+            return jsonify({
+                'error': 'Invalid status',
+                'code': 'INVALID_STATUS',
+                'message': f"Status must be one of {', '.join(STATUSES)}"
+            }), 400
+        
+        # Get timestamp parameter to replay a past scene
+        timestamp = request.args.get('timestamp')
+        if timestamp and not validate_timestamp(timestamp):
+            return jsonify({
+                'error': 'Invalid timestamp format',
+                'code': 'INVALID_TIMESTAMP',
+                'message': 'Timestamp must be valid ISO 8601 format'
+            }), 400
+        
+        wire_format = negotiate_format(request.accept_mimetypes)
+        scene_service = SceneService()
+        stream = scene_service.stream_scene(
+            status=status,
+            batch_size=current_app.config.get('SCENE_STREAM_BATCH_SIZE', 1000),
+            chunk_size=current_app.config.get('SCENE_STREAM_CHUNK_SIZE', 100),
+            wire_format=wire_format,
+            timestamp=to_utc_naive(parse_timestamp(timestamp)) if timestamp else None
+        )
+        
+        logger.info(f"Scene stream started", status=status, timestamp=timestamp,
+                    wire_format=wire_format)
+        response = Response(stream_with_context(stream), mimetype=MIMETYPES[wire_format])
+        response.headers['X-Accel-Buffering'] = 'no'
+        response.vary.add('Accept')
+        return response, 200
+        
+    except Exception as e:
+        logger.error(f"Error starting scene stream", error=str(e))
+        return jsonify({
+            'error': 'Internal server error',
+            'code': 'INTERNAL_ERROR',
+            'message': 'An unexpected error occurred'
+        }), 500
+
+@api_bp.route('/changes', methods=['GET'])
+def get_changes():
+    """Get the objects changed since a cursor."""
+    try:
+        max_limit = current_app.config.get('CHANGES_MAX_PAGE_SIZE', 5000)
+        limit = request.args.get('limit', default=current_app.config.get('CHANGES_PAGE_SIZE', 1000), type=int)
+        if limit is None or not 1 <= limit <= max_limit:
+            return jsonify({
+                'error': 'Invalid limit',
+                'code': 'INVALID_LIMIT',
+                'message': f'limit must be between 1 and {max_limit}'
+            }), 400
+        
+        change_service = ChangeService(
+            settle_delay=current_app.config.get('CHANGES_SETTLE_DELAY', 1.0)
+        )
+        try:
+            result = change_service.get_changes(request.args.get('since'), limit=limit)
+        except InvalidCursorError:
+            return jsonify({
+                'error': 'Invalid cursor',
+                'code': 'INVALID_CURSOR',
+                'message': 'since must be a cursor returned by this endpoint'
+            }), 400
+        
+        logger.info(f"Changes retrieved", change_count=result['count'], has_more=result['has_more'])
+        return negotiated_response(result, result['changes']), 200
+        
+    except Exception as e:
+        logger.error(f"Error retrieving changes", error=str(e))
+        return jsonify({
+            'error': 'Internal server error',
+            'code': 'INTERNAL_ERROR',
+            'message': 'An unexpected error occurred'
+        }), 500
+
+@api_bp.route('/history/bulk', methods=['POST'])
+def ingest_history_bulk():
+    """Write a batch of history samples, reporting rejected samples individually."""
+    try:
+        max_samples = current_app.config.get('HISTORY_BULK_MAX_SAMPLES', 10000)
+        data = request_payload()
+        samples = data.get('samples') if isinstance(data, dict) else None
+        if not isinstance(samples, list) or not samples:
+            return jsonify({
+                'error': 'Invalid bulk request',
+                'code': 'INVALID_BULK_REQUEST',
+                'message': 'Request must contain a non-empty samples array'
+            }), 400
+        if len(samples) > max_samples:
+            return jsonify({
+                'error': 'Too many samples',
+                'code': 'BULK_TOO_LARGE',
+                'message': f'A request may contain at most {max_samples} samples'
+            }), 413
+        
+        write_behind = get_write_behind()
+        if write_behind is not None:
+            return queued_response(write_behind, 'history', samples)
+        
+        ingest_service = HistoryIngestService(
+            chunk_size=current_app.config.get('HISTORY_BULK_CHUNK_SIZE', 1000),
+            mutable_horizon=current_app.config.get('HISTORY_CACHE_MUTABLE_HORIZON', 300.0)
+        )
+        result = ingest_service.ingest(samples)
+        
+        logger.info(f"History samples ingested", received=result['received'],
+                   inserted=result['inserted'], rejected=result['rejected'])
+        return jsonify(result), 200
+        
+    except Exception as e:
+        logger.error(f"Error ingesting history samples", error=str(e))
+        return jsonify({
+            'error': 'Internal server error',
+            'code': 'INTERNAL_ERROR',
+            'message': 'An unexpected error occurred'
+        }), 500
+
+@api_bp.route('/live', methods=['GET'])
+def get_live_updates_stream():
+    """Push object changes as Server-Sent Events, filtered by IDs and bounding box."""
+    try:
+        # Parse subscription filters
+        object_ids = None
+        if request.args.get('ids'):
+            object_ids = request.args['ids'].split(',')
+        bbox = None
+        if request.args.get('bbox'):
+            bbox = parse_bbox(request.args['bbox'])
+        if ((object_ids is not None and not all(validate_object_id(i) for i in object_ids))
+                or ('bbox' in request.args and bbox is None)):
+            return jsonify({
+                'error': 'Invalid subscription',
+                'code': 'INVALID_SUBSCRIPTION',
+                'message': 'ids must be comma-separated object IDs and bbox must be '
+                           'min_x,min_y,min_z,max_x,max_y,max_z'
+            }), 400
+        
+        broker = get_live_updates()
+        subscription = broker.subscribe(object_ids=object_ids, bbox=bbox)
+        if subscription is None:
+            return jsonify({
+                'error': 'Too many subscribers',
+                'code': 'TOO_MANY_SUBSCRIBERS',
+                'message': 'The live update channel is full, retry later'
+            }), 503
+        
+        logger.info(f"Live update subscription opened",
+                   object_count=len(object_ids) if object_ids else None, bbox=bbox)
+        client_socket = request.environ.get('gunicorn.socket')
+        stream = broker.stream(
+            subscription,
+            heartbeat_interval=current_app.config.get('LIVE_UPDATES_HEARTBEAT_INTERVAL', 5.0),
+            disconnected=(lambda: client_disconnected(client_socket)) if client_socket else None
+        )
+        response = Response(stream, mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response, 200
+        
+    except Exception as e:
+        logger.error(f"Error opening live update subscription", error=str(e))
+        return jsonify({
+            'error': 'Internal server error',
+            'code': 'INTERNAL_ERROR',
+            'message': 'An unexpected error occurred'
+        }), 500
+
 @api_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
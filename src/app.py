@@ -14,9 +14,19 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from src.config import config
 from dotenv import load_dotenv
 from src.database import init_database
+from src.services.cache import init_cache
+from src.services.coordinate_snapshot import init_coordinate_snapshot
+from src.services.spatial_service import init_spatial_index
+from src.services.live_updates import init_live_updates
+from src.services.scene_replay import init_scene_checkpoints
+from src.services.history_archive import init_history_archive
+from src.services.history_tiers import init_history_tiers
+from src.services.write_behind import init_write_behind
 from src.app_logging import setup_logging, get_logger
 from src.middleware.error_handler import register_error_handlers
 from src.middleware.cors import init_cors
+from src.middleware.metrics import init_metrics
+from src.middleware.query_profiler import init_query_profiler
 from src.api.routes import api_bp
 from src.api.health import health_bp
 
@@ -41,13 +51,43 @@ def create_app(config_name=None):
     config_name = config_name or os.environ.get('FLASK_ENV', 'development')
     app.config.from_object(config[config_name])
     
+    # Apply JSON output settings
+    app.json.sort_keys = app.config.get('JSON_SORT_KEYS', False)
+    app.json.compact = not app.config.get('JSONIFY_PRETTYPRINT_REGULAR', False)
+    
     # Initialize logging
     setup_logging(app)
     logger = get_logger(__name__)
     
+    # Initialize request metrics first, so they cover the other request hooks
+    init_metrics(app)
+    
+    # Initialize sampled query profiling
+    init_query_profiler(app)
+    
     # Initialize database
     init_database(app)
     
+    # Initialize caches
+    init_cache(app)
+    
+    # Initialize coordinate snapshot and spatial index
+    init_coordinate_snapshot(app)
+    init_spatial_index(app)
+    
+    # Initialize live update broker
+    init_live_updates(app)
+    
+    # Initialize scene checkpoints
+    init_scene_checkpoints(app)
+    
+    # Initialize the cold history archive, then history tiers and retention
+    init_history_archive(app)
+    init_history_tiers(app)
+    
+    # Initialize write-behind queue
+    init_write_behind(app)
+    
     # Initialize CORS
     init_cors(app)
     
@@ -189,6 +229,16 @@ def create_app(config_name=None):
                 'health': '/api/v1/health',
                 'objects': '/api/v1/objects/{id}',
                 'batch': '/api/v1/objects/batch',
+                'spatial': '/api/v1/objects/spatial?bbox={min_x,min_y,min_z,max_x,max_y,max_z}',
+                'neighbors': '/api/v1/objects/{id}/neighbors?k={k}&radius={radius}',
+                'trajectory': '/api/v1/objects/{id}/trajectory?start={start}&end={end}&downsample={bucket|rdp}',
+                'history_bulk': '/api/v1/history/bulk',
+                'coordinates': '/api/v1/coordinates',
+                'object_coordinates': '/api/v1/objects/{id}/coordinates (PUT, PATCH)',
+                'coordinates_bulk': '/api/v1/coordinates/bulk (PUT, PATCH)',
+                'scene': '/api/v1/scene?status={status}&timestamp={timestamp}',
+                'changes': '/api/v1/changes?since={cursor}',
+                'live': '/api/v1/live?ids={ids}&bbox={bbox}',
                 'test': '/test'
             }
         })
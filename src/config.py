@@ -21,11 +21,124 @@ class Config:
     # Flask configuration
     SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-here')
     JSON_SORT_KEYS = False
-    JSONIFY_PRETTYPRINT_REGULAR = True
+    JSONIFY_PRETTYPRINT_REGULAR = os.environ.get('JSONIFY_PRETTYPRINT_REGULAR', 'false').lower() == 'true'
     
     # API configuration
     API_VERSION = 'v1'
     
+    # Read path: 'orm' loads model instances, 'core' reads plain column rows
+    READ_PATH = os.environ.get('READ_PATH', 'orm')
+    
+    # Cache backend: 'memory' (per process) or 'redis' (shared by all workers)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_URL = os.environ.get('CACHE_URL', 'redis://localhost:6379/0')
+    CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'productline')
+    CACHE_SOCKET_TIMEOUT = float(os.environ.get('CACHE_SOCKET_TIMEOUT', 0.25))
+    
+    # Object snapshot cache
+    OBJECT_CACHE_ENABLED = os.environ.get('OBJECT_CACHE_ENABLED', 'true').lower() == 'true'
+    OBJECT_CACHE_TTL = float(os.environ.get('OBJECT_CACHE_TTL', 5.0))
+    OBJECT_CACHE_MAX_SIZE = int(os.environ.get('OBJECT_CACHE_MAX_SIZE', 10000))
+    
+    # Historical snapshot cache
+    HISTORY_CACHE_ENABLED = os.environ.get('HISTORY_CACHE_ENABLED', 'true').lower() == 'true'
+    HISTORY_CACHE_TTL = float(os.environ.get('HISTORY_CACHE_TTL', 86400.0))
+    HISTORY_CACHE_MAX_ENTRIES = int(os.environ.get('HISTORY_CACHE_MAX_ENTRIES', 50000))
+    HISTORY_CACHE_QUANTUM = float(os.environ.get('HISTORY_CACHE_QUANTUM', 1.0))
+    HISTORY_CACHE_MUTABLE_HORIZON = float(os.environ.get('HISTORY_CACHE_MUTABLE_HORIZON', 300.0))
+    
+    # History tiers, partitions and retention (seconds, 0 keeps forever)
+    HISTORY_MAINTENANCE_ENABLED = os.environ.get('HISTORY_MAINTENANCE_ENABLED', 'true').lower() == 'true'
+    HISTORY_MAINTENANCE_INTERVAL = float(os.environ.get('HISTORY_MAINTENANCE_INTERVAL', 300.0))
+    HISTORY_RAW_RETENTION = float(os.environ.get('HISTORY_RAW_RETENTION', 0.0))
+    HISTORY_MINUTE_TIER_RETENTION = float(os.environ.get('HISTORY_MINUTE_TIER_RETENTION', 7776000.0))
+    HISTORY_HOUR_TIER_RETENTION = float(os.environ.get('HISTORY_HOUR_TIER_RETENTION', 0.0))
+    HISTORY_RETENTION_MODE = os.environ.get('HISTORY_RETENTION_MODE', 'drop')
+    HISTORY_PARTITION_PREMAKE = int(os.environ.get('HISTORY_PARTITION_PREMAKE', 3))
+    HISTORY_PARTITION_MAX_PER_RUN = int(os.environ.get('HISTORY_PARTITION_MAX_PER_RUN', 7))
+    HISTORY_ROLLUP_MAX_SPAN = float(os.environ.get('HISTORY_ROLLUP_MAX_SPAN', 3600.0))
+    HISTORY_ROLLUP_MAX_ROWS = int(os.environ.get('HISTORY_ROLLUP_MAX_ROWS', 100000))
+    
+    # Cold history archive, written in 'archive' retention mode
+    HISTORY_ARCHIVE_PATH = os.environ.get('HISTORY_ARCHIVE_PATH', 'data/history_archive')
+    HISTORY_ARCHIVE_ROW_GROUP_SIZE = int(os.environ.get('HISTORY_ARCHIVE_ROW_GROUP_SIZE', 16384))
+    HISTORY_ARCHIVE_CACHE_CHUNKS = int(os.environ.get('HISTORY_ARCHIVE_CACHE_CHUNKS', 256))
+    HISTORY_ARCHIVE_RETENTION = float(os.environ.get('HISTORY_ARCHIVE_RETENTION', 0.0))
+    
+    # Columnar coordinate snapshot
+    COORDINATE_SNAPSHOT_REFRESH_INTERVAL = float(os.environ.get('COORDINATE_SNAPSHOT_REFRESH_INTERVAL', 1.0))
+    COORDINATE_SNAPSHOT_FULL_RELOAD_INTERVAL = float(os.environ.get('COORDINATE_SNAPSHOT_FULL_RELOAD_INTERVAL', 300.0))
+    
+    # Spatial index
+    SPATIAL_INDEX_CELL_SIZE = float(os.environ.get('SPATIAL_INDEX_CELL_SIZE', 10.0))
+    SPATIAL_QUERY_MAX_RESULTS = int(os.environ.get('SPATIAL_QUERY_MAX_RESULTS', 10000))
+    
+    # Full-scene streaming
+    SCENE_STREAM_BATCH_SIZE = int(os.environ.get('SCENE_STREAM_BATCH_SIZE', 1000))
+    SCENE_STREAM_CHUNK_SIZE = int(os.environ.get('SCENE_STREAM_CHUNK_SIZE', 100))
+    
+    # Scene checkpoints for replaying past scenes
+    SCENE_CHECKPOINT_ENABLED = os.environ.get('SCENE_CHECKPOINT_ENABLED', 'true').lower() == 'true'
+    SCENE_CHECKPOINT_INTERVAL = float(os.environ.get('SCENE_CHECKPOINT_INTERVAL', 900.0))
+    SCENE_CHECKPOINT_CHECK_INTERVAL = float(os.environ.get('SCENE_CHECKPOINT_CHECK_INTERVAL', 60.0))
+    SCENE_CHECKPOINT_MAX_BACKFILL = int(os.environ.get('SCENE_CHECKPOINT_MAX_BACKFILL', 96))
+    SCENE_CHECKPOINT_RETENTION = float(os.environ.get('SCENE_CHECKPOINT_RETENTION', 0.0))
+    SCENE_CHECKPOINT_CACHE_SIZE = int(os.environ.get('SCENE_CHECKPOINT_CACHE_SIZE', 4))
+    SCENE_CHECKPOINT_BUILD_WINDOW = float(os.environ.get('SCENE_CHECKPOINT_BUILD_WINDOW', 86400.0))
+    
+    # Delta synchronization
+    CHANGES_PAGE_SIZE = int(os.environ.get('CHANGES_PAGE_SIZE', 1000))
+    CHANGES_MAX_PAGE_SIZE = int(os.environ.get('CHANGES_MAX_PAGE_SIZE', 5000))
+    CHANGES_SETTLE_DELAY = float(os.environ.get('CHANGES_SETTLE_DELAY', 1.0))
+    
+    # Live updates (Server-Sent Events); each subscriber holds one of the
+    # worker's threads, so keep the cap well below gunicorn's --threads
+    LIVE_UPDATES_POLL_INTERVAL = float(os.environ.get('LIVE_UPDATES_POLL_INTERVAL', 0.5))
+    LIVE_UPDATES_QUEUE_SIZE = int(os.environ.get('LIVE_UPDATES_QUEUE_SIZE', 256))
+    LIVE_UPDATES_MAX_SUBSCRIBERS = int(os.environ.get('LIVE_UPDATES_MAX_SUBSCRIBERS', 4))
+    LIVE_UPDATES_HEARTBEAT_INTERVAL = float(os.environ.get('LIVE_UPDATES_HEARTBEAT_INTERVAL', 5.0))
+    
+    # Trajectories
+    TRAJECTORY_PAGE_SIZE = int(os.environ.get('TRAJECTORY_PAGE_SIZE', 1000))
+    TRAJECTORY_MAX_PAGE_SIZE = int(os.environ.get('TRAJECTORY_MAX_PAGE_SIZE', 10000))
+    TRAJECTORY_MAX_POINTS = int(os.environ.get('TRAJECTORY_MAX_POINTS', 10000))
+    TRAJECTORY_RDP_MAX_INPUT = int(os.environ.get('TRAJECTORY_RDP_MAX_INPUT', 50000))
+    TRAJECTORY_BATCH_SIZE = int(os.environ.get('TRAJECTORY_BATCH_SIZE', 5000))
+    
+    # Bulk history ingestion
+    HISTORY_BULK_MAX_SAMPLES = int(os.environ.get('HISTORY_BULK_MAX_SAMPLES', 10000))
+    HISTORY_BULK_CHUNK_SIZE = int(os.environ.get('HISTORY_BULK_CHUNK_SIZE', 1000))
+    
+    # Coordinate updates
+    COORDINATE_COALESCE_WINDOW = float(os.environ.get('COORDINATE_COALESCE_WINDOW', 1.0))
+    COORDINATE_BULK_MAX_UPDATES = int(os.environ.get('COORDINATE_BULK_MAX_UPDATES', 1000))
+    
+    # Write-behind queue for bulk writes
+    WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', 'false').lower() == 'true'
+    WRITE_BEHIND_MAX_QUEUE = int(os.environ.get('WRITE_BEHIND_MAX_QUEUE', 100000))
+    WRITE_BEHIND_BATCH_SIZE = int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', 1000))
+    WRITE_BEHIND_FLUSH_INTERVAL = float(os.environ.get('WRITE_BEHIND_FLUSH_INTERVAL', 0.5))
+    WRITE_BEHIND_MAX_RETRIES = int(os.environ.get('WRITE_BEHIND_MAX_RETRIES', 5))
+    WRITE_BEHIND_RETRY_BACKOFF = float(os.environ.get('WRITE_BEHIND_RETRY_BACKOFF', 0.5))
+    WRITE_BEHIND_MAX_BACKOFF = float(os.environ.get('WRITE_BEHIND_MAX_BACKOFF', 30.0))
+    WRITE_BEHIND_SPILL_PATH = os.environ.get('WRITE_BEHIND_SPILL_PATH', 'data/write_behind.spill')
+    
+    # Request metrics (latency buckets in seconds)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_LATENCY_BUCKETS = tuple(
+        float(bound) for bound in os.environ.get(
+            'METRICS_LATENCY_BUCKETS', '0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10'
+        ).split(',')
+    )
+    
+    # Sampled query profiling (N+1 detection and slow query log)
+    QUERY_PROFILER_ENABLED = os.environ.get('QUERY_PROFILER_ENABLED', 'false').lower() == 'true'
+    QUERY_PROFILER_SAMPLE_RATE = float(os.environ.get('QUERY_PROFILER_SAMPLE_RATE', 0.01))
+    QUERY_PROFILER_REPEAT_THRESHOLD = int(os.environ.get('QUERY_PROFILER_REPEAT_THRESHOLD', 5))
+    QUERY_PROFILER_SLOW_THRESHOLD = float(os.environ.get('QUERY_PROFILER_SLOW_THRESHOLD', 0.1))
+    QUERY_PROFILER_EXPLAIN = os.environ.get('QUERY_PROFILER_EXPLAIN', 'true').lower() == 'true'
+    QUERY_PROFILER_EXPLAIN_INTERVAL = float(os.environ.get('QUERY_PROFILER_EXPLAIN_INTERVAL', 300.0))
+    
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     LOG_FILE = os.environ.get('LOG_FILE', 'logs/app.log')
@@ -47,7 +160,7 @@ class DevelopmentConfig(Config):
     
     # CORS
     CORS_ORIGINS = ['*']
-    CORS_METHODS = ['GET', 'POST', 'OPTIONS']
+    CORS_METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'OPTIONS']
     CORS_HEADERS = ['Content-Type', 'Authorization']
 
 class ProductionConfig(Config):
@@ -68,7 +181,7 @@ class ProductionConfig(Config):
     
     # CORS
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '').split(',')
-    CORS_METHODS = ['GET', 'POST', 'OPTIONS']
+    CORS_METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'OPTIONS']
     CORS_HEADERS = ['Content-Type', 'Authorization']
 
 class TestingConfig(Config):
@@ -83,6 +196,15 @@ class TestingConfig(Config):
     
     # Disable CSRF for testing
     WTF_CSRF_ENABLED = False
+    
+    # Checkpoints are created explicitly in tests
+    SCENE_CHECKPOINT_ENABLED = False
+    
+    # Bulk writes are synchronous in tests
+    WRITE_BEHIND_ENABLED = False
+    
+    # History tiers are maintained explicitly in tests
+    HISTORY_MAINTENANCE_ENABLED = False
 
 # Configuration mapping
 config = {
@@ -1,8 +1,17 @@
+from contextlib import contextmanager
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.pool import QueuePool
 from sqlalchemy.orm import sessionmaker
+import hashlib
 import os
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
 
 # Initialize SQLAlchemy
 db = SQLAlchemy()
@@ -44,6 +53,53 @@ def init_database(app):
     
     return db
 
+@contextmanager
+def advisory_lock(name, timeout=0):
+    """Hold a named lock shared by every process using the database.
+    
+    On MySQL this is GET_LOCK on a dedicated connection, so it covers every
+    host. Other databases fall back to an exclusive flock on a lock file in
+    the temporary directory, which covers the processes of this host.
+    Waits at most `timeout` seconds and yields whether the lock was taken;
+    the block runs either way, so callers skip their work when it was not.
+    """
+    engine = db.engine
+    if engine.dialect.name == 'mysql':
+        with engine.connect() as connection:
+            acquired = connection.execute(
+                text("SELECT GET_LOCK(:name, :timeout)"), {'name': name, 'timeout': timeout}
+            ).scalar() == 1
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    connection.execute(text("SELECT RELEASE_LOCK(:name)"), {'name': name})
+        return
+    
+    if fcntl is None:
+        yield True
+        return
+    
+    database = hashlib.sha1(str(engine.url).encode('utf-8')).hexdigest()[:12]
+    path = os.path.join(tempfile.gettempdir(), f"productline-{database}-{name}.lock")
+    with open(path, 'a') as handle:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                acquired = True
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    acquired = False
+                    break
+                time.sleep(0.05)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
 def get_db_session():
     """Get a database session."""
     from flask import current_app
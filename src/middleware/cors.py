@@ -8,7 +8,7 @@ def init_cors(app):
     
     # Get CORS configuration from app config
     cors_origins = app.config.get('CORS_ORIGINS', ['*'])
-    cors_methods = app.config.get('CORS_METHODS', ['GET', 'POST', 'OPTIONS'])
+    cors_methods = app.config.get('CORS_METHODS', ['GET', 'POST', 'PUT', 'PATCH', 'OPTIONS'])
     cors_headers = app.config.get('CORS_HEADERS', ['Content-Type', 'Authorization'])
     
     # Configure CORS
@@ -30,7 +30,7 @@ def init_cors(app):
         
         # Add custom headers for Unreal Engine
         response.headers['Access-Control-Allow-Origin'] = '*'
-        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+        response.headers['Access-Control-Allow-Methods'] = ', '.join(cors_methods)
         response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Requested-With'
         response.headers['Access-Control-Max-Age'] = '86400'  # 24 hours
         
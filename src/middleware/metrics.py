@@ -0,0 +1,291 @@
+"""
+Request-scoped performance metrics.
+Every request records its latency, the number and time of database queries
+it ran, the time spent serializing its response and the response size,
+per endpoint. Database time is measured with SQLAlchemy cursor events.
+Streamed responses are recorded once the server closes them, so their
+latency covers the whole stream. Metrics are kept per process and rendered
+in the Prometheus text exposition format for /metrics with a "pid" label,
+so series of different worker processes are told apart; aggregate them
+with e.g. sum without (pid).
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.app_logging import get_logger
+
+logger = get_logger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Metric families: name -> (type, help text)
+FAMILIES = {
+    'http_requests_total': ('counter', 'Requests by endpoint, method and status.'),
+    'http_request_duration_seconds': ('histogram', 'Request latency by endpoint.'),
+    'http_request_db_queries': ('histogram', 'Database queries per request by endpoint.'),
+    'http_request_db_seconds': ('histogram', 'Database time per request by endpoint.'),
+    'http_response_serialization_seconds': ('histogram', 'Response serialization time by endpoint.'),
+    'http_response_bytes': ('histogram', 'Response body size by endpoint.'),
+    'db_queries_total': ('counter', 'Database queries, in requests or in the background.'),
+    'db_query_seconds_total': ('counter', 'Database query time, in requests or in the background.'),
+    'db_repeated_query_patterns_total': ('counter', 'N+1 query patterns found in profiled requests.'),
+    'db_slow_queries_total': ('counter', 'Slow queries found in profiled requests.')
+}
+
+_QUERY_START = 'metrics_query_start'
+
+class Histogram:
+    """Cumulative histogram over fixed upper bounds."""
+    
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def cumulative(self):
+        """List (upper bound, cumulative count) pairs, ending with +Inf."""
+        pairs, running = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            pairs.append((bound, running))
+        return pairs
+
+class RequestTimings:
+    """Database and serialization time accumulated by the current request."""
+    
+    __slots__ = ('started', 'queries', 'query_time', 'serialization_time')
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0.0
+        self.serialization_time = 0.0
+
+def format_value(value):
+    """Format a sample value or bucket bound for the exposition format."""
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+def format_labels(labels):
+    """Format label pairs as {name="value",...}, escaping values."""
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+class RequestMetrics:
+    """Per-process registry of request and database metrics."""
+    
+    def __init__(self, latency_buckets=LATENCY_BUCKETS):
+        self.latency_buckets = tuple(latency_buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+    
+    def increment(self, name, labels, amount=1):
+        """Add to a counter; labels are (name, value) pairs."""
+        with self._lock:
+            key = (name, tuple(labels))
+            self._counters[key] = self._counters.get(key, 0) + amount
+    
+    def observe(self, name, labels, value, buckets):
+        """Record a histogram sample; labels are (name, value) pairs."""
+        with self._lock:
+            key = (name, tuple(labels))
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+    
+    def record_request(self, endpoint, method, status, duration, timings, size):
+        """Record a finished request."""
+        labels = (('endpoint', endpoint),)
+        self.increment('http_requests_total', labels + (('method', method), ('status', str(status))))
+        self.observe('http_request_duration_seconds', labels + (('method', method),), duration,
+                     self.latency_buckets)
+        self.observe('http_request_db_queries', labels, timings.queries, QUERY_COUNT_BUCKETS)
+        self.observe('http_request_db_seconds', labels, timings.query_time, self.latency_buckets)
+        self.observe('http_response_serialization_seconds', labels, timings.serialization_time,
+                     self.latency_buckets)
+        if size is not None:
+            self.observe('http_response_bytes', labels, size, SIZE_BUCKETS)
+    
+    def record_query(self, duration, in_request):
+        """Record one database query."""
+        labels = (('context', 'request' if in_request else 'background'),)
+        self.increment('db_queries_total', labels)
+        self.increment('db_query_seconds_total', labels, duration)
+    
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format.
+        
+        Every sample is labelled with the pid of the process it comes from.
+        """
+        process = (('pid', str(os.getpid())),)
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (histogram.cumulative(), histogram.sum, histogram.count))
+                for key, histogram in self._histograms.items()
+            )
+        
+        samples = {name: [] for name in FAMILIES}
+        for (name, labels), value in counters:
+            labels += process
+            samples[name].append(f"{name}{format_labels(labels)} {format_value(value)}")
+        for (name, labels), (buckets, total, count) in histograms:
+            labels += process
+            for bound, cumulative in buckets:
+                bucket_labels = labels + (('le', format_value(float(bound))),)
+                samples[name].append(f"{name}_bucket{format_labels(bucket_labels)} {cumulative}")
+            samples[name].append(f"{name}_sum{format_labels(labels)} {format_value(total)}")
+            samples[name].append(f"{name}_count{format_labels(labels)} {count}")
+        
+        lines = []
+        for name, (kind, description) in FAMILIES.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples[name])
+        return '\n'.join(lines) + '\n'
+
+def current_timings():
+    """Get the timings of the current request, or None outside of a measured request."""
+    if not has_request_context():
+        return None
+    return g.get('request_timings')
+
+def record_serialization(seconds):
+    """Add serialization time to the current request."""
+    timings = current_timings()
+    if timings is not None:
+        timings.serialization_time += seconds
+
+@contextmanager
+def serialization_timer():
+    """Time a block as response serialization of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_serialization(time.perf_counter() - started)
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that counts JSON encoding as serialization time."""
+    
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            record_serialization(time.perf_counter() - started)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_QUERY_START, []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get(_QUERY_START)
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    
+    timings = current_timings()
+    if timings is not None:
+        timings.queries += 1
+        timings.query_time += duration
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.record_query(duration, timings is not None)
+
+def _handle_error(context):
+    starts = context.connection.info.get(_QUERY_START) if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+def listen_for_queries():
+    """Time queries on every engine; safe to call more than once."""
+    for name, listener in (('before_cursor_execute', _before_cursor_execute),
+                           ('after_cursor_execute', _after_cursor_execute),
+                           ('handle_error', _handle_error)):
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+
+def init_metrics(app):
+    """Initialize request metrics for the Flask application if enabled."""
+    if not app.config.get('METRICS_ENABLED', True):
+        app.request_metrics = None
+        return None
+    
+    app.request_metrics = RequestMetrics(app.config.get('METRICS_LATENCY_BUCKETS', LATENCY_BUCKETS))
+    
+    # Time JSON encoding, keeping the configured output settings
+    provider = TimedJSONProvider(app)
+    provider.sort_keys = app.json.sort_keys
+    provider.compact = app.json.compact
+    app.json = provider
+    
+    listen_for_queries()
+    
+    @app.before_request
+    def start_request_timings():
+        """Start measuring the request."""
+        g.request_timings = RequestTimings()
+    
+    @app.after_request
+    def record_request_metrics(response):
+        """Record the request's latency, queries, serialization time and size.
+        
+        Streamed bodies are produced after this hook, so streamed responses
+        are recorded when the server closes them instead.
+        """
+        timings = g.get('request_timings')
+        if timings is None:
+            return response
+        
+        endpoint = request.endpoint or 'unmatched'
+        method = request.method
+        status = response.status_code
+        
+        def record():
+            size = response.content_length
+            if size is None and not response.is_streamed:
+                size = response.calculate_content_length()
+            app.request_metrics.record_request(
+                endpoint, method, status, time.perf_counter() - timings.started, timings, size
+            )
+        
+        if response.is_streamed:
+            response.call_on_close(record)
+        else:
+            g.pop('request_timings', None)
+            record()
+        return response
+    
+    logger.info("Request metrics enabled")
+    return app.request_metrics
+
+def get_metrics():
+    """Get the request metrics of the current app."""
+    if not has_app_context():
+        return None
+    return getattr(current_app, 'request_metrics', None)
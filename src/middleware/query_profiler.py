@@ -0,0 +1,250 @@
+"""
+Sampled query profiling for the ORM layer.
+On a sample of requests, every SQL statement is fingerprinted by replacing
+its literals and parameter lists with placeholders. Fingerprints repeated
+within one request, the N+1 pattern classmethod lookups in loops produce,
+are logged once the request ends. Statements slower than a threshold are
+logged with their parameters and EXPLAIN plan, each fingerprint explained
+at most once per interval.
+"""
+
+import hashlib
+import random
+import re
+import threading
+import time
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.middleware.metrics import get_metrics
+from src.app_logging import get_logger
+
+logger = get_logger(__name__)
+
+_COMMENTS = re.compile(r'/\*.*?\*/|--[^\n]*', re.S)
+_STRINGS = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBERS = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b')
+_PARAMETERS = re.compile(r'%\(\w+\)s|%s|:\w+|\?')
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_VALUES = re.compile(r'(values\s*\(\?\))(?:\s*,\s*\(\?\))+', re.I)
+_WHITESPACE = re.compile(r'\s+')
+
+_QUERY_START = 'profiler_query_start'
+
+def normalize_statement(statement):
+    """Replace literals, parameters and parameter lists in a statement with placeholders."""
+    normalized = _COMMENTS.sub(' ', statement)
+    normalized = _STRINGS.sub('?', normalized)
+    normalized = _NUMBERS.sub('?', normalized)
+    normalized = _PARAMETERS.sub('?', normalized)
+    normalized = _LISTS.sub('(?)', normalized)
+    normalized = _VALUES.sub(r'\1', normalized)
+    return _WHITESPACE.sub(' ', normalized).strip()
+
+def fingerprint_statement(statement):
+    """Get the (fingerprint, normalized statement) of a SQL statement."""
+    normalized = normalize_statement(statement)
+    return hashlib.sha1(normalized.lower().encode('utf-8')).hexdigest()[:16], normalized
+
+def format_parameters(parameters, limit=500):
+    """Format statement parameters for the log, truncated to `limit` characters."""
+    formatted = repr(parameters)
+    return formatted if len(formatted) <= limit else formatted[:limit] + '...'
+
+class QueryProfile:
+    """Statements run by one profiled request."""
+    
+    __slots__ = ('fingerprints', 'slow')
+    
+    def __init__(self):
+        # Fingerprint -> [count, total seconds, normalized statement]
+        self.fingerprints = {}
+        self.slow = []
+    
+    def add(self, statement, parameters, duration, engine, executemany, slow_threshold):
+        fingerprint, normalized = fingerprint_statement(statement)
+        entry = self.fingerprints.get(fingerprint)
+        if entry is None:
+            entry = self.fingerprints[fingerprint] = [0, 0.0, normalized]
+        entry[0] += 1
+        entry[1] += duration
+        if duration >= slow_threshold:
+            self.slow.append((fingerprint, statement, parameters, duration, engine, executemany))
+
+class QueryProfiler:
+    """Samples requests, detecting repeated statements and explaining slow ones.
+    
+    `repeat_threshold` is the number of runs of one fingerprint in a
+    request that counts as N+1, and `slow_threshold` the seconds above
+    which a statement is logged.
+    """
+    
+    def __init__(self, sample_rate=0.01, repeat_threshold=5, slow_threshold=0.1, explain=True,
+                 explain_interval=300.0, random=random.random, clock=time.monotonic):
+        self.sample_rate = sample_rate
+        self.repeat_threshold = repeat_threshold
+        self.slow_threshold = slow_threshold
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self._random = random
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._explained = {}
+        self.requests_profiled = 0
+        self.repeated_patterns = 0
+        self.slow_queries = 0
+    
+    def should_sample(self):
+        """Decide whether to profile the current request."""
+        return self.sample_rate > 0 and self._random() < self.sample_rate
+    
+    def finish(self, profile, endpoint):
+        """Log the repeated and slow statements of a finished request.
+        
+        Returns {'repeated': [...], 'slow': [...]} for the request.
+        """
+        repeated = [
+            {'fingerprint': fingerprint, 'count': count, 'total_ms': round(total * 1000, 3),
+             'statement': normalized}
+            for fingerprint, (count, total, normalized) in profile.fingerprints.items()
+            if count >= self.repeat_threshold
+        ]
+        for pattern in repeated:
+            logger.warning("Repeated query pattern (N+1)", endpoint=endpoint, **pattern)
+        
+        slow = []
+        for fingerprint, statement, parameters, duration, engine, executemany in profile.slow:
+            entry = {
+                'fingerprint': fingerprint,
+                'duration_ms': round(duration * 1000, 3),
+                'statement': statement,
+                'parameters': format_parameters(parameters),
+                'plan': None
+            }
+            if self.explain and not executemany and self._should_explain(fingerprint):
+                entry['plan'] = explain_statement(engine, statement, parameters)
+            logger.warning("Slow query", endpoint=endpoint, **entry)
+            slow.append(entry)
+        
+        with self._lock:
+            self.requests_profiled += 1
+            self.repeated_patterns += len(repeated)
+            self.slow_queries += len(slow)
+        metrics = get_metrics()
+        if metrics is not None:
+            labels = (('endpoint', endpoint),)
+            if repeated:
+                metrics.increment('db_repeated_query_patterns_total', labels, len(repeated))
+            if slow:
+                metrics.increment('db_slow_queries_total', labels, len(slow))
+        return {'repeated': repeated, 'slow': slow}
+    
+    def _should_explain(self, fingerprint):
+        """Check whether a fingerprint was not explained within the interval, and claim it."""
+        now = self._clock()
+        with self._lock:
+            last = self._explained.get(fingerprint)
+            if last is not None and now - last < self.explain_interval:
+                return False
+            self._explained[fingerprint] = now
+            
+            # Forget fingerprints explained long ago
+            if len(self._explained) > 10000:
+                self._explained = {key: moment for key, moment in self._explained.items()
+                                   if now - moment < self.explain_interval}
+            return True
+    
+    def stats(self):
+        """Get profiling counters."""
+        return {
+            'sample_rate': self.sample_rate,
+            'requests_profiled': self.requests_profiled,
+            'repeated_patterns': self.repeated_patterns,
+            'slow_queries': self.slow_queries
+        }
+
+def explain_statement(engine, statement, parameters):
+    """Get the EXPLAIN plan of a SELECT statement as a list of rows, or None.
+    
+    The plan is read on a separate connection. Failures are logged and
+    give None, so explaining never fails a request.
+    """
+    if not statement.lstrip().lower().startswith(('select', 'with')):
+        return None
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    try:
+        with engine.connect() as connection:
+            result = connection.exec_driver_sql(prefix + statement, parameters or ())
+            keys = list(result.keys())
+            return [dict(zip(keys, row)) for row in result]
+    except Exception as e:
+        logger.warning(f"Could not explain slow query: {str(e)}")
+        return None
+
+def current_profile():
+    """Get the query profile of the current request, or None if it is not profiled."""
+    if not has_request_context():
+        return None
+    return g.get('query_profile')
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile() is not None:
+        conn.info.setdefault(_QUERY_START, []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile()
+    starts = conn.info.get(_QUERY_START)
+    if profile is None or not starts:
+        return
+    profiler = get_query_profiler()
+    if profiler is not None:
+        profile.add(statement, parameters, time.perf_counter() - starts.pop(), conn.engine,
+                    executemany, profiler.slow_threshold)
+
+def _handle_error(context):
+    starts = context.connection.info.get(_QUERY_START) if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+def init_query_profiler(app):
+    """Initialize sampled query profiling for the Flask application if enabled."""
+    if not app.config.get('QUERY_PROFILER_ENABLED', False):
+        app.query_profiler = None
+        return None
+    
+    app.query_profiler = QueryProfiler(
+        sample_rate=app.config.get('QUERY_PROFILER_SAMPLE_RATE', 0.01),
+        repeat_threshold=app.config.get('QUERY_PROFILER_REPEAT_THRESHOLD', 5),
+        slow_threshold=app.config.get('QUERY_PROFILER_SLOW_THRESHOLD', 0.1),
+        explain=app.config.get('QUERY_PROFILER_EXPLAIN', True),
+        explain_interval=app.config.get('QUERY_PROFILER_EXPLAIN_INTERVAL', 300.0)
+    )
+    
+    for name, listener in (('before_cursor_execute', _before_cursor_execute),
+                           ('after_cursor_execute', _after_cursor_execute),
+                           ('handle_error', _handle_error)):
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+    
+    @app.before_request
+    def start_query_profile():
+        """Profile a sample of requests."""
+        if app.query_profiler.should_sample():
+            g.query_profile = QueryProfile()
+    
+    @app.after_request
+    def finish_query_profile(response):
+        """Log the repeated and slow statements of a profiled request."""
+        profile = g.pop('query_profile', None)
+        if profile is not None:
+            app.query_profiler.finish(profile, request.endpoint or 'unmatched')
+        return response
+    
+    logger.info("Query profiling enabled", sample_rate=app.query_profiler.sample_rate)
+    return app.query_profiler
+
+def get_query_profiler():
+    """Get the query profiler of the current app."""
+    if not has_app_context():
+        return None
+    return getattr(current_app, 'query_profiler', None)
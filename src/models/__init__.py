@@ -1 +1,8 @@
 # Models package initialization
+# Importing the package registers every model, so relationships between
+# them resolve whichever model module a caller imports first.
+from src.models.coordinates import Coordinates
+from src.models.object_history import ObjectHistory
+from src.models.productline_object import ProductlineObject
+
+__all__ = ['Coordinates', 'ObjectHistory', 'ProductlineObject']
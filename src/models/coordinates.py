@@ -1,7 +1,8 @@
 from src.database import db
+from src.models.hooks import notify_object_changed
 from datetime import datetime
-from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Index, CheckConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Index, CheckConstraint, and_, or_
+from sqlalchemy.orm import relationship, object_session
 import math
 
 class Coordinates3D:
@@ -148,6 +149,7 @@ class Coordinates(db.Model):
         self.position_y = y
         self.position_z = z
         self.updated_at = datetime.utcnow()
+        notify_object_changed(self.object_id, object_session(self))
     
     def update_direction(self, x, y, z):
         """Update direction vector and normalize."""
@@ -156,6 +158,16 @@ class Coordinates(db.Model):
         self.direction_z = z
         self._normalize_direction()
         self.updated_at = datetime.utcnow()
+        notify_object_changed(self.object_id, object_session(self))
+    
+    def update_height(self, height):
+        """Update object height."""
+        if height < 0:
+            raise ValueError("Height must not be negative")
+        
+        self.height = height
+        self.updated_at = datetime.utcnow()
+        notify_object_changed(self.object_id, object_session(self))
     
     def update_rotation(self, rotation):
         """Update rotation angle."""
@@ -164,6 +176,26 @@ class Coordinates(db.Model):
         
         self.rotation = rotation
         self.updated_at = datetime.utcnow()
+        notify_object_changed(self.object_id, object_session(self))
+    
+    def update_all(self, x, y, z, height, direction_x, direction_y, direction_z, rotation):
+        """Update position, height, direction and rotation at once."""
+        if height < 0:
+            raise ValueError("Height must not be negative")
+        if rotation is not None and (rotation < 0 or rotation > 360):
+            raise ValueError("Rotation must be between 0 and 360 degrees")
+        
+        self.position_x = x
+        self.position_y = y
+        self.position_z = z
+        self.height = height
+        self.direction_x = direction_x
+        self.direction_y = direction_y
+        self.direction_z = direction_z
+        self._normalize_direction()
+        self.rotation = rotation
+        self.updated_at = datetime.utcnow()
+        notify_object_changed(self.object_id, object_session(self))
     
     def get_distance_to(self, other_coordinates):
         """Calculate distance to another set of coordinates."""
@@ -184,6 +216,50 @@ class Coordinates(db.Model):
         """Find coordinates by object ID."""
         return cls.query.filter_by(object_id=object_id).first()
     
+    @classmethod
+    def find_by_object_ids(cls, object_ids):
+        """Find coordinates for all objects whose ID is in the given collection."""
+        if not object_ids:
+            return []
+        return cls.query.filter(cls.object_id.in_(list(object_ids))).all()
+    
+    @classmethod
+    def find_columns_updated_since(cls, timestamp=None):
+        """Find coordinate rows updated at or after a timestamp as plain tuples.
+        
+        Each row is (object_id, position_x, position_y, position_z, height,
+        direction_x, direction_y, direction_z, rotation, updated_at).
+        """
+        query = db.session.query(
+            cls.object_id,
+            cls.position_x, cls.position_y, cls.position_z,
+            cls.height,
+            cls.direction_x, cls.direction_y, cls.direction_z,
+            cls.rotation,
+            cls.updated_at
+        )
+        if timestamp is not None:
+            query = query.filter(cls.updated_at >= timestamp)
+        return query.all()
+    
+    @classmethod
+    def find_changed_after(cls, updated_at=None, object_id=None, until=None, limit=1000):
+        """Find (updated_at, object_id) keys of rows changed after a keyset position.
+        
+        Rows are ordered by (updated_at, object_id) and start strictly after the
+        given position, or at the beginning if none is given. Rows updated
+        after `until` are left out.
+        """
+        query = db.session.query(cls.updated_at, cls.object_id)
+        if updated_at is not None:
+            query = query.filter(or_(
+                cls.updated_at > updated_at,
+                and_(cls.updated_at == updated_at, cls.object_id > object_id)
+            ))
+        if until is not None:
+            query = query.filter(cls.updated_at <= until)
+        return query.order_by(cls.updated_at, cls.object_id).limit(limit).all()
+    
     @classmethod
     def find_within_bounds(cls, min_x, max_x, min_y, max_y, min_z, max_z):
         """Find all coordinates within specified bounds."""
@@ -0,0 +1,211 @@
+from src.database import db
+from datetime import timedelta
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, Enum, Index, and_, func
+
+class HistoryRollup(db.Model):
+    """HistoryRollup model holding the last state of an object per time bucket of a tier.
+    
+    Each tier rolls its source up into buckets of `tier` seconds: the 60
+    second tier rolls up raw object history, the 3600 second tier rolls up
+    the 60 second one. A row keeps the last state recorded in its bucket,
+    so as-of lookups on a tier work like on raw history at the bucket's
+    resolution.
+    """
+    
+    __tablename__ = 'object_history_rollups'
+    
+    # Bucket length in seconds, object and bucket start
+    tier = Column(Integer, primary_key=True)
+    object_id = Column(String(100), primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    
+    # Timestamp of the last state recorded in the bucket
+    timestamp = Column(DateTime, nullable=False)
+    
+    # State at that timestamp
+    position_x = Column(Float, nullable=True)
+    position_y = Column(Float, nullable=True)
+    position_z = Column(Float, nullable=True)
+    height = Column(Float, nullable=True)
+    direction_x = Column(Float, nullable=True)
+    direction_y = Column(Float, nullable=True)
+    direction_z = Column(Float, nullable=True)
+    rotation = Column(Float, nullable=True)
+    status = Column(Enum('active', 'inactive', 'processing', 'error', name='rollup_status_enum'),
+                    nullable=True)
+    object_metadata = Column(JSON, nullable=True)
+    
+    # Number of source records rolled into the bucket
+    sample_count = Column(Integer, nullable=False, default=1)
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_rollup_tier_bucket', 'tier', 'bucket'),
+        Index('idx_rollup_tier_object_timestamp', 'tier', 'object_id', 'timestamp'),
+    )
+    
+    def to_dict(self):
+        """Convert rollup row to dictionary for JSON serialization."""
+        return {
+            'tier': self.tier,
+            'object_id': self.object_id,
+            'bucket': self.bucket.isoformat() + 'Z' if self.bucket else None,
+            'timestamp': self.timestamp.isoformat() + 'Z' if self.timestamp else None,
+            'position': {
+                'x': self.position_x,
+                'y': self.position_y,
+                'z': self.position_z
+            } if self.position_x is not None else None,
+            'height': self.height,
+            'direction': {
+                'x': self.direction_x,
+                'y': self.direction_y,
+                'z': self.direction_z
+            } if self.direction_x is not None else None,
+            'rotation': self.rotation,
+            'status': self.status,
+            'metadata': self.object_metadata,
+            'sample_count': self.sample_count
+        }
+    
+    @classmethod
+    def find_latest_before_timestamp(cls, tier, object_ids, timestamp):
+        """Find the latest rollup row at or before a timestamp for each object of a tier.
+        
+        Uses the same groupwise-max query as ObjectHistory on
+        idx_rollup_tier_object_timestamp. An object has one row per bucket,
+        so timestamps never tie.
+        """
+        if not object_ids:
+            return []
+        
+        latest = db.session.query(
+            cls.object_id.label('object_id'),
+            func.max(cls.timestamp).label('timestamp')
+        ).filter(
+            cls.tier == tier,
+            cls.object_id.in_(list(object_ids)),
+            cls.timestamp <= timestamp
+        ).group_by(cls.object_id).subquery()
+        
+        return cls.query.join(latest, and_(
+            cls.object_id == latest.c.object_id,
+            cls.timestamp == latest.c.timestamp
+        )).filter(cls.tier == tier).all()
+    
+    @classmethod
+    def find_bracketing(cls, tier, object_ids, timestamp):
+        """Find the rollup rows bracketing a timestamp for each object of a tier.
+        
+        Returns a dict mapping object ID to (before, after) like
+        ObjectHistory.find_bracketing.
+        """
+        if not object_ids:
+            return {}
+        
+        object_ids = list(object_ids)
+        before = db.session.query(
+            cls.object_id.label('object_id'),
+            func.max(cls.timestamp).label('timestamp')
+        ).filter(
+            cls.tier == tier,
+            cls.object_id.in_(object_ids),
+            cls.timestamp <= timestamp
+        ).group_by(cls.object_id)
+        after = db.session.query(
+            cls.object_id.label('object_id'),
+            func.min(cls.timestamp).label('timestamp')
+        ).filter(
+            cls.tier == tier,
+            cls.object_id.in_(object_ids),
+            cls.timestamp > timestamp
+        ).group_by(cls.object_id)
+        bounds = before.union_all(after).subquery()
+        
+        records = cls.query.join(bounds, and_(
+            cls.object_id == bounds.c.object_id,
+            cls.timestamp == bounds.c.timestamp
+        )).filter(cls.tier == tier).all()
+        
+        brackets = {}
+        for record in records:
+            pair = brackets.setdefault(record.object_id, [None, None])
+            pair[0 if record.timestamp <= timestamp else 1] = record
+        return {object_id: tuple(pair) for object_id, pair in brackets.items()}
+    
+    @classmethod
+    def find_rolled_up_until(cls, tier):
+        """Find the end of the latest bucket of a tier, or None if it is empty."""
+        latest = db.session.query(func.max(cls.bucket)).filter(cls.tier == tier).scalar()
+        return None if latest is None else latest + timedelta(seconds=tier)
+    
+    @classmethod
+    def find_first_timestamp(cls, tier, since=None):
+        """Find the earliest state timestamp of a tier at or after `since`, or None."""
+        query = db.session.query(func.min(cls.timestamp)).filter(cls.tier == tier)
+        if since is not None:
+            query = query.filter(cls.timestamp >= since)
+        return query.scalar()
+    
+    @classmethod
+    def find_timestamp_at_offset(cls, tier, since, offset):
+        """Find the timestamp of a tier's row `offset` places after the first one at or after `since`, or None."""
+        return db.session.query(cls.timestamp).filter(
+            cls.tier == tier,
+            cls.timestamp >= since
+        ).order_by(cls.timestamp).offset(offset).limit(1).scalar()
+    
+    @classmethod
+    def iter_state_rows(cls, tier, start, end, batch_size=5000):
+        """Iterate over a tier's state rows with timestamps in [start, end), oldest first.
+        
+        Rows have the layout of ObjectHistory.iter_state_rows.
+        """
+        query = db.session.query(
+            cls.object_id, cls.timestamp,
+            cls.position_x, cls.position_y, cls.position_z,
+            cls.height,
+            cls.direction_x, cls.direction_y, cls.direction_z,
+            cls.rotation, cls.status, cls.object_metadata
+        ).filter(
+            cls.tier == tier,
+            cls.timestamp >= start,
+            cls.timestamp < end
+        ).order_by(cls.timestamp)
+        return query.execution_options(stream_results=True).yield_per(batch_size)
+    
+    @classmethod
+    def replace_buckets(cls, tier, start, end, rows):
+        """Replace a tier's buckets in [start, end) with column-keyed dict rows.
+        
+        Deletes the existing buckets first, so rolling a range up again is
+        idempotent. Does not commit. Returns the number of rows inserted.
+        """
+        cls.query.filter(
+            cls.tier == tier,
+            cls.bucket >= start,
+            cls.bucket < end
+        ).delete(synchronize_session=False)
+        if rows:
+            db.session.execute(cls.__table__.insert(), rows)
+        return len(rows)
+    
+    @classmethod
+    def delete_buckets_from(cls, tier, bucket):
+        """Delete a tier's buckets starting at or after a moment; returns the number deleted."""
+        return cls.query.filter(
+            cls.tier == tier,
+            cls.bucket >= bucket
+        ).delete(synchronize_session=False)
+    
+    @classmethod
+    def delete_buckets_before(cls, tier, bucket):
+        """Delete a tier's buckets starting before a moment; returns the number deleted."""
+        return cls.query.filter(
+            cls.tier == tier,
+            cls.bucket < bucket
+        ).delete(synchronize_session=False)
+    
+    def __repr__(self):
+        return f'<HistoryRollup {self.tier}s {self.object_id} at {self.bucket}>'
+
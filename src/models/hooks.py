@@ -0,0 +1,56 @@
+"""
+Change notification hooks for model writes.
+Models call notify_object_changed when they write new state so that caches
+and other derived views can react without the models depending on them.
+Changes made in a session are held until the session commits, so readers
+never see a derived view dropped for state that is not yet visible, or that
+is rolled back.
+"""
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from src.app_logging import get_logger
+
+logger = get_logger(__name__)
+
+_change_listeners = []
+
+PENDING_CHANGES_KEY = 'changed_object_ids'
+
+def register_change_listener(listener):
+    """Register a callable invoked with the object ID of every change."""
+    if listener not in _change_listeners:
+        _change_listeners.append(listener)
+    return listener
+
+def unregister_change_listener(listener):
+    """Remove a previously registered change listener."""
+    if listener in _change_listeners:
+        _change_listeners.remove(listener)
+
+def notify_object_changed(object_id, session=None):
+    """Notify all listeners that an object has new state.
+    
+    With a `session`, listeners are notified once per object after the
+    session commits, and not at all if it rolls back.
+    """
+    if session is not None:
+        session.info.setdefault(PENDING_CHANGES_KEY, {})[object_id] = None
+        return
+    
+    for listener in list(_change_listeners):
+        try:
+            listener(object_id)
+        except Exception as e:
+            logger.warning(f"Change listener failed for {object_id}: {str(e)}")
+
+@event.listens_for(Session, 'after_commit')
+def _notify_committed(session):
+    """Notify listeners of the changes a session committed."""
+    for object_id in session.info.pop(PENDING_CHANGES_KEY, {}):
+        notify_object_changed(object_id)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back(session):
+    """Forget the changes of a rolled back session."""
+    session.info.pop(PENDING_CHANGES_KEY, None)
@@ -1,6 +1,6 @@
 from src.database import db
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Enum, Index
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, JSON, Enum, Index, and_, or_, func, select
 from sqlalchemy.orm import relationship
 
 class ObjectHistory(db.Model):
@@ -8,8 +8,8 @@ class ObjectHistory(db.Model):
     
     __tablename__ = 'object_history'
     
-    # Primary key
-    id = Column(Integer, primary_key=True, autoincrement=True)
+    # Primary key; partitioned MySQL tables key on (id, timestamp)
+    id = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True)
     
     # Foreign key to ProductlineObject
     object_id = Column(String(100), ForeignKey('productline_objects.id', ondelete='CASCADE'), 
@@ -47,11 +47,10 @@ class ObjectHistory(db.Model):
     # Relationship
     object = relationship("ProductlineObject", back_populates="history")
     
-    # Indexes
+    # Indexes; idx_object_timestamp also serves lookups by object alone
     __table_args__ = (
         Index('idx_object_timestamp', 'object_id', 'timestamp'),
         Index('idx_timestamp', 'timestamp'),
-        Index('idx_object_id', 'object_id'),
     )
     
     def __init__(self, object_id, timestamp, position_x=None, position_y=None, position_z=None,
@@ -110,6 +109,215 @@ class ObjectHistory(db.Model):
             cls.timestamp <= timestamp
         ).order_by(cls.timestamp.desc()).first()
     
+    @classmethod
+    def find_latest_before_timestamp(cls, object_ids, timestamp):
+        """Find the latest history record at or before a timestamp for each object.
+        
+        Uses a single groupwise-max query: the per-object MAX(timestamp) is
+        resolved on idx_object_timestamp and joined back to the table. When
+        several records share that timestamp, the one inserted last wins.
+        With a timestamp of None, the latest record overall is found.
+        """
+        if not object_ids:
+            return []
+        
+        conditions = [cls.object_id.in_(list(object_ids))]
+        if timestamp is not None:
+            conditions.append(cls.timestamp <= timestamp)
+        latest = db.session.query(
+            cls.object_id.label('object_id'),
+            func.max(cls.timestamp).label('timestamp')
+        ).filter(*conditions).group_by(cls.object_id).subquery()
+        
+        records = cls.query.join(latest, and_(
+            cls.object_id == latest.c.object_id,
+            cls.timestamp == latest.c.timestamp
+        )).order_by(cls.object_id, cls.id.desc()).all()
+        
+        # Keep one record per object
+        latest_records = {}
+        for record in records:
+            latest_records.setdefault(record.object_id, record)
+        return list(latest_records.values())
+    
+    @classmethod
+    def find_bracketing(cls, object_ids, timestamp):
+        """Find the records bracketing a timestamp for each object in one query.
+        
+        Returns a dict mapping object ID to (before, after), where `before`
+        is the latest record at or before the timestamp and `after` the
+        earliest one after it; either may be None. Both sides are resolved
+        as groupwise MAX/MIN on idx_object_timestamp and joined back to the
+        table in a single statement.
+        """
+        if not object_ids:
+            return {}
+        
+        object_ids = list(object_ids)
+        before = db.session.query(
+            cls.object_id.label('object_id'),
+            func.max(cls.timestamp).label('timestamp')
+        ).filter(
+            cls.object_id.in_(object_ids),
+            cls.timestamp <= timestamp
+        ).group_by(cls.object_id)
+        after = db.session.query(
+            cls.object_id.label('object_id'),
+            func.min(cls.timestamp).label('timestamp')
+        ).filter(
+            cls.object_id.in_(object_ids),
+            cls.timestamp > timestamp
+        ).group_by(cls.object_id)
+        bounds = before.union_all(after).subquery()
+        
+        records = cls.query.join(bounds, and_(
+            cls.object_id == bounds.c.object_id,
+            cls.timestamp == bounds.c.timestamp
+        )).order_by(cls.object_id, cls.id.desc()).all()
+        
+        # Keep one record per side, the one inserted last
+        brackets = {}
+        for record in records:
+            pair = brackets.setdefault(record.object_id, [None, None])
+            side = 0 if record.timestamp <= timestamp else 1
+            if pair[side] is None:
+                pair[side] = record
+        return {object_id: tuple(pair) for object_id, pair in brackets.items()}
+    
+    # Columns of the plain rows read by the Core-level finders
+    ROW_COLUMNS = ('id', 'object_id', 'timestamp', 'position_x', 'position_y', 'position_z', 'height',
+                   'direction_x', 'direction_y', 'direction_z', 'rotation', 'status', 'object_metadata')
+    
+    @classmethod
+    def _select_rows(cls):
+        """Build a Core select of ROW_COLUMNS, bypassing ORM compilation and hydration."""
+        table = cls.__table__
+        return select(*(table.c[name] for name in cls.ROW_COLUMNS))
+    
+    @classmethod
+    def find_row_before_timestamp(cls, object_id, timestamp):
+        """Find the latest record of an object at or before a timestamp as a plain row.
+        
+        Rows have the ROW_COLUMNS, readable by attribute name.
+        """
+        table = cls.__table__
+        statement = cls._select_rows().where(
+            table.c.object_id == object_id,
+            table.c.timestamp <= timestamp
+        ).order_by(table.c.timestamp.desc()).limit(1)
+        return db.session.connection().execute(statement).first()
+    
+    @classmethod
+    def find_latest_rows_before_timestamp(cls, object_ids, timestamp):
+        """Find the latest record at or before a timestamp per object as plain rows.
+        
+        The Core-level counterpart of find_latest_before_timestamp, with
+        the same groupwise-max query and tie-breaking.
+        """
+        if not object_ids:
+            return []
+        
+        table = cls.__table__
+        conditions = [table.c.object_id.in_(list(object_ids))]
+        if timestamp is not None:
+            conditions.append(table.c.timestamp <= timestamp)
+        latest = select(
+            table.c.object_id,
+            func.max(table.c.timestamp).label('timestamp')
+        ).where(*conditions).group_by(table.c.object_id).subquery()
+        
+        statement = cls._select_rows().join(latest, and_(
+            table.c.object_id == latest.c.object_id,
+            table.c.timestamp == latest.c.timestamp
+        )).order_by(table.c.object_id, table.c.id.desc())
+        
+        # Keep one row per object
+        latest_rows = {}
+        for row in db.session.connection().execute(statement):
+            latest_rows.setdefault(row.object_id, row)
+        return list(latest_rows.values())
+    
+    @classmethod
+    def find_bracketing_rows(cls, object_ids, timestamp):
+        """Find the records bracketing a timestamp for each object as plain rows.
+        
+        The Core-level counterpart of find_bracketing, returning a dict
+        mapping object ID to (before, after) rows.
+        """
+        if not object_ids:
+            return {}
+        
+        table = cls.__table__
+        object_ids = list(object_ids)
+        before = select(
+            table.c.object_id,
+            func.max(table.c.timestamp).label('timestamp')
+        ).where(
+            table.c.object_id.in_(object_ids),
+            table.c.timestamp <= timestamp
+        ).group_by(table.c.object_id)
+        after = select(
+            table.c.object_id,
+            func.min(table.c.timestamp).label('timestamp')
+        ).where(
+            table.c.object_id.in_(object_ids),
+            table.c.timestamp > timestamp
+        ).group_by(table.c.object_id)
+        bounds = before.union_all(after).subquery()
+        
+        statement = cls._select_rows().join(bounds, and_(
+            table.c.object_id == bounds.c.object_id,
+            table.c.timestamp == bounds.c.timestamp
+        )).order_by(table.c.object_id, table.c.id.desc())
+        
+        # Keep one row per side, the one inserted last
+        brackets = {}
+        for row in db.session.connection().execute(statement):
+            pair = brackets.setdefault(row.object_id, [None, None])
+            side = 0 if row.timestamp <= timestamp else 1
+            if pair[side] is None:
+                pair[side] = row
+        return {object_id: tuple(pair) for object_id, pair in brackets.items()}
+    
+    @classmethod
+    def find_latest_in_range(cls, after=None, until=None):
+        """Find the latest state row of every object recorded within a time window.
+        
+        The window is (after, until]; either bound may be None. Each row is
+        (object_id, timestamp, position_x, position_y, position_z, height,
+        direction_x, direction_y, direction_z, rotation, status, metadata).
+        The per-object MAX(timestamp) is resolved on idx_timestamp over the
+        window only, so the cost follows the number of records in it rather
+        than the age of the window. Ties go to the record inserted last.
+        """
+        window = []
+        if after is not None:
+            window.append(cls.timestamp > after)
+        if until is not None:
+            window.append(cls.timestamp <= until)
+        
+        latest = db.session.query(
+            cls.object_id.label('object_id'),
+            func.max(cls.timestamp).label('timestamp')
+        ).filter(*window).group_by(cls.object_id).subquery()
+        
+        rows = db.session.query(
+            cls.object_id, cls.timestamp,
+            cls.position_x, cls.position_y, cls.position_z,
+            cls.height,
+            cls.direction_x, cls.direction_y, cls.direction_z,
+            cls.rotation, cls.status, cls.object_metadata
+        ).join(latest, and_(
+            cls.object_id == latest.c.object_id,
+            cls.timestamp == latest.c.timestamp
+        )).order_by(cls.object_id, cls.id.desc()).all()
+        
+        # Keep one row per object
+        latest_rows = {}
+        for row in rows:
+            latest_rows.setdefault(row[0], tuple(row))
+        return list(latest_rows.values())
+    
     @classmethod
     def find_by_object_after_timestamp(cls, object_id, timestamp):
         """Find history record for an object after specific timestamp."""
@@ -125,6 +333,147 @@ class ObjectHistory(db.Model):
             cls.timestamp.between(start_timestamp, end_timestamp)
         ).order_by(cls.timestamp.asc()).all()
     
+    @classmethod
+    def _trajectory_query(cls, object_id, start=None, end=None, after=None):
+        """Build the query for an object's positioned history rows as tuples."""
+        query = db.session.query(
+            cls.id, cls.timestamp,
+            cls.position_x, cls.position_y, cls.position_z,
+            cls.height,
+            cls.direction_x, cls.direction_y, cls.direction_z,
+            cls.rotation, cls.status
+        ).filter(cls.object_id == object_id, cls.position_x.isnot(None))
+        if start is not None:
+            query = query.filter(cls.timestamp >= start)
+        if end is not None:
+            query = query.filter(cls.timestamp <= end)
+        if after is not None:
+            after_timestamp, after_id = after
+            query = query.filter(or_(
+                cls.timestamp > after_timestamp,
+                and_(cls.timestamp == after_timestamp, cls.id > after_id)
+            ))
+        return query.order_by(cls.timestamp, cls.id)
+    
+    @classmethod
+    def find_trajectory_page(cls, object_id, start=None, end=None, after=None, limit=1000):
+        """Find one page of an object's trajectory ordered by (timestamp, id).
+        
+        Each row is (id, timestamp, position_x, position_y, position_z,
+        height, direction_x, direction_y, direction_z, rotation, status).
+        The page starts strictly after the `after` (timestamp, id) position.
+        Rows without a position are skipped.
+        """
+        return cls._trajectory_query(object_id, start, end, after).limit(limit).all()
+    
+    @classmethod
+    def iter_trajectory(cls, object_id, start=None, end=None, batch_size=5000):
+        """Iterate over an object's trajectory rows through a server-side cursor."""
+        query = cls._trajectory_query(object_id, start, end)
+        return query.execution_options(stream_results=True).yield_per(batch_size)
+    
+    @classmethod
+    def find_time_bounds(cls, object_id):
+        """Find the (first, last) history timestamps of an object."""
+        return db.session.query(
+            func.min(cls.timestamp), func.max(cls.timestamp)
+        ).filter(cls.object_id == object_id).one()
+    
+    @classmethod
+    def find_first_timestamp(cls, since=None):
+        """Find the earliest history timestamp at or after `since`, or None."""
+        query = db.session.query(func.min(cls.timestamp))
+        if since is not None:
+            query = query.filter(cls.timestamp >= since)
+        return query.scalar()
+    
+    @classmethod
+    def find_timestamp_at_offset(cls, since, offset):
+        """Find the timestamp of the record `offset` places after the first one at or after `since`, or None."""
+        return db.session.query(cls.timestamp).filter(
+            cls.timestamp >= since
+        ).order_by(cls.timestamp).offset(offset).limit(1).scalar()
+    
+    @classmethod
+    def iter_state_rows(cls, start, end, batch_size=5000):
+        """Iterate over state rows with timestamps in [start, end), oldest first.
+        
+        Rows have the layout of find_latest_in_range and are read on
+        idx_timestamp through a server-side cursor. Ties are ordered by
+        insertion, so the last row of a moment is the one inserted last.
+        """
+        query = db.session.query(
+            cls.object_id, cls.timestamp,
+            cls.position_x, cls.position_y, cls.position_z,
+            cls.height,
+            cls.direction_x, cls.direction_y, cls.direction_z,
+            cls.rotation, cls.status, cls.object_metadata
+        ).filter(
+            cls.timestamp >= start,
+            cls.timestamp < end
+        ).order_by(cls.timestamp, cls.id)
+        return query.execution_options(stream_results=True).yield_per(batch_size)
+    
+    @classmethod
+    def iter_archive_rows(cls, start, end, batch_size=5000):
+        """Iterate over full rows with timestamps in [start, end) grouped by object.
+        
+        Each row is (id, object_id, timestamp, 8 state fields, status,
+        metadata), ordered by (object_id, timestamp, id) on
+        idx_object_timestamp through a server-side cursor.
+        """
+        query = db.session.query(
+            cls.id, cls.object_id, cls.timestamp,
+            cls.position_x, cls.position_y, cls.position_z,
+            cls.height,
+            cls.direction_x, cls.direction_y, cls.direction_z,
+            cls.rotation, cls.status, cls.object_metadata
+        ).filter(
+            cls.timestamp >= start,
+            cls.timestamp < end
+        ).order_by(cls.object_id, cls.timestamp, cls.id)
+        return query.execution_options(stream_results=True).yield_per(batch_size)
+    
+    @classmethod
+    def delete_before(cls, timestamp, limit=10000):
+        """Delete up to `limit` records older than a timestamp; returns the number deleted.
+        
+        Deleting in bounded batches keeps each transaction short on tables
+        that are not partitioned. Does not commit.
+        """
+        ids = [row[0] for row in db.session.query(cls.id).filter(
+            cls.timestamp < timestamp
+        ).order_by(cls.timestamp).limit(limit)]
+        if not ids:
+            return 0
+        return cls.query.filter(cls.id.in_(ids)).delete(synchronize_session=False)
+    
+    @classmethod
+    def insert_many(cls, rows):
+        """Insert history rows given as column-keyed dicts in one executemany.
+        
+        Bypasses the ORM unit of work, so drivers can batch the rows into
+        multi-row INSERT statements. Does not commit.
+        """
+        if not rows:
+            return 0
+        db.session.execute(cls.__table__.insert(), rows)
+        return len(rows)
+    
+    def set_state(self, coordinates, timestamp, status=None, metadata=None):
+        """Overwrite the recorded state with coordinates at a timestamp."""
+        self.timestamp = timestamp
+        self.position_x = coordinates.position_x
+        self.position_y = coordinates.position_y
+        self.position_z = coordinates.position_z
+        self.height = coordinates.height
+        self.direction_x = coordinates.direction_x
+        self.direction_y = coordinates.direction_y
+        self.direction_z = coordinates.direction_z
+        self.rotation = coordinates.rotation
+        self.status = status
+        self.object_metadata = metadata
+    
     @classmethod
     def create_from_coordinates(cls, object_id, coordinates, timestamp=None):
         """Create history record from current coordinates."""
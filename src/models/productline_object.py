@@ -1,7 +1,9 @@
 from src.database import db
+from src.models.hooks import notify_object_changed
+from src.models.coordinates import Coordinates
 from datetime import datetime
-from sqlalchemy import Column, String, Enum, DateTime, JSON, Index
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Enum, DateTime, JSON, Index, and_, or_, select
+from sqlalchemy.orm import relationship, object_session
 import json
 
 class ProductlineObject(db.Model):
@@ -56,6 +58,7 @@ class ProductlineObject(db.Model):
         
         self.status = new_status
         self.updated_at = datetime.utcnow()
+        notify_object_changed(self.id, object_session(self))
     
     def update_metadata(self, metadata_dict):
         """Update object metadata."""
@@ -64,6 +67,7 @@ class ProductlineObject(db.Model):
         
         self.object_metadata.update(metadata_dict)
         self.updated_at = datetime.utcnow()
+        notify_object_changed(self.id, object_session(self))
     
     def is_active(self):
         """Check if object is active."""
@@ -78,6 +82,58 @@ class ProductlineObject(db.Model):
         """Find object by ID."""
         return cls.query.filter_by(id=object_id).first()
     
+    @classmethod
+    def find_by_ids(cls, object_ids):
+        """Find all objects whose ID is in the given collection."""
+        if not object_ids:
+            return []
+        return cls.query.filter(cls.id.in_(list(object_ids))).all()
+    
+    # Columns of the plain rows read by the Core-level finders
+    ROW_COLUMNS = ('id', 'name', 'status', 'object_metadata', 'created_at', 'updated_at')
+    
+    @classmethod
+    def find_rows_by_ids(cls, object_ids):
+        """Find objects as plain rows of ROW_COLUMNS, without building model instances."""
+        if not object_ids:
+            return []
+        table = cls.__table__
+        statement = select(*(table.c[name] for name in cls.ROW_COLUMNS)).where(
+            table.c.id.in_(list(object_ids))
+        )
+        return db.session.connection().execute(statement).all()
+    
+    @classmethod
+    def find_rows_with_coordinates(cls, object_ids):
+        """Find objects with their coordinates as plain rows, in one outer join.
+        
+        Rows have the ROW_COLUMNS followed by position_x, position_y,
+        position_z, height, direction_x, direction_y, direction_z and
+        rotation, which are None for objects without stored coordinates.
+        """
+        if not object_ids:
+            return []
+        table = cls.__table__
+        coordinates = Coordinates.__table__
+        statement = select(
+            *(table.c[name] for name in cls.ROW_COLUMNS),
+            coordinates.c.position_x, coordinates.c.position_y, coordinates.c.position_z,
+            coordinates.c.height,
+            coordinates.c.direction_x, coordinates.c.direction_y, coordinates.c.direction_z,
+            coordinates.c.rotation
+        ).select_from(
+            table.outerjoin(coordinates, coordinates.c.object_id == table.c.id)
+        ).where(table.c.id.in_(list(object_ids)))
+        return db.session.connection().execute(statement).all()
+    
+    @classmethod
+    def find_existing_ids(cls, object_ids):
+        """Find which of the given object IDs exist, as a set."""
+        if not object_ids:
+            return set()
+        rows = db.session.query(cls.id).filter(cls.id.in_(list(object_ids))).all()
+        return {row[0] for row in rows}
+    
     @classmethod
     def find_active_objects(cls):
         """Find all active objects."""
@@ -88,5 +144,39 @@ class ProductlineObject(db.Model):
         """Find objects by status."""
         return cls.query.filter_by(status=status).all()
     
+    @classmethod
+    def find_changed_after(cls, updated_at=None, object_id=None, until=None, limit=1000):
+        """Find (updated_at, object_id) keys of rows changed after a keyset position.
+        
+        Rows are ordered by (updated_at, object_id) and start strictly after the
+        given position, or at the beginning if none is given. Rows updated
+        after `until` are left out.
+        """
+        query = db.session.query(cls.updated_at, cls.id)
+        if updated_at is not None:
+            query = query.filter(or_(
+                cls.updated_at > updated_at,
+                and_(cls.updated_at == updated_at, cls.id > object_id)
+            ))
+        if until is not None:
+            query = query.filter(cls.updated_at <= until)
+        return query.order_by(cls.updated_at, cls.id).limit(limit).all()
+    
+    @classmethod
+    def iter_with_coordinates(cls, status=None, batch_size=1000):
+        """Iterate over (object, coordinates) pairs ordered by object ID.
+        
+        Rows are fetched through a server-side cursor in batches of
+        `batch_size`, so the full result set is never held in memory.
+        Coordinates are None for objects that have none stored.
+        """
+        query = db.session.query(cls, Coordinates).outerjoin(
+            Coordinates, Coordinates.object_id == cls.id
+        )
+        if status is not None:
+            query = query.filter(cls.status == status)
+        query = query.order_by(cls.id).execution_options(stream_results=True)
+        return query.yield_per(batch_size)
+    
     def __repr__(self):
         return f'<ProductlineObject {self.id}: {self.name} ({self.status})>'
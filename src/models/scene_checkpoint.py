@@ -0,0 +1,74 @@
+from src.database import db
+from datetime import datetime
+from sqlalchemy import Column, Integer, DateTime, LargeBinary, Index, func
+from sqlalchemy.dialects.mysql import LONGBLOB
+
+class SceneCheckpoint(db.Model):
+    """SceneCheckpoint model holding the full historical scene state at a moment."""
+    
+    __tablename__ = 'scene_checkpoints'
+    
+    # Primary key
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    
+    # Moment the state was materialized at; one checkpoint per moment
+    taken_at = Column(DateTime, nullable=False, unique=True)
+    
+    # Number of objects in the encoded state
+    object_count = Column(Integer, nullable=False, default=0)
+    
+    # Encoded scene state
+    payload = Column(LargeBinary().with_variant(LONGBLOB(), 'mysql'), nullable=False)
+    
+    # Record creation timestamp
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_checkpoint_created_at', 'created_at'),
+    )
+    
+    def __init__(self, taken_at, payload, object_count=0):
+        self.taken_at = taken_at
+        self.payload = payload
+        self.object_count = object_count
+    
+    def to_dict(self):
+        """Convert checkpoint to dictionary for JSON serialization, without the payload."""
+        return {
+            'id': self.id,
+            'taken_at': self.taken_at.isoformat() + 'Z' if self.taken_at else None,
+            'object_count': self.object_count,
+            'size': len(self.payload) if self.payload is not None else 0,
+            'created_at': self.created_at.isoformat() + 'Z' if self.created_at else None
+        }
+    
+    @classmethod
+    def find_latest_at_or_before(cls, timestamp):
+        """Find the latest checkpoint taken at or before a timestamp."""
+        return cls.query.filter(
+            cls.taken_at <= timestamp
+        ).order_by(cls.taken_at.desc()).first()
+    
+    @classmethod
+    def find_latest_taken_at(cls):
+        """Find the moment of the latest checkpoint, or None if there is none."""
+        return db.session.query(func.max(cls.taken_at)).scalar()
+    
+    @classmethod
+    def find_earliest_taken_at(cls):
+        """Find the moment of the earliest checkpoint, or None if there is none."""
+        return db.session.query(func.min(cls.taken_at)).scalar()
+    
+    @classmethod
+    def delete_taken_at_or_after(cls, timestamp):
+        """Delete checkpoints made stale by history at a timestamp; returns the number deleted."""
+        return cls.query.filter(cls.taken_at >= timestamp).delete(synchronize_session=False)
+    
+    @classmethod
+    def delete_older_than(cls, timestamp):
+        """Delete checkpoints taken before a timestamp; returns the number deleted."""
+        return cls.query.filter(cls.taken_at < timestamp).delete(synchronize_session=False)
+    
+    def __repr__(self):
+        return f'<SceneCheckpoint at {self.taken_at} ({self.object_count} objects)>'
@@ -7,39 +7,52 @@ logger = get_logger(__name__)
 class BatchService:
     """Service for batch object data retrieval."""
     
-    def get_objects_batch(self, object_ids, timestamp=None):
+    def __init__(self, read_path=None):
+        self.read_path = read_path
+    
+    def get_objects_batch(self, object_ids, timestamp=None, interpolate=None):
         """Get multiple objects in a single request."""
         try:
             objects = []
             errors = []
             
-            for object_id in object_ids:
-                try:
-                    if timestamp:
-                        # Get historical data
-                        history_service = HistoryService()
-                        obj_data = history_service.get_object_at_timestamp(object_id, timestamp)
-                    else:
-                        # Get current data
-                        data_service = DataService()
-                        obj_data = data_service.get_object(object_id)
+            # Resolve the whole batch with set-based queries
+            try:
+                if timestamp:
+                    # Get historical data
+                    history_service = HistoryService(read_path=self.read_path)
+                    results = history_service.get_objects_at_timestamp(
+                        object_ids, timestamp, interpolate=interpolate
+                    )
+                else:
+                    # Get current data
+                    data_service = DataService(self.read_path)
+                    results = data_service.get_objects(object_ids)
                     
-                    if obj_data:
-                        objects.append(obj_data)
-                    else:
-                        errors.append({
-                            'object_id': object_id,
-                            'error': 'Object not found',
-                            'code': 'OBJECT_NOT_FOUND'
-                        })
-                        
-                except Exception as e:
-                    logger.warning(f"Error retrieving object {object_id}: {str(e)}")
+            except Exception as e:
+                logger.warning(f"Error retrieving batch of {len(object_ids)} objects: {str(e)}")
+                for object_id in object_ids:
                     errors.append({
                         'object_id': object_id,
                         'error': str(e),
                         'code': 'RETRIEVAL_ERROR'
                     })
+                return {
+                    'objects': objects,
+                    'errors': errors
+                }
+            
+            # Keep request order, including duplicate IDs
+            for object_id in object_ids:
+                obj_data = results.get(object_id)
+                if obj_data:
+                    objects.append(obj_data)
+                else:
+                    errors.append({
+                        'object_id': object_id,
+                        'error': 'Object not found',
+                        'code': 'OBJECT_NOT_FOUND'
+                    })
             
             response = {
                 'objects': objects,
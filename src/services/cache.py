@@ -0,0 +1,173 @@
+"""
+Caching for object snapshots.
+Provides the cache for current snapshots, a long-lived cache for historical
+as-of snapshots, and wires both into the Flask application on top of the
+backend selected by CACHE_BACKEND.
+"""
+
+from datetime import datetime, timedelta, timezone
+from flask import current_app, has_app_context
+from src.models.hooks import register_change_listener
+from src.services.cache_backends import InProcessCacheBackend, create_cache_backend
+from src.app_logging import get_logger
+
+logger = get_logger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+class HistorySnapshotCache:
+    """Memoizes resolved historical snapshots keyed by (object ID, quantized timestamp).
+    
+    Snapshots are resolved at the exact requested timestamp. Each entry
+    records the span it is known to hold for, from the timestamp of the
+    history record it was built from through the timestamp it was resolved
+    at, and is only served for timestamps within that span, so requests
+    that differ by less than `quantum` seconds share an entry without
+    seeing a record written between them. Timestamps within
+    `mutable_horizon` seconds of now may still receive new history and are
+    never cached.
+    """
+    
+    def __init__(self, backend=None, quantum=1.0, mutable_horizon=300.0,
+                 clock=datetime.utcnow):
+        self.quantum = quantum
+        self.mutable_horizon = mutable_horizon
+        self._clock = clock
+        if backend is None:
+            backend = InProcessCacheBackend(max_size=50000, ttl=86400.0)
+        self._entries = backend
+        self.bypasses = 0
+        self.span_misses = 0
+    
+    @staticmethod
+    def _to_utc_naive(timestamp):
+        """Convert a timestamp to a naive UTC datetime."""
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        return timestamp
+    
+    @classmethod
+    def _microseconds(cls, timestamp):
+        """Convert a timestamp to microseconds since the epoch."""
+        return (cls._to_utc_naive(timestamp) - _EPOCH) // _MICROSECOND
+    
+    def quantize(self, timestamp):
+        """Floor a timestamp to the cache quantum, keeping its timezone."""
+        if not self.quantum:
+            return timestamp
+        
+        quantum = timedelta(seconds=self.quantum)
+        epoch = datetime(1970, 1, 1, tzinfo=timestamp.tzinfo)
+        return epoch + ((timestamp - epoch) // quantum) * quantum
+    
+    def is_cacheable(self, timestamp):
+        """Check whether a timestamp is older than the mutable horizon."""
+        horizon = self._clock() - timedelta(seconds=self.mutable_horizon)
+        if self._to_utc_naive(timestamp) <= horizon:
+            return True
+        
+        self.bypasses += 1
+        return False
+    
+    def key(self, object_id, timestamp):
+        """Build the cache key for an object at a timestamp, quantized."""
+        return f"{object_id}@{self._to_utc_naive(self.quantize(timestamp)).isoformat()}"
+    
+    def get(self, object_id, timestamp):
+        """Get the snapshot of an object at a timestamp, or None if none is known to hold."""
+        entry = self._entries.get(self.key(object_id, timestamp))
+        if entry is None:
+            return None
+        
+        moment = self._microseconds(timestamp)
+        if not entry['from'] <= moment <= entry['through']:
+            self.span_misses += 1
+            return None
+        return entry['snapshot']
+    
+    def set(self, object_id, timestamp, snapshot, valid_from=None):
+        """Store the snapshot resolved at a timestamp.
+        
+        `valid_from` is the timestamp of the history record the snapshot
+        was built from, so the snapshot holds from then through `timestamp`.
+        """
+        self._entries.set(self.key(object_id, timestamp), {
+            'from': self._microseconds(timestamp if valid_from is None else valid_from),
+            'through': self._microseconds(timestamp),
+            'snapshot': snapshot
+        })
+    
+    def clear(self):
+        """Remove all snapshots."""
+        self._entries.clear()
+    
+    def stats(self):
+        """Get cache counters."""
+        stats = self._entries.stats()
+        stats.update({
+            'quantum_seconds': self.quantum,
+            'mutable_horizon_seconds': self.mutable_horizon,
+            'bypasses': self.bypasses,
+            'span_misses': self.span_misses
+        })
+        return stats
+
+def init_cache(app):
+    """Initialize the object snapshot caches for Flask app."""
+    
+    if app.config.get('OBJECT_CACHE_ENABLED', False):
+        app.object_cache = create_cache_backend(
+            app.config,
+            namespace='object',
+            max_size=app.config.get('OBJECT_CACHE_MAX_SIZE', 10000),
+            ttl=app.config.get('OBJECT_CACHE_TTL', 5.0)
+        )
+        logger.info("Object cache configured",
+                   backend=app.config.get('CACHE_BACKEND', 'memory'),
+                   max_size=app.config.get('OBJECT_CACHE_MAX_SIZE', 10000),
+                   ttl_seconds=app.config.get('OBJECT_CACHE_TTL', 5.0))
+    else:
+        app.object_cache = None
+    
+    if app.config.get('HISTORY_CACHE_ENABLED', False):
+        backend = create_cache_backend(
+            app.config,
+            namespace='history',
+            max_size=app.config.get('HISTORY_CACHE_MAX_ENTRIES', 50000),
+            ttl=app.config.get('HISTORY_CACHE_TTL', 86400.0)
+        )
+        app.history_cache = HistorySnapshotCache(
+            backend=backend,
+            quantum=app.config.get('HISTORY_CACHE_QUANTUM', 1.0),
+            mutable_horizon=app.config.get('HISTORY_CACHE_MUTABLE_HORIZON', 300.0)
+        )
+        logger.info("History cache configured",
+                   backend=app.config.get('CACHE_BACKEND', 'memory'),
+                   max_entries=app.config.get('HISTORY_CACHE_MAX_ENTRIES', 50000),
+                   mutable_horizon_seconds=app.history_cache.mutable_horizon)
+    else:
+        app.history_cache = None
+    
+    return app.object_cache
+
+def get_object_cache():
+    """Get the object snapshot cache of the current app, if enabled."""
+    if not has_app_context():
+        return None
+    return getattr(current_app, 'object_cache', None)
+
+def get_history_cache():
+    """Get the historical snapshot cache of the current app, if enabled."""
+    if not has_app_context():
+        return None
+    return getattr(current_app, 'history_cache', None)
+
+def invalidate_object(object_id):
+    """Drop the cached snapshot of an object."""
+    cache = get_object_cache()
+    if cache is not None:
+        cache.delete(object_id)
+
+# Drop cached snapshots whenever a model writes new state
+register_change_listener(invalidate_object)
@@ -0,0 +1,361 @@
+"""
+Pluggable cache backends for object snapshots.
+Provides an in-process TTL/LRU backend and a networked backend that speaks
+the Redis protocol, so every worker and replica can share one warm cache.
+"""
+
+import abc
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+import msgpack
+from src.app_logging import get_logger
+
+logger = get_logger(__name__)
+
+class CacheBackendError(Exception):
+    """Error reported by a cache backend."""
+
+def encode_value(value):
+    """Serialize a cached value with MessagePack."""
+    return msgpack.packb(value, use_bin_type=True)
+
+def decode_value(data):
+    """Deserialize a cached value encoded with encode_value."""
+    return msgpack.unpackb(data, raw=False)
+
+class CacheBackend(abc.ABC):
+    """Interface shared by all cache backends."""
+    
+    @abc.abstractmethod
+    def get(self, key):
+        """Get a cached value, or None if it is missing or expired."""
+    
+    @abc.abstractmethod
+    def set(self, key, value, ttl=None):
+        """Store a value; ttl overrides the backend default."""
+    
+    @abc.abstractmethod
+    def delete(self, key):
+        """Remove a single entry."""
+    
+    @abc.abstractmethod
+    def clear(self):
+        """Remove all entries of this backend."""
+    
+    @abc.abstractmethod
+    def stats(self):
+        """Get backend counters."""
+
+class InProcessCacheBackend(CacheBackend):
+    """Thread-safe LRU cache whose entries expire after a time-to-live.
+    
+    A ttl of 0 or None keeps entries until they are evicted or deleted.
+    """
+    
+    def __init__(self, max_size=10000, ttl=5.0, clock=time.monotonic):
+        if max_size < 1:
+            raise ValueError("Cache max_size must be at least 1")
+        
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    def get(self, key):
+        """Get a cached value, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key, value, ttl=None):
+        """Store a value, evicting the least recently used entries if full."""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = self._clock() + ttl if ttl else None
+        
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def delete(self, key):
+        """Remove a single entry."""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+    
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def stats(self):
+        """Get cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'memory',
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+class RedisCacheBackend(CacheBackend):
+    """Cache backend for a Redis-compatible key-value server.
+    
+    Values are encoded with MessagePack and keys are prefixed with a
+    namespace so several caches can share one server. Expiry and eviction
+    are left to the server. Connection and protocol errors are logged and
+    treated as misses, so an unavailable cache never fails a read.
+    """
+    
+    def __init__(self, url='redis://localhost:6379/0', namespace='cache', ttl=None,
+                 key_prefix='productline', socket_timeout=0.25):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.password = parsed.password
+        self.namespace = namespace
+        self.ttl = ttl
+        self.key_prefix = f"{key_prefix}:{namespace}:"
+        self.socket_timeout = socket_timeout
+        
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+        
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.invalidations = 0
+    
+    def _connect(self):
+        """Open the connection and select the configured database.
+        
+        A connection that fails to authenticate or select is closed again,
+        so the next command reconnects rather than reusing it.
+        """
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.socket_timeout)
+        try:
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._reader = self._sock.makefile('rb')
+            
+            if self.password:
+                self._command('AUTH', self.password)
+            if self.db:
+                self._command('SELECT', self.db)
+        except Exception:
+            self._disconnect()
+            raise
+    
+    def _disconnect(self):
+        """Close the connection, ignoring errors."""
+        for resource in (self._reader, self._sock):
+            if resource is not None:
+                try:
+                    resource.close()
+                except OSError:
+                    pass
+        self._sock = None
+        self._reader = None
+    
+    def close(self):
+        """Close the connection to the server."""
+        with self._lock:
+            self._disconnect()
+    
+    @staticmethod
+    def _encode_command(args):
+        """Encode a command as a RESP array of bulk strings."""
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, bytes):
+                data = arg
+            else:
+                data = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        return b''.join(parts)
+    
+    def _read_reply(self):
+        """Read one RESP reply from the connection."""
+        line = self._reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError("Connection closed by cache server")
+        
+        prefix, body = line[:1], line[1:-2]
+        if prefix == b'+':
+            return body.decode('utf-8')
+        if prefix == b'-':
+            raise CacheBackendError(body.decode('utf-8'))
+        if prefix == b':':
+            return int(body)
+        if prefix == b'$':
+            length = int(body)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Connection closed by cache server")
+            return data[:-2]
+        if prefix == b'*':
+            length = int(body)
+            if length < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        
+        raise CacheBackendError(f"Unexpected reply prefix: {prefix!r}")
+    
+    def _command(self, *args):
+        """Send a command on the open connection and read its reply."""
+        self._sock.sendall(self._encode_command(args))
+        return self._read_reply()
+    
+    def execute(self, *args):
+        """Execute a command, reconnecting once if the connection was lost."""
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._command(*args)
+                except OSError:
+                    self._disconnect()
+                    if attempt:
+                        raise
+    
+    def _key(self, key):
+        return self.key_prefix + str(key)
+    
+    def get(self, key):
+        """Get a cached value, or None if it is missing, undecodable or the server is unavailable.
+        
+        An entry that does not decode is deleted.
+        """
+        try:
+            data = self.execute('GET', self._key(key))
+            if data is None:
+                self.misses += 1
+                return None
+            value = decode_value(data)
+        except (OSError, CacheBackendError) as e:
+            self.errors += 1
+            logger.warning(f"Cache get failed for {key}: {str(e)}")
+            return None
+        except (ValueError, TypeError, msgpack.UnpackException) as e:
+            self.errors += 1
+            logger.warning(f"Dropping undecodable cache entry {key}: {str(e)}")
+            try:
+                self.execute('DEL', self._key(key))
+            except (OSError, CacheBackendError):
+                pass
+            return None
+        
+        self.hits += 1
+        return value
+    
+    def set(self, key, value, ttl=None):
+        """Store a value with an optional expiry in seconds."""
+        ttl = self.ttl if ttl is None else ttl
+        args = ['SET', self._key(key), encode_value(value)]
+        if ttl:
+            args.extend(['PX', int(ttl * 1000)])
+        
+        try:
+            self.execute(*args)
+        except (OSError, CacheBackendError) as e:
+            self.errors += 1
+            logger.warning(f"Cache set failed for {key}: {str(e)}")
+    
+    def delete(self, key):
+        """Remove a single entry."""
+        try:
+            if self.execute('DEL', self._key(key)):
+                self.invalidations += 1
+        except (OSError, CacheBackendError) as e:
+            self.errors += 1
+            logger.warning(f"Cache delete failed for {key}: {str(e)}")
+    
+    def clear(self):
+        """Remove all entries of this namespace."""
+        try:
+            cursor = '0'
+            while True:
+                cursor, keys = self.execute('SCAN', cursor, 'MATCH', self.key_prefix + '*', 'COUNT', 500)
+                cursor = cursor.decode('utf-8') if isinstance(cursor, bytes) else str(cursor)
+                if keys:
+                    self.execute('DEL', *keys)
+                if cursor == '0':
+                    break
+        except (OSError, CacheBackendError) as e:
+            self.errors += 1
+            logger.warning(f"Cache clear failed for {self.namespace}: {str(e)}")
+    
+    def stats(self):
+        """Get client-side cache counters."""
+        lookups = self.hits + self.misses
+        return {
+            'backend': 'redis',
+            'server': f"{self.host}:{self.port}/{self.db}",
+            'namespace': self.namespace,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'errors': self.errors,
+            'invalidations': self.invalidations
+        }
+
+def create_cache_backend(config, namespace, max_size, ttl):
+    """Create the cache backend selected by CACHE_BACKEND."""
+    backend = config.get('CACHE_BACKEND', 'memory')
+    
+    if backend == 'memory':
+        return InProcessCacheBackend(max_size=max_size, ttl=ttl)
+    
+    if backend == 'redis':
+        return RedisCacheBackend(
+            url=config.get('CACHE_URL', 'redis://localhost:6379/0'),
+            namespace=namespace,
+            ttl=ttl,
+            key_prefix=config.get('CACHE_KEY_PREFIX', 'productline'),
+            socket_timeout=config.get('CACHE_SOCKET_TIMEOUT', 0.25)
+        )
+    
+    raise ValueError(f"Unknown cache backend: {backend}")
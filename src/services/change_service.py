@@ -0,0 +1,91 @@
+"""
+Delta synchronization of current object state.
+Walks the updated_at indexes of the objects and coordinates tables with a
+keyset cursor, so clients fetch only the objects that changed since their
+last poll instead of reloading the whole scene.
+"""
+
+import base64
+import json
+import heapq
+from datetime import datetime, timedelta
+from src.models.productline_object import ProductlineObject
+from src.models.coordinates import Coordinates
+from src.services.data_service import DataService
+from src.app_logging import get_logger
+
+logger = get_logger(__name__)
+
+class InvalidCursorError(ValueError):
+    """Raised when a change cursor cannot be decoded."""
+
+def encode_cursor(updated_at, object_id):
+    """Encode a keyset position as an opaque URL-safe cursor."""
+    raw = json.dumps([updated_at.isoformat(), object_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor into (updated_at, object_id)."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, object_id = json.loads(raw.decode('utf-8'))
+        return datetime.fromisoformat(timestamp), str(object_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid change cursor: {cursor}") from e
+
+class ChangeService:
+    """Service for fetching objects changed since a cursor."""
+    
+    def __init__(self, settle_delay=1.0, clock=datetime.utcnow):
+        self.settle_delay = settle_delay
+        self._clock = clock
+    
+    def get_changes(self, cursor=None, limit=1000):
+        """Get the objects changed after a cursor, oldest change first.
+        
+        Both tables are walked in (updated_at, object_id) order and merged,
+        so an object is reported when either its state or its coordinates
+        change. Rows newer than the settle delay are left for the next
+        poll, so writes that commit slightly out of timestamp order are not
+        skipped. Deleted objects are not reported.
+        """
+        try:
+            position = decode_cursor(cursor) if cursor else (None, None)
+            until = self._clock() - timedelta(seconds=self.settle_delay)
+            
+            # Fetch one extra key per table to know whether more remain
+            keys = heapq.merge(
+                ProductlineObject.find_changed_after(*position, until=until, limit=limit + 1),
+                Coordinates.find_changed_after(*position, until=until, limit=limit + 1)
+            )
+            keys = [tuple(key) for key in keys]
+            has_more = len(keys) > limit
+            keys = keys[:limit]
+            
+            # Load the current state of each changed object once
+            object_ids = list(dict.fromkeys(object_id for _, object_id in keys))
+            objects = {obj.id: obj for obj in ProductlineObject.find_by_ids(object_ids)}
+            coords = {
+                c.object_id: c for c in Coordinates.find_by_object_ids(list(objects))
+            }
+            changes = [
+                DataService.build_response(objects[object_id], coords.get(object_id))
+                for object_id in object_ids if object_id in objects
+            ]
+            
+            if keys:
+                cursor = encode_cursor(*keys[-1])
+            
+            logger.info(f"Found {len(changes)} changed objects")
+            return {
+                'changes': changes,
+                'count': len(changes),
+                'cursor': cursor,
+                'has_more': has_more
+            }
+            
+        except InvalidCursorError:
+            raise
+        except Exception as e:
+            logger.error(f"Error retrieving changes: {str(e)}")
+            raise
@@ -0,0 +1,325 @@
+"""
+Columnar in-memory snapshot of the coordinates table.
+Keeps every object's current coordinates in contiguous float arrays with an
+ID-to-row index, refreshed incrementally by `updated_at`, so bulk readers
+never build ORM instances or per-object dicts.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from flask import current_app, has_app_context
+from src.models.coordinates import Coordinates
+from src.app_logging import get_logger
+
+logger = get_logger(__name__)
+
+SNAPSHOT_COLUMNS = (
+    'position_x', 'position_y', 'position_z', 'height',
+    'direction_x', 'direction_y', 'direction_z', 'rotation'
+)
+
+_EPOCH = datetime(1970, 1, 1)
+
+def to_epoch_seconds(timestamp):
+    """Convert a naive UTC datetime to seconds since the epoch."""
+    return (timestamp - _EPOCH).total_seconds()
+
+class CoordinateSnapshot:
+    """Struct-of-arrays copy of the coordinates table.
+    
+    Each column lives in its own contiguous float64 array; rows [0, size)
+    are live. Removed rows are filled by moving the last row into the hole,
+    so the arrays stay dense. Missing rotations are stored as NaN.
+    
+    Every change bumps `version` and stamps the row, so consumers can ask
+    which objects changed since the version they last saw.
+    """
+    
+    def __init__(self, capacity=1024, removal_log_size=10000):
+        capacity = max(int(capacity), 1)
+        self.size = 0
+        self.version = 0
+        self.object_ids = []
+        self.rows = {}
+        self.columns = {name: np.empty(capacity) for name in SNAPSHOT_COLUMNS}
+        self.updated_at = np.empty(capacity)
+        self.row_versions = np.zeros(capacity, dtype=np.int64)
+        self.lock = threading.RLock()
+        
+        self._removals = []
+        self._removal_log_size = removal_log_size
+        self._removals_truncated_at = 0
+        self._positions = None
+    
+    def __len__(self):
+        return self.size
+    
+    def __contains__(self, object_id):
+        return object_id in self.rows
+    
+    @property
+    def capacity(self):
+        return len(self.updated_at)
+    
+    def _grow(self):
+        """Double the capacity of every array."""
+        capacity = self.capacity * 2
+        for name, column in self.columns.items():
+            grown = np.empty(capacity)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+        for attr in ('updated_at', 'row_versions'):
+            column = getattr(self, attr)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, attr, grown)
+    
+    def upsert(self, object_id, values, updated_at):
+        """Insert or update an object's row.
+        
+        `values` follows SNAPSHOT_COLUMNS and `updated_at` is in epoch
+        seconds. Returns False if the row already holds this state.
+        """
+        with self.lock:
+            row = self.rows.get(object_id)
+            if row is None:
+                if self.size == self.capacity:
+                    self._grow()
+                row = self.size
+                self.size += 1
+                self.rows[object_id] = row
+                self.object_ids.append(object_id)
+            elif self._row_equals(row, values, updated_at):
+                return False
+            
+            for name, value in zip(SNAPSHOT_COLUMNS, values):
+                self.columns[name][row] = np.nan if value is None else value
+            self.updated_at[row] = updated_at
+            self.version += 1
+            self.row_versions[row] = self.version
+            return True
+    
+    def _row_equals(self, row, values, updated_at):
+        """Check whether a row already holds the given state."""
+        if self.updated_at[row] != updated_at:
+            return False
+        for name, value in zip(SNAPSHOT_COLUMNS, values):
+            current = self.columns[name][row]
+            if value is None:
+                if not np.isnan(current):
+                    return False
+            elif current != value:
+                return False
+        return True
+    
+    def remove(self, object_id):
+        """Remove an object's row, keeping the arrays dense."""
+        with self.lock:
+            row = self.rows.pop(object_id, None)
+            if row is None:
+                return False
+            
+            last = self.size - 1
+            if row != last:
+                # Move the last row into the hole
+                moved_id = self.object_ids[last]
+                for column in self.columns.values():
+                    column[row] = column[last]
+                self.updated_at[row] = self.updated_at[last]
+                self.row_versions[row] = self.row_versions[last]
+                self.object_ids[row] = moved_id
+                self.rows[moved_id] = row
+            self.object_ids.pop()
+            self.size -= 1
+            
+            self.version += 1
+            self._removals.append((self.version, object_id))
+            if len(self._removals) > self._removal_log_size:
+                dropped = len(self._removals) - self._removal_log_size
+                self._removals_truncated_at = self._removals[dropped - 1][0]
+                del self._removals[:dropped]
+            return True
+    
+    def column(self, name):
+        """Get a read-only view of the live rows of a column."""
+        if name == 'updated_at':
+            view = self.updated_at[:self.size]
+        else:
+            view = self.columns[name][:self.size]
+        view = view.view()
+        view.flags.writeable = False
+        return view
+    
+    def get(self, object_id):
+        """Get an object's row as a dict of column values, or None."""
+        with self.lock:
+            row = self.rows.get(object_id)
+            if row is None:
+                return None
+            values = {name: float(self.columns[name][row]) for name in SNAPSHOT_COLUMNS}
+            if np.isnan(values['rotation']):
+                values['rotation'] = None
+            values['updated_at'] = float(self.updated_at[row])
+            return values
+    
+    def positions(self):
+        """Get (object_ids, positions, rows) with positions as a packed (N, 3) array.
+        
+        The result is a consistent copy, cached until the next change, and
+        must not be modified.
+        """
+        with self.lock:
+            if self._positions is None or self._positions[0] != self.version:
+                n = self.size
+                positions = np.column_stack((
+                    self.columns['position_x'][:n],
+                    self.columns['position_y'][:n],
+                    self.columns['position_z'][:n]
+                ))
+                positions.flags.writeable = False
+                self._positions = (self.version, list(self.object_ids), positions, dict(self.rows))
+            return self._positions[1:]
+    
+    def export_columns(self):
+        """Export the live rows as a dict of column lists.
+        
+        Missing rotations become None and `updated_at_epoch` holds epoch
+        seconds.
+        """
+        with self.lock:
+            n = self.size
+            columns = {name: self.columns[name][:n].tolist() for name in SNAPSHOT_COLUMNS}
+            rotation = self.columns['rotation'][:n]
+            if np.isnan(rotation).any():
+                columns['rotation'] = [
+                    None if missing else value
+                    for missing, value in zip(np.isnan(rotation).tolist(), columns['rotation'])
+                ]
+            columns['updated_at_epoch'] = self.updated_at[:n].tolist()
+            return {
+                'count': n,
+                'version': self.version,
+                'object_ids': list(self.object_ids),
+                'columns': columns
+            }
+    
+    def changed_since(self, version):
+        """Get (changed_ids, removed_ids) for changes after a version.
+        
+        Returns None if removals that old are no longer tracked and the
+        caller must rebuild from the full snapshot.
+        """
+        with self.lock:
+            if version < self._removals_truncated_at:
+                return None
+            
+            rows = np.nonzero(self.row_versions[:self.size] > version)[0]
+            changed = [self.object_ids[row] for row in rows]
+            removed = [
+                object_id for removed_version, object_id in self._removals
+                if removed_version > version and object_id not in self.rows
+            ]
+            return changed, removed
+
+class CoordinateSnapshotManager:
+    """Keeps a process-wide coordinate snapshot in sync with the database.
+    
+    Changed rows are pulled incrementally by `updated_at`, at most once per
+    refresh interval. A periodic full reload builds a new snapshot, which
+    drops objects whose coordinates were deleted.
+    """
+    
+    def __init__(self, refresh_interval=1.0, full_reload_interval=300.0, overlap=2.0,
+                 clock=time.monotonic):
+        self.refresh_interval = refresh_interval
+        self.full_reload_interval = full_reload_interval
+        self.overlap = timedelta(seconds=overlap)
+        self._clock = clock
+        self._lock = threading.Lock()
+        
+        self.snapshot = CoordinateSnapshot()
+        self.watermark = None
+        self.last_refresh = None
+        self.last_full_reload = None
+    
+    def _apply(self, snapshot, rows):
+        """Apply coordinate rows to a snapshot and advance the watermark."""
+        changed = 0
+        for row in rows:
+            object_id, values, updated_at = row[0], row[1:-1], row[-1]
+            if snapshot.upsert(object_id, values, to_epoch_seconds(updated_at)):
+                changed += 1
+            if self.watermark is None or updated_at > self.watermark:
+                self.watermark = updated_at
+        return changed
+    
+    def refresh(self, force=False):
+        """Bring the snapshot up to date if the refresh interval has passed."""
+        now = self._clock()
+        with self._lock:
+            if (force or self.last_full_reload is None
+                    or now - self.last_full_reload >= self.full_reload_interval):
+                # Load a fresh snapshot and swap it in
+                rows = Coordinates.find_columns_updated_since(None)
+                snapshot = CoordinateSnapshot(capacity=len(rows) * 2)
+                self.watermark = None
+                self._apply(snapshot, rows)
+                self.snapshot = snapshot
+                self.last_full_reload = now
+                self.last_refresh = now
+                logger.info(f"Coordinate snapshot loaded with {len(snapshot)} objects")
+                
+            elif now - self.last_refresh >= self.refresh_interval:
+                # Pull rows changed since the watermark, overlapping a little
+                # to tolerate commits that land out of timestamp order
+                since = self.watermark - self.overlap if self.watermark else None
+                self._apply(self.snapshot, Coordinates.find_columns_updated_since(since))
+                self.last_refresh = now
+        
+        return self.snapshot
+    
+    def stats(self):
+        """Get snapshot counters."""
+        snapshot = self.snapshot
+        return {
+            'objects': len(snapshot),
+            'capacity': snapshot.capacity,
+            'version': snapshot.version,
+            'watermark': self.watermark.isoformat() + 'Z' if self.watermark else None
+        }
+
+def init_coordinate_snapshot(app):
+    """Initialize the coordinate snapshot manager for Flask app."""
+    app.coordinate_snapshot = CoordinateSnapshotManager(
+        refresh_interval=app.config.get('COORDINATE_SNAPSHOT_REFRESH_INTERVAL', 1.0),
+        full_reload_interval=app.config.get('COORDINATE_SNAPSHOT_FULL_RELOAD_INTERVAL', 300.0)
+    )
+    return app.coordinate_snapshot
+
+def get_coordinate_snapshot():
+    """Get the coordinate snapshot manager of the current app."""
+    if not has_app_context():
+        return None
+    return getattr(current_app, 'coordinate_snapshot', None)
+
+class CoordinateSnapshotService:
+    """Service for bulk reads of current coordinates from the snapshot."""
+    
+    def get_columns(self):
+        """Get every object's current coordinates in columnar form."""
+        try:
+            manager = get_coordinate_snapshot()
+            if manager is None:
+                raise RuntimeError("Coordinate snapshot is not initialized")
+            
+            result = manager.refresh().export_columns()
+            result['watermark'] = manager.watermark.isoformat() + 'Z' if manager.watermark else None
+            
+            logger.info(f"Exported coordinate snapshot with {result['count']} objects")
+            return result
+        
+        except Exception as e:
+            logger.error(f"Error exporting coordinate snapshot: {str(e)}")
+            raise
@@ -0,0 +1,239 @@
+"""
+Coordinate updates with history capture.
+Each update writes the current coordinates and records the new state in
+object history within one transaction. Updates to an object within the same
+coalescing window share one history row holding the window's latest state,
+so high-frequency telemetry does not add a history row per sample.
+"""
+
+from datetime import datetime
+from src.database import db
+from src.models.productline_object import ProductlineObject
+from src.models.coordinates import Coordinates
+from src.models.object_history import ObjectHistory
+from src.services.data_service import DataService, default_coordinates
+from src.services.history_service import invalidate_history
+from src.services.samples import align_down, reject, sample_timestamp
+from src.services.validation import validate_coordinates, validate_object_id
+from src.app_logging import get_logger
+
+logger = get_logger(__name__)
+
+COORDINATE_FIELDS = ('position', 'height', 'direction', 'rotation')
+
+class InvalidCoordinatesError(ValueError):
+    """Raised when a coordinate update is malformed."""
+    
+    def __init__(self, message, code='INVALID_COORDINATES'):
+        super().__init__(message)
+        self.code = code
+
+def merge_coordinates(current, changes, replace=False):
+    """Build the coordinates an update results in, as a response coordinates dict.
+    
+    With `replace`, the update must hold every field. Otherwise missing
+    fields and axes keep their current values. Raises
+    InvalidCoordinatesError if the result is not valid.
+    """
+    if not isinstance(changes, dict) or not any(field in changes for field in COORDINATE_FIELDS):
+        raise InvalidCoordinatesError("Update must contain position, height, direction or rotation")
+    
+    if replace:
+        merged = {field: changes.get(field) for field in COORDINATE_FIELDS}
+    else:
+        merged = dict(current)
+        for field in COORDINATE_FIELDS:
+            if field not in changes:
+                continue
+            value = changes[field]
+            if isinstance(value, dict) and isinstance(current.get(field), dict):
+                value = dict(current[field], **value)
+            merged[field] = value
+    
+    if not validate_coordinates(merged):
+        raise InvalidCoordinatesError(
+            "Coordinates must have numeric position and direction, height >= 0 "
+            "and rotation within 0-360"
+        )
+    return merged
+
+def apply_coordinates(coords, merged):
+    """Write merged coordinates to the model in one update."""
+    position = merged['position']
+    direction = merged['direction']
+    coords.update_all(
+        position['x'], position['y'], position['z'],
+        merged['height'],
+        direction['x'], direction['y'], direction['z'],
+        merged['rotation']
+    )
+
+class CoordinateWriteService:
+    """Service for updating object coordinates and recording their history."""
+    
+    def __init__(self, coalesce_window=1.0, mutable_horizon=300.0, clock=datetime.utcnow):
+        self.coalesce_window = coalesce_window
+        self.mutable_horizon = mutable_horizon
+        self._clock = clock
+    
+    def update_coordinates(self, object_id, changes, replace=False):
+        """Update one object's coordinates.
+        
+        Returns the object response with a "history" entry describing the
+        recorded row, or None if the object does not exist. Raises
+        InvalidCoordinatesError for a malformed update, with the code of
+        the reject.
+        """
+        if not isinstance(changes, dict):
+            raise InvalidCoordinatesError("Update must be an object")
+        
+        applied, rejects = self._write([dict(changes, object_id=object_id)], replace)
+        if rejects:
+            if rejects[0]['code'] == 'OBJECT_NOT_FOUND':
+                return None
+            raise InvalidCoordinatesError(rejects[0]['error'], rejects[0]['code'])
+        
+        entry = applied[0]
+        response = DataService.build_response(entry.pop('object'), entry.pop('coordinates'))
+        response['history'] = entry
+        return response
+    
+    def update_many(self, updates, replace=False):
+        """Apply coordinate updates in order, all in one transaction.
+        
+        Each update is a coordinates body with an "object_id" and an
+        optional "timestamp", ISO 8601 or Unix seconds, defaulting to now.
+        An update timestamped before the object's latest history row is
+        recorded in history but leaves the current coordinates alone.
+        Invalid updates are rejected individually.
+        """
+        applied, rejects = self._write(updates, replace)
+        for entry in applied:
+            del entry['object'], entry['coordinates']
+        return {
+            'updated': len(applied),
+            'coalesced': sum(1 for entry in applied if entry['action'] == 'coalesced'),
+            'rejected': len(rejects),
+            'updates': applied,
+            'rejects': rejects
+        }
+    
+    def _write(self, updates, replace):
+        """Validate and apply updates, returning (applied entries, rejects)."""
+        try:
+            rejects = []
+            parsed = []
+            now = self._clock()
+            for index, update in enumerate(updates):
+                object_id = update.get('object_id') if isinstance(update, dict) else None
+                if not validate_object_id(object_id):
+                    rejects.append(reject(index, object_id, 'INVALID_OBJECT_ID',
+                                          'Object ID must be 1-100 characters'))
+                    continue
+                timestamp = now
+                if update.get('timestamp') is not None:
+                    timestamp = sample_timestamp(update['timestamp'])
+                    if timestamp is None:
+                        rejects.append(reject(index, object_id, 'INVALID_TIMESTAMP',
+                                              'Timestamp must be ISO 8601 or Unix seconds'))
+                        continue
+                parsed.append((index, object_id, update, timestamp))
+            
+            # Load the current state of every updated object at once
+            object_ids = list(dict.fromkeys(object_id for _, object_id, _, _ in parsed))
+            objects = {obj.id: obj for obj in ProductlineObject.find_by_ids(object_ids)}
+            coordinates = {c.object_id: c for c in Coordinates.find_by_object_ids(list(objects))}
+            latest = {
+                h.object_id: h
+                for h in ObjectHistory.find_latest_before_timestamp(list(objects), None)
+            }
+            
+            applied = []
+            earliest = None
+            for index, object_id, update, timestamp in parsed:
+                obj = objects.get(object_id)
+                if obj is None:
+                    rejects.append(reject(index, object_id, 'OBJECT_NOT_FOUND', 'Object not found'))
+                    continue
+                
+                coords = coordinates.get(object_id)
+                current = coords.to_dict() if coords else default_coordinates()
+                try:
+                    merged = merge_coordinates(current, update, replace=replace)
+                except InvalidCoordinatesError as e:
+                    rejects.append(reject(index, object_id, 'INVALID_COORDINATES', str(e)))
+                    continue
+                
+                entry, changed_from = self._apply(obj, merged, timestamp, coordinates, latest)
+                applied.append(entry)
+                if earliest is None or changed_from < earliest:
+                    earliest = changed_from
+            
+            if earliest is not None:
+                invalidate_history(earliest, self.mutable_horizon, now)
+            db.session.commit()
+            
+            rejects.sort(key=lambda entry: entry['index'])
+            coalesced = sum(1 for entry in applied if entry['action'] == 'coalesced')
+            logger.info(f"Updated coordinates of {len(applied)} objects, "
+                        f"{coalesced} coalesced, {len(rejects)} rejected")
+            return applied, rejects
+            
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error updating coordinates: {str(e)}")
+            raise
+    
+    def _apply(self, obj, merged, timestamp, coordinates, latest_rows):
+        """Write one update and its history row in the current transaction.
+        
+        `coordinates` and `latest_rows` map object IDs to their current
+        coordinates and latest history row, and are kept up to date for
+        later updates of the same batch. Returns the applied entry and the
+        earliest history moment changed.
+        """
+        coords = coordinates.get(obj.id)
+        latest = latest_rows.get(obj.id)
+        stale = latest is not None and latest.timestamp > timestamp
+        if stale:
+            # Record the late sample without moving the object back in time
+            source = Coordinates(
+                obj.id,
+                *(merged['position'][axis] for axis in 'xyz'),
+                height=merged['height'],
+                direction_x=merged['direction']['x'],
+                direction_y=merged['direction']['y'],
+                direction_z=merged['direction']['z'],
+                rotation=merged['rotation']
+            )
+        else:
+            if coords is None:
+                coords = Coordinates(obj.id)
+                db.session.add(coords)
+                coordinates[obj.id] = coords
+            apply_coordinates(coords, merged)
+            source = coords
+        
+        # Coalesce into the latest row if it falls in the same window
+        coalesce = (not stale and latest is not None and self.coalesce_window > 0
+                    and align_down(latest.timestamp, self.coalesce_window)
+                    == align_down(timestamp, self.coalesce_window))
+        if coalesce:
+            record = latest
+            changed_from = latest.timestamp
+        else:
+            record = ObjectHistory(object_id=obj.id, timestamp=timestamp)
+            db.session.add(record)
+            changed_from = timestamp
+            if not stale:
+                latest_rows[obj.id] = record
+        record.set_state(source, timestamp, status=obj.status, metadata=obj.object_metadata)
+        
+        return {
+            'object_id': obj.id,
+            'timestamp': timestamp.isoformat() + 'Z',
+            'action': 'coalesced' if coalesce else 'inserted',
+            'stale': stale,
+            'object': obj,
+            'coordinates': coords
+        }, changed_from
@@ -1,36 +1,59 @@
+import copy
+from flask import current_app, has_app_context
 from src.models.productline_object import ProductlineObject
 from src.models.coordinates import Coordinates
+from src.services.cache import get_object_cache
 from src.app_logging import get_logger
 
 logger = get_logger(__name__)
 
+READ_PATHS = ('orm', 'core')
+
+def get_read_path():
+    """Get the configured read path, 'orm' outside of an app context."""
+    read_path = current_app.config.get('READ_PATH', 'orm') if has_app_context() else 'orm'
+    if read_path not in READ_PATHS:
+        raise ValueError(f"Unknown read path: {read_path}")
+    return read_path
+
+def default_coordinates():
+    """Get default coordinates for objects without stored coordinates."""
+    return {
+        'position': {'x': 0.0, 'y': 0.0, 'z': 0.0},
+        'height': 0.0,
+        'direction': {'x': 1.0, 'y': 0.0, 'z': 0.0},
+        'rotation': 0.0
+    }
+
 class DataService:
-    """Service for retrieving object data."""
+    """Service for retrieving object data.
+    
+    On the 'orm' read path objects and coordinates are loaded as model
+    instances. On the 'core' read path they are selected as plain rows in
+    one joined query and responses are built straight from the rows.
+    """
+    
+    def __init__(self, read_path=None):
+        self.read_path = read_path or get_read_path()
     
     def get_object(self, object_id):
         """Get complete object data by ID."""
         try:
-            # Get object
-            obj = ProductlineObject.find_by_id(object_id)
-            if not obj:
+            # Serve from the snapshot cache when possible
+            cache = get_object_cache()
+            if cache is not None:
+                cached = cache.get(object_id)
+                if cached is not None:
+                    return copy.deepcopy(cached)
+            
+            # Get object and coordinates
+            response = self._load_object(object_id)
+            if response is None:
                 logger.warning(f"Object not found: {object_id}")
                 return None
             
-            # Get coordinates
-            coords = Coordinates.find_by_object_id(object_id)
-            
-            # Build response
-            response = obj.to_dict()
-            if coords:
-                response['coordinates'] = coords.to_dict()
-            else:
-                # Return default coordinates if none exist
-                response['coordinates'] = {
-                    'position': {'x': 0.0, 'y': 0.0, 'z': 0.0},
-                    'height': 0.0,
-                    'direction': {'x': 1.0, 'y': 0.0, 'z': 0.0},
-                    'rotation': 0.0
-                }
+            if cache is not None:
+                cache.set(object_id, copy.deepcopy(response))
             
             logger.info(f"Retrieved object data for {object_id}")
             return response
@@ -38,3 +61,98 @@ class DataService:
         except Exception as e:
             logger.error(f"Error retrieving object {object_id}: {str(e)}")
             raise
+    
+    def get_objects(self, object_ids):
+        """Get complete object data for several IDs, keyed by object ID.
+        
+        Objects and coordinates are loaded with one IN query each, so the
+        number of round trips does not grow with the number of IDs. IDs
+        that do not exist are absent from the result.
+        """
+        try:
+            unique_ids = list(dict.fromkeys(object_ids))
+            results = {}
+            
+            # Serve cached snapshots first
+            cache = get_object_cache()
+            if cache is not None:
+                for object_id in unique_ids:
+                    cached = cache.get(object_id)
+                    if cached is not None:
+                        results[object_id] = copy.deepcopy(cached)
+            missing_ids = [object_id for object_id in unique_ids if object_id not in results]
+            
+            # Get remaining objects and their coordinates with set-based queries
+            for object_id, response in self._load_objects(missing_ids).items():
+                if cache is not None:
+                    cache.set(object_id, copy.deepcopy(response))
+                results[object_id] = response
+            
+            logger.info(f"Retrieved object data for {len(results)} of {len(unique_ids)} objects")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error retrieving objects: {str(e)}")
+            raise
+    
+    def _load_object(self, object_id):
+        """Load the response of one object, or None if it does not exist."""
+        if self.read_path == 'core':
+            return self._load_objects([object_id]).get(object_id)
+        
+        obj = ProductlineObject.find_by_id(object_id)
+        if not obj:
+            return None
+        return self.build_response(obj, Coordinates.find_by_object_id(object_id))
+    
+    def _load_objects(self, object_ids):
+        """Load the responses of several objects, keyed by object ID."""
+        if not object_ids:
+            return {}
+        if self.read_path == 'core':
+            return {
+                row.id: self.build_row_response(row)
+                for row in ProductlineObject.find_rows_with_coordinates(object_ids)
+            }
+        
+        objects = {obj.id: obj for obj in ProductlineObject.find_by_ids(object_ids)}
+        coords = {
+            c.object_id: c for c in Coordinates.find_by_object_ids(list(objects))
+        }
+        return {
+            object_id: self.build_response(obj, coords.get(object_id))
+            for object_id, obj in objects.items()
+        }
+    
+    @staticmethod
+    def build_response(obj, coords):
+        """Build the object response from an object and its coordinates."""
+        response = obj.to_dict()
+        if coords:
+            response['coordinates'] = coords.to_dict()
+        else:
+            # Return default coordinates if none exist
+            response['coordinates'] = default_coordinates()
+        return response
+    
+    @staticmethod
+    def build_row_response(row):
+        """Build the object response from a row of find_rows_with_coordinates."""
+        if row.position_x is None:
+            coordinates = default_coordinates()
+        else:
+            coordinates = {
+                'position': {'x': row.position_x, 'y': row.position_y, 'z': row.position_z},
+                'height': row.height,
+                'direction': {'x': row.direction_x, 'y': row.direction_y, 'z': row.direction_z},
+                'rotation': row.rotation
+            }
+        return {
+            'object_id': row.id,
+            'name': row.name,
+            'status': row.status,
+            'metadata': row.object_metadata,
+            'created_at': row.created_at.isoformat() + 'Z' if row.created_at else None,
+            'updated_at': row.updated_at.isoformat() + 'Z' if row.updated_at else None,
+            'coordinates': coordinates
+        }
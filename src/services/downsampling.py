@@ -0,0 +1,82 @@
+"""
+Downsampling of object trajectories.
+Reduces long position series to a bounded number of points, either by
+keeping the last sample of fixed time buckets or by Ramer-Douglas-Peucker
+simplification of the path.
+"""
+
+import heapq
+import numpy as np
+
+class BucketReducer:
+    """Keeps the last row of each fixed-width time bucket.
+    
+    Rows are fed in timestamp order, so memory is bounded by the number of
+    buckets rather than the number of rows.
+    """
+    
+    def __init__(self, start, end, buckets):
+        self.start = start
+        self.buckets = max(int(buckets), 1)
+        self.width = max((end - start) / self.buckets, 1e-9)
+        self.scanned = 0
+        self._rows = {}
+    
+    def add(self, seconds, row):
+        """Feed a row whose timestamp is `seconds` on the same scale as start."""
+        bucket = min(int((seconds - self.start) // self.width), self.buckets - 1)
+        self._rows[max(bucket, 0)] = row
+        self.scanned += 1
+    
+    def rows(self):
+        """Get the kept rows in bucket order."""
+        return [self._rows[bucket] for bucket in sorted(self._rows)]
+
+def segment_distances(points, first, last):
+    """Distances of points[first+1:last] to the segment from points[first] to points[last]."""
+    inner = points[first + 1:last]
+    origin = points[first]
+    direction = points[last] - origin
+    length_sq = float(direction @ direction)
+    offsets = inner - origin
+    if length_sq == 0.0:
+        return np.sqrt(np.einsum('ij,ij->i', offsets, offsets))
+    
+    t = np.clip(offsets @ direction / length_sq, 0.0, 1.0)
+    nearest = offsets - np.outer(t, direction)
+    return np.sqrt(np.einsum('ij,ij->i', nearest, nearest))
+
+def rdp_select(points, max_points=None, tolerance=0.0):
+    """Select the indices of a Ramer-Douglas-Peucker simplified path.
+    
+    The segment whose farthest inner point deviates most is split first,
+    so stopping at `max_points` keeps the most significant points. Splitting
+    also stops once no point deviates more than `tolerance`. The first and
+    last points are always kept. Returns sorted indices.
+    """
+    points = np.asarray(points, dtype=float)
+    count = len(points)
+    if count <= 2 or (max_points is not None and max_points >= count and tolerance <= 0):
+        return list(range(count))
+    
+    limit = count if max_points is None else max(int(max_points), 2)
+    selected = {0, count - 1}
+    heap = []
+    
+    def push(first, last):
+        if last - first < 2:
+            return
+        distances = segment_distances(points, first, last)
+        farthest = int(np.argmax(distances))
+        distance = float(distances[farthest])
+        if distance > tolerance:
+            heapq.heappush(heap, (-distance, first, last, first + 1 + farthest))
+    
+    push(0, count - 1)
+    while heap and len(selected) < limit:
+        _, first, last, split = heapq.heappop(heap)
+        selected.add(split)
+        push(first, split)
+        push(split, last)
+    
+    return sorted(selected)
@@ -0,0 +1,615 @@
+"""
+Cold history archive in columnar day files.
+Raw history past its retention can be exported to compressed columnar
+files on local disk, one per day, instead of being dropped. Each file holds
+the day's rows grouped by object and ordered by timestamp and ID, split
+into row groups whose columns are compressed separately. A footer maps
+every object to its rows and keeps per-group time ranges, so readers
+memory-map the file and decompress only the column chunks a lookup needs.
+"""
+
+import heapq
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+import zlib
+from bisect import bisect_right
+from collections import OrderedDict, namedtuple
+from itertools import groupby
+from datetime import datetime, timedelta
+import msgpack
+import numpy as np
+from flask import current_app, has_app_context
+from src.models.object_history import ObjectHistory
+from src.services.interpolation import STATE_FIELDS
+from src.services.samples import align_down
+from src.app_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Fields follow the attribute names of ObjectHistory so archived records
+# can stand in for history records
+ArchiveRecord = namedtuple(
+    'ArchiveRecord',
+    ('id', 'object_id', 'timestamp') + STATE_FIELDS + ('status', 'object_metadata')
+)
+
+ARCHIVE_FORMAT = 1
+MAGIC = b'PLHA'
+DAY = timedelta(days=1)
+
+STATUSES = ('active', 'inactive', 'processing', 'error')
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+# Fixed-width columns and their dtypes; metadata is stored as a msgpack list
+COLUMN_TYPES = dict(
+    [('id', '<i8'), ('timestamp', '<i8')] + [(field, '<f8') for field in STATE_FIELDS] + [('status', 'i1')]
+)
+
+_FILE_NAME = re.compile(r'^history-(\d{8})\.col$')
+_TRAILER = struct.Struct('<Q')
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+def to_micros(timestamp):
+    """Convert a naive UTC timestamp to integer microseconds since the epoch."""
+    return (timestamp - _EPOCH) // _MICROSECOND
+
+def from_micros(micros):
+    """Convert integer microseconds since the epoch to a naive UTC timestamp."""
+    return _EPOCH + timedelta(microseconds=int(micros))
+
+def day_path(directory, day):
+    """Get the path of the archive file of a day."""
+    return os.path.join(directory, f"history-{day:%Y%m%d}.col")
+
+class ArchiveWriter:
+    """Writes one archive file from rows grouped by object.
+    
+    Rows are (id, object_id, timestamp, 8 state fields, status, metadata).
+    The file is written under a unique temporary name in the same
+    directory and moved into place by close(), so readers never see a
+    partial file.
+    """
+    
+    def __init__(self, path, day, row_group_size=16384, compression_level=6):
+        self.path = path
+        self.day = day
+        self.row_group_size = row_group_size
+        self.compression_level = compression_level
+        self.rows = 0
+        fd, self._tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.', suffix='.tmp'
+        )
+        self._file = os.fdopen(fd, 'wb')
+        self._file.write(MAGIC)
+        self._offset = len(MAGIC)
+        self._pending = []
+        self._groups = []
+        self._objects = {}
+        self._last = None
+    
+    def add(self, row):
+        """Add a row; an object's rows must arrive together, ordered by timestamp and ID."""
+        key = (row[2], row[0])
+        entry = self._objects.get(row[1])
+        if entry is not None and (entry[0] + entry[1] != self.rows or key <= self._last):
+            raise ValueError(f"Archive rows of {row[1]} must be contiguous and ordered: {key}")
+        self._last = key
+        
+        micros = to_micros(row[2])
+        if entry is None:
+            entry = self._objects[row[1]] = [self.rows, 0, micros, micros]
+        entry[1] += 1
+        entry[3] = micros
+        
+        self._pending.append(row)
+        self.rows += 1
+        if len(self._pending) >= self.row_group_size:
+            self._write_group()
+    
+    def _write_group(self):
+        """Compress and write the pending rows as one row group."""
+        rows, self._pending = self._pending, []
+        if not rows:
+            return
+        
+        timestamps = np.array([to_micros(row[2]) for row in rows], dtype='<i8')
+        columns = {
+            'id': np.array([row[0] for row in rows], dtype='<i8'),
+            'timestamp': timestamps
+        }
+        for index, field in enumerate(STATE_FIELDS):
+            columns[field] = np.array(
+                [np.nan if row[3 + index] is None else row[3 + index] for row in rows], dtype='<f8'
+            )
+        columns['status'] = np.array([STATUS_CODES.get(row[11], -1) for row in rows], dtype='i1')
+        
+        chunks = {}
+        for name, values in columns.items():
+            chunks[name] = self._write_chunk(values.tobytes())
+        chunks['metadata'] = self._write_chunk(
+            msgpack.packb([row[12] for row in rows], use_bin_type=True)
+        )
+        
+        self._groups.append({
+            'first': self.rows - len(rows),
+            'rows': len(rows),
+            'min_ts': int(timestamps.min()),
+            'max_ts': int(timestamps.max()),
+            'columns': chunks
+        })
+    
+    def _write_chunk(self, data):
+        """Write one compressed column chunk, returning its (offset, length)."""
+        data = zlib.compress(data, self.compression_level)
+        self._file.write(data)
+        location = (self._offset, len(data))
+        self._offset += len(data)
+        return location
+    
+    def close(self):
+        """Write the footer and move the file into place; returns the number of rows."""
+        self._write_group()
+        footer = zlib.compress(msgpack.packb({
+            'format': ARCHIVE_FORMAT,
+            'day': self.day.strftime('%Y-%m-%d'),
+            'rows': self.rows,
+            'min_ts': min((entry[2] for entry in self._objects.values()), default=None),
+            'max_ts': max((entry[3] for entry in self._objects.values()), default=None),
+            'objects': self._objects,
+            'groups': self._groups
+        }, use_bin_type=True), self.compression_level)
+        self._file.write(footer)
+        self._file.write(_TRAILER.pack(len(footer)))
+        self._file.write(MAGIC)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        return self.rows
+    
+    def abort(self):
+        """Discard the file being written."""
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+class ChunkCache:
+    """Thread-safe LRU cache of decoded column chunks."""
+    
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def __len__(self):
+        return len(self._entries)
+
+class ArchiveFile:
+    """Memory-mapped reader of one archive file.
+    
+    Lookups are pushed down to the footer: an object's rows are located
+    through its row range, and row groups outside the requested time range
+    are skipped on their zone maps before any chunk is decompressed.
+    """
+    
+    def __init__(self, path, cache=None):
+        self.path = path
+        stat = os.stat(path)
+        self.key = (path, stat.st_mtime_ns, stat.st_size)
+        self._cache = cache
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        trailer = len(self._mmap) - _TRAILER.size - len(MAGIC)
+        if trailer < len(MAGIC) or self._mmap[:len(MAGIC)] != MAGIC or self._mmap[-len(MAGIC):] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a history archive file: {path}")
+        length, = _TRAILER.unpack(self._mmap[trailer:trailer + _TRAILER.size])
+        footer = msgpack.unpackb(zlib.decompress(self._mmap[trailer - length:trailer]), raw=False)
+        if footer.get('format') != ARCHIVE_FORMAT:
+            self.close()
+            raise ValueError(f"Unsupported history archive format: {footer.get('format')}")
+        
+        self.day = datetime.strptime(footer['day'], '%Y-%m-%d')
+        self.rows = footer['rows']
+        self.min_ts = footer['min_ts']
+        self.max_ts = footer['max_ts']
+        self.objects = footer['objects']
+        self.groups = footer['groups']
+        self._group_starts = [group['first'] for group in self.groups]
+    
+    def close(self):
+        self._mmap.close()
+    
+    def column(self, index, name):
+        """Get a decoded column chunk of a row group."""
+        key = (self.key, index, name)
+        values = self._cache.get(key) if self._cache is not None else None
+        if values is None:
+            offset, length = self.groups[index]['columns'][name]
+            data = zlib.decompress(self._mmap[offset:offset + length])
+            if name == 'metadata':
+                values = msgpack.unpackb(data, raw=False)
+            else:
+                values = np.frombuffer(data, dtype=COLUMN_TYPES[name])
+            if self._cache is not None:
+                self._cache.set(key, values)
+        return values
+    
+    def _spans(self, object_id):
+        """List the (group, lo, hi) row spans of an object, one per row group."""
+        entry = self.objects.get(object_id)
+        if entry is None:
+            return []
+        first, count = entry[0], entry[1]
+        last = first + count - 1
+        spans = []
+        for index in range(bisect_right(self._group_starts, first) - 1,
+                           bisect_right(self._group_starts, last)):
+            start = self.groups[index]['first']
+            spans.append((index, max(first, start) - start,
+                          min(last + 1, start + self.groups[index]['rows']) - start))
+        return spans
+    
+    def record(self, index, row, object_id):
+        """Build an ArchiveRecord from one row of a row group."""
+        values = [self.column(index, field)[row] for field in STATE_FIELDS]
+        status = int(self.column(index, 'status')[row])
+        return ArchiveRecord(
+            int(self.column(index, 'id')[row]),
+            object_id,
+            from_micros(self.column(index, 'timestamp')[row]),
+            *[None if value != value else float(value) for value in values],
+            STATUSES[status] if status >= 0 else None,
+            self.column(index, 'metadata')[row]
+        )
+    
+    def latest_at_or_before(self, object_id, micros):
+        """Find an object's last record at or before a moment, or None."""
+        entry = self.objects.get(object_id)
+        if entry is None or entry[2] > micros:
+            return None
+        for index, lo, hi in reversed(self._spans(object_id)):
+            if self.groups[index]['min_ts'] > micros:
+                continue
+            position = int(np.searchsorted(self.column(index, 'timestamp')[lo:hi], micros, 'right'))
+            if position:
+                return self.record(index, lo + position - 1, object_id)
+        return None
+    
+    def earliest_after(self, object_id, micros):
+        """Find an object's first record after a moment, or None."""
+        entry = self.objects.get(object_id)
+        if entry is None or entry[3] <= micros:
+            return None
+        for index, lo, hi in self._spans(object_id):
+            if self.groups[index]['max_ts'] <= micros:
+                continue
+            timestamps = self.column(index, 'timestamp')[lo:hi]
+            position = int(np.searchsorted(timestamps, micros, 'right'))
+            if position < len(timestamps):
+                return self.record(index, lo + position, object_id)
+        return None
+    
+    def iter_trajectory(self, object_id, start=None, end=None):
+        """Iterate over an object's positioned rows with timestamps in [start, end].
+        
+        Bounds are in microseconds. Rows have the layout of
+        ObjectHistory trajectory rows.
+        """
+        entry = self.objects.get(object_id)
+        if entry is None or (start is not None and entry[3] < start) or (end is not None and entry[2] > end):
+            return
+        for index, lo, hi in self._spans(object_id):
+            group = self.groups[index]
+            if (start is not None and group['max_ts'] < start) or (end is not None and group['min_ts'] > end):
+                continue
+            timestamps = self.column(index, 'timestamp')[lo:hi]
+            first = 0 if start is None else int(np.searchsorted(timestamps, start, 'left'))
+            last = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, 'right'))
+            if first >= last:
+                continue
+            
+            lo, hi = lo + first, lo + last
+            states = np.column_stack([self.column(index, field)[lo:hi] for field in STATE_FIELDS])
+            positioned = ~np.isnan(states[:, 0])
+            ids = self.column(index, 'id')[lo:hi][positioned].tolist()
+            stamps = self.column(index, 'timestamp')[lo:hi][positioned].tolist()
+            codes = self.column(index, 'status')[lo:hi][positioned].tolist()
+            for row_id, micros, values, status in zip(ids, stamps, states[positioned].tolist(), codes):
+                yield (row_id, from_micros(micros),
+                       *[None if value != value else value for value in values],
+                       STATUSES[status] if status >= 0 else None)
+    
+    def object_ids(self):
+        """List the archived objects in file order."""
+        return sorted(self.objects, key=lambda object_id: self.objects[object_id][0])
+    
+    def iter_object_rows(self, object_id):
+        """Iterate over all rows of an object, in the layout ArchiveWriter takes."""
+        for index, lo, hi in self._spans(object_id):
+            columns = [self.column(index, name)[lo:hi].tolist()
+                       for name in ('id', 'timestamp') + STATE_FIELDS + ('status',)]
+            metadata = self.column(index, 'metadata')[lo:hi]
+            for values, meta in zip(zip(*columns), metadata):
+                yield (values[0], object_id, from_micros(values[1]),
+                       *[None if value != value else value for value in values[2:-1]],
+                       STATUSES[values[-1]] if values[-1] >= 0 else None, meta)
+
+class HistoryArchive:
+    """Exports expired raw history to day files and answers lookups from them.
+    
+    The archive covers every moment up to the end of its newest day file,
+    since raw history is exported oldest first and removed once exported.
+    The directory listing is refreshed when the directory changes, so
+    files exported by another process are picked up.
+    """
+    
+    def __init__(self, app=None, directory='data/history_archive', row_group_size=16384,
+                 compression_level=6, cache_size=256, retention=0.0, clock=datetime.utcnow):
+        self.app = app
+        self.directory = directory
+        self.row_group_size = row_group_size
+        self.compression_level = compression_level
+        self.retention = retention
+        self._clock = clock
+        self._cache = ChunkCache(cache_size)
+        self._lock = threading.Lock()
+        self._listing = (None, [])
+        self._files = {}
+        self.days_exported = 0
+        self.rows_exported = 0
+        self.files_expired = 0
+    
+    def days(self):
+        """List the archived (day, path) files, oldest first."""
+        try:
+            version = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        with self._lock:
+            if self._listing[0] != version:
+                days = []
+                for name in os.listdir(self.directory):
+                    match = _FILE_NAME.match(name)
+                    if match:
+                        days.append((datetime.strptime(match.group(1), '%Y%m%d'),
+                                     os.path.join(self.directory, name)))
+                self._listing = (version, sorted(days))
+            return self._listing[1]
+    
+    def _open(self, path):
+        """Get the reader of an archive file, reopening it if it was replaced."""
+        stat = os.stat(path)
+        with self._lock:
+            archive_file = self._files.get(path)
+            if archive_file is not None and archive_file.key == (path, stat.st_mtime_ns, stat.st_size):
+                return archive_file
+            if archive_file is not None:
+                archive_file.close()
+            archive_file = self._files[path] = ArchiveFile(path, self._cache)
+            return archive_file
+    
+    def _readers(self, start=None, end=None, reverse=False):
+        """Iterate over the readers of the days overlapping [start, end]."""
+        days = self.days()
+        for day, path in (reversed(days) if reverse else days):
+            if (start is not None and day + DAY <= start) or (end is not None and day > end):
+                continue
+            try:
+                yield self._open(path)
+            except FileNotFoundError:
+                continue
+    
+    def archived_until(self):
+        """Get the end of the newest archived day, or None if the archive is empty."""
+        days = self.days()
+        return days[-1][0] + DAY if days else None
+    
+    def covers(self, timestamp):
+        """Check whether a moment is answered from the archive."""
+        until = self.archived_until()
+        return until is not None and timestamp < until
+    
+    def find_latest_before_timestamp(self, object_ids, timestamp):
+        """Find each object's last archived record at or before a timestamp.
+        
+        Day files are searched newest first until every object is found.
+        """
+        micros = to_micros(timestamp)
+        remaining = list(dict.fromkeys(object_ids))
+        records = []
+        for archive_file in self._readers(end=timestamp, reverse=True):
+            if not remaining:
+                break
+            missing = []
+            for object_id in remaining:
+                record = archive_file.latest_at_or_before(object_id, micros)
+                if record is None:
+                    missing.append(object_id)
+                else:
+                    records.append(record)
+            remaining = missing
+        return records
+    
+    def find_bracketing(self, object_ids, timestamp):
+        """Find the archived records bracketing a timestamp for each object.
+        
+        Returns a dict mapping object ID to (before, after) like
+        ObjectHistory.find_bracketing; `after` is None past the archive.
+        """
+        brackets = {record.object_id: [record, None]
+                    for record in self.find_latest_before_timestamp(object_ids, timestamp)}
+        micros = to_micros(timestamp)
+        remaining = list(dict.fromkeys(object_ids))
+        for archive_file in self._readers(start=timestamp):
+            if not remaining:
+                break
+            missing = []
+            for object_id in remaining:
+                record = archive_file.earliest_after(object_id, micros)
+                if record is None:
+                    missing.append(object_id)
+                else:
+                    brackets.setdefault(object_id, [None, None])[1] = record
+            remaining = missing
+        return {object_id: tuple(pair) for object_id, pair in brackets.items()}
+    
+    def iter_trajectory(self, object_id, start=None, end=None, after=None):
+        """Iterate over an object's archived trajectory rows ordered by (timestamp, id).
+        
+        Rows have the layout of ObjectHistory.find_trajectory_page and
+        start strictly after the `after` (timestamp, id) position.
+        """
+        if after is not None:
+            start = after[0] if start is None else max(start, after[0])
+        start_micros = None if start is None else to_micros(start)
+        end_micros = None if end is None else to_micros(end)
+        for archive_file in self._readers(start, end):
+            for row in archive_file.iter_trajectory(object_id, start_micros, end_micros):
+                if after is None or (row[1], row[0]) > after:
+                    yield row
+    
+    def find_time_bounds(self, object_id):
+        """Find the (first, last) archived timestamps of an object."""
+        first = last = None
+        for archive_file in self._readers():
+            entry = archive_file.objects.get(object_id)
+            if entry is not None:
+                first = first or from_micros(entry[2])
+                last = from_micros(entry[3])
+        return first, last
+    
+    def export_day(self, day):
+        """Export the raw history of one day to its file, returning the rows written.
+        
+        Rows of an existing file for the day are merged in, so exporting a
+        day again after late writes keeps both. Nothing is written for a
+        day without history.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = day_path(self.directory, day)
+        existing = self._open(path) if os.path.exists(path) else None
+        
+        writer = ArchiveWriter(path, day, self.row_group_size, self.compression_level)
+        try:
+            merged = set()
+            rows = ObjectHistory.iter_archive_rows(day, day + DAY)
+            for object_id, object_rows in groupby(rows, key=lambda row: row[1]):
+                if existing is not None and object_id in existing.objects:
+                    merged.add(object_id)
+                    object_rows = heapq.merge(object_rows, existing.iter_object_rows(object_id),
+                                              key=lambda row: (row[2], row[0]))
+                previous = None
+                for row in object_rows:
+                    if row[0] != previous:
+                        writer.add(row)
+                        previous = row[0]
+            if existing is not None:
+                for object_id in existing.object_ids():
+                    if object_id not in merged:
+                        for row in existing.iter_object_rows(object_id):
+                            writer.add(row)
+            if not writer.rows:
+                writer.abort()
+                return 0
+            rows = writer.close()
+        except Exception as e:
+            writer.abort()
+            logger.error(f"Error exporting history of {day:%Y-%m-%d} to the archive: {str(e)}")
+            raise
+        
+        self.days_exported += 1
+        self.rows_exported += rows
+        logger.info(f"Exported {rows} history records of {day:%Y-%m-%d} to {path}")
+        return rows
+    
+    def export(self, start, end):
+        """Export every day with raw history in [start, end); returns the rows written.
+        
+        Both bounds must be day boundaries. Days without history are skipped.
+        """
+        exported = 0
+        day = start
+        while day < end:
+            first = ObjectHistory.find_first_timestamp(day)
+            if first is None or first >= end:
+                break
+            day = align_down(first, DAY.total_seconds())
+            exported += self.export_day(day)
+            day += DAY
+        return exported
+    
+    def apply_retention(self, now=None):
+        """Delete day files past the archive retention; returns the number deleted."""
+        if not self.retention:
+            return 0
+        now = now or self._clock()
+        cutoff = now - timedelta(seconds=self.retention)
+        expired = 0
+        for day, path in self.days():
+            if day + DAY > cutoff:
+                break
+            with self._lock:
+                archive_file = self._files.pop(path, None)
+                if archive_file is not None:
+                    archive_file.close()
+            os.remove(path)
+            expired += 1
+        self.files_expired += expired
+        if expired:
+            logger.info(f"Expired {expired} history archive files before {cutoff}")
+        return expired
+    
+    def stats(self):
+        """Get archive counters."""
+        days = self.days()
+        return {
+            'directory': self.directory,
+            'days': len(days),
+            'first_day': days[0][0].strftime('%Y-%m-%d') if days else None,
+            'last_day': days[-1][0].strftime('%Y-%m-%d') if days else None,
+            'bytes': sum(os.path.getsize(path) for _, path in days if os.path.exists(path)),
+            'days_exported': self.days_exported,
+            'rows_exported': self.rows_exported,
+            'files_expired': self.files_expired,
+            'cached_chunks': len(self._cache)
+        }
+
+def init_history_archive(app):
+    """Initialize the history archive for Flask app."""
+    app.history_archive = HistoryArchive(
+        app,
+        directory=app.config.get('HISTORY_ARCHIVE_PATH', 'data/history_archive'),
+        row_group_size=app.config.get('HISTORY_ARCHIVE_ROW_GROUP_SIZE', 16384),
+        cache_size=app.config.get('HISTORY_ARCHIVE_CACHE_CHUNKS', 256),
+        retention=app.config.get('HISTORY_ARCHIVE_RETENTION', 0.0)
+    )
+    return app.history_archive
+
+def get_history_archive():
+    """Get the history archive of the current app."""
+    if not has_app_context():
+        return None
+    return getattr(current_app, 'history_archive', None)
@@ -1,57 +1,213 @@
 from src.models.productline_object import ProductlineObject
 from src.models.object_history import ObjectHistory
+from src.models.coordinates import Coordinates
+from src.models.scene_checkpoint import SceneCheckpoint
+from src.models.history_rollup import HistoryRollup
+from src.services.data_service import DataService, get_read_path
+from src.services.cache import get_history_cache
+from src.services.history_archive import get_history_archive
+from src.services.history_tiers import get_history_tiers
+from src.services.interpolation import interpolate_states, state_row
+from src.services.samples import parse_timestamp, to_utc_naive
 from src.app_logging import get_logger
-from datetime import datetime
+from datetime import datetime, timedelta
+import copy
+import math
+import numpy as np
 
 logger = get_logger(__name__)
 
+def coordinates_from_state(state):
+    """Build response coordinates from an interpolated STATE_FIELDS row."""
+    values = [None if math.isnan(value) else value for value in state.tolist()]
+    return {
+        'position': {'x': values[0], 'y': values[1], 'z': values[2]},
+        'height': values[3],
+        'direction': {'x': values[4], 'y': values[5], 'z': values[6]},
+        'rotation': values[7]
+    }
+
+def invalidate_history(earliest, mutable_horizon, now=None):
+    """Drop derived state that history records from `earliest` on may have changed.
+    
+    Scene checkpoints, rollup tiers and cached as-of snapshots only cover
+    moments older than the mutable horizon, so newer records need nothing
+    dropped. Otherwise the checkpoints and rollup buckets at or after
+    `earliest` are deleted, to be rebuilt, and the history cache is
+    cleared. The caller commits.
+    Returns whether anything was dropped.
+    """
+    now = now or datetime.utcnow()
+    if earliest > now - timedelta(seconds=mutable_horizon):
+        return False
+    
+    deleted = SceneCheckpoint.delete_taken_at_or_after(earliest)
+    if deleted:
+        logger.info(f"Deleted {deleted} scene checkpoints made stale by history at {earliest}")
+    
+    tiers = get_history_tiers()
+    if tiers is not None:
+        tiers.invalidate(earliest)
+    
+    cache = get_history_cache()
+    if cache is not None:
+        cache.clear()
+        logger.info(f"Cleared history cache for late history at {earliest}")
+    return True
+
 class HistoryService:
-    """Service for retrieving historical object data."""
+    """Service for retrieving historical object data.
+    
+    Moments the cold history archive covers are read from its day files.
+    Other moments older than the raw history retention and the earliest
+    retained raw history are read from the finest rollup tier still
+    retained for them, and from raw history for objects the tier has no
+    row for. On the 'core' read path
+    objects and raw history are selected as plain rows rather than model
+    instances.
+    """
+    
+    def __init__(self, tiers=None, archive=None, read_path=None):
+        self.tiers = tiers or get_history_tiers()
+        self.archive = archive or get_history_archive()
+        self.read_path = read_path or get_read_path()
+    
+    def _tier(self, timestamp):
+        """Pick the tier to read a moment from, None for raw history."""
+        if self.tiers is None:
+            return None
+        return self.tiers.tier_for(to_utc_naive(timestamp))
+    
+    def _archived(self, timestamp):
+        """Check whether a moment is read from the cold history archive."""
+        return self.archive is not None and self.archive.covers(to_utc_naive(timestamp))
+    
+    def _find_archived(self, object_ids, records, timestamp):
+        """Find archived records for the objects without one among `records`.
+        
+        An object whose last record was archived has none left in the
+        database, however recent the moment.
+        """
+        if self.archive is None:
+            return []
+        found = {record.object_id for record in records}
+        missing = [object_id for object_id in object_ids if object_id not in found]
+        if not missing:
+            return []
+        return self.archive.find_latest_before_timestamp(missing, to_utc_naive(timestamp))
     
-    def get_object_at_timestamp(self, object_id, timestamp):
-        """Get object data at specific timestamp."""
+    def _find_latest(self, object_ids, timestamp):
+        """Find the latest history record per object at or before a timestamp."""
+        if self._archived(timestamp):
+            return self.archive.find_latest_before_timestamp(object_ids, to_utc_naive(timestamp))
+        
+        tier = self._tier(timestamp)
+        records = []
+        if tier is not None:
+            records = list(HistoryRollup.find_latest_before_timestamp(tier, object_ids, timestamp))
+        
+        # Objects the tier has no row for are read from raw history
+        found = {record.object_id for record in records}
+        pending = [object_id for object_id in object_ids if object_id not in found]
+        if pending and self.read_path == 'core':
+            records += ObjectHistory.find_latest_rows_before_timestamp(pending, timestamp)
+        elif pending:
+            records += ObjectHistory.find_latest_before_timestamp(pending, timestamp)
+        return records + self._find_archived(object_ids, records, timestamp)
+    
+    def _find_bracketing(self, object_ids, moment):
+        """Find the history records bracketing a moment for each object.
+        
+        Records missing on one side of the archive boundary are looked up
+        on the other: later records of archived moments in the database,
+        earlier records of database moments in the archive.
+        """
+        if self._archived(moment):
+            brackets = self.archive.find_bracketing(object_ids, moment)
+            pending = [object_id for object_id, (_, after) in brackets.items() if after is None]
+            if pending:
+                for object_id, (_, after) in self._find_raw_bracketing(pending, moment).items():
+                    if after is not None:
+                        brackets[object_id] = (brackets[object_id][0], after)
+            return brackets
+        
+        tier = self._tier(moment)
+        brackets = {}
+        if tier is not None:
+            brackets = HistoryRollup.find_bracketing(tier, object_ids, moment)
+        
+        # Objects the tier has no earlier row for are read from raw history
+        pending = [object_id for object_id in object_ids
+                   if brackets.get(object_id, (None, None))[0] is None]
+        if pending:
+            brackets.update(self._find_raw_bracketing(pending, moment))
+        
+        befores = [pair[0] for pair in brackets.values() if pair[0] is not None]
+        for record in self._find_archived(object_ids, befores, moment):
+            brackets[record.object_id] = (record, brackets.get(record.object_id, (None, None))[1])
+        return brackets
+    
+    def _find_raw_bracketing(self, object_ids, moment):
+        """Find the raw history records bracketing a moment, as plain rows on the 'core' read path."""
+        if self.read_path == 'core':
+            return ObjectHistory.find_bracketing_rows(object_ids, moment)
+        return ObjectHistory.find_bracketing(object_ids, moment)
+    
+    def get_object_at_timestamp(self, object_id, timestamp, interpolate=None):
+        """Get object data at specific timestamp.
+        
+        With `interpolate` set to 'linear' or 'slerp', the state is
+        interpolated between the bracketing history records.
+        """
         try:
             # Parse timestamp
-            if isinstance(timestamp, str):
-                timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            timestamp = parse_timestamp(timestamp)
+            
+            if interpolate:
+                return self.get_objects_at_timestamp(
+                    [object_id], timestamp, interpolate=interpolate
+                ).get(object_id)
+            
+            # Serve settled history from the snapshot cache
+            cache = get_history_cache()
+            if cache is not None and cache.is_cacheable(timestamp):
+                cached = cache.get(object_id, timestamp)
+                if cached is not None:
+                    return copy.deepcopy(cached)
+            else:
+                cache = None
             
             # Get object
-            obj = ProductlineObject.find_by_id(object_id)
+            if self.read_path == 'core':
+                obj = self._find_objects([object_id]).get(object_id)
+            else:
+                obj = ProductlineObject.find_by_id(object_id)
             if not obj:
                 logger.warning(f"Object not found: {object_id}")
                 return None
             
-            # Get historical data
-            history = ObjectHistory.find_by_object_before_timestamp(object_id, timestamp)
+            # Get historical data from the archive or tier covering the timestamp
+            if self._archived(timestamp) or self._tier(timestamp) is not None:
+                history = next(iter(self._find_latest([object_id], timestamp)), None)
+            else:
+                if self.read_path == 'core':
+                    history = ObjectHistory.find_row_before_timestamp(object_id, timestamp)
+                else:
+                    history = ObjectHistory.find_by_object_before_timestamp(object_id, timestamp)
+                if history is None:
+                    history = next(iter(self._find_archived([object_id], [], timestamp)), None)
             
             if history:
                 # Build response from historical data
-                response = {
-                    'object_id': obj.id,
-                    'name': obj.name,
-                    'status': history.status or obj.status,
-                    'metadata': history.metadata or obj.metadata,
-                    'created_at': obj.created_at.isoformat() + 'Z',
-                    'updated_at': history.timestamp.isoformat() + 'Z',
-                    'coordinates': {
-                        'position': {
-                            'x': history.position_x,
-                            'y': history.position_y,
-                            'z': history.position_z
-                        },
-                        'height': history.height,
-                        'direction': {
-                            'x': history.direction_x,
-                            'y': history.direction_y,
-                            'z': history.direction_z
-                        },
-                        'rotation': history.rotation
-                    }
-                }
+                response = self.build_response(obj, history)
+                if cache is not None:
+                    cache.set(object_id, timestamp, copy.deepcopy(response), history.timestamp)
+            elif self.read_path == 'core':
+                # No historical data, return current data
+                response = self._current_fallback({object_id: obj}, [object_id], timestamp).get(object_id)
             else:
                 # No historical data, return current data
-                from src.services.data_service import DataService
-                data_service = DataService()
+                data_service = DataService(self.read_path)
                 response = data_service.get_object(object_id)
                 if response:
                     response['timestamp'] = timestamp.isoformat() + 'Z'
@@ -62,3 +218,160 @@ class HistoryService:
         except Exception as e:
             logger.error(f"Error retrieving historical data for {object_id}: {str(e)}")
             raise
+    
+    def get_objects_at_timestamp(self, object_ids, timestamp, interpolate=None):
+        """Get data for several objects at specific timestamp, keyed by object ID.
+        
+        Objects without history at or before the timestamp fall back to
+        their current data, like get_object_at_timestamp. IDs that do not
+        exist are absent from the result. With `interpolate`, states are
+        interpolated between bracketing records for the whole batch at once.
+        """
+        try:
+            # Parse timestamp
+            timestamp = parse_timestamp(timestamp)
+            unique_ids = list(dict.fromkeys(object_ids))
+            
+            if interpolate:
+                return self._get_interpolated(unique_ids, timestamp, interpolate)
+            
+            results = {}
+            
+            # Serve settled history from the snapshot cache
+            cache = get_history_cache()
+            if cache is not None and cache.is_cacheable(timestamp):
+                for object_id in unique_ids:
+                    cached = cache.get(object_id, timestamp)
+                    if cached is not None:
+                        results[object_id] = copy.deepcopy(cached)
+            else:
+                cache = None
+            missing_ids = [object_id for object_id in unique_ids if object_id not in results]
+            
+            # Get remaining objects in one set-based query
+            objects = self._find_objects(missing_ids)
+            
+            # Get the latest history record per object in one query
+            histories = {h.object_id: h for h in self._find_latest(list(objects), timestamp)}
+            
+            missing = []
+            for object_id, obj in objects.items():
+                history = histories.get(object_id)
+                if history:
+                    response = self.build_response(obj, history)
+                    if cache is not None:
+                        cache.set(object_id, timestamp, copy.deepcopy(response), history.timestamp)
+                    results[object_id] = response
+                else:
+                    missing.append(object_id)
+            
+            # No historical data, return current data (never cached)
+            results.update(self._current_fallback(objects, missing, timestamp))
+            
+            logger.info(f"Retrieved historical data for {len(results)} objects at {timestamp}")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error retrieving historical data at {timestamp}: {str(e)}")
+            raise
+    
+    def _get_interpolated(self, object_ids, timestamp, mode):
+        """Interpolate objects between the history records bracketing a timestamp.
+        
+        Interpolated states are not cached, since cache keys are quantized
+        to whole seconds while replays ask for frame-accurate timestamps.
+        """
+        moment = to_utc_naive(timestamp)
+        objects = self._find_objects(object_ids)
+        brackets = self._find_bracketing(list(objects), moment)
+        
+        ids, befores, afters, before_rows, after_rows, fractions = [], [], [], [], [], []
+        for object_id, (before, after) in brackets.items():
+            if before is None:
+                continue
+            
+            # Hold the earlier state when there is nothing to move towards
+            if after is None or before.position_x is None or after.position_x is None:
+                fraction = 0.0
+            else:
+                span = (after.timestamp - before.timestamp).total_seconds()
+                fraction = (moment - before.timestamp).total_seconds() / span
+            
+            ids.append(object_id)
+            befores.append(before)
+            afters.append(after if fraction else None)
+            before_rows.append(state_row(before))
+            after_rows.append(state_row(after) if fraction else before_rows[-1])
+            fractions.append(fraction)
+        
+        results = {}
+        if ids:
+            states = interpolate_states(
+                np.array(before_rows), np.array(after_rows), np.array(fractions), mode
+            )
+            for object_id, before, after, fraction, state in zip(ids, befores, afters, fractions, states):
+                response = self.build_response(objects[object_id], before)
+                response['coordinates'] = coordinates_from_state(state)
+                response['timestamp'] = moment.isoformat() + 'Z'
+                response['interpolation'] = {
+                    'mode': mode,
+                    'fraction': fraction,
+                    'before': before.timestamp.isoformat() + 'Z',
+                    'after': after.timestamp.isoformat() + 'Z' if after else None
+                }
+                results[object_id] = response
+        
+        # Objects without earlier history fall back to current data
+        missing = [object_id for object_id in objects if object_id not in results]
+        results.update(self._current_fallback(objects, missing, timestamp))
+        
+        logger.info(f"Interpolated historical data for {len(ids)} objects at {timestamp}")
+        return results
+    
+    def _find_objects(self, object_ids):
+        """Find objects keyed by ID, as plain rows on the 'core' read path."""
+        if self.read_path == 'core':
+            return {row.id: row for row in ProductlineObject.find_rows_by_ids(object_ids)}
+        return {obj.id: obj for obj in ProductlineObject.find_by_ids(object_ids)}
+    
+    def _current_fallback(self, objects, missing, timestamp):
+        """Build current-data responses for objects without usable history."""
+        results = {}
+        if missing and self.read_path == 'core':
+            for row in ProductlineObject.find_rows_with_coordinates(missing):
+                response = DataService.build_row_response(row)
+                response['timestamp'] = timestamp.isoformat() + 'Z'
+                results[row.id] = response
+        elif missing:
+            coords = {c.object_id: c for c in Coordinates.find_by_object_ids(missing)}
+            for object_id in missing:
+                response = DataService.build_response(objects[object_id], coords.get(object_id))
+                response['timestamp'] = timestamp.isoformat() + 'Z'
+                results[object_id] = response
+        return results
+    
+    @staticmethod
+    def build_response(obj, history):
+        """Build the object response from an object and a history record."""
+        return {
+            'object_id': obj.id,
+            'name': obj.name,
+            'status': history.status or obj.status,
+            'metadata': history.object_metadata or obj.object_metadata,
+            'created_at': obj.created_at.isoformat() + 'Z',
+            'updated_at': history.timestamp.isoformat() + 'Z',
+            'coordinates': {
+                'position': {
+                    'x': history.position_x,
+                    'y': history.position_y,
+                    'z': history.position_z
+                },
+                'height': history.height,
+                'direction': {
+                    'x': history.direction_x,
+                    'y': history.direction_y,
+                    'z': history.direction_z
+                },
+                'rotation': history.rotation
+            }
+        }
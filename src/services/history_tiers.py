@@ -0,0 +1,476 @@
+"""
+History tiers, partitions and retention.
+Raw object history is the finest tier. Closed time buckets are rolled up
+into coarser tiers that keep the last state per object and bucket:
+raw -> 1 minute -> 1 hour. Raw history and each tier have their own
+retention. Expired raw history is removed a whole partition at a time on
+partitioned MySQL tables and in bounded batches elsewhere, and never
+before it has been rolled up. In archive mode it is first exported to the
+cold history archive, a whole day at a time. HistoryService reads moments
+older than the earliest retained raw history from the finest tier still
+retained for them. Maintenance runs in one process at a time.
+"""
+
+import calendar
+import threading
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import text
+from src.database import advisory_lock, db
+from src.models.object_history import ObjectHistory
+from src.models.history_rollup import HistoryRollup
+from src.services.samples import align_down
+from src.app_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Rollup tiers in bucket seconds, finest first; each rolls up the one before
+# it, and the first rolls up raw history
+TIERS = (60, 3600)
+
+# Raw history partitions span one day each
+PARTITION_INTERVAL = 86400
+
+RETENTION_MODES = ('drop', 'archive')
+
+def align_up(timestamp, interval):
+    """Round a timestamp up to a multiple of `interval` seconds since the epoch."""
+    aligned = align_down(timestamp, interval)
+    return aligned if aligned == timestamp else aligned + timedelta(seconds=interval)
+
+def epoch_seconds(timestamp):
+    """Convert a naive UTC timestamp to whole Unix seconds."""
+    return calendar.timegm(timestamp.utctimetuple())
+
+def rollup_rows(rows, tier):
+    """Roll state rows up into the last state per object and bucket of `tier` seconds.
+    
+    Rows are ordered oldest first, as (object_id, timestamp, 8 state
+    fields, status, metadata), optionally followed by the number of samples
+    they already stand for. Returns column-keyed dicts for
+    HistoryRollup.replace_buckets.
+    """
+    buckets = {}
+    for row in rows:
+        bucket = align_down(row[1], tier)
+        weight = row[12] if len(row) > 12 else 1
+        previous = buckets.get((row[0], bucket))
+        buckets[(row[0], bucket)] = {
+            'tier': tier,
+            'object_id': row[0],
+            'bucket': bucket,
+            'timestamp': row[1],
+            'position_x': row[2],
+            'position_y': row[3],
+            'position_z': row[4],
+            'height': row[5],
+            'direction_x': row[6],
+            'direction_y': row[7],
+            'direction_z': row[8],
+            'rotation': row[9],
+            'status': row[10],
+            'object_metadata': row[11],
+            'sample_count': weight + (previous['sample_count'] if previous else 0)
+        }
+    return list(buckets.values())
+
+def source_first_timestamp(tier, since=None):
+    """Find the earliest timestamp at or after `since` in the source of a tier."""
+    index = TIERS.index(tier)
+    if index == 0:
+        return ObjectHistory.find_first_timestamp(since)
+    return HistoryRollup.find_first_timestamp(TIERS[index - 1], since)
+
+def source_timestamp_at_offset(tier, since, offset):
+    """Find the timestamp `offset` rows after the first one at or after `since` in the source of a tier."""
+    index = TIERS.index(tier)
+    if index == 0:
+        return ObjectHistory.find_timestamp_at_offset(since, offset)
+    return HistoryRollup.find_timestamp_at_offset(TIERS[index - 1], since, offset)
+
+def source_rows(tier, start, end):
+    """Iterate over the source rows of a tier in [start, end), oldest first."""
+    index = TIERS.index(tier)
+    if index == 0:
+        return ObjectHistory.iter_state_rows(start, end)
+    return HistoryRollup.iter_state_rows(TIERS[index - 1], start, end)
+
+def history_partitions():
+    """List the (name, upper bound) partitions of object_history, oldest first.
+    
+    The bound of the catch-all MAXVALUE partition is None. Returns [] if
+    the table is not partitioned or the database is not MySQL.
+    """
+    if db.engine.dialect.name != 'mysql':
+        return []
+    rows = db.session.execute(text(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+        "AND PARTITION_NAME IS NOT NULL ORDER BY PARTITION_ORDINAL_POSITION"
+    ), {'table': ObjectHistory.__tablename__}).fetchall()
+    return [
+        (name, None if bound == 'MAXVALUE' else datetime.utcfromtimestamp(int(bound)))
+        for name, bound in rows
+    ]
+
+class HistoryTierManager:
+    """Maintains history partitions, rollup tiers and retention.
+    
+    Retentions are in seconds, 0 keeping data forever. `tier_retentions`
+    maps tier seconds to their retention. The 'archive' retention mode
+    needs a HistoryArchive to export expired raw history to. A rollup
+    reads at most `max_rollup_rows` source rows, or one bucket, and a run
+    creates at most `max_partitions_per_run` partitions.
+    """
+    
+    def __init__(self, app=None, raw_retention=0.0, tier_retentions=None, mutable_horizon=300.0,
+                 retention_mode='drop', partition_premake=3, max_rollup_span=3600.0,
+                 max_rollup_rows=100000, max_partitions_per_run=7, delete_batch_size=10000,
+                 check_interval=300.0, archive=None, clock=datetime.utcnow):
+        if retention_mode not in RETENTION_MODES:
+            raise ValueError(f"Unknown history retention mode: {retention_mode}")
+        if retention_mode == 'archive' and archive is None:
+            raise ValueError("The archive history retention mode needs a history archive")
+        self.app = app
+        self.raw_retention = raw_retention
+        self.tier_retentions = dict.fromkeys(TIERS, 0.0)
+        self.tier_retentions.update(tier_retentions or {})
+        self.mutable_horizon = mutable_horizon
+        self.retention_mode = retention_mode
+        self.partition_premake = partition_premake
+        self.max_rollup_span = max_rollup_span
+        self.max_rollup_rows = max_rollup_rows
+        self.max_partitions_per_run = max_partitions_per_run
+        self.delete_batch_size = delete_batch_size
+        self.check_interval = check_interval
+        self.archive = archive
+        self._clock = clock
+        self._thread = None
+        self._stop = threading.Event()
+        self.buckets_rolled_up = 0
+        self.partitions_created = 0
+        self.partitions_expired = 0
+        self.rows_expired = 0
+        self.last_run = None
+    
+    def tier_for(self, timestamp, now=None):
+        """Pick the tier to read a moment from: None for raw history, else tier seconds.
+        
+        Only moments before the earliest retained raw history, which raw
+        history no longer covers, are read from a tier.
+        """
+        now = now or self._clock()
+        if not self.raw_retention or timestamp >= now - timedelta(seconds=self.raw_retention):
+            return None
+        first = ObjectHistory.find_first_timestamp()
+        if first is not None and timestamp >= first:
+            return None
+        for tier in TIERS:
+            retention = self.tier_retentions[tier]
+            if not retention or timestamp >= now - timedelta(seconds=retention):
+                return tier
+        return TIERS[-1]
+    
+    def rollup(self, tier, now=None):
+        """Roll up the next closed span of a tier's source.
+        
+        A bucket is closed once it ends before the mutable horizon and,
+        for tiers above the first, once the tier below has rolled it up.
+        Spans without source records are skipped. Returns the number of
+        buckets written, or None if there was nothing to roll up.
+        """
+        now = now or self._clock()
+        closed = align_down(now - timedelta(seconds=self.mutable_horizon), tier)
+        index = TIERS.index(tier)
+        if index > 0:
+            source_until = HistoryRollup.find_rolled_up_until(TIERS[index - 1])
+            if source_until is None:
+                return None
+            closed = min(closed, align_down(source_until, tier))
+        
+        watermark = HistoryRollup.find_rolled_up_until(tier)
+        first = source_first_timestamp(tier, watermark)
+        if first is None:
+            return None
+        start = align_down(first, tier)
+        if watermark is not None:
+            start = max(start, watermark)
+        span = max(tier, self.max_rollup_span)
+        end = min(closed, align_down(start + timedelta(seconds=span), tier))
+        if end <= start:
+            return None
+        # Stop at the bucket of the row past the row limit, reading at least one bucket
+        limit = source_timestamp_at_offset(tier, start, self.max_rollup_rows)
+        if limit is not None:
+            end = min(end, max(align_down(limit, tier), start + timedelta(seconds=tier)))
+        
+        try:
+            rows = rollup_rows(source_rows(tier, start, end), tier)
+            HistoryRollup.replace_buckets(tier, start, end, rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error rolling up {tier}s history tier: {str(e)}")
+            raise
+        
+        self.buckets_rolled_up += len(rows)
+        logger.info(f"Rolled up {len(rows)} buckets of the {tier}s history tier "
+                    f"from {start} to {end}")
+        return len(rows)
+    
+    def rollup_all(self, now=None, max_spans=24):
+        """Roll every tier up, at most `max_spans` spans per tier; returns buckets written."""
+        now = now or self._clock()
+        written = 0
+        for tier in TIERS:
+            for _ in range(max_spans):
+                count = self.rollup(tier, now)
+                if count is None:
+                    break
+                written += count
+        return written
+    
+    def invalidate(self, earliest):
+        """Delete rollup buckets that history at `earliest` changes, to roll them up again.
+        
+        Buckets whose source has expired are kept, since they could not be
+        rebuilt. Does not commit. Returns the number of buckets deleted.
+        """
+        sources = [source_first_timestamp(tier) for tier in TIERS]
+        deleted = 0
+        moment = earliest
+        for tier, first in zip(TIERS, sources):
+            if first is None:
+                break
+            moment = max(align_down(moment, tier), align_up(first, tier))
+            deleted += HistoryRollup.delete_buckets_from(tier, moment)
+        if deleted:
+            logger.info(f"Deleted {deleted} rollup buckets made stale by history at {earliest}")
+        return deleted
+    
+    def ensure_partitions(self, now=None):
+        """Create daily raw history partitions up to `partition_premake` days ahead.
+        
+        New partitions are split off the MAXVALUE partition, starting at
+        today so that days missed while maintenance was down collapse into
+        the first one. At most `max_partitions_per_run` are created. Does
+        nothing unless object_history is range partitioned on MySQL.
+        Returns the number of partitions created.
+        """
+        partitions = history_partitions()
+        if not partitions or partitions[-1][1] is not None:
+            return 0
+        
+        now = now or self._clock()
+        catch_all = partitions[-1][0]
+        bounds = [bound for _, bound in partitions if bound is not None]
+        today = align_down(now, PARTITION_INTERVAL)
+        start = max(max(bounds), today) if bounds else today
+        target = today + timedelta(days=self.partition_premake)
+        created = 0
+        while start <= target and created < self.max_partitions_per_run:
+            end = start + timedelta(seconds=PARTITION_INTERVAL)
+            name = 'p' + start.strftime('%Y%m%d')
+            db.session.execute(text(
+                f"ALTER TABLE {ObjectHistory.__tablename__} REORGANIZE PARTITION {catch_all} INTO ("
+                f"PARTITION {name} VALUES LESS THAN ({epoch_seconds(end)}), "
+                f"PARTITION {catch_all} VALUES LESS THAN MAXVALUE)"
+            ))
+            created += 1
+            start = end
+        
+        self.partitions_created += created
+        if created:
+            logger.info(f"Created {created} history partitions up to {start}")
+        return created
+    
+    def apply_retention(self, now=None):
+        """Remove raw history and rollup buckets past their retention.
+        
+        Nothing is removed before the tier above has rolled it up. Returns
+        the number of partitions and rows removed.
+        """
+        now = now or self._clock()
+        removed = self._expire_raw(now)
+        
+        for index, tier in enumerate(TIERS):
+            retention = self.tier_retentions[tier]
+            if not retention:
+                continue
+            cutoff = align_down(now - timedelta(seconds=retention), tier)
+            if index + 1 < len(TIERS):
+                rolled_up = HistoryRollup.find_rolled_up_until(TIERS[index + 1])
+                if rolled_up is None:
+                    continue
+                cutoff = min(cutoff, rolled_up)
+            try:
+                deleted = HistoryRollup.delete_buckets_before(tier, cutoff)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            if deleted:
+                logger.info(f"Expired {deleted} buckets of the {tier}s history tier before {cutoff}")
+            removed += deleted
+        
+        if self.archive is not None:
+            removed += self.archive.apply_retention(now)
+        return removed
+    
+    def _expire_raw(self, now):
+        """Remove raw history past its retention that the first tier covers.
+        
+        In archive mode only whole days are removed, once exported. Export
+        and removal hold the 'history_archive' lock, so no other process
+        exports or removes the same days meanwhile; nothing is removed
+        while another process holds it.
+        """
+        if not self.raw_retention:
+            return 0
+        rolled_up = HistoryRollup.find_rolled_up_until(TIERS[0])
+        if rolled_up is None:
+            return 0
+        cutoff = min(now - timedelta(seconds=self.raw_retention), rolled_up)
+        
+        with advisory_lock('history_archive') as acquired:
+            if not acquired:
+                logger.warning("History archive is locked by another process, skipping raw expiry")
+                return 0
+            partitions = history_partitions()
+            if partitions:
+                return self._expire_partitions(partitions, cutoff)
+            return self._expire_rows(cutoff)
+    
+    def _expire_rows(self, cutoff):
+        """Delete, after exporting them in archive mode, the raw rows before `cutoff`."""
+        if self.retention_mode == 'archive':
+            cutoff = align_down(cutoff, PARTITION_INTERVAL)
+            first = ObjectHistory.find_first_timestamp()
+            if first is None or first >= cutoff:
+                return 0
+            self.archive.export(align_down(first, PARTITION_INTERVAL), cutoff)
+        
+        removed = 0
+        while True:
+            try:
+                deleted = ObjectHistory.delete_before(cutoff, self.delete_batch_size)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            removed += deleted
+            if deleted < self.delete_batch_size:
+                break
+        self.rows_expired += removed
+        if removed:
+            logger.info(f"Expired {removed} history records before {cutoff}")
+        return removed
+    
+    def _expire_partitions(self, partitions, cutoff):
+        """Drop, after exporting them in archive mode, the partitions ending by `cutoff`."""
+        table = ObjectHistory.__tablename__
+        expired = 0
+        lower = None
+        for name, bound in partitions:
+            if bound is None or bound > cutoff:
+                break
+            if self.retention_mode == 'archive':
+                # The first partition also holds anything older than its range
+                start = lower
+                if start is None:
+                    first = ObjectHistory.find_first_timestamp()
+                    start = align_down(min(first, bound), PARTITION_INTERVAL) if first else bound
+                self.archive.export(start, bound)
+            db.session.execute(text(f"ALTER TABLE {table} DROP PARTITION {name}"))
+            expired += 1
+            lower = bound
+            logger.info(f"Expired history partition {name} ending {bound} "
+                        f"({'archived' if self.retention_mode == 'archive' else 'dropped'})")
+        self.partitions_expired += expired
+        return expired
+    
+    def run_maintenance(self, now=None):
+        """Create partitions, roll tiers up and apply retention once.
+        
+        Returns False without doing anything if another process holds the
+        maintenance lock.
+        """
+        with advisory_lock('history_maintenance') as acquired:
+            if not acquired:
+                return False
+            now = now or self._clock()
+            self.ensure_partitions(now)
+            self.rollup_all(now)
+            self.apply_retention(now)
+            self.last_run = now
+            return True
+    
+    def start(self):
+        """Start the maintenance thread if it is not running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='history-tiers', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the maintenance thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.check_interval)
+    
+    def _run(self):
+        """Run maintenance every check interval until stopped."""
+        while True:
+            try:
+                with self.app.app_context():
+                    try:
+                        self.run_maintenance()
+                    finally:
+                        db.session.remove()
+            except Exception as e:
+                logger.error(f"Error maintaining history tiers: {str(e)}")
+            if self._stop.wait(self.check_interval):
+                return
+    
+    def stats(self):
+        """Get maintenance counters."""
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'raw_retention': self.raw_retention,
+            'tier_retentions': {str(tier): retention for tier, retention in self.tier_retentions.items()},
+            'last_run': self.last_run.isoformat() + 'Z' if self.last_run else None,
+            'buckets_rolled_up': self.buckets_rolled_up,
+            'partitions_created': self.partitions_created,
+            'partitions_expired': self.partitions_expired,
+            'rows_expired': self.rows_expired,
+            'archive': self.archive.stats() if self.archive is not None else None
+        }
+
+def init_history_tiers(app):
+    """Initialize history tiers for Flask app, starting maintenance if enabled."""
+    app.history_tiers = HistoryTierManager(
+        app,
+        raw_retention=app.config.get('HISTORY_RAW_RETENTION', 0.0),
+        tier_retentions={
+            60: app.config.get('HISTORY_MINUTE_TIER_RETENTION', 7776000.0),
+            3600: app.config.get('HISTORY_HOUR_TIER_RETENTION', 0.0)
+        },
+        mutable_horizon=app.config.get('HISTORY_CACHE_MUTABLE_HORIZON', 300.0),
+        retention_mode=app.config.get('HISTORY_RETENTION_MODE', 'drop'),
+        partition_premake=app.config.get('HISTORY_PARTITION_PREMAKE', 3),
+        max_rollup_span=app.config.get('HISTORY_ROLLUP_MAX_SPAN', 3600.0),
+        max_rollup_rows=app.config.get('HISTORY_ROLLUP_MAX_ROWS', 100000),
+        max_partitions_per_run=app.config.get('HISTORY_PARTITION_MAX_PER_RUN', 7),
+        check_interval=app.config.get('HISTORY_MAINTENANCE_INTERVAL', 300.0),
+        archive=getattr(app, 'history_archive', None)
+    )
+    if app.config.get('HISTORY_MAINTENANCE_ENABLED', False) and not app.config.get('TESTING'):
+        app.history_tiers.start()
+    return app.history_tiers
+
+def get_history_tiers():
+    """Get the history tier manager of the current app."""
+    if not has_app_context():
+        return None
+    return getattr(current_app, 'history_tiers', None)
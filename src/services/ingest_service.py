@@ -0,0 +1,192 @@
+"""
+Bulk ingestion of object history.
+Validates thousands of samples at once and writes them with multi-row
+INSERTs in bounded transactions, rejecting bad samples one by one instead
+of failing the whole request.
+"""
+
+from datetime import datetime
+import math
+import numpy as np
+from sqlalchemy.exc import SQLAlchemyError
+from src.database import db
+from src.models.productline_object import ProductlineObject
+from src.models.object_history import ObjectHistory
+from src.services.history_service import invalidate_history
+from src.services.interpolation import STATE_FIELDS
+from src.services.samples import reject, sample_timestamp
+from src.services.validation import (
+    STATUSES, validate_object_id, validate_status, validate_coordinates_array
+)
+from src.app_logging import get_logger
+
+logger = get_logger(__name__)
+
+_MISSING = (np.nan,) * len(STATE_FIELDS)
+
+def sample_values(sample):
+    """Flatten a sample's coordinates in STATE_FIELDS order as floats, or None if malformed.
+    
+    Integers too large for a float raise OverflowError on conversion, so each
+    value is converted here rather than when the batch array is built.
+    """
+    try:
+        position = sample['position']
+        direction = sample['direction']
+        values = (
+            position['x'], position['y'], position['z'],
+            sample['height'],
+            direction['x'], direction['y'], direction['z'],
+            sample['rotation']
+        )
+    except (KeyError, TypeError):
+        return None
+    
+    if not all(isinstance(value, (int, float)) and not isinstance(value, bool)
+               for value in values):
+        return None
+    try:
+        values = tuple(float(value) for value in values)
+    except OverflowError:
+        return None
+    if not all(math.isfinite(value) for value in values):
+        return None
+    return values
+
+class HistoryIngestService:
+    """Service for writing object history samples in bulk."""
+    
+    def __init__(self, chunk_size=1000, mutable_horizon=300.0, clock=datetime.utcnow):
+        self.chunk_size = chunk_size
+        self.mutable_horizon = mutable_horizon
+        self._clock = clock
+    
+    def ingest(self, samples):
+        """Validate and insert history samples, rejecting invalid ones individually.
+        
+        Each sample is {"object_id", "timestamp", "position", "height",
+        "direction", "rotation"} with optional "status" and "metadata".
+        Valid samples are inserted `chunk_size` rows per transaction; a
+        chunk that fails to write rejects only its own rows. Returns counts
+        and the rejects, each with the sample's index in the request.
+        """
+        try:
+            rejects = []
+            accepted = []
+            values = []
+            
+            # Check the fields of each sample
+            for index, sample in enumerate(samples):
+                if not isinstance(sample, dict):
+                    rejects.append(reject(index, None, 'INVALID_SAMPLE', 'Sample must be an object'))
+                    continue
+                
+                object_id = sample.get('object_id')
+                if not validate_object_id(object_id):
+                    rejects.append(reject(index, object_id, 'INVALID_OBJECT_ID',
+                                          'Object ID must be 1-100 characters'))
+                    continue
+                
+                timestamp = sample_timestamp(sample.get('timestamp'))
+                if timestamp is None:
+                    rejects.append(reject(index, object_id, 'INVALID_TIMESTAMP',
+                                          'Timestamp must be ISO 8601 or Unix seconds'))
+                    continue
+                
+                status = sample.get('status')
+                if status is not None and not validate_status(status):
+                    rejects.append(reject(index, object_id, 'INVALID_STATUS',
+                                          f"Status must be one of {', '.join(STATUSES)}"))
+                    continue
+                
+                row = sample_values(sample)
+                accepted.append((index, object_id, timestamp, status, sample.get('metadata')))
+                values.append(_MISSING if row is None else row)
+            
+            # Check the coordinate ranges of all samples at once
+            valid = validate_coordinates_array(np.array(values, dtype=float))
+            rows = []
+            for (index, object_id, timestamp, status, metadata), row, ok in zip(
+                    accepted, values, valid.tolist()):
+                if not ok:
+                    rejects.append(reject(index, object_id, 'INVALID_COORDINATES',
+                                          'Coordinates must be finite, with height >= 0 '
+                                          'and rotation within 0-360'))
+                    continue
+                record = dict(zip(STATE_FIELDS, (float(value) for value in row)))
+                record.update({
+                    'object_id': object_id,
+                    'timestamp': timestamp,
+                    'status': status,
+                    'object_metadata': metadata
+                })
+                rows.append((index, record))
+            
+            # Reject samples of unknown objects before they reach the foreign key
+            rows, unknown = self._known_objects(rows)
+            rejects.extend(unknown)
+            
+            inserted, earliest, failed = self._write(rows)
+            rejects.extend(failed)
+            if earliest is not None and invalidate_history(earliest, self.mutable_horizon,
+                                                           self._clock()):
+                db.session.commit()
+            
+            rejects.sort(key=lambda entry: entry['index'])
+            logger.info(f"Ingested {inserted} of {len(samples)} history samples, "
+                        f"{len(rejects)} rejected")
+            return {
+                'received': len(samples),
+                'inserted': inserted,
+                'rejected': len(rejects),
+                'rejects': rejects
+            }
+            
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error ingesting history samples: {str(e)}")
+            raise
+    
+    def _known_objects(self, rows):
+        """Split rows into those of existing objects and rejects for the rest."""
+        object_ids = list(dict.fromkeys(record['object_id'] for _, record in rows))
+        existing = set()
+        for start in range(0, len(object_ids), self.chunk_size):
+            existing |= ProductlineObject.find_existing_ids(object_ids[start:start + self.chunk_size])
+        
+        known, unknown = [], []
+        for index, record in rows:
+            if record['object_id'] in existing:
+                known.append((index, record))
+            else:
+                unknown.append(reject(index, record['object_id'], 'OBJECT_NOT_FOUND',
+                                      'Object not found'))
+        return known, unknown
+    
+    def _write(self, rows):
+        """Insert rows one bounded transaction at a time.
+        
+        Returns (inserted, earliest inserted timestamp, rejects).
+        """
+        inserted = 0
+        earliest = None
+        rejects = []
+        for start in range(0, len(rows), self.chunk_size):
+            chunk = rows[start:start + self.chunk_size]
+            try:
+                ObjectHistory.insert_many([record for _, record in chunk])
+                db.session.commit()
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                logger.warning(f"Failed to write {len(chunk)} history samples: {str(e)}")
+                rejects.extend(
+                    reject(index, record['object_id'], 'WRITE_ERROR', 'Sample could not be written')
+                    for index, record in chunk
+                )
+                continue
+            
+            inserted += len(chunk)
+            chunk_earliest = min(record['timestamp'] for _, record in chunk)
+            if earliest is None or chunk_earliest < earliest:
+                earliest = chunk_earliest
+        return inserted, earliest, rejects
@@ -0,0 +1,83 @@
+"""
+Vectorized interpolation of object states between history samples.
+States are rows of STATE_FIELDS; a whole batch of objects is interpolated
+with array operations rather than one object at a time.
+"""
+
+import numpy as np
+
+INTERPOLATION_MODES = ('linear', 'slerp')
+
+STATE_FIELDS = (
+    'position_x', 'position_y', 'position_z', 'height',
+    'direction_x', 'direction_y', 'direction_z', 'rotation'
+)
+
+# Below this angle between directions, slerp falls back to normalized lerp
+_SLERP_EPSILON = 1e-6
+
+def state_row(record):
+    """Get the STATE_FIELDS of a history record, with None as NaN."""
+    return [np.nan if value is None else value
+            for value in (getattr(record, name) for name in STATE_FIELDS)]
+
+def lerp(a, b, t):
+    """Linearly interpolate rows of a towards b by per-row fractions t."""
+    return a + (b - a) * t[:, None]
+
+def normalize(vectors):
+    """Scale rows to unit length, leaving zero rows unchanged."""
+    lengths = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, lengths, out=np.array(vectors, dtype=float), where=lengths > 0)
+
+def nlerp(a, b, t):
+    """Interpolate directions linearly and renormalize."""
+    return normalize(lerp(a, b, t))
+
+def slerp(a, b, t):
+    """Spherically interpolate unit directions at a constant angular rate."""
+    a = normalize(a)
+    b = normalize(b)
+    dot = np.clip(np.einsum('ij,ij->i', a, b), -1.0, 1.0)
+    angle = np.arccos(dot)
+    sin_angle = np.sin(angle)
+    
+    # Nearly parallel or opposite directions have no well-defined arc
+    small = sin_angle < _SLERP_EPSILON
+    safe_sin = np.where(small, 1.0, sin_angle)
+    wa = np.where(small, 1.0 - t, np.sin((1.0 - t) * angle) / safe_sin)
+    wb = np.where(small, t, np.sin(t * angle) / safe_sin)
+    result = a * wa[:, None] + b * wb[:, None]
+    return np.where(small[:, None], normalize(result), result)
+
+def lerp_angle(a, b, t):
+    """Interpolate angles in degrees along the shorter arc, within [0, 360)."""
+    delta = (b - a + 180.0) % 360.0 - 180.0
+    return (a + delta * t) % 360.0
+
+def interpolate_states(before, after, t, mode='linear'):
+    """Interpolate (N, 8) state arrays by per-row fractions t in [0, 1].
+    
+    Position and height are interpolated linearly in both modes. Directions
+    use normalized lerp in 'linear' mode and slerp in 'slerp' mode; rotation
+    always follows the shorter arc, which is what slerp reduces to for a
+    single angle. Fields missing (NaN) on either side keep the earlier
+    value.
+    """
+    before = np.asarray(before, dtype=float)
+    after = np.asarray(after, dtype=float)
+    t = np.clip(np.asarray(t, dtype=float), 0.0, 1.0)
+    
+    result = before.copy()
+    result[:, 0:4] = lerp(before[:, 0:4], after[:, 0:4], t)
+    if mode == 'slerp':
+        result[:, 4:7] = slerp(before[:, 4:7], after[:, 4:7], t)
+    else:
+        result[:, 4:7] = nlerp(before[:, 4:7], after[:, 4:7], t)
+    result[:, 7] = lerp_angle(before[:, 7], after[:, 7], t)
+    
+    # Keep the earlier state where either side is missing a value
+    missing = np.isnan(before) | np.isnan(after)
+    missing[:, 4:7] = missing[:, 4:7].any(axis=1, keepdims=True)
+    result[missing] = before[missing]
+    return result
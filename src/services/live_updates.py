@@ -0,0 +1,277 @@
+"""
+Live object updates pushed to subscribed clients.
+A single detector thread per process polls the change feed and fans each
+changed object out to the subscribers whose filters match it, so database
+load does not grow with the number of connected clients.
+
+Under gunicorn's threaded workers every open stream holds one of the
+worker's threads until the client disconnects, so the subscriber cap must
+leave threads for ordinary requests. Streams check the client socket for a
+disconnect every second rather than waiting for a heartbeat write to fail.
+For many subscribers, serve /live from a separate deployment with an async
+worker class (e.g. `-k gevent`).
+"""
+
+import json
+import select
+import socket
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from src.database import db
+from src.services.change_service import ChangeService, encode_cursor
+from src.app_logging import get_logger
+
+logger = get_logger(__name__)
+
+def format_sse(event, data, event_id=None):
+    """Format one Server-Sent Events message with a JSON payload."""
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+def client_disconnected(sock):
+    """Check whether the client closed a streaming request's socket.
+    
+    The client sends nothing after its request, so a readable socket with
+    no data to peek at has been closed by the other end.
+    """
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        return bool(readable) and sock.recv(1, socket.MSG_PEEK) == b''
+    except (OSError, ValueError):
+        return True
+
+class Subscription:
+    """A client's filters and its bounded queue of pending events.
+    
+    When the queue is full the oldest event is dropped and counted, so a
+    slow client only ever falls behind by `max_queue` events.
+    """
+    
+    def __init__(self, object_ids=None, bbox=None, max_queue=256):
+        self.object_ids = set(object_ids) if object_ids else None
+        self.bbox = bbox
+        self.dropped = 0
+        self.closed = False
+        self._queue = deque(maxlen=max_queue)
+        self._in_view = set()
+        self._ready = threading.Condition()
+    
+    def matches(self, obj):
+        """Check whether an object response passes the filters.
+        
+        With a bounding box, an object that leaves the box is matched once
+        more so the client sees it go.
+        """
+        object_id = obj['object_id']
+        if self.object_ids is not None and object_id not in self.object_ids:
+            return False
+        if self.bbox is None:
+            return True
+        
+        position = obj['coordinates']['position']
+        min_x, min_y, min_z, max_x, max_y, max_z = self.bbox
+        inside = (min_x <= position['x'] <= max_x and min_y <= position['y'] <= max_y
+                  and min_z <= position['z'] <= max_z)
+        if inside:
+            self._in_view.add(object_id)
+            return True
+        if object_id in self._in_view:
+            self._in_view.discard(object_id)
+            return True
+        return False
+    
+    def put(self, event):
+        """Queue an event, dropping the oldest one if the queue is full."""
+        with self._ready:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(event)
+            self._ready.notify()
+    
+    def get(self, timeout=None):
+        """Wait for events and take all queued ones; empty on timeout or close."""
+        with self._ready:
+            if not self._queue and not self.closed:
+                self._ready.wait(timeout)
+            events = list(self._queue)
+            self._queue.clear()
+            return events
+    
+    def close(self):
+        """Wake up a waiting reader and stop accepting events."""
+        with self._ready:
+            self.closed = True
+            self._ready.notify_all()
+
+class LiveUpdateBroker:
+    """Detects object changes once per process and fans them out.
+    
+    The detector thread starts with the first subscriber and walks the
+    change feed from the moment it started, every `poll_interval` seconds.
+    """
+    
+    def __init__(self, app, poll_interval=0.5, settle_delay=1.0, page_size=1000,
+                 max_queue=256, max_subscribers=4):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.settle_delay = settle_delay
+        self.page_size = page_size
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        
+        self.cursor = None
+        self.events_published = 0
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+    
+    def subscribe(self, object_ids=None, bbox=None):
+        """Register a subscriber, or return None if the broker is full."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscription = Subscription(object_ids, bbox, max_queue=self.max_queue)
+            self._subscribers.append(subscription)
+            self._start()
+        logger.info(f"Live update subscriber added, {len(self._subscribers)} connected")
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        """Remove a subscriber."""
+        subscription.close()
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+        logger.info(f"Live update subscriber removed, {len(self._subscribers)} connected")
+    
+    def publish(self, obj, cursor=None):
+        """Send an object response to every subscriber whose filters match."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        event = {'id': cursor, 'object': obj}
+        for subscription in subscribers:
+            if subscription.matches(obj):
+                subscription.put(event)
+        self.events_published += 1
+    
+    def stream(self, subscription, heartbeat_interval=5.0, disconnected=None,
+               check_interval=1.0):
+        """Yield a subscription's events as Server-Sent Events until it closes.
+        
+        Each change is a "change" event carrying the object response. If
+        events were dropped since the last read, an "overflow" event with
+        the total dropped count comes first so the client can resync. A
+        comment line is sent when idle to keep proxies from timing out.
+        `disconnected`, if given, is checked every `check_interval` seconds
+        and ends the stream once it returns true.
+        """
+        dropped = 0
+        wait = min(check_interval, heartbeat_interval) if disconnected else heartbeat_interval
+        try:
+            yield 'retry: 2000\n\n'
+            idle_since = time.monotonic()
+            while not subscription.closed:
+                events = subscription.get(timeout=wait)
+                if disconnected is not None and disconnected():
+                    logger.info("Live update client disconnected")
+                    return
+                if subscription.dropped != dropped:
+                    dropped = subscription.dropped
+                    yield format_sse('overflow', {'dropped': dropped})
+                for event in events:
+                    yield format_sse('change', event['object'], event['id'])
+                if events:
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since >= heartbeat_interval:
+                    yield ': keepalive\n\n'
+                    idle_since = time.monotonic()
+        finally:
+            self.unsubscribe(subscription)
+    
+    def _start(self):
+        """Start the detector thread if it is not running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.cursor = encode_cursor(
+            datetime.utcnow() - timedelta(seconds=self.settle_delay), ''
+        )
+        self._thread = threading.Thread(target=self._run, name='live-updates', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the detector thread and close all subscriptions."""
+        self._stop.set()
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for subscription in subscribers:
+            subscription.close()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval * 4)
+    
+    def poll(self):
+        """Publish every change after the cursor; returns the number published."""
+        change_service = ChangeService(settle_delay=self.settle_delay)
+        published = 0
+        while True:
+            result = change_service.get_changes(self.cursor, limit=self.page_size)
+            for obj in result['changes']:
+                self.publish(obj, result['cursor'])
+            published += result['count']
+            self.cursor = result['cursor']
+            if not result['has_more']:
+                return published
+    
+    def _run(self):
+        """Poll the change feed until stopped or no subscribers remain."""
+        while not self._stop.wait(self.poll_interval):
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            try:
+                with self.app.app_context():
+                    try:
+                        self.poll()
+                    finally:
+                        db.session.remove()
+            except Exception as e:
+                logger.error(f"Error detecting live updates: {str(e)}")
+    
+    def stats(self):
+        """Get broker counters."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return {
+            'subscribers': len(subscribers),
+            'max_subscribers': self.max_subscribers,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'events_published': self.events_published,
+            'events_dropped': sum(subscription.dropped for subscription in subscribers)
+        }
+
+def init_live_updates(app):
+    """Initialize the live update broker for Flask app."""
+    app.live_updates = LiveUpdateBroker(
+        app,
+        poll_interval=app.config.get('LIVE_UPDATES_POLL_INTERVAL', 0.5),
+        settle_delay=app.config.get('CHANGES_SETTLE_DELAY', 1.0),
+        page_size=app.config.get('CHANGES_PAGE_SIZE', 1000),
+        max_queue=app.config.get('LIVE_UPDATES_QUEUE_SIZE', 256),
+        max_subscribers=app.config.get('LIVE_UPDATES_MAX_SUBSCRIBERS', 4)
+    )
+    return app.live_updates
+
+def get_live_updates():
+    """Get the live update broker of the current app."""
+    if not has_app_context():
+        return None
+    return getattr(current_app, 'live_updates', None)
@@ -0,0 +1,47 @@
+"""
+Helpers shared by the services that read and write timestamped samples.
+Parses request timestamps to the naive UTC form stored in the database,
+aligns timestamps to fixed intervals and builds per-sample reject entries.
+"""
+
+from datetime import datetime, timedelta, timezone
+from src.services.validation import validate_timestamp
+
+_EPOCH = datetime(1970, 1, 1)
+
+def parse_timestamp(timestamp):
+    """Parse an ISO 8601 or Unix timestamp string into a datetime."""
+    if isinstance(timestamp, str):
+        try:
+            timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        except ValueError:
+            timestamp = datetime.fromtimestamp(float(timestamp), tz=timezone.utc)
+    return timestamp
+
+def to_utc_naive(timestamp):
+    """Convert a timestamp to the naive UTC form stored in the database."""
+    if timestamp is not None and timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def sample_timestamp(value):
+    """Parse a sample timestamp, ISO 8601 or Unix seconds, to naive UTC, or None."""
+    if isinstance(value, bool):
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.utcfromtimestamp(value)
+        if isinstance(value, str) and value and validate_timestamp(value):
+            return to_utc_naive(parse_timestamp(value))
+    except (ValueError, OverflowError, OSError):
+        pass
+    return None
+
+def align_down(timestamp, interval):
+    """Round a naive UTC timestamp down to a multiple of `interval` seconds."""
+    step = timedelta(seconds=interval)
+    return _EPOCH + ((timestamp - _EPOCH) // step) * step
+
+def reject(index, object_id, code, error):
+    """Build the reject entry of a sample."""
+    return {'index': index, 'object_id': object_id, 'code': code, 'error': error}
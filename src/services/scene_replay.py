@@ -0,0 +1,361 @@
+"""
+Historical scene replay from materialized checkpoints.
+The full scene state is checkpointed every interval, so reconstructing the
+scene at any moment reads the nearest earlier checkpoint plus only the
+history recorded since it, whatever the age of the moment.
+"""
+
+import threading
+import zlib
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+import msgpack
+import numpy as np
+from flask import current_app, has_app_context
+from sqlalchemy.exc import IntegrityError
+from src.database import advisory_lock, db
+from src.models.object_history import ObjectHistory
+from src.models.scene_checkpoint import SceneCheckpoint
+from src.services.interpolation import STATE_FIELDS
+from src.services.samples import align_down
+from src.app_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Fields follow the rows of ObjectHistory.find_latest_in_range, and the
+# attribute names of ObjectHistory so states can stand in for records
+HistoryState = namedtuple(
+    'HistoryState',
+    ('object_id', 'timestamp') + STATE_FIELDS + ('status', 'object_metadata')
+)
+
+CHECKPOINT_FORMAT = 1
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+def encode_state(states):
+    """Encode a {object_id: HistoryState} mapping as a compressed checkpoint payload.
+    
+    State values are stored column-wise as float64 with NaN for missing
+    values, and timestamps as int64 microseconds since the epoch.
+    """
+    records = list(states.values())
+    values = np.array(
+        [[np.nan if value is None else value for value in record[2:2 + len(STATE_FIELDS)]]
+         for record in records],
+        dtype='<f8'
+    ).reshape(len(records), len(STATE_FIELDS))
+    timestamps = np.array(
+        [(record.timestamp - _EPOCH) // _MICROSECOND for record in records], dtype='<i8'
+    )
+    return zlib.compress(msgpack.packb({
+        'format': CHECKPOINT_FORMAT,
+        'object_ids': [record.object_id for record in records],
+        'timestamps': timestamps.tobytes(),
+        'values': values.tobytes(),
+        'statuses': [record.status for record in records],
+        'metadata': [record.object_metadata for record in records]
+    }, use_bin_type=True))
+
+def decode_state(payload):
+    """Decode a checkpoint payload produced by encode_state."""
+    data = msgpack.unpackb(zlib.decompress(payload), raw=False)
+    if data.get('format') != CHECKPOINT_FORMAT:
+        raise ValueError(f"Unsupported checkpoint format: {data.get('format')}")
+    
+    values = np.frombuffer(data['values'], dtype='<f8').reshape(-1, len(STATE_FIELDS))
+    timestamps = np.frombuffer(data['timestamps'], dtype='<i8')
+    states = {}
+    for object_id, micros, row, status, metadata in zip(
+            data['object_ids'], timestamps.tolist(), values.tolist(),
+            data['statuses'], data['metadata']):
+        row = [None if value != value else value for value in row]
+        states[object_id] = HistoryState(
+            object_id, _EPOCH + timedelta(microseconds=micros), *row, status, metadata
+        )
+    return states
+
+def apply_history(states, rows):
+    """Get a copy of `states` with the latest-state history rows applied."""
+    merged = dict(states)
+    for row in rows:
+        merged[row[0]] = HistoryState(*row)
+    return merged
+
+class SceneCheckpointManager:
+    """Creates scene checkpoints and replays the scene at past moments.
+    
+    Checkpoints are taken at multiples of `interval` seconds, once the
+    moment is older than `mutable_horizon` so late history writes are not
+    missed. Each one is built from the previous checkpoint and the history
+    between them; the first one folds the history in windows of
+    `build_window` seconds so no single query spans all of it. Earlier
+    checkpoints are backfilled back to the start of the retained history,
+    so every moment since then has a checkpoint to replay from. The thread
+    takes a database advisory lock per run, so only one worker does the
+    work, and the unique taken_at keeps concurrent creation harmless.
+    Recently used checkpoints are kept decoded in memory.
+    """
+    
+    def __init__(self, app=None, interval=900.0, mutable_horizon=300.0, max_backfill=96,
+                 check_interval=60.0, retention=0.0, cache_size=4, build_window=86400.0,
+                 clock=datetime.utcnow):
+        self.app = app
+        self.interval = interval
+        self.mutable_horizon = mutable_horizon
+        self.max_backfill = max_backfill
+        self.check_interval = check_interval
+        self.retention = retention
+        self.cache_size = cache_size
+        self.build_window = build_window
+        self._clock = clock
+        
+        self.checkpoints_created = 0
+        self.replays = 0
+        self._decoded = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+    
+    def _load(self, checkpoint):
+        """Get the decoded state of a checkpoint, caching recent ones."""
+        with self._lock:
+            states = self._decoded.get(checkpoint.id)
+            if states is not None:
+                self._decoded.move_to_end(checkpoint.id)
+                return states
+        
+        states = decode_state(checkpoint.payload)
+        self._remember(checkpoint.id, states)
+        return states
+    
+    def _remember(self, checkpoint_id, states):
+        """Keep a decoded checkpoint state, evicting the least recently used.
+        
+        States are keyed by checkpoint ID rather than moment, since a
+        checkpoint made stale by late history is recreated under a new ID.
+        """
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._decoded[checkpoint_id] = states
+            self._decoded.move_to_end(checkpoint_id)
+            while len(self._decoded) > self.cache_size:
+                self._decoded.popitem(last=False)
+    
+    def state_at(self, timestamp):
+        """Reconstruct every object's latest history state at a naive UTC timestamp.
+        
+        Returns ({object_id: HistoryState}, checkpoint_taken_at). Objects
+        without history at or before the timestamp are absent. Without an
+        earlier checkpoint the history up to the timestamp is folded one
+        window at a time, as for the first checkpoint.
+        """
+        checkpoint = SceneCheckpoint.find_latest_at_or_before(timestamp)
+        if checkpoint is None:
+            states = self.initial_state(timestamp)
+            if states is None:
+                raise RuntimeError(f"Scene replay at {timestamp} was stopped")
+            self.replays += 1
+            return states, None
+        
+        states = apply_history(self._load(checkpoint),
+                               ObjectHistory.find_latest_in_range(checkpoint.taken_at, timestamp))
+        self.replays += 1
+        return states, checkpoint.taken_at
+    
+    def initial_state(self, until):
+        """Fold the whole history up to a moment into a scene state, one window at a time.
+        
+        Each query covers at most `build_window` seconds of history, and
+        stretches without history are skipped. Returns None if the manager
+        was stopped before the state was complete.
+        """
+        states = {}
+        after = None
+        step = timedelta(seconds=self.build_window)
+        first = ObjectHistory.find_first_timestamp()
+        while first is not None and first <= until:
+            if self._stop.is_set():
+                return None
+            bound = min(first + step, until)
+            states = apply_history(states, ObjectHistory.find_latest_in_range(after, bound))
+            after = bound
+            first = ObjectHistory.find_first_timestamp(since=bound + _MICROSECOND)
+        return states
+    
+    def create_checkpoint(self, taken_at, states=None):
+        """Materialize the scene state at a moment; returns None if one exists.
+        
+        `states` is the state at the moment if already known, otherwise it
+        is replayed from the latest earlier checkpoint.
+        """
+        try:
+            if states is None:
+                states, _ = self.state_at(taken_at)
+            checkpoint = SceneCheckpoint(
+                taken_at=taken_at,
+                payload=encode_state(states),
+                object_count=len(states)
+            )
+            db.session.add(checkpoint)
+            db.session.commit()
+            
+        except IntegrityError:
+            # Another worker created it first
+            db.session.rollback()
+            logger.info(f"Scene checkpoint at {taken_at} already exists")
+            return None
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error creating scene checkpoint at {taken_at}: {str(e)}")
+            raise
+        
+        self._remember(checkpoint.id, states)
+        self.checkpoints_created += 1
+        logger.info(f"Created scene checkpoint at {taken_at} with {len(states)} objects "
+                    f"({len(checkpoint.payload)} bytes)")
+        return checkpoint
+    
+    def ensure_checkpoints(self, now=None):
+        """Create the checkpoints due by now; returns the number created.
+        
+        Missing checkpoints since the latest one are backfilled in order.
+        Without any checkpoint only the latest due one is created, from
+        initial_state. The rest of the run's `max_backfill` checkpoints then
+        extend the earliest one back towards the first retained history.
+        Retention keeps the latest checkpoint at or before its cutoff, which
+        still covers the moments just after it.
+        """
+        now = now or self._clock()
+        due = align_down(now - timedelta(seconds=self.mutable_horizon), self.interval)
+        latest = SceneCheckpoint.find_latest_taken_at()
+        
+        created = 0
+        if latest is None:
+            states = self.initial_state(due)
+            if states is not None and self.create_checkpoint(due, states) is not None:
+                created += 1
+        else:
+            step = timedelta(seconds=self.interval)
+            missing = min((due - latest) // step, self.max_backfill)
+            for moment in [due - step * i for i in reversed(range(max(missing, 0)))]:
+                if self.create_checkpoint(moment) is not None:
+                    created += 1
+        
+        cutoff = now - timedelta(seconds=self.retention) if self.retention > 0 else None
+        created += self._backfill_earlier(self.max_backfill - created, cutoff)
+        
+        if cutoff is not None:
+            oldest = SceneCheckpoint.find_latest_at_or_before(cutoff)
+            deleted = SceneCheckpoint.delete_older_than(oldest.taken_at) if oldest else 0
+            db.session.commit()
+            if deleted:
+                logger.info(f"Deleted {deleted} expired scene checkpoints")
+        return created
+    
+    def _backfill_earlier(self, limit, cutoff=None):
+        """Create up to `limit` checkpoints before the earliest one; returns the number created.
+        
+        Checkpoints go back to the interval holding the first history, or
+        the retention `cutoff` if later. The earliest new one is built with
+        initial_state and each following one from the one before it.
+        """
+        earliest = SceneCheckpoint.find_earliest_taken_at()
+        first = ObjectHistory.find_first_timestamp()
+        if limit <= 0 or earliest is None or first is None:
+            return 0
+        
+        floor = align_down(max(first, cutoff) if cutoff else first, self.interval)
+        step = timedelta(seconds=self.interval)
+        missing = min((earliest - floor) // step, limit)
+        if missing <= 0:
+            return 0
+        
+        moments = [earliest - step * i for i in range(missing, 0, -1)]
+        states = self.initial_state(moments[0])
+        created = 0
+        for previous, moment in zip([None] + moments, moments):
+            if states is None or self._stop.is_set():
+                break
+            if previous is not None:
+                states = apply_history(states, ObjectHistory.find_latest_in_range(previous, moment))
+            if self.create_checkpoint(moment, states) is not None:
+                created += 1
+        if created:
+            logger.info(f"Backfilled {created} scene checkpoints before {earliest}")
+        return created
+    
+    def start(self):
+        """Start the checkpoint thread if it is not running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='scene-checkpoints', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the checkpoint thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.check_interval)
+    
+    def _run(self):
+        """Create due checkpoints every check interval until stopped.
+        
+        A run is skipped while another process holds the checkpoint lock.
+        """
+        while True:
+            try:
+                with self.app.app_context():
+                    try:
+                        with advisory_lock('scene_checkpoints') as acquired:
+                            if acquired:
+                                self.ensure_checkpoints()
+                    finally:
+                        db.session.remove()
+            except Exception as e:
+                logger.error(f"Error creating scene checkpoints: {str(e)}")
+            if self._stop.wait(self.check_interval):
+                return
+    
+    def stats(self):
+        """Get checkpoint counters."""
+        with self._lock:
+            cached = len(self._decoded)
+        return {
+            'interval': self.interval,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'checkpoints_created': self.checkpoints_created,
+            'replays': self.replays,
+            'cached_states': cached
+        }
+
+def init_scene_checkpoints(app):
+    """Initialize scene checkpoints for Flask app.
+    
+    If enabled, the thread starts with the first request the app serves,
+    so scripts and shells that only create the app never run it.
+    """
+    app.scene_checkpoints = SceneCheckpointManager(
+        app,
+        interval=app.config.get('SCENE_CHECKPOINT_INTERVAL', 900.0),
+        mutable_horizon=app.config.get('HISTORY_CACHE_MUTABLE_HORIZON', 300.0),
+        max_backfill=app.config.get('SCENE_CHECKPOINT_MAX_BACKFILL', 96),
+        check_interval=app.config.get('SCENE_CHECKPOINT_CHECK_INTERVAL', 60.0),
+        retention=app.config.get('SCENE_CHECKPOINT_RETENTION', 0.0),
+        cache_size=app.config.get('SCENE_CHECKPOINT_CACHE_SIZE', 4),
+        build_window=app.config.get('SCENE_CHECKPOINT_BUILD_WINDOW', 86400.0)
+    )
+    if app.config.get('SCENE_CHECKPOINT_ENABLED', False) and not app.config.get('TESTING'):
+        @app.before_request
+        def start_scene_checkpoints():
+            app.scene_checkpoints.start()
+    return app.scene_checkpoints
+
+def get_scene_checkpoints():
+    """Get the scene checkpoint manager of the current app."""
+    if not has_app_context():
+        return None
+    return getattr(current_app, 'scene_checkpoints', None)
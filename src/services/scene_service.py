@@ -0,0 +1,159 @@
+"""
+Full-scene export.
+Streams every object with its coordinates, encoding rows as they arrive
+from a server-side cursor so memory use does not grow with the size of the
+productline. Past scenes are replayed from the nearest scene checkpoint.
+"""
+
+import json
+from datetime import datetime
+from src.models.productline_object import ProductlineObject
+from src.services.data_service import DataService
+from src.services.history_service import HistoryService
+from src.services.scene_replay import SceneCheckpointManager, get_scene_checkpoints
+from src.services.wire_format import (
+    FLAG_ERROR, FLAG_FINAL, encode_msgpack, model_row, pack_frame
+)
+from src.app_logging import get_logger
+
+logger = get_logger(__name__)
+
+def _encode(value):
+    """Encode a value as compact JSON."""
+    return json.dumps(value, separators=(',', ':'))
+
+def scene_record(obj, coords, state=None):
+    """Build an object response from its coordinates or a replayed history state."""
+    if state is None:
+        return DataService.build_response(obj, coords)
+    return HistoryService.build_response(obj, state)
+
+class JsonSceneEncoder:
+    """Encodes the scene as one JSON document.
+    
+    The document is {"generated_at", "status", "objects": [...], "count"}.
+    """
+    
+    def header(self, meta):
+        return _encode(meta)[:-1] + ',"objects":['
+    
+    def objects(self, rows, first):
+        chunk = ','.join(_encode(scene_record(*row)) for row in rows)
+        return chunk if first else ',' + chunk
+    
+    def trailer(self, count, error=None):
+        if error is None:
+            return f'],"count":{count}}}'
+        return f'],"count":{count},"error":{_encode(error)}}}'
+
+class MsgpackSceneEncoder:
+    """Encodes the scene as a stream of MessagePack values.
+    
+    The stream is a header map, one array of objects per chunk, and a
+    trailer map holding "count" and, if the stream failed, "error".
+    """
+    
+    def header(self, meta):
+        return encode_msgpack(meta)
+    
+    def objects(self, rows, first):
+        return encode_msgpack([scene_record(*row) for row in rows])
+    
+    def trailer(self, count, error=None):
+        trailer = {'count': count}
+        if error is not None:
+            trailer['error'] = error
+        return encode_msgpack(trailer)
+
+class PackedSceneEncoder:
+    """Encodes the scene as packed coordinate frames.
+    
+    Each chunk is one frame. An empty frame flagged FLAG_FINAL ends the
+    stream, with FLAG_ERROR also set if the stream failed.
+    """
+    
+    def header(self, meta):
+        return b''
+    
+    def objects(self, rows, first):
+        return pack_frame(
+            [obj.id for obj, coords, state in rows],
+            [model_row(coords if state is None else state) for obj, coords, state in rows],
+            flags=0
+        )
+    
+    def trailer(self, count, error=None):
+        return pack_frame([], [], flags=FLAG_FINAL | (FLAG_ERROR if error else 0))
+
+SCENE_ENCODERS = {
+    'json': JsonSceneEncoder,
+    'msgpack': MsgpackSceneEncoder,
+    'packed': PackedSceneEncoder
+}
+
+class SceneService:
+    """Service for streaming the full productline scene."""
+    
+    def __init__(self, checkpoints=None):
+        self.checkpoints = checkpoints
+    
+    def stream_scene(self, status=None, batch_size=1000, chunk_size=100, wire_format='json',
+                     timestamp=None):
+        """Yield the scene as chunks in the given wire format.
+        
+        Objects are encoded `chunk_size` at a time, so the first chunk is
+        sent before the query has finished. Errors after streaming started
+        cannot change the response status, so they are logged and reported
+        in the trailer.
+        
+        With a naive UTC `timestamp`, each object is sent in its latest
+        history state at that moment, replayed from the nearest scene
+        checkpoint, and the status filter applies to that state. Objects
+        without history by then are sent with their current data.
+        """
+        encoder = SCENE_ENCODERS[wire_format]()
+        meta = {
+            'generated_at': datetime.utcnow().isoformat() + 'Z',
+            'status': status
+        }
+        if timestamp is not None:
+            meta['timestamp'] = timestamp.isoformat() + 'Z'
+        header = encoder.header(meta)
+        if header:
+            yield header
+        
+        count = 0
+        try:
+            states = {}
+            if timestamp is not None:
+                checkpoints = self.checkpoints or get_scene_checkpoints() or SceneCheckpointManager()
+                states, checkpoint = checkpoints.state_at(timestamp)
+                logger.info(f"Replayed {len(states)} object states at {timestamp} "
+                            f"from checkpoint {checkpoint}")
+            
+            # Past statuses are only known after replay, so filter them here
+            replay_filter = status if timestamp is not None else None
+            chunk = []
+            for obj, coords in ProductlineObject.iter_with_coordinates(
+                    None if replay_filter else status, batch_size):
+                state = states.get(obj.id)
+                if replay_filter and ((state and state.status) or obj.status) != replay_filter:
+                    continue
+                chunk.append((obj, coords, state))
+                if len(chunk) >= chunk_size:
+                    yield encoder.objects(chunk, first=not count)
+                    count += len(chunk)
+                    chunk = []
+            if chunk:
+                yield encoder.objects(chunk, first=not count)
+                count += len(chunk)
+            
+            logger.info(f"Streamed scene with {count} objects")
+            yield encoder.trailer(count)
+            
+        except Exception as e:
+            logger.error(f"Error streaming scene after {count} objects: {str(e)}")
+            yield encoder.trailer(count, error={
+                'code': 'INTERNAL_ERROR',
+                'message': 'Scene stream was interrupted'
+            })
@@ -0,0 +1,213 @@
+"""
+In-memory spatial index over object positions.
+Buckets positions into a uniform 3D grid so box and nearest-neighbour
+queries only look at the cells they overlap, and provides a vectorized
+neighbour search over packed position arrays.
+"""
+
+import heapq
+import math
+import threading
+import numpy as np
+
+def knn_search(positions, origin, k=None, radius=None, exclude_row=None):
+    """Find the k rows of a packed (N, 3) position array nearest to a point.
+    
+    Distances for all rows are computed in one vectorized pass. When a
+    radius is given, rows farther away are dropped before selecting. The
+    top-k is selected with a partial sort, so only the k winners are fully
+    ordered. Returns (rows, distances) sorted by distance.
+    """
+    if len(positions) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0)
+    
+    deltas = positions - np.asarray(origin, dtype=positions.dtype)
+    squared = np.einsum('ij,ij->i', deltas, deltas)
+    
+    rows = np.arange(len(positions))
+    if exclude_row is not None:
+        keep = rows != exclude_row
+        rows, squared = rows[keep], squared[keep]
+    if radius is not None:
+        keep = squared <= radius * radius
+        rows, squared = rows[keep], squared[keep]
+    
+    if k is not None and k < len(rows):
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        nearest = np.argpartition(squared, k - 1)[:k]
+        rows, squared = rows[nearest], squared[nearest]
+    
+    order = np.lexsort((rows, squared))
+    return rows[order], np.sqrt(squared[order])
+
+class UniformGridIndex:
+    """Uniform grid of cubic cells mapping positions to object IDs."""
+    
+    def __init__(self, cell_size=10.0):
+        if cell_size <= 0:
+            raise ValueError("Cell size must be positive")
+        
+        self.cell_size = float(cell_size)
+        self._positions = {}
+        self._cells = {}
+        self._bounds = None  # occupied cell range, only ever grows until clear()
+        self._lock = threading.RLock()
+    
+    def __len__(self):
+        return len(self._positions)
+    
+    def __contains__(self, object_id):
+        return object_id in self._positions
+    
+    def _cell_of(self, x, y, z):
+        """Get the cell coordinates containing a position."""
+        size = self.cell_size
+        return (math.floor(x / size), math.floor(y / size), math.floor(z / size))
+    
+    def upsert(self, object_id, x, y, z):
+        """Insert an object or move it to a new position."""
+        with self._lock:
+            self.remove(object_id)
+            cell = self._cell_of(x, y, z)
+            self._positions[object_id] = (x, y, z, cell)
+            self._cells.setdefault(cell, set()).add(object_id)
+            
+            if self._bounds is None:
+                self._bounds = (cell, cell)
+            else:
+                lo, hi = self._bounds
+                self._bounds = (tuple(map(min, lo, cell)), tuple(map(max, hi, cell)))
+    
+    def remove(self, object_id):
+        """Remove an object if it is indexed."""
+        with self._lock:
+            entry = self._positions.pop(object_id, None)
+            if entry is None:
+                return
+            members = self._cells.get(entry[3])
+            members.discard(object_id)
+            if not members:
+                del self._cells[entry[3]]
+    
+    def clear(self):
+        """Remove all objects."""
+        with self._lock:
+            self._positions.clear()
+            self._cells.clear()
+            self._bounds = None
+    
+    def get(self, object_id):
+        """Get the indexed position of an object as (x, y, z), or None."""
+        entry = self._positions.get(object_id)
+        return entry[:3] if entry else None
+    
+    def query_box(self, min_x, min_y, min_z, max_x, max_y, max_z, limit=None):
+        """Find objects inside an axis-aligned box (bounds inclusive).
+        
+        Returns a list of (object_id, x, y, z) tuples.
+        """
+        with self._lock:
+            lo = self._cell_of(min_x, min_y, min_z)
+            hi = self._cell_of(max_x, max_y, max_z)
+            cell_count = (hi[0] - lo[0] + 1) * (hi[1] - lo[1] + 1) * (hi[2] - lo[2] + 1)
+            
+            # Walk the overlapped cells, or the occupied ones if there are fewer
+            if cell_count <= len(self._cells):
+                cells = (
+                    (i, j, k)
+                    for i in range(lo[0], hi[0] + 1)
+                    for j in range(lo[1], hi[1] + 1)
+                    for k in range(lo[2], hi[2] + 1)
+                )
+            else:
+                cells = (
+                    cell for cell in self._cells
+                    if lo[0] <= cell[0] <= hi[0]
+                    and lo[1] <= cell[1] <= hi[1]
+                    and lo[2] <= cell[2] <= hi[2]
+                )
+            
+            results = []
+            for cell in cells:
+                for object_id in self._cells.get(cell, ()):
+                    x, y, z, _ = self._positions[object_id]
+                    if (min_x <= x <= max_x and min_y <= y <= max_y
+                            and min_z <= z <= max_z):
+                        results.append((object_id, x, y, z))
+                        if limit is not None and len(results) >= limit:
+                            return results
+            return results
+    
+    def _shell(self, center, radius):
+        """Yield the cells at Chebyshev distance `radius` from a cell."""
+        ci, cj, ck = center
+        if radius == 0:
+            yield center
+            return
+        for i in range(ci - radius, ci + radius + 1):
+            for j in range(cj - radius, cj + radius + 1):
+                if abs(i - ci) == radius or abs(j - cj) == radius:
+                    for k in range(ck - radius, ck + radius + 1):
+                        yield (i, j, k)
+                else:
+                    yield (i, j, ck - radius)
+                    yield (i, j, ck + radius)
+    
+    def nearest(self, x, y, z, n=1, max_distance=None, exclude=None):
+        """Find the n objects nearest to a point.
+        
+        Searches outward one shell of cells at a time and stops once no
+        unvisited cell can hold a closer object. Returns a list of
+        (object_id, x, y, z, distance) tuples sorted by distance.
+        """
+        with self._lock:
+            if n < 1 or not self._positions:
+                return []
+            
+            center = self._cell_of(x, y, z)
+            best = []  # max-heap of (-distance, object_id)
+            
+            def visit(cell):
+                for object_id in self._cells.get(cell, ()):
+                    if exclude is not None and object_id in exclude:
+                        continue
+                    px, py, pz, _ = self._positions[object_id]
+                    distance = math.sqrt((px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2)
+                    if max_distance is not None and distance > max_distance:
+                        continue
+                    if len(best) < n:
+                        heapq.heappush(best, (-distance, object_id))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, object_id))
+            
+            def chebyshev(cell):
+                return max(abs(cell[0] - center[0]), abs(cell[1] - center[1]),
+                           abs(cell[2] - center[2]))
+            
+            lo, hi = self._bounds
+            max_radius = max(max(abs(l - c), abs(h - c)) for l, h, c in zip(lo, hi, center))
+            for radius in range(max_radius + 1):
+                # Every object in an unvisited cell is at least this far away
+                reach = (radius - 1) * self.cell_size if radius else 0.0
+                if len(best) == n and -best[0][0] <= reach:
+                    break
+                if max_distance is not None and reach > max_distance:
+                    break
+                
+                # Once a shell has more cells than are occupied, scan the rest directly
+                shell_size = (2 * radius + 1) ** 3 - (2 * radius - 1) ** 3 if radius else 1
+                if shell_size > len(self._cells):
+                    for cell in list(self._cells):
+                        if chebyshev(cell) >= radius:
+                            visit(cell)
+                    break
+                
+                for cell in self._shell(center, radius):
+                    visit(cell)
+            
+            results = []
+            for neg_distance, object_id in sorted(best, key=lambda item: (-item[0], item[1])):
+                px, py, pz, _ = self._positions[object_id]
+                results.append((object_id, px, py, pz, -neg_distance))
+            return results
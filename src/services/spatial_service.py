@@ -0,0 +1,178 @@
+import threading
+from flask import current_app, has_app_context
+from src.services.coordinate_snapshot import get_coordinate_snapshot
+from src.services.spatial_index import UniformGridIndex, knn_search
+from src.app_logging import get_logger
+
+logger = get_logger(__name__)
+
+class SpatialIndexManager:
+    """Keeps a process-wide spatial index in sync with the coordinate snapshot.
+    
+    On each refresh only the objects the snapshot reports as changed since
+    the last sync are moved in the grid. When the snapshot is replaced by a
+    full reload, the grid is rebuilt from it.
+    """
+    
+    def __init__(self, snapshots, cell_size=10.0):
+        self.snapshots = snapshots
+        self.cell_size = cell_size
+        self._lock = threading.Lock()
+        
+        self.index = UniformGridIndex(cell_size)
+        self._snapshot = None
+        self._version = 0
+    
+    def _rebuild(self, snapshot):
+        """Build a fresh grid from every row of a snapshot."""
+        index = UniformGridIndex(self.cell_size)
+        object_ids, positions, rows = snapshot.positions()
+        for object_id, (x, y, z) in zip(object_ids, positions.tolist()):
+            index.upsert(object_id, x, y, z)
+        self.index = index
+        logger.info(f"Spatial index rebuilt with {len(index)} objects")
+    
+    def refresh(self):
+        """Refresh the snapshot and apply its changes to the grid."""
+        snapshot = self.snapshots.refresh()
+        with self._lock, snapshot.lock:
+            if snapshot is not self._snapshot:
+                self._rebuild(snapshot)
+            elif snapshot.version != self._version:
+                changes = snapshot.changed_since(self._version)
+                if changes is None:
+                    self._rebuild(snapshot)
+                else:
+                    changed, removed = changes
+                    for object_id in removed:
+                        self.index.remove(object_id)
+                    for object_id in changed:
+                        row = snapshot.rows[object_id]
+                        self.index.upsert(
+                            object_id,
+                            float(snapshot.columns['position_x'][row]),
+                            float(snapshot.columns['position_y'][row]),
+                            float(snapshot.columns['position_z'][row])
+                        )
+            self._snapshot = snapshot
+            self._version = snapshot.version
+        
+        return self.index
+    
+    def stats(self):
+        """Get index counters."""
+        return {
+            'objects': len(self.index),
+            'cell_size': self.cell_size,
+            'snapshot_version': self._version
+        }
+
+def init_spatial_index(app):
+    """Initialize the spatial index manager for Flask app."""
+    app.spatial_index = SpatialIndexManager(
+        app.coordinate_snapshot,
+        cell_size=app.config.get('SPATIAL_INDEX_CELL_SIZE', 10.0)
+    )
+    return app.spatial_index
+
+def get_spatial_index():
+    """Get the spatial index manager of the current app."""
+    if not has_app_context():
+        return None
+    return getattr(current_app, 'spatial_index', None)
+
+class SpatialService:
+    """Service for spatial queries over current object positions."""
+    
+    def _index(self):
+        manager = get_spatial_index()
+        if manager is None:
+            raise RuntimeError("Spatial index is not initialized")
+        return manager.refresh()
+    
+    def find_in_box(self, bbox, limit=None):
+        """Find objects whose position lies inside a bounding box."""
+        try:
+            min_x, min_y, min_z, max_x, max_y, max_z = bbox
+            matches = self._index().query_box(min_x, min_y, min_z, max_x, max_y, max_z, limit=limit)
+            
+            objects = [
+                {'object_id': object_id, 'position': {'x': x, 'y': y, 'z': z}}
+                for object_id, x, y, z in matches
+            ]
+            
+            logger.info(f"Spatial box query matched {len(objects)} objects")
+            return objects
+            
+        except Exception as e:
+            logger.error(f"Error running spatial box query: {str(e)}")
+            raise
+    
+    def find_nearest(self, point, n=10, max_distance=None):
+        """Find the n objects nearest to a point."""
+        try:
+            x, y, z = point
+            matches = self._index().nearest(x, y, z, n=n, max_distance=max_distance)
+            
+            objects = [
+                {
+                    'object_id': object_id,
+                    'position': {'x': px, 'y': py, 'z': pz},
+                    'distance': distance
+                }
+                for object_id, px, py, pz, distance in matches
+            ]
+            
+            logger.info(f"Spatial nearest query returned {len(objects)} objects")
+            return objects
+            
+        except Exception as e:
+            logger.error(f"Error running spatial nearest query: {str(e)}")
+            raise
+    
+    def find_neighbors(self, object_id, k=10, radius=None):
+        """Find the k objects nearest to an object, optionally within a radius.
+        
+        Distances are computed over the packed positions of the coordinate
+        snapshot in one vectorized pass. Returns None if the object has no
+        coordinates.
+        """
+        try:
+            manager = get_coordinate_snapshot()
+            if manager is None:
+                raise RuntimeError("Coordinate snapshot is not initialized")
+            
+            object_ids, positions, rows = manager.refresh().positions()
+            row = rows.get(object_id)
+            if row is None:
+                logger.warning(f"Object not in coordinate snapshot: {object_id}")
+                return None
+            
+            found, distances = knn_search(positions, positions[row], k=k, radius=radius,
+                                          exclude_row=row)
+            origin = positions[row].tolist()
+            
+            response = {
+                'object_id': object_id,
+                'position': {'x': origin[0], 'y': origin[1], 'z': origin[2]},
+                'k': k,
+                'radius': radius,
+                'count': len(found),
+                'neighbors': [
+                    {
+                        'object_id': object_ids[neighbor_row],
+                        'position': {'x': x, 'y': y, 'z': z},
+                        'distance': distance
+                    }
+                    for neighbor_row, (x, y, z), distance in zip(
+                        found.tolist(), positions[found].tolist(), distances.tolist()
+                    )
+                ]
+            }
+            
+            logger.info(f"Found {len(found)} neighbors for {object_id}")
+            return response
+            
+        except Exception as e:
+            logger.error(f"Error finding neighbors for {object_id}: {str(e)}")
+            raise
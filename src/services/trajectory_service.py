@@ -0,0 +1,158 @@
+"""
+Trajectory retrieval over object history.
+Serves an object's movement over a time range either as keyset-paginated
+pages of raw history or downsampled to a bounded number of points. Rows
+older than the end of the cold history archive are read from its day
+files, newer ones from the database.
+"""
+
+from itertools import chain, islice
+
+import numpy as np
+from src.models.productline_object import ProductlineObject
+from src.models.object_history import ObjectHistory
+from src.services.change_service import InvalidCursorError, decode_cursor, encode_cursor
+from src.services.coordinate_snapshot import to_epoch_seconds
+from src.services.downsampling import BucketReducer, rdp_select
+from src.services.history_archive import get_history_archive
+from src.services.samples import parse_timestamp, to_utc_naive
+from src.app_logging import get_logger
+
+logger = get_logger(__name__)
+
+DOWNSAMPLE_MODES = ('bucket', 'rdp')
+
+def point_from_row(row):
+    """Build a trajectory point from an ObjectHistory trajectory row."""
+    return {
+        'timestamp': row[1].isoformat() + 'Z',
+        'position': {'x': row[2], 'y': row[3], 'z': row[4]},
+        'height': row[5],
+        'direction': {'x': row[6], 'y': row[7], 'z': row[8]},
+        'rotation': row[9],
+        'status': row[10]
+    }
+
+class TrajectoryService:
+    """Service for retrieving object trajectories."""
+    
+    def __init__(self, batch_size=5000, rdp_max_input=50000, archive=None):
+        self.batch_size = batch_size
+        self.rdp_max_input = rdp_max_input
+        self.archive = archive or get_history_archive()
+    
+    def _archived_until(self, start):
+        """Get the end of the archive if the range starting at `start` overlaps it, else None."""
+        until = self.archive.archived_until() if self.archive is not None else None
+        if until is None or (start is not None and start >= until):
+            return None
+        return until
+    
+    @staticmethod
+    def _database_start(start, until):
+        """Get the start of the range left to the database after the archive."""
+        if until is None:
+            return start
+        return until if start is None else max(start, until)
+    
+    def get_trajectory(self, object_id, start=None, end=None, cursor=None, limit=1000,
+                       downsample=None, max_points=1000, tolerance=0.0):
+        """Get an object's trajectory between two timestamps.
+        
+        Without downsampling, returns one page of `limit` points and a
+        cursor for the next page. With 'bucket', the range is split into
+        `max_points` equal intervals and the last point of each is kept.
+        With 'rdp', the path is simplified to at most `max_points` points,
+        dropping points that deviate no more than `tolerance` from it; long
+        ranges are first bucketed to `rdp_max_input` points. Returns None if
+        the object does not exist.
+        """
+        try:
+            if not ProductlineObject.find_by_id(object_id):
+                logger.warning(f"Object not found: {object_id}")
+                return None
+            
+            start = to_utc_naive(parse_timestamp(start)) if start else None
+            end = to_utc_naive(parse_timestamp(end)) if end else None
+            
+            result = {'object_id': object_id, 'downsample': downsample}
+            if downsample is None:
+                rows, cursor, has_more = self._page(object_id, start, end, cursor, limit)
+                result.update({'cursor': cursor, 'has_more': has_more})
+            else:
+                rows, scanned = self._downsample(
+                    object_id, start, end, downsample, max_points, tolerance
+                )
+                result['source_points'] = scanned
+            
+            result.update({
+                'start': start.isoformat() + 'Z' if start else None,
+                'end': end.isoformat() + 'Z' if end else None,
+                'count': len(rows),
+                'points': [point_from_row(row) for row in rows]
+            })
+            
+            logger.info(f"Retrieved trajectory of {object_id} with {len(rows)} points")
+            return result
+            
+        except InvalidCursorError:
+            raise
+        except Exception as e:
+            logger.error(f"Error retrieving trajectory of {object_id}: {str(e)}")
+            raise
+    
+    def _page(self, object_id, start, end, cursor, limit):
+        """Fetch one keyset page, returning (rows, next_cursor, has_more)."""
+        after = None
+        if cursor:
+            timestamp, row_id = decode_cursor(cursor)
+            try:
+                after = (timestamp, int(row_id))
+            except ValueError as e:
+                raise InvalidCursorError(f"Invalid trajectory cursor: {cursor}") from e
+        
+        # Fetch one extra row to know whether more remain, archived rows first
+        rows = []
+        until = self._archived_until(start)
+        if until is not None and (after is None or after[0] < until):
+            rows = list(islice(self.archive.iter_trajectory(object_id, start, end, after), limit + 1))
+        if len(rows) <= limit and (until is None or end is None or end >= until):
+            rows += ObjectHistory.find_trajectory_page(
+                object_id, self._database_start(start, until), end, after, limit + 1 - len(rows)
+            )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], str(rows[-1][0])) if has_more else None
+        return rows, next_cursor, has_more
+    
+    def _downsample(self, object_id, start, end, mode, max_points, tolerance):
+        """Stream the range through a bucket reducer, returning (rows, scanned)."""
+        if start is None or end is None:
+            first, last = ObjectHistory.find_time_bounds(object_id)
+            if self.archive is not None:
+                archived_first, archived_last = self.archive.find_time_bounds(object_id)
+                first = archived_first or first
+                last = last or archived_last
+            start = start or first
+            end = end or last
+        if start is None or end is None or start > end:
+            return [], 0
+        
+        until = self._archived_until(start)
+        rows = ObjectHistory.iter_trajectory(
+            object_id, self._database_start(start, until), end, self.batch_size
+        )
+        if until is not None:
+            rows = chain(self.archive.iter_trajectory(object_id, start, end), rows)
+        
+        buckets = max_points if mode == 'bucket' else self.rdp_max_input
+        reducer = BucketReducer(to_epoch_seconds(start), to_epoch_seconds(end), buckets)
+        for row in rows:
+            reducer.add(to_epoch_seconds(row[1]), row)
+        rows = reducer.rows()
+        
+        if mode == 'rdp' and rows:
+            positions = np.array([row[2:5] for row in rows], dtype=float)
+            rows = [rows[i] for i in rdp_select(positions, max_points, tolerance)]
+        
+        return rows, reducer.scanned
@@ -0,0 +1,176 @@
+import math
+import re
+from datetime import datetime
+import numpy as np
+from src.models.productline_object import ProductlineObject
+from src.services.interpolation import INTERPOLATION_MODES
+from src.app_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Object statuses, as declared by the model's status column
+STATUSES = tuple(ProductlineObject.__table__.c.status.type.enums)
+
+def validate_object_id(object_id):
+    """Validate object ID format."""
+    if not object_id or not isinstance(object_id, str):
+        return False
+    
+    # Check length (1-100 characters)
+    if len(object_id) < 1 or len(object_id) > 100:
+        return False
+    
+    # Check for valid characters (alphanumeric and underscore)
+    if not re.match(r'^[a-zA-Z0-9_]+$', object_id):
+        return False
+    
+    return True
+
+def validate_timestamp(timestamp):
+    """Validate timestamp format."""
+    if not timestamp:
+        return True  # Optional parameter
+    
+    try:
+        # Try to parse ISO 8601 format
+        datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        return True
+    except ValueError:
+        try:
+            # Try to parse Unix timestamp
+            datetime.fromtimestamp(float(timestamp))
+            return True
+        except (ValueError, TypeError):
+            return False
+
+def validate_batch_request(data):
+    """Validate batch request data."""
+    if not isinstance(data, dict):
+        return False
+    
+    # Check for required object_ids
+    if 'object_ids' not in data:
+        return False
+    
+    object_ids = data.get('object_ids', [])
+    if not isinstance(object_ids, list):
+        return False
+    
+    # Check array size (max 50 objects)
+    if len(object_ids) > 50:
+        return False
+    
+    # Validate each object ID
+    for object_id in object_ids:
+        if not validate_object_id(object_id):
+            return False
+    
+    # Validate optional timestamp
+    if 'timestamp' in data:
+        if not validate_timestamp(data['timestamp']):
+            return False
+    
+    # Validate optional interpolation, which needs a timestamp
+    if data.get('interpolate') is not None:
+        if not data.get('timestamp') or not validate_interpolation(data['interpolate']):
+            return False
+    
+    return True
+
+def validate_interpolation(mode):
+    """Validate an interpolation mode."""
+    return mode in INTERPOLATION_MODES
+
+def validate_status(status):
+    """Validate an object status filter."""
+    return status in STATUSES
+
+def validate_coordinates(coords):
+    """Validate coordinate data."""
+    if not isinstance(coords, dict):
+        return False
+    
+    required_fields = ['position', 'height', 'direction', 'rotation']
+    for field in required_fields:
+        if field not in coords:
+            return False
+    
+    # Validate position
+    position = coords.get('position', {})
+    if not isinstance(position, dict):
+        return False
+    
+    for axis in ['x', 'y', 'z']:
+        if axis not in position or not isinstance(position[axis], (int, float)):
+            return False
+    
+    # Validate height
+    height = coords.get('height')
+    if not isinstance(height, (int, float)) or height < 0:
+        return False
+    
+    # Validate direction
+    direction = coords.get('direction', {})
+    if not isinstance(direction, dict):
+        return False
+    
+    for axis in ['x', 'y', 'z']:
+        if axis not in direction or not isinstance(direction[axis], (int, float)):
+            return False
+    
+    # Validate rotation
+    rotation = coords.get('rotation')
+    if not isinstance(rotation, (int, float)) or rotation < 0 or rotation > 360:
+        return False
+    
+    return True
+
+def validate_coordinates_array(values):
+    """Validate rows of coordinate values at once, returning a boolean mask.
+    
+    Each row is (position_x, position_y, position_z, height, direction_x,
+    direction_y, direction_z, rotation), with NaN for missing values. Rows
+    pass under the same rules as validate_coordinates: every value present
+    and finite, height not negative and rotation within [0, 360].
+    """
+    values = np.asarray(values, dtype=float).reshape(-1, 8)
+    valid = np.isfinite(values).all(axis=1)
+    with np.errstate(invalid='ignore'):
+        valid &= values[:, 3] >= 0
+        valid &= (values[:, 7] >= 0) & (values[:, 7] <= 360)
+    return valid
+
+def parse_float_list(value, count):
+    """Parse a comma-separated list of exactly `count` finite numbers."""
+    if not value or not isinstance(value, str):
+        return None
+    
+    parts = value.split(',')
+    if len(parts) != count:
+        return None
+    
+    try:
+        numbers = tuple(float(part) for part in parts)
+    except ValueError:
+        return None
+    
+    if not all(math.isfinite(number) for number in numbers):
+        return None
+    
+    return numbers
+
+def parse_bbox(value):
+    """Parse a 'min_x,min_y,min_z,max_x,max_y,max_z' bounding box."""
+    bbox = parse_float_list(value, 6)
+    if bbox is None:
+        return None
+    
+    # Minimum corner must not exceed maximum corner
+    if bbox[0] > bbox[3] or bbox[1] > bbox[4] or bbox[2] > bbox[5]:
+        return None
+    
+    return bbox
+
+def parse_point(value):
+    """Parse an 'x,y,z' point."""
+    return parse_float_list(value, 3)
@@ -0,0 +1,167 @@
+"""
+Binary wire formats for object coordinates.
+Besides JSON, responses can be encoded as MessagePack or as packed frames of
+little-endian float32 records that clients can copy straight into memory.
+
+A packed frame is a 16-byte header followed by `count` records of
+`fields` float32 values and then the ID table:
+    
+    magic     4s   b'PLC1'
+    version   u8
+    flags     u8   FLAG_FINAL, FLAG_ERROR
+    fields    u16  float32 values per record
+    count     u32  number of records
+    ids_size  u32  size of the ID table in bytes
+
+Record values follow PACKED_FIELDS, with a missing rotation sent as NaN.
+The ID table holds one u16 length and UTF-8 bytes per record, in record
+order, and is zero-padded to a multiple of 4 bytes that `ids_size` does not
+count. Every frame is then a multiple of 4 bytes long, so the float block of
+each frame in a stream is 4-byte aligned.
+
+An error frame has FLAG_ERROR set and no float block (`fields` is 0). Its
+`count` entries each hold an object ID then an error code in the ID table.
+A stream that failed ends with an error frame without entries.
+"""
+
+import struct
+import msgpack
+import numpy as np
+from src.services.coordinate_snapshot import SNAPSHOT_COLUMNS
+
+MIMETYPES = {
+    'json': 'application/json',
+    'msgpack': 'application/msgpack',
+    'packed': 'application/vnd.productline.packed'
+}
+
+PACKED_MAGIC = b'PLC1'
+PACKED_VERSION = 2
+PACKED_FIELDS = SNAPSHOT_COLUMNS
+PACKED_HEADER = struct.Struct('<4sBBHII')
+
+FLAG_FINAL = 1
+FLAG_ERROR = 2
+
+_ID_LENGTH = struct.Struct('<H')
+_NAN = float('nan')
+
+def negotiate_format(accept_mimetypes):
+    """Pick the wire format for a request's Accept header, preferring JSON."""
+    best = accept_mimetypes.best_match(
+        [MIMETYPES['json'], MIMETYPES['msgpack'], 'application/x-msgpack', MIMETYPES['packed']],
+        default=MIMETYPES['json']
+    )
+    if best == MIMETYPES['packed']:
+        return 'packed'
+    if best in (MIMETYPES['msgpack'], 'application/x-msgpack'):
+        return 'msgpack'
+    return 'json'
+
+def coordinates_row(coordinates):
+    """Flatten a response coordinates dict into a packed record."""
+    position = coordinates['position']
+    direction = coordinates['direction']
+    rotation = coordinates.get('rotation')
+    return (
+        position['x'], position['y'], position['z'],
+        coordinates['height'],
+        direction['x'], direction['y'], direction['z'],
+        _NAN if rotation is None else rotation
+    )
+
+def model_row(coords):
+    """Flatten a Coordinates model or history record into a packed record.
+    
+    Missing values are sent as NaN, and defaults are used if coords is None.
+    """
+    if coords is None:
+        return (0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0)
+    return tuple(_NAN if value is None else value
+                 for value in (getattr(coords, name) for name in PACKED_FIELDS))
+
+def _padding(size):
+    """Get the zero bytes that pad `size` bytes to a multiple of 4."""
+    return b'\x00' * (-size % 4)
+
+def _pack_strings(strings):
+    """Encode strings as an ID table, each a u16 length and UTF-8 bytes."""
+    return b''.join(
+        _ID_LENGTH.pack(len(encoded)) + encoded
+        for encoded in (string.encode('utf-8') for string in strings)
+    )
+
+def pack_frame(object_ids, rows, flags=FLAG_FINAL):
+    """Encode records and their object IDs as one packed frame."""
+    values = np.asarray(rows, dtype='<f4').reshape(len(rows), len(PACKED_FIELDS))
+    ids = _pack_strings(object_ids)
+    header = PACKED_HEADER.pack(
+        PACKED_MAGIC, PACKED_VERSION, flags, len(PACKED_FIELDS), len(object_ids), len(ids)
+    )
+    return header + values.tobytes() + ids + _padding(len(ids))
+
+def pack_error_frame(errors, flags=FLAG_FINAL):
+    """Encode per-object errors, dicts with "object_id" and "code", as one error frame."""
+    ids = _pack_strings(
+        string for error in errors for string in (error['object_id'] or '', error['code'])
+    )
+    header = PACKED_HEADER.pack(
+        PACKED_MAGIC, PACKED_VERSION, flags | FLAG_ERROR, 0, len(errors), len(ids)
+    )
+    return header + ids + _padding(len(ids))
+
+def unpack_frame(data, offset=0):
+    """Decode one packed frame starting at `offset`.
+    
+    Returns (object_ids, values, flags, next_offset), with values as an
+    (N, fields) float32 array. For an error frame, object_ids holds
+    (object_id, code) pairs and values has no columns.
+    """
+    magic, version, flags, fields, count, ids_size = PACKED_HEADER.unpack_from(data, offset)
+    if magic != PACKED_MAGIC or version != PACKED_VERSION:
+        raise ValueError("Not a packed coordinates frame")
+    
+    offset += PACKED_HEADER.size
+    values = np.frombuffer(data, dtype='<f4', count=count * fields, offset=offset)
+    offset += count * fields * 4
+    
+    object_ids = []
+    end = offset + ids_size
+    while offset < end:
+        (length,) = _ID_LENGTH.unpack_from(data, offset)
+        offset += _ID_LENGTH.size
+        object_ids.append(bytes(data[offset:offset + length]).decode('utf-8'))
+        offset += length
+    
+    if flags & FLAG_ERROR and not fields:
+        object_ids = list(zip(object_ids[0::2], object_ids[1::2]))
+    return object_ids, values.reshape(count, fields), flags, end + (-ids_size % 4)
+
+def encode_msgpack(payload):
+    """Encode a response payload as MessagePack."""
+    return msgpack.packb(payload, use_bin_type=True)
+
+def decode_msgpack(data):
+    """Decode a MessagePack request body."""
+    return msgpack.unpackb(data, raw=False)
+
+def encode_body(payload, objects, wire_format):
+    """Encode a response body in a binary wire format.
+    
+    MessagePack carries the whole payload. Packed frames carry only the
+    coordinates of `objects`, the object responses in the payload, followed
+    by an error frame if the payload has "errors".
+    """
+    if wire_format == 'msgpack':
+        return encode_msgpack(payload)
+    if wire_format == 'packed':
+        errors = payload.get('errors') or []
+        body = pack_frame(
+            [obj['object_id'] for obj in objects],
+            [coordinates_row(obj['coordinates']) for obj in objects],
+            flags=0 if errors else FLAG_FINAL
+        )
+        if errors:
+            body += pack_error_frame(errors)
+        return body
+    raise ValueError(f"Unknown wire format: {wire_format}")
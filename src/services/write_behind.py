@@ -0,0 +1,452 @@
+"""
+Write-behind queue for bulk writes.
+Bulk history samples and coordinate updates are accepted into a bounded
+in-memory queue and written by a background flusher in batches, so writers
+do not wait on database commits. Batches that keep failing, and requests
+that do not fit in the queue, are appended to a local spill file and
+replayed once the database keeps up again. Spilled writes are delivered at
+least once; writes still in memory are lost if the process is killed.
+
+Worker processes share the spill file: appends hold an exclusive file
+lock, and only the process holding the replay lock replays, taking over
+when that process exits.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy.exc import SQLAlchemyError
+from src.database import db
+from src.services.ingest_service import HistoryIngestService
+from src.services.coordinate_write_service import CoordinateWriteService
+from src.app_logging import get_logger
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = get_logger(__name__)
+
+def write_history(samples, replace=False):
+    """Write queued history samples, returning (written, rejects)."""
+    service = HistoryIngestService(
+        chunk_size=current_app.config.get('HISTORY_BULK_CHUNK_SIZE', 1000),
+        mutable_horizon=current_app.config.get('HISTORY_CACHE_MUTABLE_HORIZON', 300.0)
+    )
+    result = service.ingest(samples)
+    return result['inserted'], result['rejects']
+
+def write_coordinates(updates, replace=False):
+    """Write queued coordinate updates, returning (written, rejects)."""
+    service = CoordinateWriteService(
+        coalesce_window=current_app.config.get('COORDINATE_COALESCE_WINDOW', 1.0),
+        mutable_horizon=current_app.config.get('HISTORY_CACHE_MUTABLE_HORIZON', 300.0)
+    )
+    result = service.update_many(updates, replace=replace)
+    return result['updated'], result['rejects']
+
+WRITERS = {
+    'history': write_history,
+    'coordinates': write_coordinates
+}
+
+def percentile(values, fraction):
+    """Get the nearest-rank percentile of a sorted list."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+class WriteBehindQueue:
+    """Bounded queue of pending writes with a batching background flusher.
+    
+    A batch is written once `batch_size` writes are queued or the oldest
+    has waited `flush_interval` seconds. Database errors are retried with
+    exponential backoff up to `max_retries` times before the batch is
+    spilled to `spill_path`.
+    """
+    
+    def __init__(self, app=None, max_size=100000, batch_size=1000, flush_interval=0.5,
+                 max_retries=5, retry_backoff=0.5, max_backoff=30.0, spill_path=None,
+                 writers=None, clock=datetime.utcnow):
+        self.app = app
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.spill_path = spill_path
+        self.writers = writers or WRITERS
+        self._clock = clock
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._spill_lock = threading.Lock()
+        self._replay_offset = 0
+        self._replay_after = 0.0
+        self._replayer = None
+        self._latencies = deque(maxlen=512)
+        self._thread = None
+        self._stop = threading.Event()
+        self.enqueued = 0
+        self.written = 0
+        self.rejected = 0
+        self.retries = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+    
+    @property
+    def replay_path(self):
+        return self.spill_path + '.replay' if self.spill_path else None
+    
+    @property
+    def lock_path(self):
+        return self.spill_path + '.lock' if self.spill_path else None
+    
+    def enqueue(self, kind, items, replace=False):
+        """Queue writes of one kind, spilling them if the queue is full.
+        
+        Coordinate updates without a timestamp are stamped with the time
+        they were accepted. A request is queued or spilled as a whole.
+        Returns {"queued", "spilled"}, both 0 if the request was dropped
+        because the queue is full and there is no spill file.
+        """
+        if kind not in self.writers:
+            raise ValueError(f"Unknown write kind: {kind}")
+        
+        if kind == 'coordinates':
+            accepted_at = self._clock().isoformat() + 'Z'
+            items = [
+                dict(item, timestamp=accepted_at)
+                if isinstance(item, dict) and item.get('timestamp') is None else item
+                for item in items
+            ]
+        
+        now = time.monotonic()
+        entries = [(kind, replace, item, now) for item in items]
+        with self._cond:
+            if len(self._items) + len(entries) <= self.max_size:
+                self._items.extend(entries)
+                self.enqueued += len(entries)
+                if len(self._items) >= self.batch_size:
+                    self._cond.notify()
+                return {'queued': len(entries), 'spilled': 0}
+        
+        if self._spill(entries):
+            return {'queued': 0, 'spilled': len(entries)}
+        return {'queued': 0, 'spilled': 0}
+    
+    def _take(self, wait=True):
+        """Take the next batch once it is due, or [] if the queue stays empty."""
+        with self._cond:
+            waited = False
+            while True:
+                if self._items:
+                    age = time.monotonic() - self._items[0][3]
+                    if (len(self._items) >= self.batch_size or age >= self.flush_interval
+                            or self._stop.is_set() or not wait):
+                        count = min(self.batch_size, len(self._items))
+                        return [self._items.popleft() for _ in range(count)]
+                    timeout = self.flush_interval - age
+                elif waited or self._stop.is_set() or not wait:
+                    return []
+                else:
+                    timeout = self.flush_interval
+                self._cond.wait(timeout)
+                waited = True
+    
+    def flush(self):
+        """Write everything queued now, in the calling thread."""
+        while True:
+            batch = self._take(wait=False)
+            if not batch:
+                return
+            self._flush_batch(batch)
+    
+    def _flush_batch(self, batch):
+        """Write a batch, retrying database errors and spilling what still fails.
+        
+        Returns True if nothing had to be spilled.
+        """
+        started = time.monotonic()
+        pending = []
+        for entry in batch:
+            if pending and pending[-1][0][:2] == entry[:2]:
+                pending[-1].append(entry)
+            else:
+                pending.append([entry])
+        
+        spilled = []
+        for group in pending:
+            spilled.extend(self._write_group(group))
+        
+        self.flushes += 1
+        self._latencies.append((time.monotonic() - started) * 1000)
+        if spilled:
+            self.failed_flushes += 1
+            self._spill(spilled)
+            return False
+        return True
+    
+    def _write_group(self, entries):
+        """Write consecutive entries of one kind, returning the entries left unwritten."""
+        kind, replace = entries[0][:2]
+        attempt = 0
+        while True:
+            try:
+                written, rejects = self._call(self.writers[kind], [e[2] for e in entries], replace)
+                retry = [entries[r['index']] for r in rejects if r['code'] == 'WRITE_ERROR']
+                invalid = [r for r in rejects if r['code'] != 'WRITE_ERROR']
+                self.written += written
+                self.rejected += len(invalid)
+                if invalid:
+                    logger.warning(f"Rejected {len(invalid)} queued {kind} writes, "
+                                   f"first: {invalid[0]['code']} {invalid[0]['error']}")
+            except SQLAlchemyError as e:
+                logger.warning(f"Failed to write {len(entries)} queued {kind} writes: {str(e)}")
+                retry = entries
+            except Exception as e:
+                logger.error(f"Error writing {len(entries)} queued {kind} writes: {str(e)}")
+                self.dropped += len(entries)
+                return []
+            
+            if not retry:
+                return []
+            attempt += 1
+            if attempt > self.max_retries:
+                return retry
+            self.retries += 1
+            delay = min(self.max_backoff, self.retry_backoff * 2 ** (attempt - 1))
+            if self._stop.wait(delay):
+                return retry
+            entries = retry
+    
+    def _call(self, writer, items, replace):
+        """Run a writer inside an app context with a fresh session."""
+        if self.app is None:
+            return writer(items, replace)
+        with self.app.app_context():
+            try:
+                return writer(items, replace)
+            finally:
+                db.session.remove()
+    
+    def _spill(self, entries):
+        """Append entries to the spill file, returning False if there is none."""
+        if not self.spill_path:
+            self.dropped += len(entries)
+            logger.error(f"Dropped {len(entries)} writes, no spill file is configured")
+            return False
+        
+        lines = b''.join(
+            json.dumps({'kind': kind, 'replace': replace, 'item': item}, default=str).encode() + b'\n'
+            for kind, replace, item, _ in entries
+        )
+        try:
+            with self._spill_lock:
+                directory = os.path.dirname(self.spill_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._append(lines)
+        except OSError as e:
+            self.dropped += len(entries)
+            logger.error(f"Dropped {len(entries)} writes, spill file failed: {str(e)}")
+            return False
+        
+        self.spilled += len(entries)
+        logger.warning(f"Spilled {len(entries)} writes to {self.spill_path}")
+        return True
+    
+    def _append(self, lines):
+        """Append lines to the spill file while holding its file lock."""
+        while True:
+            with open(self.spill_path, 'ab') as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                    # The replayer may have moved the file aside while we waited
+                    try:
+                        moved = os.stat(self.spill_path).st_ino != os.fstat(f.fileno()).st_ino
+                    except FileNotFoundError:
+                        moved = True
+                    if moved:
+                        continue
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+                return
+    
+    def _claim_replay(self):
+        """Take the replay lock, returning whether this process replays the spill file.
+        
+        The lock is kept until stop(), or until the process exits, so one
+        process replays at a time.
+        """
+        if fcntl is None or self._replayer is not None:
+            return True
+        handle = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            return False
+        self._replayer = handle
+        return True
+    
+    def _release_replay(self):
+        """Give up the replay lock so another process can take over."""
+        if self._replayer is not None:
+            self._replayer.close()
+            self._replayer = None
+    
+    def replay_spill(self):
+        """Write one batch from the spill file.
+        
+        The spill file is moved aside and read a batch at a time, so writes
+        spilled meanwhile go to a new file. Only the process holding the
+        replay lock replays; a process taking over starts the moved-aside
+        file from the beginning. Returns the number of entries read.
+        """
+        if not self.spill_path or time.monotonic() < self._replay_after:
+            return 0
+        if not os.path.exists(self.replay_path) and not os.path.exists(self.spill_path):
+            return 0
+        if not self._claim_replay():
+            return 0
+        
+        with self._spill_lock:
+            if not os.path.exists(self.replay_path):
+                if not os.path.exists(self.spill_path) or os.path.getsize(self.spill_path) == 0:
+                    return 0
+                with open(self.spill_path, 'ab') as f:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_EX)
+                    os.replace(self.spill_path, self.replay_path)
+                self._replay_offset = 0
+        
+        entries = []
+        with open(self.replay_path, 'rb') as f:
+            f.seek(self._replay_offset)
+            while len(entries) < self.batch_size:
+                line = f.readline()
+                if not line:
+                    break
+                try:
+                    record = json.loads(line)
+                    entries.append((record['kind'], record.get('replace', False), record['item'],
+                                    time.monotonic()))
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"Skipping malformed spill record in {self.replay_path}")
+            self._replay_offset = f.tell()
+            finished = not f.read(1)
+        
+        if entries:
+            self.replayed += len(entries)
+            if not self._flush_batch(entries):
+                self._replay_after = time.monotonic() + self.max_backoff
+        # Drop the file as soon as it is written, so a process taking over
+        # does not replay it again
+        if finished:
+            os.remove(self.replay_path)
+            self._replay_offset = 0
+        return len(entries)
+    
+    def start(self):
+        """Start the flusher thread if it is not running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout=30.0):
+        """Stop the flusher after it writes or spills what is queued."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self._release_replay()
+    
+    def _run(self):
+        """Flush batches as they fall due and replay the spill file when idle."""
+        while True:
+            try:
+                batch = self._take()
+                if batch:
+                    self._flush_batch(batch)
+                elif self._stop.is_set():
+                    return
+                else:
+                    self.replay_spill()
+            except Exception as e:
+                logger.error(f"Error in write-behind flusher: {str(e)}")
+                if self._stop.wait(self.flush_interval):
+                    return
+    
+    def stats(self):
+        """Get queue depth, flush latency and write counters."""
+        with self._cond:
+            depth = len(self._items)
+            oldest = time.monotonic() - self._items[0][3] if self._items else None
+        latencies = sorted(self._latencies)
+        spill_bytes = 0
+        for path in (self.spill_path, self.replay_path):
+            if path and os.path.exists(path):
+                spill_bytes += os.path.getsize(path)
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'queue_depth': depth,
+            'max_size': self.max_size,
+            'oldest_age_ms': round(oldest * 1000, 2) if oldest is not None else None,
+            'flush_latency_ms': {
+                'last': round(self._latencies[-1], 2) if self._latencies else None,
+                'p50': round(percentile(latencies, 0.5), 2) if latencies else None,
+                'p95': round(percentile(latencies, 0.95), 2) if latencies else None,
+                'max': round(latencies[-1], 2) if latencies else None
+            },
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'rejected': self.rejected,
+            'retries': self.retries,
+            'flushes': self.flushes,
+            'failed_flushes': self.failed_flushes,
+            'spilled': self.spilled,
+            'replayed': self.replayed,
+            'dropped': self.dropped,
+            'spill_bytes': spill_bytes
+        }
+
+def init_write_behind(app):
+    """Initialize the write-behind queue for Flask app if enabled."""
+    if not app.config.get('WRITE_BEHIND_ENABLED', False):
+        app.write_behind = None
+        return None
+    
+    app.write_behind = WriteBehindQueue(
+        app,
+        max_size=app.config.get('WRITE_BEHIND_MAX_QUEUE', 100000),
+        batch_size=app.config.get('WRITE_BEHIND_BATCH_SIZE', 1000),
+        flush_interval=app.config.get('WRITE_BEHIND_FLUSH_INTERVAL', 0.5),
+        max_retries=app.config.get('WRITE_BEHIND_MAX_RETRIES', 5),
+        retry_backoff=app.config.get('WRITE_BEHIND_RETRY_BACKOFF', 0.5),
+        max_backoff=app.config.get('WRITE_BEHIND_MAX_BACKOFF', 30.0),
+        spill_path=app.config.get('WRITE_BEHIND_SPILL_PATH') or None
+    )
+    if not app.config.get('TESTING'):
+        app.write_behind.start()
+        atexit.register(app.write_behind.stop)
+    return app.write_behind
+
+def get_write_behind():
+    """Get the write-behind queue of the current app, or None if disabled."""
+    if not has_app_context():
+        return None
+    return getattr(current_app, 'write_behind', None)
@@ -0,0 +1,20 @@
+"""
+Shared fixtures for the unit tests.
+Provides a testing app on its own in-memory SQLite database for tests that
+run real queries.
+"""
+
+import pytest
+from benchmarks.generator import create_schema
+from src.app import create_app
+from src.database import db
+
+@pytest.fixture
+def database():
+    """Create a testing app with an empty schema and push its app context."""
+    app = create_app('testing')
+    with app.app_context():
+        create_schema()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
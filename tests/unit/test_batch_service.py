@@ -0,0 +1,86 @@
+"""
+Unit tests for batch retrieval.
+Tests batches are resolved with a fixed number of queries against a seeded
+SQLite database, whatever their size.
+"""
+
+from contextlib import contextmanager
+from datetime import timedelta
+import pytest
+from sqlalchemy import event
+from benchmarks.generator import HISTORY_START, object_id, seed_productline
+from src.database import db
+from src.services.batch_service import BatchService
+from src.services.data_service import DataService
+
+@contextmanager
+def count_queries():
+    """Count the statements executed on the database engine."""
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(db.engine, 'after_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'after_cursor_execute', record)
+
+class TestBatchQueryCount:
+    """Test batch lookups issue the same number of queries for 5 and 50 IDs."""
+    
+    @pytest.fixture
+    def object_ids(self, database, monkeypatch):
+        """Seed a productline and read it without the snapshot caches."""
+        seed_productline(50, 3)
+        db.session.commit()
+        monkeypatch.setattr(database, 'object_cache', None)
+        monkeypatch.setattr(database, 'history_cache', None)
+        return [object_id(index) for index in range(50)]
+    
+    def query_counts(self, lookup, object_ids):
+        """Count the queries of a lookup for batches of 5 and 50 IDs."""
+        counts = []
+        for size in (5, 50):
+            with count_queries() as statements:
+                lookup(object_ids[:size])
+            counts.append(len(statements))
+        return counts
+    
+    @pytest.mark.parametrize('read_path', ['orm', 'core'])
+    def test_get_objects(self, object_ids, read_path):
+        """Test DataService.get_objects does not query per ID."""
+        service = DataService(read_path)
+        small, large = self.query_counts(service.get_objects, object_ids)
+        
+        assert 0 < small == large
+        assert len(service.get_objects(object_ids)) == 50
+    
+    @pytest.mark.parametrize('read_path', ['orm', 'core'])
+    def test_get_objects_batch(self, object_ids, read_path):
+        """Test BatchService.get_objects_batch does not query per ID."""
+        service = BatchService(read_path)
+        small, large = self.query_counts(service.get_objects_batch, object_ids)
+        
+        assert 0 < small == large
+        result = service.get_objects_batch(object_ids + ['OBJ_404'])
+        assert len(result['objects']) == 50
+        assert [error['code'] for error in result['errors']] == ['OBJECT_NOT_FOUND']
+    
+    @pytest.mark.parametrize('read_path', ['orm', 'core'])
+    @pytest.mark.parametrize('interpolate', [None, 'linear'])
+    def test_get_objects_batch_as_of(self, object_ids, read_path, interpolate):
+        """Test as-of batch lookups do not query per ID."""
+        service = BatchService(read_path)
+        moment = HISTORY_START + timedelta(seconds=90)
+        small, large = self.query_counts(
+            lambda ids: service.get_objects_batch(ids, moment, interpolate=interpolate),
+            object_ids
+        )
+        
+        assert 0 < small == large
+        result = service.get_objects_batch(object_ids[:3] + object_ids[:3], moment,
+                                           interpolate=interpolate)
+        assert [obj['object_id'] for obj in result['objects']] == object_ids[:3] * 2
+        assert result['errors'] == []
@@ -0,0 +1,78 @@
+"""
+Unit tests for the benchmark harness.
+Tests the synthetic generator is reproducible, the latency summary and
+the micro-benchmark regression gate.
+"""
+
+from benchmarks.api_benchmark import summarize
+from benchmarks.generator import generate_history, generate_objects, history_end
+from benchmarks.micro_benchmark import REFERENCE_CASE, build_cases, compare, normalize
+
+class TestGenerator:
+    """Test the synthetic productline generator."""
+    
+    def test_same_seed_same_data(self):
+        """Test a seed always generates the same objects and history."""
+        assert list(generate_objects(20, seed=7)) == list(generate_objects(20, seed=7))
+        assert list(generate_history(5, 10, seed=7)) == list(generate_history(5, 10, seed=7))
+        assert list(generate_objects(20, seed=7)) != list(generate_objects(20, seed=8))
+    
+    def test_history_is_ordered_within_bounds(self):
+        """Test each object's history is increasing and ends before history_end."""
+        rows = list(generate_history(3, 50, interval=30.0))
+        assert len(rows) == 150
+        for index in range(3):
+            timestamps = [row['timestamp'] for row in rows[index * 50:(index + 1) * 50]]
+            assert timestamps == sorted(timestamps)
+            assert timestamps[-1] < history_end(50, 30.0)
+
+class TestSummarize:
+    """Test scenario summaries."""
+    
+    def test_percentiles_and_throughput(self):
+        """Test latencies are reported in milliseconds with nearest-rank percentiles."""
+        summary = summarize([i / 1000 for i in range(1, 101)], 2, 0.5)
+        
+        assert summary['requests'] == 100 and summary['errors'] == 2
+        assert summary['throughput_rps'] == 200.0
+        assert summary['latency_ms']['p50'] == 51.0
+        assert summary['latency_ms']['p99'] == 100.0
+        assert summary['latency_ms']['max'] == 100.0
+    
+    def test_empty(self):
+        """Test a scenario without requests summarizes to empty latencies."""
+        assert summarize([], 0, 0.0)['latency_ms']['p95'] is None
+
+class TestMicroBenchmarkGate:
+    """Test the micro-benchmark regression gate."""
+    
+    def test_regression_above_threshold(self):
+        """Test only cases whose ratio to the reference grew past the threshold regress."""
+        results = {'isoformat_z': 200.0, 'fast': 180.0, 'slower': 220.0, 'regressed': 260.0,
+                   'added': 10.0}
+        comparison = compare(results, {'isoformat_z': 1.0, 'fast': 1.0, 'slower': 1.0,
+                                       'regressed': 1.0}, 15.0)
+        
+        assert comparison['fast'] == {'ns': 180.0, 'ratio': 0.9, 'baseline_ratio': 1.0,
+                                      'change_pct': -10.0, 'status': 'ok'}
+        assert comparison['slower']['status'] == 'ok'
+        assert comparison['regressed']['status'] == 'regressed'
+        assert comparison['regressed']['change_pct'] == 30.0
+        assert comparison['added']['status'] == 'new'
+        assert comparison['isoformat_z']['status'] == 'reference'
+    
+    def test_machine_speed_cancels_out(self):
+        """Test a uniformly slower machine does not regress against the baseline."""
+        baseline = normalize({'isoformat_z': 100.0, 'case': 300.0})
+        comparison = compare({'isoformat_z': 250.0, 'case': 750.0}, baseline, 15.0)
+        
+        assert baseline == {'isoformat_z': 1.0, 'case': 3.0}
+        assert comparison['case']['change_pct'] == 0.0
+        assert comparison['case']['status'] == 'ok'
+    
+    def test_cases_run(self):
+        """Test every case runs without a database or app."""
+        cases = build_cases()
+        for function in cases.values():
+            function()
+        assert REFERENCE_CASE in cases
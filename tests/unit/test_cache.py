@@ -0,0 +1,149 @@
+"""
+Unit tests for the object snapshot caches.
+Tests change hooks, history quantization and the mutable horizon.
+"""
+
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from flask import Flask
+from src.services.cache import HistorySnapshotCache
+from src.services.cache_backends import InProcessCacheBackend
+from src.services.data_service import DataService, default_coordinates
+from src.models.hooks import (
+    register_change_listener, unregister_change_listener, notify_object_changed
+)
+
+class TestChangeHooks:
+    """Test model change notification hooks."""
+    
+    def test_listener_receives_changes(self):
+        """Test registered listeners are notified."""
+        changed = []
+        listener = register_change_listener(changed.append)
+        try:
+            notify_object_changed('OBJ_001')
+        finally:
+            unregister_change_listener(listener)
+        
+        notify_object_changed('OBJ_002')
+        assert changed == ['OBJ_001']
+    
+    def test_failing_listener_is_isolated(self):
+        """Test a failing listener does not break notification."""
+        changed = []
+        
+        def failing(object_id):
+            raise RuntimeError('boom')
+        
+        register_change_listener(failing)
+        register_change_listener(changed.append)
+        try:
+            notify_object_changed('OBJ_001')
+        finally:
+            unregister_change_listener(failing)
+            unregister_change_listener(changed.append)
+        
+        assert changed == ['OBJ_001']
+
+    def test_session_changes_notify_after_commit(self):
+        """Test changes made in a session notify once on commit, and not on rollback."""
+        changed = []
+        session = Session(create_engine('sqlite://'))
+        register_change_listener(changed.append)
+        try:
+            notify_object_changed('OBJ_001', session)
+            notify_object_changed('OBJ_001', session)
+            assert changed == []
+            
+            session.commit()
+            assert changed == ['OBJ_001']
+            
+            session.execute(text('SELECT 1'))
+            notify_object_changed('OBJ_002', session)
+            session.rollback()
+            session.commit()
+        finally:
+            unregister_change_listener(changed.append)
+            session.close()
+        
+        assert changed == ['OBJ_001']
+
+class TestHistorySnapshotCache:
+    """Test HistorySnapshotCache functionality."""
+    
+    def test_quantize(self):
+        """Test timestamps are floored to the quantum."""
+        cache = HistorySnapshotCache(quantum=60)
+        
+        quantized = cache.quantize(datetime(2025, 1, 1, 8, 30, 59, 999000))
+        assert quantized == datetime(2025, 1, 1, 8, 30)
+        
+        aware = datetime(2025, 1, 1, 8, 30, 59, tzinfo=timezone.utc)
+        assert cache.quantize(aware) == datetime(2025, 1, 1, 8, 30, tzinfo=timezone.utc)
+    
+    def test_zero_quantum(self):
+        """Test a quantum of 0 keeps timestamps unchanged."""
+        cache = HistorySnapshotCache(quantum=0)
+        timestamp = datetime(2025, 1, 1, 8, 30, 59, 123456)
+        
+        assert cache.quantize(timestamp) == timestamp
+    
+    def test_mutable_horizon(self):
+        """Test timestamps near now are never cacheable."""
+        now = datetime(2025, 1, 1, 12, 0, 0)
+        cache = HistorySnapshotCache(mutable_horizon=300, clock=lambda: now)
+        
+        assert cache.is_cacheable(now - timedelta(seconds=301))
+        assert not cache.is_cacheable(now - timedelta(seconds=299))
+        assert not cache.is_cacheable(now + timedelta(hours=1))
+        assert cache.stats()['bypasses'] == 2
+    
+    def test_keys_normalize_timezones(self):
+        """Test equal instants share a cache entry."""
+        cache = HistorySnapshotCache()
+        naive = datetime(2025, 1, 1, 8, 0)
+        aware = datetime(2025, 1, 1, 10, 0, tzinfo=timezone(timedelta(hours=2)))
+        
+        cache.set('OBJ_001', naive, {'object_id': 'OBJ_001'})
+        assert cache.get('OBJ_001', aware) == {'object_id': 'OBJ_001'}
+        assert cache.get('OBJ_002', aware) is None
+    
+    def test_entries_hold_for_their_span(self):
+        """Test an entry is only served within the span it was resolved for."""
+        cache = HistorySnapshotCache(quantum=1)
+        record = datetime(2025, 1, 1, 8, 0, 0, 500000)
+        
+        cache.set('OBJ_001', datetime(2025, 1, 1, 8, 0, 0, 700000), 'state', valid_from=record)
+        assert cache.get('OBJ_001', datetime(2025, 1, 1, 8, 0, 0, 600000)) == 'state'
+        assert cache.get('OBJ_001', datetime(2025, 1, 1, 8, 0, 0, 700000)) == 'state'
+        assert cache.get('OBJ_001', datetime(2025, 1, 1, 8, 0, 0, 200000)) is None
+        assert cache.get('OBJ_001', datetime(2025, 1, 1, 8, 0, 0, 900000)) is None
+        assert cache.stats()['span_misses'] == 2
+    
+    def test_memory_bound(self):
+        """Test the number of snapshots is bounded."""
+        cache = HistorySnapshotCache(backend=InProcessCacheBackend(max_size=2, ttl=86400))
+        for minute in range(3):
+            cache.set('OBJ_001', datetime(2025, 1, 1, 8, minute), minute)
+        
+        assert cache.get('OBJ_001', datetime(2025, 1, 1, 8, 0)) is None
+        assert cache.stats()['size'] == 2
+
+class TestObjectSnapshotCache:
+    """Test object snapshots served by DataService."""
+    
+    def test_snapshots_are_copies(self, monkeypatch):
+        """Test changing a returned response leaves the cached snapshot alone."""
+        response = {'object_id': 'OBJ_001', 'coordinates': default_coordinates()}
+        monkeypatch.setattr(DataService, '_load_object', lambda self, object_id: response)
+        app = Flask(__name__)
+        app.object_cache = InProcessCacheBackend(max_size=10, ttl=60)
+        
+        with app.app_context():
+            service = DataService(read_path='orm')
+            service.get_object('OBJ_001')['coordinates']['position']['x'] = 5.0
+            response['coordinates']['position']['y'] = 6.0
+            service.get_objects(['OBJ_001'])['OBJ_001']['coordinates']['position']['z'] = 7.0
+            
+            assert service.get_object('OBJ_001')['coordinates']['position'] == {'x': 0.0, 'y': 0.0, 'z': 0.0}
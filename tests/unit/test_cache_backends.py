@@ -0,0 +1,321 @@
+"""
+Unit tests for the cache backends.
+Tests the in-process TTL/LRU backend and the Redis protocol backend
+against a local fake server.
+"""
+
+import socketserver
+import threading
+import time
+import pytest
+from src.services.cache_backends import (
+    CacheBackend, InProcessCacheBackend, RedisCacheBackend, create_cache_backend,
+    encode_value, decode_value
+)
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Handle the subset of RESP commands used by RedisCacheBackend."""
+    
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        assert line.startswith(b'*')
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+    
+    def write_bulk(self, data):
+        if data is None:
+            self.wfile.write(b'$-1\r\n')
+        else:
+            self.wfile.write(b'$%d\r\n%s\r\n' % (len(data), data))
+    
+    def handle(self):
+        store = self.server.store
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            command = args[0].upper()
+            self.server.commands.append(command)
+            
+            if command == b'GET':
+                value, expires_at = store.get(args[1], (None, None))
+                if expires_at is not None and expires_at <= time.monotonic():
+                    store.pop(args[1], None)
+                    value = None
+                self.write_bulk(value)
+            elif command == b'SET':
+                expires_at = None
+                if len(args) == 5 and args[3].upper() == b'PX':
+                    expires_at = time.monotonic() + int(args[4]) / 1000.0
+                store[args[1]] = (args[2], expires_at)
+                self.wfile.write(b'+OK\r\n')
+            elif command == b'DEL':
+                removed = sum(1 for key in args[1:] if store.pop(key, None) is not None)
+                self.wfile.write(b':%d\r\n' % removed)
+            elif command == b'SCAN':
+                prefix = args[3].rstrip(b'*')
+                keys = [key for key in store if key.startswith(prefix)]
+                self.wfile.write(b'*2\r\n')
+                self.write_bulk(b'0')
+                self.wfile.write(b'*%d\r\n' % len(keys))
+                for key in keys:
+                    self.write_bulk(key)
+            elif command == b'SELECT':
+                self.wfile.write(b'+OK\r\n')
+            else:
+                self.wfile.write(b'-ERR unknown command\r\n')
+            self.wfile.flush()
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    """Local in-memory stand-in for a Redis server."""
+    
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeRedisHandler)
+        self.store = {}
+        self.commands = []
+
+@pytest.fixture
+def redis_server():
+    """Run a fake Redis server on a free local port."""
+    server = FakeRedisServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def backend_url(server, db=0):
+    host, port = server.server_address
+    return f"redis://{host}:{port}/{db}"
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+class TestInProcessCacheBackend:
+    """Test InProcessCacheBackend functionality."""
+    
+    def test_get_and_set(self):
+        """Test basic read-through behaviour."""
+        cache = InProcessCacheBackend(max_size=10, ttl=5.0)
+        
+        assert cache.get('OBJ_001') is None
+        cache.set('OBJ_001', {'object_id': 'OBJ_001'})
+        assert cache.get('OBJ_001') == {'object_id': 'OBJ_001'}
+        
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['size'] == 1
+    
+    def test_ttl_expiry(self):
+        """Test entries expire after the TTL."""
+        clock = FakeClock()
+        cache = InProcessCacheBackend(max_size=10, ttl=5.0, clock=clock)
+        cache.set('OBJ_001', 'value')
+        
+        clock.now = 4.9
+        assert cache.get('OBJ_001') == 'value'
+        
+        clock.now = 5.0
+        assert cache.get('OBJ_001') is None
+        assert cache.stats()['expirations'] == 1
+        assert len(cache) == 0
+    
+    def test_zero_ttl_never_expires(self):
+        """Test a TTL of 0 keeps entries until evicted."""
+        clock = FakeClock()
+        cache = InProcessCacheBackend(max_size=10, ttl=0, clock=clock)
+        cache.set('OBJ_001', 'value')
+        
+        clock.now = 10 ** 9
+        assert cache.get('OBJ_001') == 'value'
+    
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted first."""
+        cache = InProcessCacheBackend(max_size=2, ttl=60)
+        cache.set('OBJ_001', 1)
+        cache.set('OBJ_002', 2)
+        
+        # Touch OBJ_001 so OBJ_002 becomes least recently used
+        assert cache.get('OBJ_001') == 1
+        cache.set('OBJ_003', 3)
+        
+        assert cache.get('OBJ_002') is None
+        assert cache.get('OBJ_001') == 1
+        assert cache.get('OBJ_003') == 3
+        assert cache.stats()['evictions'] == 1
+    
+    def test_delete(self):
+        """Test explicit invalidation."""
+        cache = InProcessCacheBackend(max_size=10, ttl=60)
+        cache.set('OBJ_001', 1)
+        cache.delete('OBJ_001')
+        cache.delete('OBJ_404')
+        
+        assert cache.get('OBJ_001') is None
+        assert cache.stats()['invalidations'] == 1
+    
+    def test_invalid_size(self):
+        """Test max_size must be positive."""
+        with pytest.raises(ValueError):
+            InProcessCacheBackend(max_size=0)
+
+class TestRedisCacheBackend:
+    """Test RedisCacheBackend against the fake server."""
+    
+    def test_round_trip(self, redis_server):
+        """Test values survive encoding and the network round trip."""
+        backend = RedisCacheBackend(url=backend_url(redis_server), namespace='object', ttl=5)
+        value = {
+            'object_id': 'OBJ_001',
+            'metadata': None,
+            'coordinates': {'position': {'x': 1.5, 'y': -2.0, 'z': 0.0}, 'rotation': 90.0}
+        }
+        
+        assert backend.get('OBJ_001') is None
+        backend.set('OBJ_001', value)
+        assert backend.get('OBJ_001') == value
+        
+        stats = backend.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['errors'] == 0
+        backend.close()
+    
+    def test_keys_are_namespaced(self, redis_server):
+        """Test namespaces do not collide and clear only touches its own keys."""
+        objects = RedisCacheBackend(url=backend_url(redis_server), namespace='object')
+        history = RedisCacheBackend(url=backend_url(redis_server), namespace='history')
+        
+        objects.set('OBJ_001', 'current')
+        history.set('OBJ_001', 'past')
+        assert b'productline:object:OBJ_001' in redis_server.store
+        
+        objects.clear()
+        assert objects.get('OBJ_001') is None
+        assert history.get('OBJ_001') == 'past'
+    
+    def test_ttl_and_delete(self, redis_server):
+        """Test expiry is delegated to the server and delete removes keys."""
+        backend = RedisCacheBackend(url=backend_url(redis_server), namespace='object', ttl=0.05)
+        backend.set('OBJ_001', 1)
+        backend.set('OBJ_002', 2, ttl=60)
+        backend.delete('OBJ_002')
+        
+        time.sleep(0.1)
+        assert backend.get('OBJ_001') is None
+        assert backend.get('OBJ_002') is None
+        assert backend.stats()['invalidations'] == 1
+    
+    def test_shared_between_clients(self, redis_server):
+        """Test two workers see the same entries."""
+        worker_a = RedisCacheBackend(url=backend_url(redis_server), namespace='object')
+        worker_b = RedisCacheBackend(url=backend_url(redis_server), namespace='object')
+        
+        worker_a.set('OBJ_001', {'status': 'active'})
+        assert worker_b.get('OBJ_001') == {'status': 'active'}
+        
+        worker_b.delete('OBJ_001')
+        assert worker_a.get('OBJ_001') is None
+    
+    def test_selects_database(self, redis_server):
+        """Test a non-zero database index is selected on connect."""
+        backend = RedisCacheBackend(url=backend_url(redis_server, db=2), namespace='object')
+        backend.set('OBJ_001', 1)
+        
+        assert redis_server.commands[0] == b'SELECT'
+    
+    def test_reconnects_after_disconnect(self, redis_server):
+        """Test a dropped connection is re-established transparently."""
+        backend = RedisCacheBackend(url=backend_url(redis_server), namespace='object')
+        backend.set('OBJ_001', 1)
+        backend._sock.close()
+        
+        assert backend.get('OBJ_001') == 1
+    
+    def test_undecodable_entry_is_a_miss(self, redis_server):
+        """Test a corrupt or foreign value is dropped instead of raising."""
+        backend = RedisCacheBackend(url=backend_url(redis_server), namespace='object')
+        redis_server.store[b'productline:object:OBJ_001'] = (b'\xc1not msgpack', None)
+        
+        assert backend.get('OBJ_001') is None
+        assert b'productline:object:OBJ_001' not in redis_server.store
+        assert backend.stats()['errors'] == 1 and backend.stats()['hits'] == 0
+    
+    def test_failed_auth_closes_connection(self, redis_server):
+        """Test a connection rejected during AUTH is not kept for later commands."""
+        host, port = redis_server.server_address
+        backend = RedisCacheBackend(url=f"redis://:secret@{host}:{port}/0", namespace='object')
+        
+        assert backend.get('OBJ_001') is None
+        assert backend._sock is None
+        assert backend.stats()['errors'] == 1
+    
+    def test_unavailable_server_is_a_miss(self):
+        """Test connection failures degrade to cache misses."""
+        server = FakeRedisServer()
+        url = backend_url(server)
+        server.server_close()
+        
+        backend = RedisCacheBackend(url=url, namespace='object', socket_timeout=0.05)
+        backend.set('OBJ_001', 1)
+        assert backend.get('OBJ_001') is None
+        assert backend.stats()['errors'] == 2
+
+class TestCacheBackendInterface:
+    """Test the cache backend interface."""
+    
+    def test_incomplete_backend_cannot_be_created(self):
+        """Test a backend must implement every operation."""
+        class GetOnly(CacheBackend):
+            def get(self, key):
+                return None
+        
+        with pytest.raises(TypeError):
+            GetOnly()
+
+class TestCacheBackendFactory:
+    """Test backend selection from configuration."""
+    
+    def test_encoding_is_compact(self):
+        """Test MessagePack encoding round-trips and beats JSON on size."""
+        import json
+        value = {'position': {'x': 1.25, 'y': 2.5, 'z': 3.75}, 'height': 4.0}
+        
+        encoded = encode_value(value)
+        assert decode_value(encoded) == value
+        assert len(encoded) < len(json.dumps(value))
+    
+    def test_memory_backend(self):
+        """Test the default backend is in-process."""
+        backend = create_cache_backend({}, namespace='object', max_size=5, ttl=1)
+        assert isinstance(backend, InProcessCacheBackend)
+        assert backend.max_size == 5
+    
+    def test_redis_backend(self):
+        """Test the networked backend is selected by CACHE_BACKEND."""
+        config = {'CACHE_BACKEND': 'redis', 'CACHE_URL': 'redis://cache:6380/1'}
+        backend = create_cache_backend(config, namespace='history', max_size=5, ttl=60)
+        
+        assert isinstance(backend, RedisCacheBackend)
+        assert (backend.host, backend.port, backend.db) == ('cache', 6380, 1)
+        assert backend.key_prefix == 'productline:history:'
+    
+    def test_unknown_backend(self):
+        """Test an unknown backend name is rejected."""
+        with pytest.raises(ValueError):
+            create_cache_backend({'CACHE_BACKEND': 'memcached'}, 'object', 5, 1)
@@ -0,0 +1,115 @@
+"""
+Unit tests for delta synchronization.
+Tests cursor encoding and the keyset merge of both tables.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from src.models.productline_object import ProductlineObject
+from src.models.coordinates import Coordinates
+from src.services.change_service import (
+    ChangeService, InvalidCursorError, decode_cursor, encode_cursor
+)
+
+NOW = datetime(2025, 1, 1, 12, 0, 0)
+
+def at(seconds):
+    """Get a timestamp relative to NOW."""
+    return NOW + timedelta(seconds=seconds)
+
+class FakeTable:
+    """Serves find_changed_after from a list of (updated_at, object_id) keys."""
+    
+    def __init__(self, keys):
+        self.keys = sorted(keys)
+        self.calls = []
+    
+    def __call__(self, updated_at=None, object_id=None, until=None, limit=1000):
+        self.calls.append((updated_at, object_id, until, limit))
+        keys = [
+            key for key in self.keys
+            if (updated_at is None or key > (updated_at, object_id))
+            and (until is None or key[0] <= until)
+        ]
+        return keys[:limit]
+
+class TestCursor:
+    """Test cursor encoding."""
+    
+    def test_round_trip(self):
+        """Test a cursor decodes to the position it encodes."""
+        cursor = encode_cursor(at(1.5), 'OBJ_001')
+        
+        assert '=' not in cursor
+        assert decode_cursor(cursor) == (at(1.5), 'OBJ_001')
+    
+    @pytest.mark.parametrize('cursor', ['garbage', 'e30', '!!!', encode_cursor(NOW, 'A')[:-4]])
+    def test_invalid_cursor(self, cursor):
+        """Test malformed cursors are rejected."""
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(cursor)
+
+class TestChangeService:
+    """Test ChangeService functionality."""
+    
+    @pytest.fixture
+    def tables(self, monkeypatch):
+        """Serve both tables and object loads from memory."""
+        objects = FakeTable([(at(0), 'OBJ_001'), (at(2), 'OBJ_002'), (at(4), 'OBJ_003')])
+        coords = FakeTable([(at(1), 'OBJ_002'), (at(3), 'OBJ_001'), (at(4), 'OBJ_003')])
+        monkeypatch.setattr(ProductlineObject, 'find_changed_after', objects)
+        monkeypatch.setattr(Coordinates, 'find_changed_after', coords)
+        monkeypatch.setattr(ProductlineObject, 'find_by_ids', lambda ids: [
+            ProductlineObject(id=object_id) for object_id in ids
+        ])
+        monkeypatch.setattr(Coordinates, 'find_by_object_ids', lambda ids: [])
+        return objects, coords
+    
+    def make_service(self):
+        return ChangeService(settle_delay=1.0, clock=lambda: at(10))
+    
+    def test_merges_both_tables(self, tables):
+        """Test changes from either table are reported once, oldest first."""
+        result = self.make_service().get_changes()
+        
+        assert [c['object_id'] for c in result['changes']] == ['OBJ_001', 'OBJ_002', 'OBJ_003']
+        assert result['count'] == 3
+        assert result['has_more'] is False
+        assert decode_cursor(result['cursor']) == (at(4), 'OBJ_003')
+    
+    def test_pages_follow_cursor(self, tables):
+        """Test paging by cursor visits every change exactly once."""
+        service = self.make_service()
+        
+        first = service.get_changes(limit=2)
+        assert [c['object_id'] for c in first['changes']] == ['OBJ_001', 'OBJ_002']
+        assert first['has_more'] is True
+        
+        second = service.get_changes(first['cursor'], limit=2)
+        assert [c['object_id'] for c in second['changes']] == ['OBJ_002', 'OBJ_001']
+        
+        third = service.get_changes(second['cursor'], limit=2)
+        assert [c['object_id'] for c in third['changes']] == ['OBJ_003']
+        assert third['has_more'] is False
+    
+    def test_no_changes_keeps_cursor(self, tables):
+        """Test an idle poll returns the cursor it was given."""
+        cursor = encode_cursor(at(4), 'OBJ_003')
+        result = self.make_service().get_changes(cursor)
+        
+        assert result['changes'] == []
+        assert result['cursor'] == cursor
+    
+    def test_settle_delay_bounds_walk(self, tables):
+        """Test rows newer than the settle delay are left for later."""
+        objects, coords = tables
+        service = ChangeService(settle_delay=7.0, clock=lambda: at(10))
+        
+        result = service.get_changes()
+        assert [c['object_id'] for c in result['changes']] == ['OBJ_001', 'OBJ_002']
+        assert objects.calls[0][2] == at(3)
+    
+    def test_invalid_cursor(self, tables):
+        """Test an undecodable cursor raises InvalidCursorError."""
+        with pytest.raises(InvalidCursorError):
+            self.make_service().get_changes('garbage')
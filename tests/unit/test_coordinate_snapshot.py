@@ -0,0 +1,121 @@
+"""
+Unit tests for the columnar coordinate snapshot.
+Tests row management, change tracking and the packed views.
+"""
+
+import numpy as np
+import pytest
+from src.services.coordinate_snapshot import CoordinateSnapshot, SNAPSHOT_COLUMNS
+
+def make_values(x, y=0.0, z=0.0, rotation=0.0):
+    """Build a row following SNAPSHOT_COLUMNS."""
+    return (x, y, z, 1.0, 1.0, 0.0, 0.0, rotation)
+
+class TestCoordinateSnapshot:
+    """Test CoordinateSnapshot functionality."""
+    
+    def test_upsert_and_get(self):
+        """Test rows are stored column by column."""
+        snapshot = CoordinateSnapshot(capacity=2)
+        snapshot.upsert('OBJ_001', make_values(1.0, 2.0, 3.0, rotation=None), 100.0)
+        
+        row = snapshot.get('OBJ_001')
+        assert (row['position_x'], row['position_y'], row['position_z']) == (1.0, 2.0, 3.0)
+        assert row['rotation'] is None
+        assert row['updated_at'] == 100.0
+        assert snapshot.get('OBJ_404') is None
+        assert len(SNAPSHOT_COLUMNS) == 8
+    
+    def test_grows_past_capacity(self):
+        """Test the arrays grow while keeping existing rows."""
+        snapshot = CoordinateSnapshot(capacity=1)
+        for i in range(5):
+            snapshot.upsert(f'OBJ_{i:03d}', make_values(float(i)), float(i))
+        
+        assert len(snapshot) == 5
+        assert snapshot.capacity >= 5
+        assert list(snapshot.column('position_x')) == [0.0, 1.0, 2.0, 3.0, 4.0]
+    
+    def test_unchanged_rows_keep_version(self):
+        """Test re-applying identical state is not a change."""
+        snapshot = CoordinateSnapshot()
+        assert snapshot.upsert('OBJ_001', make_values(1.0, rotation=None), 100.0)
+        assert not snapshot.upsert('OBJ_001', make_values(1.0, rotation=None), 100.0)
+        assert snapshot.upsert('OBJ_001', make_values(2.0, rotation=None), 101.0)
+        assert snapshot.version == 2
+    
+    def test_remove_keeps_arrays_dense(self):
+        """Test removal moves the last row into the hole."""
+        snapshot = CoordinateSnapshot()
+        for i in range(3):
+            snapshot.upsert(f'OBJ_{i:03d}', make_values(float(i)), 0.0)
+        
+        assert snapshot.remove('OBJ_000')
+        assert not snapshot.remove('OBJ_000')
+        assert len(snapshot) == 2
+        assert snapshot.object_ids == ['OBJ_002', 'OBJ_001']
+        assert snapshot.get('OBJ_002')['position_x'] == 2.0
+        assert list(snapshot.column('position_x')) == [2.0, 1.0]
+    
+    def test_changed_since(self):
+        """Test consumers can sync from a version."""
+        snapshot = CoordinateSnapshot()
+        snapshot.upsert('OBJ_001', make_values(1.0), 0.0)
+        snapshot.upsert('OBJ_002', make_values(2.0), 0.0)
+        version = snapshot.version
+        
+        snapshot.upsert('OBJ_002', make_values(5.0), 1.0)
+        snapshot.upsert('OBJ_003', make_values(3.0), 1.0)
+        snapshot.remove('OBJ_001')
+        
+        changed, removed = snapshot.changed_since(version)
+        assert sorted(changed) == ['OBJ_002', 'OBJ_003']
+        assert removed == ['OBJ_001']
+        assert snapshot.changed_since(snapshot.version) == ([], [])
+    
+    def test_changed_since_truncated_log(self):
+        """Test a truncated removal log forces a rebuild."""
+        snapshot = CoordinateSnapshot(removal_log_size=1)
+        for i in range(3):
+            snapshot.upsert(f'OBJ_{i:03d}', make_values(float(i)), 0.0)
+        snapshot.remove('OBJ_000')
+        snapshot.remove('OBJ_001')
+        
+        assert snapshot.changed_since(0) is None
+    
+    def test_positions_view(self):
+        """Test packed positions are cached until the next change."""
+        snapshot = CoordinateSnapshot()
+        snapshot.upsert('OBJ_001', make_values(1.0, 2.0, 3.0), 0.0)
+        
+        object_ids, positions, rows = snapshot.positions()
+        assert object_ids == ['OBJ_001']
+        assert positions.shape == (1, 3)
+        assert snapshot.positions()[1] is positions
+        with pytest.raises(ValueError):
+            positions[0, 0] = 9.0
+        
+        snapshot.upsert('OBJ_001', make_values(4.0, 5.0, 6.0), 1.0)
+        assert list(snapshot.positions()[1][0]) == [4.0, 5.0, 6.0]
+    
+    def test_column_is_read_only(self):
+        """Test column views cannot be written."""
+        snapshot = CoordinateSnapshot()
+        snapshot.upsert('OBJ_001', make_values(1.0), 0.0)
+        
+        with pytest.raises(ValueError):
+            snapshot.column('height')[0] = 2.0
+        assert isinstance(snapshot.column('updated_at'), np.ndarray)
+    
+    def test_export_columns(self):
+        """Test columnar export converts missing rotations to None."""
+        snapshot = CoordinateSnapshot()
+        snapshot.upsert('OBJ_001', make_values(1.0, rotation=None), 10.0)
+        snapshot.upsert('OBJ_002', make_values(2.0, rotation=90.0), 20.0)
+        
+        exported = snapshot.export_columns()
+        assert exported['count'] == 2
+        assert exported['object_ids'] == ['OBJ_001', 'OBJ_002']
+        assert exported['columns']['position_x'] == [1.0, 2.0]
+        assert exported['columns']['rotation'] == [None, 90.0]
+        assert exported['columns']['updated_at_epoch'] == [10.0, 20.0]
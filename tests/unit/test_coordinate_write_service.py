@@ -0,0 +1,186 @@
+"""
+Unit tests for coordinate updates with history capture.
+Tests merging partial updates, coalescing of history rows and late samples
+in memory and against a seeded SQLite database.
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from benchmarks.generator import object_id, seed_productline
+from src.models.coordinates import Coordinates
+from src.models.object_history import ObjectHistory
+from src.models.productline_object import ProductlineObject
+from src.services import coordinate_write_service
+from src.services.coordinate_write_service import (
+    CoordinateWriteService, InvalidCoordinatesError, merge_coordinates
+)
+from src.services.data_service import default_coordinates
+
+NOW = datetime(2025, 1, 27, 10, 0, 0)
+
+class TestMergeCoordinates:
+    """Test building coordinates from updates."""
+    
+    def test_patch_keeps_missing_fields_and_axes(self):
+        """Test a partial update only changes what it names."""
+        merged = merge_coordinates(default_coordinates(), {'position': {'x': 5.0}, 'rotation': 45})
+        
+        assert merged['position'] == {'x': 5.0, 'y': 0.0, 'z': 0.0}
+        assert merged['rotation'] == 45
+        assert merged['height'] == 0.0
+    
+    def test_put_requires_every_field(self):
+        """Test a replacement missing fields is rejected."""
+        with pytest.raises(InvalidCoordinatesError):
+            merge_coordinates(default_coordinates(), {'position': {'x': 1, 'y': 2, 'z': 3}},
+                              replace=True)
+    
+    def test_invalid_values(self):
+        """Test out-of-range results are rejected."""
+        with pytest.raises(InvalidCoordinatesError):
+            merge_coordinates(default_coordinates(), {'rotation': 400})
+        with pytest.raises(InvalidCoordinatesError):
+            merge_coordinates(default_coordinates(), {'name': 'x'})
+
+class TestCoordinateWriteService:
+    """Test CoordinateWriteService functionality."""
+    
+    @pytest.fixture
+    def store(self, monkeypatch):
+        """Serve one object from memory and record session activity."""
+        obj = ProductlineObject(id='OBJ_001', name='Robot', status='active')
+        obj.created_at = obj.updated_at = NOW
+        store = SimpleNamespace(added=[], commits=0, invalidated=[], coords={}, history={})
+        
+        monkeypatch.setattr(ProductlineObject, 'find_by_ids',
+                            lambda ids: [obj] if 'OBJ_001' in ids else [])
+        monkeypatch.setattr(Coordinates, 'find_by_object_ids',
+                            lambda ids: list(store.coords.values()))
+        monkeypatch.setattr(ObjectHistory, 'find_latest_before_timestamp',
+                            lambda ids, timestamp: list(store.history.values()))
+        monkeypatch.setattr(coordinate_write_service, 'invalidate_history',
+                            lambda earliest, horizon, now: store.invalidated.append(earliest))
+        monkeypatch.setattr(coordinate_write_service, 'db', SimpleNamespace(session=SimpleNamespace(
+            add=store.added.append,
+            commit=lambda: setattr(store, 'commits', store.commits + 1),
+            rollback=lambda: None
+        )))
+        return store
+    
+    def service(self, window=1.0):
+        return CoordinateWriteService(coalesce_window=window, clock=lambda: NOW)
+    
+    def test_creates_coordinates_and_history(self, store):
+        """Test an object without coordinates gets them and a history row."""
+        result = self.service().update_coordinates('OBJ_001', {'position': {'x': 1, 'y': 2, 'z': 3}})
+        
+        coords, history = store.added
+        assert isinstance(coords, Coordinates) and coords.position_x == 1
+        assert isinstance(history, ObjectHistory)
+        assert history.timestamp == NOW and history.position_z == 3 and history.status == 'active'
+        assert result['coordinates']['position'] == {'x': 1, 'y': 2, 'z': 3}
+        assert result['history']['action'] == 'inserted'
+        assert store.commits == 1
+        assert store.invalidated == [NOW]
+    
+    def test_coalesces_within_window(self, store):
+        """Test updates inside one window share a history row."""
+        result = self.service().update_many([
+            {'object_id': 'OBJ_001', 'position': {'x': 1.0}, 'timestamp': '2025-01-27T10:00:00.100Z'},
+            {'object_id': 'OBJ_001', 'position': {'x': 2.0}, 'timestamp': '2025-01-27T10:00:00.900Z'},
+            {'object_id': 'OBJ_001', 'position': {'x': 3.0}, 'timestamp': '2025-01-27T10:00:01.200Z'}
+        ])
+        
+        rows = [record for record in store.added if isinstance(record, ObjectHistory)]
+        assert [entry['action'] for entry in result['updates']] == ['inserted', 'coalesced', 'inserted']
+        assert [row.position_x for row in rows] == [2.0, 3.0]
+        assert rows[0].timestamp == NOW + timedelta(milliseconds=900)
+        assert result['coalesced'] == 1
+    
+    def test_zero_window_records_every_update(self, store):
+        """Test coalescing can be turned off."""
+        result = self.service(window=0).update_many([
+            {'object_id': 'OBJ_001', 'rotation': 10},
+            {'object_id': 'OBJ_001', 'rotation': 20}
+        ])
+        
+        assert [entry['action'] for entry in result['updates']] == ['inserted', 'inserted']
+    
+    def test_late_sample_keeps_current_coordinates(self, store):
+        """Test an update older than the latest history only lands in history."""
+        coords = Coordinates('OBJ_001', position_x=9.0)
+        store.coords['OBJ_001'] = coords
+        store.history['OBJ_001'] = SimpleNamespace(object_id='OBJ_001', timestamp=NOW)
+        
+        result = self.service().update_many([
+            {'object_id': 'OBJ_001', 'position': {'x': 1.0}, 'timestamp': '2025-01-27T09:00:00Z'}
+        ])
+        
+        assert result['updates'][0]['stale'] is True
+        assert coords.position_x == 9.0
+        assert store.added[0].position_x == 1.0
+        assert store.invalidated == [NOW - timedelta(hours=1)]
+    
+    def test_rejects_are_per_update(self, store):
+        """Test invalid updates are reported while valid ones are applied."""
+        result = self.service().update_many([
+            {'object_id': 'OBJ_404', 'rotation': 10},
+            {'object_id': 'OBJ_001', 'rotation': 400},
+            {'object_id': 'OBJ_001', 'rotation': 10, 'timestamp': 'soon'},
+            {'object_id': 'OBJ_001', 'rotation': 10}
+        ])
+        
+        assert result['updated'] == 1
+        assert [(r['index'], r['code']) for r in result['rejects']] == [
+            (0, 'OBJECT_NOT_FOUND'), (1, 'INVALID_COORDINATES'), (2, 'INVALID_TIMESTAMP')
+        ]
+    
+    def test_unknown_object(self, store):
+        """Test a single update of an unknown object returns None."""
+        assert self.service().update_coordinates('OBJ_404', {'rotation': 10}) is None
+    
+    def test_invalid_timestamp_code(self, store):
+        """Test a single update with a bad timestamp raises with the reject's code."""
+        with pytest.raises(InvalidCoordinatesError) as error:
+            self.service().update_coordinates('OBJ_001', {'rotation': 10, 'timestamp': 'soon'})
+        
+        assert error.value.code == 'INVALID_TIMESTAMP'
+
+class TestCoordinateWriteDatabase:
+    """Test CoordinateWriteService against a seeded SQLite database."""
+    
+    def test_coalesces_and_records_late_samples(self, database):
+        """Test updates coalesce into stored rows and late samples leave the coordinates alone."""
+        seed_productline(2, 3)
+        history_rows = ObjectHistory.query.count()
+        
+        result = CoordinateWriteService(clock=lambda: NOW).update_many([
+            {'object_id': object_id(0), 'position': {'x': 1.0}, 'timestamp': '2025-01-27T10:00:00.100Z'},
+            {'object_id': object_id(0), 'position': {'x': 2.0}, 'timestamp': '2025-01-27T10:00:00.900Z'},
+            {'object_id': object_id(1), 'rotation': 45.0, 'timestamp': '2024-12-31T00:00:00Z'}
+        ])
+        
+        assert [entry['action'] for entry in result['updates']] == ['inserted', 'coalesced', 'inserted']
+        assert result['updates'][2]['stale'] is True
+        assert ObjectHistory.query.count() == history_rows + 2
+        
+        record = ObjectHistory.find_by_object_before_timestamp(object_id(0), NOW + timedelta(seconds=1))
+        assert record.timestamp == NOW + timedelta(milliseconds=900)
+        assert record.position_x == 2.0
+        assert Coordinates.find_by_object_id(object_id(0)).position_x == 2.0
+        assert Coordinates.find_by_object_id(object_id(1)).rotation != 45.0
+    
+    def test_invalid_timestamp_leaves_object_alone(self, database):
+        """Test a rejected single update writes nothing."""
+        seed_productline(1, 1)
+        before = Coordinates.find_by_object_id(object_id(0)).to_dict()
+        
+        with pytest.raises(InvalidCoordinatesError) as error:
+            CoordinateWriteService(clock=lambda: NOW).update_coordinates(
+                object_id(0), {'rotation': 10.0, 'timestamp': 'soon'}
+            )
+        
+        assert error.value.code == 'INVALID_TIMESTAMP'
+        assert Coordinates.find_by_object_id(object_id(0)).to_dict() == before
+        assert ObjectHistory.query.count() == 1
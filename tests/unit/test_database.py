@@ -0,0 +1,27 @@
+"""
+Unit tests for the database helpers.
+Tests the cross-process advisory lock on SQLite, where it falls back to a
+lock file.
+"""
+
+from src.database import advisory_lock
+
+class TestAdvisoryLock:
+    """Test advisory_lock functionality."""
+    
+    def test_lock_is_exclusive(self, database):
+        """Test a held lock is refused to another holder until released."""
+        with advisory_lock('maintenance') as first:
+            with advisory_lock('maintenance') as second:
+                assert first and not second
+            with advisory_lock('other') as other:
+                assert other
+        
+        with advisory_lock('maintenance') as again:
+            assert again
+    
+    def test_waits_up_to_timeout(self, database):
+        """Test a lock that stays held is given up on after the timeout."""
+        with advisory_lock('maintenance'):
+            with advisory_lock('maintenance', timeout=0.1) as acquired:
+                assert not acquired
@@ -0,0 +1,83 @@
+"""
+Unit tests for trajectory downsampling.
+Tests time bucketing and Ramer-Douglas-Peucker simplification.
+"""
+
+import numpy as np
+import pytest
+from src.services.downsampling import BucketReducer, rdp_select, segment_distances
+
+class TestBucketReducer:
+    """Test BucketReducer functionality."""
+    
+    def test_keeps_last_row_per_bucket(self):
+        """Test each bucket keeps the last row fed into it."""
+        reducer = BucketReducer(0.0, 100.0, 4)
+        for second in range(0, 101, 5):
+            reducer.add(float(second), second)
+        
+        assert reducer.rows() == [20, 45, 70, 100]
+        assert reducer.scanned == 21
+    
+    def test_empty_buckets_are_skipped(self):
+        """Test buckets without rows produce no output."""
+        reducer = BucketReducer(0.0, 100.0, 10)
+        reducer.add(1.0, 'a')
+        reducer.add(99.0, 'b')
+        
+        assert reducer.rows() == ['a', 'b']
+    
+    def test_zero_width_range(self):
+        """Test a range with a single instant collapses into one bucket."""
+        reducer = BucketReducer(5.0, 5.0, 10)
+        reducer.add(5.0, 'a')
+        reducer.add(5.0, 'b')
+        
+        assert reducer.rows() == ['b']
+
+class TestRdpSelect:
+    """Test Ramer-Douglas-Peucker simplification."""
+    
+    @pytest.fixture
+    def corner(self):
+        """Points along an L-shaped path."""
+        leg = [(float(i), 0.0, 0.0) for i in range(11)]
+        return np.array(leg + [(10.0, float(i), 0.0) for i in range(1, 11)])
+    
+    def test_collinear_points_collapse(self):
+        """Test points on a straight line reduce to the endpoints."""
+        points = np.array([(float(i), 2.0 * i, 0.0) for i in range(50)])
+        assert rdp_select(points, tolerance=1e-9) == [0, 49]
+    
+    def test_keeps_corner(self, corner):
+        """Test the corner of a path survives simplification."""
+        assert rdp_select(corner, max_points=3) == [0, 10, 20]
+        assert rdp_select(corner, tolerance=0.01) == [0, 10, 20]
+    
+    def test_max_points_bound(self):
+        """Test the result never exceeds max_points."""
+        rng = np.random.default_rng(7)
+        points = np.cumsum(rng.normal(size=(500, 3)), axis=0)
+        
+        selected = rdp_select(points, max_points=25)
+        assert len(selected) == 25
+        assert selected[0] == 0 and selected[-1] == 499
+        assert selected == sorted(selected)
+    
+    def test_most_significant_points_first(self):
+        """Test the largest deviation is kept before smaller ones."""
+        points = np.array([
+            (0.0, 0.0, 0.0), (1.0, 1.0, 0.0), (2.0, 0.0, 0.0),
+            (3.0, 5.0, 0.0), (4.0, 0.0, 0.0)
+        ])
+        assert rdp_select(points, max_points=3) == [0, 3, 4]
+    
+    def test_short_paths_unchanged(self):
+        """Test paths with two or fewer points are returned whole."""
+        assert rdp_select(np.zeros((2, 3)), max_points=2) == [0, 1]
+        assert rdp_select(np.zeros((0, 3))) == []
+    
+    def test_segment_distances_degenerate_segment(self):
+        """Test distances to a zero-length segment are point distances."""
+        points = np.array([(0.0, 0.0, 0.0), (3.0, 4.0, 0.0), (0.0, 0.0, 0.0)])
+        assert segment_distances(points, 0, 2).tolist() == [5.0]
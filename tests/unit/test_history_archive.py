@@ -0,0 +1,227 @@
+"""
+Unit tests for the cold history archive.
+Tests writing day files, pushed-down lookups and the services reading
+archived moments in memory, and archiving expired history from a SQLite
+database.
+"""
+
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from src.database import advisory_lock, db
+from src.models.object_history import ObjectHistory
+from src.models.productline_object import ProductlineObject
+from src.services.history_archive import ArchiveFile, ArchiveWriter, ChunkCache, HistoryArchive, day_path
+from src.services.history_service import HistoryService
+from src.services.history_tiers import HistoryTierManager
+from src.services.trajectory_service import TrajectoryService
+
+DAY0 = datetime(2025, 1, 20)
+
+def make_row(row_id, object_id, timestamp, x=1.0, status='active', metadata=None):
+    """Build a full history row."""
+    return (row_id, object_id, timestamp, x, 2.0, 3.0, 1.5, 1.0, 0.0, 0.0, 90.0, status, metadata)
+
+def day_rows(day, objects=('OBJ_001', 'OBJ_002'), count=10, first_id=1):
+    """Build rows every hour of a day, grouped by object."""
+    rows = []
+    for object_id in objects:
+        for hour in range(count):
+            rows.append(make_row(first_id + len(rows), object_id, day + timedelta(hours=hour), x=float(hour)))
+    return rows
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    """Export two days of in-memory history to a temporary archive."""
+    store = SimpleNamespace(rows=day_rows(DAY0) + day_rows(DAY0 + timedelta(days=1), first_id=100))
+    
+    def archive_rows(start, end, batch_size=5000):
+        return sorted((r for r in store.rows if start <= r[2] < end), key=lambda r: (r[1], r[2], r[0]))
+    
+    def first_timestamp(since=None):
+        stamps = [r[2] for r in store.rows if since is None or r[2] >= since]
+        return min(stamps) if stamps else None
+    
+    monkeypatch.setattr(ObjectHistory, 'iter_archive_rows', archive_rows)
+    monkeypatch.setattr(ObjectHistory, 'find_first_timestamp', first_timestamp)
+    archive = HistoryArchive(directory=str(tmp_path / 'archive'), row_group_size=4)
+    archive.store = store
+    archive.export(DAY0, DAY0 + timedelta(days=3))
+    return archive
+
+class TestArchiveFile:
+    """Test the archive file format."""
+    
+    def test_round_trip(self, tmp_path):
+        """Test rows read back with their values, statuses and metadata."""
+        path = str(tmp_path / 'day.col')
+        writer = ArchiveWriter(path, DAY0, row_group_size=3)
+        rows = [make_row(1, 'OBJ_001', DAY0, metadata={'line': 'A'}),
+                make_row(2, 'OBJ_001', DAY0 + timedelta(seconds=1), x=None, status=None)]
+        for row in rows:
+            writer.add(row)
+        assert writer.close() == 2
+        
+        archive_file = ArchiveFile(path)
+        assert list(archive_file.iter_object_rows('OBJ_001')) == rows
+        assert os.listdir(tmp_path) == ['day.col']
+    
+    def test_writers_use_their_own_temporary_files(self, tmp_path):
+        """Test two writers of one day do not share a temporary file."""
+        path = str(tmp_path / 'day.col')
+        first, second = ArchiveWriter(path, DAY0), ArchiveWriter(path, DAY0)
+        
+        assert first._tmp_path != second._tmp_path
+        first.abort()
+        second.abort()
+        assert os.listdir(tmp_path) == []
+    
+    def test_rows_must_be_grouped_by_object(self, tmp_path):
+        """Test an object's rows cannot be split or unordered."""
+        writer = ArchiveWriter(str(tmp_path / 'day.col'), DAY0)
+        writer.add(make_row(1, 'OBJ_001', DAY0))
+        writer.add(make_row(2, 'OBJ_002', DAY0))
+        with pytest.raises(ValueError):
+            writer.add(make_row(3, 'OBJ_001', DAY0 + timedelta(seconds=1)))
+        writer.abort()
+    
+    def test_lookups_decompress_only_needed_groups(self, tmp_path):
+        """Test an as-of lookup reads the chunks of one row group."""
+        path = str(tmp_path / 'day.col')
+        writer = ArchiveWriter(path, DAY0, row_group_size=4)
+        for row in day_rows(DAY0, count=12):
+            writer.add(row)
+        writer.close()
+        
+        cache = ChunkCache()
+        record = ArchiveFile(path, cache).latest_at_or_before(
+            'OBJ_002', (DAY0 + timedelta(hours=5, minutes=30) - datetime(1970, 1, 1)) // timedelta(microseconds=1)
+        )
+        
+        assert record.position_x == 5.0 and record.object_id == 'OBJ_002'
+        assert {key[1] for key in cache._entries} == {4}
+
+class TestHistoryArchive:
+    """Test HistoryArchive exports and lookups."""
+    
+    def test_exports_one_file_per_day(self, archive):
+        """Test each day with history gets its own file."""
+        assert [day for day, _ in archive.days()] == [DAY0, DAY0 + timedelta(days=1)]
+        assert archive.rows_exported == 40
+        assert archive.archived_until() == DAY0 + timedelta(days=2)
+    
+    def test_latest_searches_earlier_days(self, archive):
+        """Test an as-of lookup finds the last record of an earlier day."""
+        records = archive.find_latest_before_timestamp(['OBJ_001', 'OBJ_003'], DAY0 + timedelta(hours=30))
+        
+        assert [(r.object_id, r.timestamp) for r in records] == [('OBJ_001', DAY0 + timedelta(days=1, hours=6))]
+        late = archive.find_latest_before_timestamp(['OBJ_002'], DAY0 + timedelta(hours=23))
+        assert late[0].timestamp == DAY0 + timedelta(hours=9)
+    
+    def test_bracketing_crosses_days(self, archive):
+        """Test the record after a moment is found in the next day file."""
+        before, after = archive.find_bracketing(['OBJ_001'], DAY0 + timedelta(hours=12))['OBJ_001']
+        
+        assert before.timestamp == DAY0 + timedelta(hours=9)
+        assert after.timestamp == DAY0 + timedelta(days=1)
+    
+    def test_trajectory_range_and_keyset(self, archive):
+        """Test trajectory rows are bounded by range and start after the cursor."""
+        rows = list(archive.iter_trajectory('OBJ_001', DAY0 + timedelta(hours=8), DAY0 + timedelta(hours=25)))
+        assert [row[1] for row in rows] == [DAY0 + timedelta(hours=h) for h in (8, 9, 24, 25)]
+        
+        after = (rows[1][1], rows[1][0])
+        assert list(archive.iter_trajectory('OBJ_001', after=after))[0] == rows[2]
+    
+    def test_reexport_merges_late_rows(self, archive):
+        """Test exporting a day again keeps its archived rows."""
+        archive.store.rows = [make_row(500, 'OBJ_003', DAY0 + timedelta(hours=2))]
+        
+        assert archive.export_day(DAY0) == 21
+        assert archive.find_time_bounds('OBJ_001') == (DAY0, DAY0 + timedelta(days=1, hours=9))
+        assert archive.find_latest_before_timestamp(['OBJ_003'], DAY0 + timedelta(hours=3))[0].id == 500
+    
+    def test_retention_deletes_old_days(self, archive):
+        """Test day files past the archive retention are deleted."""
+        archive.retention = 86400
+        
+        assert archive.apply_retention(DAY0 + timedelta(days=2, hours=1)) == 1
+        assert not os.path.exists(day_path(archive.directory, DAY0))
+
+class TestArchiveReads:
+    """Test services reading archived moments."""
+    
+    @pytest.fixture
+    def objects(self, monkeypatch):
+        """Serve one object and no database history."""
+        obj = ProductlineObject(id='OBJ_001', name='Robot', status='active')
+        obj.created_at = obj.updated_at = DAY0
+        monkeypatch.setattr(ProductlineObject, 'find_by_id', lambda object_id: obj)
+        monkeypatch.setattr(ProductlineObject, 'find_by_ids', lambda ids: [obj])
+        monkeypatch.setattr(ObjectHistory, 'find_latest_before_timestamp', lambda ids, timestamp: [])
+        monkeypatch.setattr(ObjectHistory, 'find_trajectory_page',
+                            lambda object_id, start=None, end=None, after=None, limit=1000: [])
+        return obj
+    
+    def test_history_reads_archived_moment(self, archive, objects):
+        """Test an archived moment keeps the response shape of raw history."""
+        result = HistoryService(archive=archive).get_objects_at_timestamp(
+            ['OBJ_001'], DAY0 + timedelta(hours=3, minutes=30)
+        )
+        
+        assert result['OBJ_001']['coordinates']['position']['x'] == 3.0
+        assert result['OBJ_001']['updated_at'] == '2025-01-20T03:00:00Z'
+    
+    def test_history_falls_back_to_archive_after_it(self, archive, objects):
+        """Test an object whose last record was archived is still found later on."""
+        result = HistoryService(archive=archive).get_objects_at_timestamp(
+            ['OBJ_001'], DAY0 + timedelta(days=5)
+        )
+        
+        assert result['OBJ_001']['updated_at'] == '2025-01-21T09:00:00Z'
+    
+    def test_trajectory_pages_through_archive(self, archive, objects):
+        """Test trajectory pages continue from archived rows with the same cursor."""
+        service = TrajectoryService(archive=archive)
+        first = service.get_trajectory('OBJ_001', limit=15)
+        second = service.get_trajectory('OBJ_001', cursor=first['cursor'], limit=15)
+        
+        assert first['count'] == 15 and first['has_more']
+        assert second['count'] == 5 and not second['has_more']
+        assert second['points'][-1]['timestamp'] == '2025-01-21T09:00:00Z'
+
+class TestArchiveRetentionDatabase:
+    """Test archiving expired raw history from a SQLite database."""
+    
+    @pytest.fixture
+    def manager(self, database, tmp_path):
+        """Store two days of history and a tier manager archiving what is 7 days old."""
+        db.session.add(ProductlineObject(id='OBJ_001', name='Robot', status='active'))
+        for row in day_rows(DAY0, objects=('OBJ_001',)) + day_rows(DAY0 + timedelta(days=8), objects=('OBJ_001',)):
+            db.session.add(ObjectHistory(row[1], row[2], position_x=row[3], status=row[11]))
+        db.session.commit()
+        
+        archive = HistoryArchive(directory=str(tmp_path / 'archive'))
+        return HistoryTierManager(raw_retention=7 * 86400, retention_mode='archive', mutable_horizon=0,
+                                  archive=archive, clock=lambda: DAY0 + timedelta(days=9))
+    
+    def test_exports_then_deletes_expired_days(self, manager):
+        """Test an expired day is written to its file before its rows are deleted."""
+        assert manager.run_maintenance() is True
+        
+        assert os.listdir(manager.archive.directory) == ['history-20250120.col']
+        assert [day for day, _ in manager.archive.days()] == [DAY0]
+        assert ObjectHistory.query.filter(ObjectHistory.timestamp < DAY0 + timedelta(days=1)).count() == 0
+        assert ObjectHistory.query.count() == 10
+        records = manager.archive.find_latest_before_timestamp(['OBJ_001'], DAY0 + timedelta(hours=12))
+        assert records[0].position_x == 9.0
+    
+    def test_waits_for_another_exporter(self, manager):
+        """Test nothing is exported or deleted while another process holds the archive lock."""
+        with advisory_lock('history_archive') as acquired:
+            assert acquired
+            manager.run_maintenance()
+        
+        assert manager.archive.days() == []
+        assert ObjectHistory.query.count() == 20
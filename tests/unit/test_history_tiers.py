@@ -0,0 +1,342 @@
+"""
+Unit tests for history tiers.
+Tests rolling history up into tiers, tier selection and rollup scheduling
+in memory, and maintenance and tier reads against a SQLite database.
+"""
+
+import re
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from src.database import advisory_lock, db
+from src.models.history_rollup import HistoryRollup
+from src.models.object_history import ObjectHistory
+from src.models.productline_object import ProductlineObject
+from src.services import history_tiers
+from src.services.history_service import HistoryService
+from src.services.history_tiers import HistoryTierManager, align_up, rollup_rows
+
+T0 = datetime(2025, 1, 27, 10, 0, 0)
+DAY = 86400
+
+def make_row(object_id, timestamp, x=1.0, status='active'):
+    """Build a history state row."""
+    return (object_id, timestamp, x, 2.0, 3.0, 1.5, 1.0, 0.0, 0.0, 90.0, status, None)
+
+class TestRollupRows:
+    """Test rolling state rows up into buckets."""
+    
+    def test_keeps_last_state_per_bucket(self):
+        """Test each object and bucket keeps its last state and sample count."""
+        rows = [
+            make_row('OBJ_001', T0 + timedelta(seconds=5), x=1.0),
+            make_row('OBJ_002', T0 + timedelta(seconds=10), x=5.0),
+            make_row('OBJ_001', T0 + timedelta(seconds=50), x=2.0),
+            make_row('OBJ_001', T0 + timedelta(seconds=70), x=3.0)
+        ]
+        buckets = {(r['object_id'], r['bucket']): r for r in rollup_rows(rows, 60)}
+        
+        first = buckets[('OBJ_001', T0)]
+        assert first['position_x'] == 2.0
+        assert first['timestamp'] == T0 + timedelta(seconds=50)
+        assert first['sample_count'] == 2
+        assert buckets[('OBJ_001', T0 + timedelta(minutes=1))]['position_x'] == 3.0
+        assert buckets[('OBJ_002', T0)]['tier'] == 60
+    
+    def test_carries_sample_counts_up(self):
+        """Test rolled-up rows add the samples they stand for."""
+        rows = [make_row('OBJ_001', T0) + (30,), make_row('OBJ_001', T0 + timedelta(minutes=1)) + (12,)]
+        
+        assert rollup_rows(rows, 3600)[0]['sample_count'] == 42
+    
+    def test_align_up(self):
+        """Test moments round up to bucket boundaries."""
+        assert align_up(T0, 60) == T0
+        assert align_up(T0 + timedelta(seconds=1), 60) == T0 + timedelta(minutes=1)
+
+class TestTierSelection:
+    """Test picking the tier a moment is read from."""
+    
+    @pytest.fixture(autouse=True)
+    def expired(self, monkeypatch):
+        """Keep raw history from 7 days back."""
+        monkeypatch.setattr(ObjectHistory, 'find_first_timestamp',
+                            lambda since=None: T0 - timedelta(days=7))
+    
+    def manager(self):
+        return HistoryTierManager(raw_retention=7 * DAY, tier_retentions={60: 90 * DAY},
+                                  clock=lambda: T0)
+    
+    def test_recent_moments_read_raw_history(self):
+        """Test moments within the raw retention use raw history."""
+        assert self.manager().tier_for(T0 - timedelta(days=6)) is None
+    
+    def test_older_moments_read_finest_retained_tier(self):
+        """Test older moments use the minute tier, then the hour tier."""
+        assert self.manager().tier_for(T0 - timedelta(days=8)) == 60
+        assert self.manager().tier_for(T0 - timedelta(days=120)) == 3600
+    
+    def test_retained_raw_history_reads_raw(self, monkeypatch):
+        """Test moments past the raw retention still read raw history until it is expired."""
+        monkeypatch.setattr(ObjectHistory, 'find_first_timestamp',
+                            lambda since=None: T0 - timedelta(days=10))
+        assert self.manager().tier_for(T0 - timedelta(days=9)) is None
+        assert self.manager().tier_for(T0 - timedelta(days=11)) == 60
+    
+    def test_without_raw_retention_reads_raw(self):
+        """Test raw history serves every moment when it is kept forever."""
+        manager = HistoryTierManager(clock=lambda: T0)
+        assert manager.tier_for(T0 - timedelta(days=1000)) is None
+    
+    def test_unknown_retention_mode(self):
+        """Test retention modes are checked."""
+        with pytest.raises(ValueError):
+            HistoryTierManager(retention_mode='truncate')
+
+class TestPartitions:
+    """Test splitting daily history partitions off the MAXVALUE partition."""
+    
+    @pytest.fixture
+    def statements(self, monkeypatch):
+        """Record executed statements instead of altering a table."""
+        statements = []
+        monkeypatch.setattr(history_tiers, 'db', SimpleNamespace(session=SimpleNamespace(
+            execute=lambda statement: statements.append(str(statement))
+        )))
+        return statements
+    
+    def partitioned(self, monkeypatch, last_bound):
+        """Serve partitions ending at `last_bound`, then MAXVALUE."""
+        monkeypatch.setattr(history_tiers, 'history_partitions', lambda: [
+            ('p_initial', last_bound), ('pmax', None)
+        ])
+    
+    def test_premakes_days_ahead(self, monkeypatch, statements):
+        """Test partitions are created from the last bound up to the premake days."""
+        self.partitioned(monkeypatch, datetime(2025, 1, 28))
+        created = HistoryTierManager(partition_premake=3, clock=lambda: T0).ensure_partitions()
+        
+        assert created == 3
+        assert [re.search(r'INTO \(PARTITION (\w+)', statement).group(1)
+                for statement in statements] == [
+            'p20250128', 'p20250129', 'p20250130'
+        ]
+    
+    def test_missed_days_collapse_into_one_partition(self, monkeypatch, statements):
+        """Test days before today that have no partition join today's."""
+        self.partitioned(monkeypatch, datetime(2024, 6, 1))
+        created = HistoryTierManager(partition_premake=1, clock=lambda: T0).ensure_partitions()
+        
+        assert created == 2
+        assert 'PARTITION p20250127 VALUES LESS THAN (1738022400)' in statements[0]
+        assert 'PARTITION p20250128 VALUES LESS THAN (1738108800)' in statements[1]
+    
+    def test_partitions_per_run_are_capped(self, monkeypatch, statements):
+        """Test a run creates at most max_partitions_per_run partitions."""
+        self.partitioned(monkeypatch, datetime(2025, 1, 27))
+        manager = HistoryTierManager(partition_premake=30, max_partitions_per_run=4,
+                                     clock=lambda: T0)
+        
+        assert manager.ensure_partitions() == 4
+        assert manager.partitions_created == 4
+    
+    def test_unpartitioned_table(self, monkeypatch, statements):
+        """Test nothing happens unless the table ends in a MAXVALUE partition."""
+        monkeypatch.setattr(history_tiers, 'history_partitions', lambda: [])
+        
+        assert HistoryTierManager(clock=lambda: T0).ensure_partitions() == 0
+        assert statements == []
+
+class TestRollup:
+    """Test HistoryTierManager rollup scheduling."""
+    
+    @pytest.fixture
+    def store(self, monkeypatch):
+        """Serve raw history and record written buckets in memory."""
+        store = SimpleNamespace(raw=[], buckets={60: [], 3600: []}, commits=0)
+        
+        def rolled_up_until(tier):
+            buckets = [r['bucket'] for r in store.buckets[tier]]
+            return max(buckets) + timedelta(seconds=tier) if buckets else None
+        
+        def first_timestamp(since=None):
+            stamps = [r[1] for r in store.raw if since is None or r[1] >= since]
+            return min(stamps) if stamps else None
+        
+        def tier_first_timestamp(tier, since=None):
+            stamps = [r['timestamp'] for r in store.buckets[tier]
+                      if since is None or r['timestamp'] >= since]
+            return min(stamps) if stamps else None
+        
+        def offset_timestamp(stamps, since, offset):
+            stamps = sorted(stamp for stamp in stamps if stamp >= since)
+            return stamps[offset] if offset < len(stamps) else None
+        
+        def tier_rows(tier, start, end, batch_size=5000):
+            rows = sorted((r for r in store.buckets[tier] if start <= r['timestamp'] < end),
+                          key=lambda r: r['timestamp'])
+            return [make_row(r['object_id'], r['timestamp'], r['position_x']) + (r['sample_count'],)
+                    for r in rows]
+        
+        def replace_buckets(tier, start, end, rows):
+            store.buckets[tier] = [r for r in store.buckets[tier]
+                                   if not start <= r['bucket'] < end] + rows
+            return len(rows)
+        
+        monkeypatch.setattr(HistoryRollup, 'find_rolled_up_until', rolled_up_until)
+        monkeypatch.setattr(ObjectHistory, 'find_first_timestamp', first_timestamp)
+        monkeypatch.setattr(ObjectHistory, 'iter_state_rows', lambda start, end, batch_size=5000: [
+            r for r in store.raw if start <= r[1] < end
+        ])
+        monkeypatch.setattr(HistoryRollup, 'find_first_timestamp', tier_first_timestamp)
+        monkeypatch.setattr(ObjectHistory, 'find_timestamp_at_offset', lambda since, offset:
+                            offset_timestamp([r[1] for r in store.raw], since, offset))
+        monkeypatch.setattr(HistoryRollup, 'find_timestamp_at_offset', lambda tier, since, offset:
+                            offset_timestamp([r['timestamp'] for r in store.buckets[tier]], since, offset))
+        monkeypatch.setattr(HistoryRollup, 'iter_state_rows', tier_rows)
+        monkeypatch.setattr(HistoryRollup, 'replace_buckets', replace_buckets)
+        monkeypatch.setattr(history_tiers, 'db', SimpleNamespace(session=SimpleNamespace(
+            commit=lambda: setattr(store, 'commits', store.commits + 1),
+            rollback=lambda: None
+        )))
+        return store
+    
+    def test_rolls_up_closed_buckets_only(self, store):
+        """Test buckets inside the mutable horizon are left for later."""
+        store.raw = [make_row('OBJ_001', T0 + timedelta(minutes=m, seconds=30)) for m in range(10)]
+        manager = HistoryTierManager(mutable_horizon=300, clock=lambda: T0 + timedelta(minutes=12))
+        
+        assert manager.rollup(60) == 7
+        assert manager.rollup(60) is None
+        assert max(r['bucket'] for r in store.buckets[60]) == T0 + timedelta(minutes=6)
+    
+    def test_skips_gaps_in_history(self, store):
+        """Test a span starts at the next recorded sample, not at the watermark."""
+        store.raw = [make_row('OBJ_001', T0), make_row('OBJ_001', T0 + timedelta(days=3))]
+        manager = HistoryTierManager(mutable_horizon=0, max_rollup_span=3600,
+                                     clock=lambda: T0 + timedelta(days=4))
+        
+        assert manager.rollup(60) == 1
+        assert manager.rollup(60) == 1
+        assert [r['bucket'] for r in store.buckets[60]] == [T0, T0 + timedelta(days=3)]
+    
+    def test_bounds_spans_by_rows(self, store):
+        """Test a span stops at the bucket holding the row past the row limit."""
+        store.raw = [make_row('OBJ_001', T0 + timedelta(minutes=m, seconds=s))
+                     for m in range(10) for s in (10, 20, 30)]
+        manager = HistoryTierManager(mutable_horizon=0, max_rollup_rows=7,
+                                     clock=lambda: T0 + timedelta(hours=1))
+        
+        assert manager.rollup(60) == 2
+        assert manager.rollup(60) == 2
+        assert manager.rollup_all() == 6
+        assert len(store.buckets[60]) == 10
+    
+    def test_large_bucket_still_rolls_up(self, store):
+        """Test a bucket with more rows than the limit is rolled up on its own."""
+        store.raw = [make_row('OBJ_001', T0 + timedelta(seconds=s)) for s in range(20)]
+        manager = HistoryTierManager(mutable_horizon=0, max_rollup_rows=5,
+                                     clock=lambda: T0 + timedelta(hours=1))
+        
+        assert manager.rollup(60) == 1
+        assert store.buckets[60][0]['sample_count'] == 20
+    
+    def test_hour_tier_waits_for_minute_tier(self, store):
+        """Test the hour tier only rolls up hours the minute tier has covered."""
+        store.raw = [make_row('OBJ_001', T0 + timedelta(minutes=m)) for m in range(0, 130, 10)]
+        manager = HistoryTierManager(mutable_horizon=0, clock=lambda: T0 + timedelta(hours=5))
+        
+        manager.rollup_all()
+        
+        hours = {r['bucket']: r for r in store.buckets[3600]}
+        assert set(hours) == {T0, T0 + timedelta(hours=1)}
+        assert hours[T0]['sample_count'] == 6
+        assert hours[T0 + timedelta(hours=1)]['timestamp'] == T0 + timedelta(minutes=110)
+
+class TestHistoryServiceTiers:
+    """Test HistoryService reading old moments from rollup tiers."""
+    
+    @pytest.fixture
+    def lookups(self, monkeypatch):
+        """Serve one object and record which history source is read."""
+        obj = ProductlineObject(id='OBJ_001', name='Robot', status='active')
+        obj.created_at = obj.updated_at = T0
+        rollup = HistoryRollup(tier=60, object_id='OBJ_001', bucket=T0 - timedelta(days=10),
+                               timestamp=T0 - timedelta(days=10), position_x=4.0, status='error')
+        calls = []
+        
+        monkeypatch.setattr(ProductlineObject, 'find_by_ids', lambda ids: [obj])
+        monkeypatch.setattr(ObjectHistory, 'find_first_timestamp', lambda since=None: None)
+        monkeypatch.setattr(ObjectHistory, 'find_latest_before_timestamp',
+                            lambda ids, timestamp: calls.append('raw') or [])
+        monkeypatch.setattr(HistoryRollup, 'find_latest_before_timestamp',
+                            lambda tier, ids, timestamp: calls.append(tier) or [rollup])
+        return calls
+    
+    def test_old_moment_reads_tier(self, lookups):
+        """Test a moment past the raw retention is answered from the minute tier."""
+        tiers = HistoryTierManager(raw_retention=7 * DAY, tier_retentions={60: 90 * DAY},
+                                   clock=lambda: T0)
+        result = HistoryService(tiers=tiers).get_objects_at_timestamp(
+            ['OBJ_001'], T0 - timedelta(days=9)
+        )
+        
+        assert lookups == [60]
+        assert result['OBJ_001']['coordinates']['position']['x'] == 4.0
+        assert result['OBJ_001']['status'] == 'error'
+
+class TestHistoryTiersDatabase:
+    """Test history maintenance and tier reads against a SQLite database."""
+    
+    def add_history(self, *timestamps):
+        """Store an object with one raw history record at (1, 2, 3) per timestamp."""
+        obj = ProductlineObject(id='OBJ_001', name='Robot', status='active')
+        db.session.add(obj)
+        for timestamp in timestamps:
+            db.session.add(ObjectHistory('OBJ_001', timestamp, position_x=1.0, position_y=2.0,
+                                         position_z=3.0, height=1.5, direction_x=1.0, direction_y=0.0,
+                                         direction_z=0.0, rotation=90.0, status='active'))
+        db.session.commit()
+    
+    def manager(self):
+        return HistoryTierManager(raw_retention=7 * DAY, tier_retentions={60: 90 * DAY},
+                                  mutable_horizon=0, clock=lambda: T0)
+    
+    def test_unexpired_raw_history_is_read(self, database):
+        """Test a moment past the raw retention reads raw history that is still there."""
+        self.add_history(T0 - timedelta(days=10))
+        
+        result = HistoryService(tiers=self.manager()).get_objects_at_timestamp(
+            ['OBJ_001'], T0 - timedelta(days=9)
+        )
+        
+        position = result['OBJ_001']['coordinates']['position']
+        assert (position['x'], position['y'], position['z']) == (1.0, 2.0, 3.0)
+        assert result['OBJ_001']['updated_at'] == (T0 - timedelta(days=10)).isoformat() + 'Z'
+    
+    def test_maintenance_rolls_up_then_expires(self, database):
+        """Test expired raw history is read from the minute tier it was rolled up into."""
+        self.add_history(T0 - timedelta(days=10), T0 - timedelta(days=10, seconds=-30),
+                         T0 - timedelta(days=1))
+        manager = self.manager()
+        
+        assert manager.run_maintenance() is True
+        
+        assert [r.timestamp for r in ObjectHistory.query.all()] == [T0 - timedelta(days=1)]
+        bucket = HistoryRollup.query.filter_by(tier=60, bucket=T0 - timedelta(days=10)).one()
+        assert bucket.sample_count == 2
+        assert manager.tier_for(T0 - timedelta(days=9)) == 60
+        result = HistoryService(tiers=manager).get_object_at_timestamp('OBJ_001', T0 - timedelta(days=9))
+        assert result['updated_at'] == (T0 - timedelta(days=10, seconds=-30)).isoformat() + 'Z'
+    
+    def test_one_maintenance_run_at_a_time(self, database):
+        """Test maintenance skips its run while another holds the lock."""
+        self.add_history(T0 - timedelta(days=10))
+        manager = self.manager()
+        
+        with advisory_lock('history_maintenance') as acquired:
+            assert acquired
+            assert manager.run_maintenance() is False
+        
+        assert manager.last_run is None
+        assert HistoryRollup.query.count() == 0
@@ -0,0 +1,207 @@
+"""
+Unit tests for bulk history ingestion.
+Tests vectorized validation, per-sample rejects and chunked writes without
+a database, and the writes against SQLite.
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from sqlalchemy.exc import OperationalError
+from benchmarks.generator import object_id, seed_productline
+from src.database import db
+from src.services.validation import validate_coordinates_array
+from src.models.object_history import ObjectHistory
+from src.models.productline_object import ProductlineObject
+from src.models.scene_checkpoint import SceneCheckpoint
+from src.services import ingest_service
+from src.services.ingest_service import HistoryIngestService
+from src.services.samples import sample_timestamp
+
+NOW = datetime(2025, 1, 27, 12, 0)
+
+def make_sample(object_id='OBJ_001', timestamp='2025-01-27T10:00:00Z', **overrides):
+    """Build a valid history sample."""
+    sample = {
+        'object_id': object_id,
+        'timestamp': timestamp,
+        'position': {'x': 1.0, 'y': 2.0, 'z': 3.0},
+        'height': 1.5,
+        'direction': {'x': 1.0, 'y': 0.0, 'z': 0.0},
+        'rotation': 90.0
+    }
+    sample.update(overrides)
+    return sample
+
+class TestValidateCoordinatesArray:
+    """Test the vectorized coordinate validation."""
+    
+    def test_ranges(self):
+        """Test rows are checked like validate_coordinates."""
+        values = np.array([
+            [1, 2, 3, 1.5, 1, 0, 0, 90],
+            [1, 2, 3, -1, 1, 0, 0, 90],
+            [1, 2, 3, 1.5, 1, 0, 0, 361],
+            [np.nan, 2, 3, 1.5, 1, 0, 0, 90],
+            [np.inf, 2, 3, 1.5, 1, 0, 0, 90]
+        ])
+        assert validate_coordinates_array(values).tolist() == [True, False, False, False, False]
+    
+    def test_empty(self):
+        """Test no rows give an empty mask."""
+        assert validate_coordinates_array(np.empty((0, 8))).tolist() == []
+
+class TestHistoryIngestService:
+    """Test HistoryIngestService functionality."""
+    
+    @pytest.fixture
+    def store(self, monkeypatch):
+        """Record inserted chunks and transactions in memory."""
+        store = SimpleNamespace(chunks=[], commits=0, rollbacks=0, fail_chunks=set(),
+                                stale_from=[])
+        
+        def insert_many(rows):
+            if len(store.chunks) in store.fail_chunks:
+                store.chunks.append(None)
+                raise OperationalError('INSERT', {}, Exception('deadlock'))
+            store.chunks.append(list(rows))
+            return len(rows)
+        
+        def commit():
+            store.commits += 1
+        
+        def rollback():
+            store.rollbacks += 1
+        
+        monkeypatch.setattr(ObjectHistory, 'insert_many', insert_many)
+        monkeypatch.setattr(ProductlineObject, 'find_existing_ids',
+                            lambda object_ids: {i for i in object_ids if i != 'OBJ_404'})
+        monkeypatch.setattr(SceneCheckpoint, 'delete_taken_at_or_after',
+                            lambda timestamp: store.stale_from.append(timestamp) or 0)
+        monkeypatch.setattr(ingest_service, 'db', SimpleNamespace(
+            session=SimpleNamespace(commit=commit, rollback=rollback)
+        ))
+        return store
+    
+    def test_inserts_valid_samples(self, store):
+        """Test valid samples become history rows."""
+        result = HistoryIngestService().ingest([make_sample(), make_sample('OBJ_002', 1737972000)])
+        
+        assert result == {'received': 2, 'inserted': 2, 'rejected': 0, 'rejects': []}
+        row = store.chunks[0][0]
+        assert row['object_id'] == 'OBJ_001'
+        assert row['timestamp'] == datetime(2025, 1, 27, 10, 0)
+        assert row['position_x'] == 1.0 and row['rotation'] == 90.0
+        assert store.chunks[0][1]['timestamp'] == datetime(2025, 1, 27, 10, 0)
+        assert store.stale_from == [datetime(2025, 1, 27, 10, 0)]
+    
+    def test_rejects_are_per_sample(self, store):
+        """Test invalid samples are reported by index while the rest are written."""
+        samples = [
+            make_sample(),
+            'not a sample',
+            make_sample(object_id='bad id'),
+            make_sample(timestamp='yesterday'),
+            make_sample(status='broken'),
+            make_sample(height=-1.0),
+            make_sample(position={'x': 1.0, 'y': 2.0}),
+            make_sample(object_id='OBJ_404'),
+            make_sample(rotation=True)
+        ]
+        result = HistoryIngestService().ingest(samples)
+        
+        assert result['inserted'] == 1
+        assert [(r['index'], r['code']) for r in result['rejects']] == [
+            (1, 'INVALID_SAMPLE'),
+            (2, 'INVALID_OBJECT_ID'),
+            (3, 'INVALID_TIMESTAMP'),
+            (4, 'INVALID_STATUS'),
+            (5, 'INVALID_COORDINATES'),
+            (6, 'INVALID_COORDINATES'),
+            (7, 'OBJECT_NOT_FOUND'),
+            (8, 'INVALID_COORDINATES')
+        ]
+    
+    def test_oversized_integer_is_rejected(self, store):
+        """Test an integer too large for a float rejects only its own sample."""
+        result = HistoryIngestService().ingest([
+            make_sample(position={'x': 10 ** 400, 'y': 2.0, 'z': 3.0}),
+            make_sample('OBJ_002')
+        ])
+        
+        assert result['inserted'] == 1
+        assert [(r['index'], r['code']) for r in result['rejects']] == [
+            (0, 'INVALID_COORDINATES')
+        ]
+    
+    def test_writes_in_bounded_chunks(self, store):
+        """Test rows are committed chunk_size at a time."""
+        samples = [make_sample(timestamp=1737972000 + i) for i in range(5)]
+        result = HistoryIngestService(chunk_size=2).ingest(samples)
+        
+        assert result['inserted'] == 5
+        assert [len(chunk) for chunk in store.chunks] == [2, 2, 1]
+        assert store.commits >= 3
+    
+    def test_failed_chunk_rejects_only_its_rows(self, store):
+        """Test a write failure rolls back one chunk and the others still land."""
+        store.fail_chunks.add(1)
+        samples = [make_sample(timestamp=1737972000 + i) for i in range(5)]
+        result = HistoryIngestService(chunk_size=2).ingest(samples)
+        
+        assert result['inserted'] == 3
+        assert [(r['index'], r['code']) for r in result['rejects']] == [
+            (2, 'WRITE_ERROR'), (3, 'WRITE_ERROR')
+        ]
+        assert store.rollbacks == 1
+    
+    def test_recent_samples_keep_checkpoints(self, store):
+        """Test samples inside the mutable horizon invalidate nothing."""
+        service = HistoryIngestService(mutable_horizon=300, clock=lambda: NOW)
+        service.ingest([make_sample(timestamp='2025-01-27T11:58:00Z')])
+        
+        assert store.stale_from == []
+    
+    def test_nothing_valid(self, store):
+        """Test a batch without valid samples writes nothing."""
+        result = HistoryIngestService().ingest([make_sample(height=-1.0)])
+        
+        assert result['inserted'] == 0
+        assert store.chunks == []
+        assert store.stale_from == []
+    
+    def test_sample_timestamp(self):
+        """Test ISO 8601 and Unix timestamps are parsed to naive UTC."""
+        assert sample_timestamp('2025-01-27T12:00:00+02:00') == datetime(2025, 1, 27, 10, 0)
+        assert sample_timestamp(0) == datetime(1970, 1, 1)
+        assert sample_timestamp(None) is None
+        assert sample_timestamp(True) is None
+
+class TestHistoryIngestDatabase:
+    """Test HistoryIngestService against a seeded SQLite database."""
+    
+    def test_writes_rows_and_drops_stale_checkpoints(self, database):
+        """Test accepted samples are stored and late ones drop the checkpoints they change."""
+        seed_productline(3, 2)
+        db.session.add(SceneCheckpoint(datetime(2025, 1, 27, 9, 0), b'', 0))
+        db.session.add(SceneCheckpoint(datetime(2025, 1, 27, 11, 0), b'', 0))
+        db.session.commit()
+        
+        service = HistoryIngestService(chunk_size=2, clock=lambda: NOW)
+        result = service.ingest([
+            make_sample(object_id(0), status='processing', metadata={'shift': 2}),
+            make_sample(object_id(1), timestamp=1737972000),
+            make_sample(object_id(2), timestamp='2025-01-27T10:30:00Z'),
+            make_sample('OBJ_404')
+        ])
+        
+        assert result['inserted'] == 3
+        assert [(r['index'], r['code']) for r in result['rejects']] == [(3, 'OBJECT_NOT_FOUND')]
+        
+        record = ObjectHistory.find_by_object_before_timestamp(object_id(0), NOW)
+        assert record.timestamp == datetime(2025, 1, 27, 10, 0)
+        assert (record.position_x, record.rotation, record.status) == (1.0, 90.0, 'processing')
+        assert record.object_metadata == {'shift': 2}
+        assert ObjectHistory.query.count() == 3 * 2 + 3
+        assert [c.taken_at for c in SceneCheckpoint.query.all()] == [datetime(2025, 1, 27, 9, 0)]
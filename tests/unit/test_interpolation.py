@@ -0,0 +1,99 @@
+"""
+Unit tests for state interpolation.
+Tests lerp, slerp, shortest-arc rotation and missing values.
+"""
+
+import math
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from src.services.interpolation import (
+    interpolate_states, lerp_angle, nlerp, slerp, state_row
+)
+
+def make_state(x, direction, rotation, height=1.0):
+    """Build a STATE_FIELDS row."""
+    return [x, 0.0, 0.0, height, direction[0], direction[1], direction[2], rotation]
+
+class TestDirections:
+    """Test direction interpolation."""
+    
+    def test_slerp_constant_angular_rate(self):
+        """Test slerp moves a quarter of the angle at a quarter of the way."""
+        a = np.array([[1.0, 0.0, 0.0]])
+        b = np.array([[0.0, 1.0, 0.0]])
+        
+        result = slerp(a, b, np.array([0.25]))[0]
+        assert result == pytest.approx([math.cos(math.pi / 8), math.sin(math.pi / 8), 0.0])
+    
+    def test_nlerp_is_unit_length(self):
+        """Test normalized lerp yields unit directions."""
+        a = np.array([[1.0, 0.0, 0.0], [0.0, 0.0, 1.0]])
+        b = np.array([[0.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+        
+        result = nlerp(a, b, np.array([0.25, 0.5]))
+        assert np.linalg.norm(result, axis=1) == pytest.approx([1.0, 1.0])
+    
+    def test_slerp_parallel_directions(self):
+        """Test slerp between equal directions is stable."""
+        a = np.array([[0.0, 0.0, 1.0]])
+        
+        result = slerp(a, a, np.array([0.5]))[0]
+        assert result == pytest.approx([0.0, 0.0, 1.0])
+        assert not np.isnan(result).any()
+
+class TestRotation:
+    """Test rotation angle interpolation."""
+    
+    @pytest.mark.parametrize('a, b, t, expected', [
+        (350.0, 10.0, 0.5, 0.0),
+        (10.0, 350.0, 0.25, 5.0),
+        (90.0, 180.0, 0.5, 135.0),
+        (0.0, 0.0, 0.5, 0.0),
+    ])
+    def test_shorter_arc(self, a, b, t, expected):
+        """Test rotation follows the shorter way round."""
+        result = lerp_angle(np.array([a]), np.array([b]), np.array([t]))[0]
+        assert result == pytest.approx(expected)
+
+class TestInterpolateStates:
+    """Test whole-state interpolation."""
+    
+    def test_batch(self):
+        """Test several objects are interpolated by their own fractions."""
+        before = [make_state(0.0, (1, 0, 0), 0.0), make_state(10.0, (1, 0, 0), 90.0, height=2.0)]
+        after = [make_state(10.0, (0, 1, 0), 40.0), make_state(20.0, (1, 0, 0), 90.0, height=4.0)]
+        
+        result = interpolate_states(before, after, [0.5, 0.25], mode='slerp')
+        assert result[0][0] == pytest.approx(5.0)
+        assert result[0][4:7] == pytest.approx([math.sqrt(0.5), math.sqrt(0.5), 0.0])
+        assert result[0][7] == pytest.approx(20.0)
+        assert result[1][0] == pytest.approx(12.5)
+        assert result[1][3] == pytest.approx(2.5)
+    
+    def test_fraction_is_clamped(self):
+        """Test fractions outside [0, 1] do not extrapolate."""
+        result = interpolate_states(
+            [make_state(0.0, (1, 0, 0), 0.0)], [make_state(10.0, (1, 0, 0), 0.0)], [1.5]
+        )
+        assert result[0][0] == pytest.approx(10.0)
+    
+    def test_missing_values_keep_earlier_state(self):
+        """Test NaN fields on either side hold the earlier value."""
+        before = [make_state(0.0, (1, 0, 0), float('nan'))]
+        after = [make_state(10.0, (0, float('nan'), 0), 90.0)]
+        
+        result = interpolate_states(before, after, [0.5])[0]
+        assert result[0] == pytest.approx(5.0)
+        assert list(result[4:7]) == [1.0, 0.0, 0.0]
+        assert math.isnan(result[7])
+    
+    def test_state_row(self):
+        """Test history records map to rows with None as NaN."""
+        record = SimpleNamespace(position_x=1.0, position_y=2.0, position_z=3.0, height=4.0,
+                                 direction_x=1.0, direction_y=0.0, direction_z=0.0,
+                                 rotation=None)
+        
+        row = state_row(record)
+        assert row[:7] == [1.0, 2.0, 3.0, 4.0, 1.0, 0.0, 0.0]
+        assert math.isnan(row[7])
@@ -0,0 +1,138 @@
+"""
+Unit tests for live update fan-out.
+Tests subscription filters, drop-oldest queues and the event stream.
+"""
+
+import socket
+import pytest
+from src.services.live_updates import LiveUpdateBroker, Subscription, client_disconnected, format_sse
+
+def make_object(object_id, x=0.0, y=0.0, z=0.0):
+    """Build a minimal object response at a position."""
+    return {'object_id': object_id, 'coordinates': {'position': {'x': x, 'y': y, 'z': z}}}
+
+class TestSubscription:
+    """Test Subscription functionality."""
+    
+    def test_no_filters_match_everything(self):
+        """Test an unfiltered subscription matches every object."""
+        assert Subscription().matches(make_object('OBJ_001'))
+    
+    def test_object_id_filter(self):
+        """Test only the subscribed IDs match."""
+        subscription = Subscription(object_ids=['OBJ_001'])
+        
+        assert subscription.matches(make_object('OBJ_001'))
+        assert not subscription.matches(make_object('OBJ_002'))
+    
+    def test_bbox_reports_leaving_objects_once(self):
+        """Test an object leaving the box is matched once more."""
+        subscription = Subscription(bbox=(0, 0, 0, 10, 10, 10))
+        
+        assert not subscription.matches(make_object('OBJ_001', x=20))
+        assert subscription.matches(make_object('OBJ_001', x=5))
+        assert subscription.matches(make_object('OBJ_001', x=20))
+        assert not subscription.matches(make_object('OBJ_001', x=30))
+    
+    def test_queue_drops_oldest(self):
+        """Test a full queue drops its oldest events."""
+        subscription = Subscription(max_queue=2)
+        for i in range(5):
+            subscription.put(i)
+        
+        assert subscription.get(timeout=0) == [3, 4]
+        assert subscription.dropped == 3
+        assert subscription.get(timeout=0) == []
+    
+    def test_close_wakes_reader(self):
+        """Test a closed subscription returns immediately."""
+        subscription = Subscription()
+        subscription.close()
+        
+        assert subscription.get(timeout=10) == []
+        assert subscription.closed
+
+class TestLiveUpdateBroker:
+    """Test LiveUpdateBroker functionality."""
+    
+    @pytest.fixture
+    def broker(self):
+        """Create a broker whose detector never polls during the test."""
+        broker = LiveUpdateBroker(app=None, poll_interval=60, max_queue=4, max_subscribers=2)
+        yield broker
+        broker.stop()
+    
+    def test_publish_fans_out_by_filter(self, broker):
+        """Test each subscriber only receives matching objects."""
+        everything = broker.subscribe()
+        only_two = broker.subscribe(object_ids=['OBJ_002'])
+        
+        broker.publish(make_object('OBJ_001'), 'c1')
+        broker.publish(make_object('OBJ_002'), 'c2')
+        
+        assert [e['id'] for e in everything.get(timeout=0)] == ['c1', 'c2']
+        assert [e['object']['object_id'] for e in only_two.get(timeout=0)] == ['OBJ_002']
+        assert broker.stats()['events_published'] == 2
+    
+    def test_subscriber_limit(self, broker):
+        """Test subscriptions beyond the limit are refused."""
+        assert broker.subscribe() is not None
+        assert broker.subscribe() is not None
+        assert broker.subscribe() is None
+        assert broker.stats()['subscribers'] == 2
+    
+    def test_stream_reports_overflow(self, broker):
+        """Test dropped events are announced before the remaining ones."""
+        subscription = broker.subscribe()
+        for i in range(6):
+            broker.publish(make_object('OBJ_001', x=i), f'c{i}')
+        
+        stream = broker.stream(subscription, heartbeat_interval=0)
+        assert next(stream) == 'retry: 2000\n\n'
+        assert next(stream) == format_sse('overflow', {'dropped': 2})
+        assert next(stream).startswith('id: c2\nevent: change\n')
+        
+        # Remaining events, then a keepalive once the queue is empty
+        messages = [next(stream) for _ in range(4)]
+        assert messages[-1] == ': keepalive\n\n'
+    
+    def test_closing_stream_unsubscribes(self, broker):
+        """Test a closed stream removes its subscription."""
+        stream = broker.stream(broker.subscribe(), heartbeat_interval=0)
+        next(stream)
+        stream.close()
+        
+        assert broker.stats()['subscribers'] == 0
+
+    def test_stream_ends_on_disconnect(self, broker):
+        """Test a stream ends and unsubscribes once the client is gone, without a heartbeat."""
+        gone = []
+        stream = broker.stream(broker.subscribe(), heartbeat_interval=60,
+                               disconnected=lambda: bool(gone), check_interval=0.01)
+        next(stream)
+        gone.append(True)
+        
+        assert list(stream) == []
+        assert broker.stats()['subscribers'] == 0
+
+class TestClientDisconnected:
+    """Test client disconnect detection."""
+    
+    def test_closed_peer(self):
+        """Test a socket is only reported once its peer has closed it."""
+        server, client = socket.socketpair()
+        try:
+            assert not client_disconnected(server)
+            client.close()
+            assert client_disconnected(server)
+        finally:
+            server.close()
+
+class TestFormatSse:
+    """Test Server-Sent Events formatting."""
+    
+    def test_format(self):
+        """Test messages carry id, event name and compact JSON data."""
+        message = format_sse('change', {'a': 1}, 'c1')
+        assert message == 'id: c1\nevent: change\ndata: {"a":1}\n\n'
+        assert format_sse('overflow', {}) == 'event: overflow\ndata: {}\n\n'
@@ -0,0 +1,120 @@
+"""
+Unit tests for request metrics.
+Tests histograms, the Prometheus text format and request measurement on a
+bare Flask app with an in-memory SQLite engine.
+"""
+
+import os
+from flask import Flask, Response, jsonify, stream_with_context
+from sqlalchemy import create_engine, text
+from src.middleware.metrics import Histogram, RequestMetrics, RequestTimings, format_labels, init_metrics
+
+class TestHistogram:
+    """Test Histogram functionality."""
+    
+    def test_cumulative_buckets(self):
+        """Test counts accumulate up to +Inf and bounds are inclusive."""
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        
+        assert histogram.cumulative() == [(0.1, 2), (1.0, 3), (float('inf'), 4)]
+        assert histogram.count == 4 and histogram.sum == 3.65
+
+class TestRequestMetrics:
+    """Test RequestMetrics rendering."""
+    
+    def test_renders_exposition_format(self):
+        """Test request samples render as Prometheus histograms and counters."""
+        metrics = RequestMetrics(latency_buckets=(0.1, 1.0))
+        timings = RequestTimings()
+        timings.queries = 2
+        metrics.record_request('api.get_object', 'GET', 200, 0.05, timings, 512)
+        text_output = metrics.render()
+        pid = os.getpid()
+        
+        assert '# TYPE http_request_duration_seconds histogram' in text_output
+        assert ('http_request_duration_seconds_bucket'
+                f'{{endpoint="api.get_object",method="GET",pid="{pid}",le="0.1"}} 1' in text_output)
+        assert (f'http_request_duration_seconds_count{{endpoint="api.get_object",method="GET",pid="{pid}"}} 1'
+                in text_output)
+        assert (f'http_requests_total{{endpoint="api.get_object",method="GET",status="200",pid="{pid}"}} 1'
+                in text_output)
+        assert f'http_request_db_queries_sum{{endpoint="api.get_object",pid="{pid}"}} 2' in text_output
+        assert f'http_response_bytes_bucket{{endpoint="api.get_object",pid="{pid}",le="1024"}} 1' in text_output
+    
+    def test_escapes_label_values(self):
+        """Test quotes, backslashes and newlines in label values are escaped."""
+        assert format_labels((('endpoint', 'a"b\\c\n'),)) == '{endpoint="a\\"b\\\\c\\n"}'
+
+class TestRequestMeasurement:
+    """Test measuring requests through the Flask hooks."""
+    
+    def make_app(self):
+        """Build an app whose route runs two queries."""
+        app = Flask(__name__)
+        engine = create_engine('sqlite://')
+        init_metrics(app)
+        
+        @app.route('/objects')
+        def objects():
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+                connection.execute(text('SELECT 2'))
+            return jsonify({'objects': list(range(100))})
+        
+        @app.route('/stream')
+        def stream():
+            def rows():
+                with engine.connect() as connection:
+                    for value in range(3):
+                        yield f"{connection.execute(text(f'SELECT {value}')).scalar()}\n"
+            return Response(stream_with_context(rows()), mimetype='text/plain')
+        
+        return app
+    
+    def test_counts_queries_and_bytes_per_request(self):
+        """Test a request records its queries, serialization and response size."""
+        app = self.make_app()
+        response = app.test_client().get('/objects')
+        metrics = app.request_metrics
+        
+        queries = metrics._histograms[('http_request_db_queries', (('endpoint', 'objects'),))]
+        size = metrics._histograms[('http_response_bytes', (('endpoint', 'objects'),))]
+        serialization = metrics._histograms[('http_response_serialization_seconds',
+                                             (('endpoint', 'objects'),))]
+        assert queries.sum == 2
+        assert size.sum == len(response.data)
+        assert serialization.count == 1 and serialization.sum > 0
+        assert metrics._counters[('db_queries_total', (('context', 'request'),))] == 2
+    
+    def test_streamed_response_recorded_on_close(self):
+        """Test a streamed response is recorded once closed, with the queries it streamed."""
+        app = self.make_app()
+        response = app.test_client().get('/stream', buffered=False)
+        metrics = app.request_metrics
+        key = ('http_request_db_queries', (('endpoint', 'stream'),))
+        
+        assert key not in metrics._histograms
+        assert response.get_data() == b'0\n1\n2\n'
+        response.close()
+        
+        assert metrics._histograms[key].sum == 3
+        assert metrics._counters[('http_requests_total', (('endpoint', 'stream'), ('method', 'GET'),
+                                                          ('status', '200')))] == 1
+    
+    def test_background_queries_are_counted_apart(self):
+        """Test queries outside of requests are counted as background work."""
+        app = self.make_app()
+        with app.app_context():
+            create_engine('sqlite://').connect().execute(text('SELECT 1'))
+        
+        assert app.request_metrics._counters[('db_queries_total', (('context', 'background'),))] == 1
+    
+    def test_disabled(self):
+        """Test no hooks are installed when metrics are disabled."""
+        app = Flask(__name__)
+        app.config['METRICS_ENABLED'] = False
+        
+        assert init_metrics(app) is None
+        assert not app.before_request_funcs
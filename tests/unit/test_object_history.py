@@ -0,0 +1,72 @@
+"""
+Unit tests for ObjectHistory lookups.
+Tests the groupwise-max as-of query against a SQLite database, including
+ties on timestamp, duplicate IDs and objects without history.
+"""
+
+from datetime import datetime, timedelta
+import pytest
+from src.database import db
+from src.models.object_history import ObjectHistory
+
+T0 = datetime(2025, 1, 27, 10, 0, 0)
+
+def make_row(row_id, object_id, timestamp, x=1.0):
+    """Build a history row keyed by column."""
+    return {
+        'id': row_id, 'object_id': object_id, 'timestamp': timestamp,
+        'position_x': x, 'position_y': 2.0, 'position_z': 3.0, 'height': 1.5,
+        'direction_x': 1.0, 'direction_y': 0.0, 'direction_z': 0.0, 'rotation': 90.0,
+        'status': 'active'
+    }
+
+class TestFindLatestBeforeTimestamp:
+    """Test ObjectHistory.find_latest_before_timestamp against SQLite."""
+    
+    @pytest.fixture
+    def history(self, database):
+        """Insert history for two objects, with OBJ_001 tied at T0 + 1 minute."""
+        ObjectHistory.insert_many([
+            make_row(1, 'OBJ_001', T0, x=0.0),
+            make_row(7, 'OBJ_001', T0 + timedelta(minutes=1), x=7.0),
+            make_row(4, 'OBJ_001', T0 + timedelta(minutes=1), x=4.0),
+            make_row(9, 'OBJ_001', T0 + timedelta(minutes=2), x=9.0),
+            make_row(2, 'OBJ_002', T0, x=2.0),
+        ])
+        db.session.commit()
+    
+    def latest(self, object_ids, timestamp):
+        """Look up the latest records, keyed by object ID."""
+        records = ObjectHistory.find_latest_before_timestamp(object_ids, timestamp)
+        return {record.object_id: record.id for record in records}
+    
+    def test_latest_at_or_before(self, history):
+        """Test each object resolves to its latest record at or before the timestamp."""
+        assert self.latest(['OBJ_001', 'OBJ_002'], T0 + timedelta(seconds=30)) == {
+            'OBJ_001': 1, 'OBJ_002': 2
+        }
+        assert self.latest(['OBJ_001'], T0 + timedelta(minutes=2)) == {'OBJ_001': 9}
+    
+    def test_timestamp_ties_pick_highest_id(self, history):
+        """Test records sharing the latest timestamp resolve to the highest ID."""
+        records = ObjectHistory.find_latest_before_timestamp(
+            ['OBJ_001'], T0 + timedelta(minutes=1, seconds=30))
+        
+        assert [(record.id, record.position_x) for record in records] == [(7, 7.0)]
+    
+    def test_duplicate_ids(self, history):
+        """Test duplicate IDs in a request yield one record per object."""
+        records = ObjectHistory.find_latest_before_timestamp(
+            ['OBJ_002', 'OBJ_001', 'OBJ_002', 'OBJ_001'], T0 + timedelta(minutes=5))
+        
+        assert sorted(record.id for record in records) == [2, 9]
+    
+    def test_ids_without_history(self, history):
+        """Test IDs without history, or none before the timestamp, are absent."""
+        assert self.latest(['OBJ_001', 'OBJ_404'], T0) == {'OBJ_001': 1}
+        assert self.latest(['OBJ_001', 'OBJ_002'], T0 - timedelta(seconds=1)) == {}
+        assert self.latest([], T0) == {}
+    
+    def test_latest_overall(self, history):
+        """Test a timestamp of None finds the latest record overall."""
+        assert self.latest(['OBJ_001', 'OBJ_002'], None) == {'OBJ_001': 9, 'OBJ_002': 2}
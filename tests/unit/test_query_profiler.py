@@ -0,0 +1,102 @@
+"""
+Unit tests for the query profiler.
+Tests statement fingerprints, N+1 detection and the slow query log on a
+bare Flask app with an in-memory SQLite engine.
+"""
+
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+from src.middleware.query_profiler import QueryProfile, QueryProfiler, fingerprint_statement, init_query_profiler
+
+def make_app(**config):
+    """Build an app that looks objects up one query at a time."""
+    app = Flask(__name__)
+    app.config.update(QUERY_PROFILER_ENABLED=True, QUERY_PROFILER_SAMPLE_RATE=1.0)
+    app.config.update(config)
+    engine = create_engine('sqlite://', poolclass=StaticPool)
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE objects (id TEXT PRIMARY KEY, name TEXT)'))
+        connection.execute(text("INSERT INTO objects VALUES ('OBJ_001', 'Robot'), ('OBJ_002', 'Belt')"))
+    init_query_profiler(app)
+    reports = []
+    finish = app.query_profiler.finish
+    app.query_profiler.finish = lambda profile, endpoint: reports.append(finish(profile, endpoint)) or reports[-1]
+    
+    @app.route('/objects/<int:count>')
+    def objects(count):
+        with engine.connect() as connection:
+            for index in range(count):
+                connection.execute(text('SELECT name FROM objects WHERE id = :id'),
+                                   {'id': f'OBJ_{index:03d}'})
+        return jsonify({'count': count})
+    
+    return app, reports
+
+class TestFingerprints:
+    """Test statement fingerprints."""
+    
+    def test_literals_and_parameters_share_a_fingerprint(self):
+        """Test statements differing only in values get the same fingerprint."""
+        first = fingerprint_statement("SELECT * FROM objects WHERE id = 'OBJ_001' AND x > 1.5")
+        second = fingerprint_statement("select * from objects  where id = %s and x > %s")
+        
+        assert first[0] == second[0]
+        assert first[1] == 'SELECT * FROM objects WHERE id = ? AND x > ?'
+    
+    def test_in_lists_collapse(self):
+        """Test IN lists and multi-row VALUES of any length share a fingerprint."""
+        assert (fingerprint_statement('SELECT * FROM t WHERE id IN (?, ?, ?)')[1]
+                == fingerprint_statement('SELECT * FROM t WHERE id IN (%s)')[1]
+                == 'SELECT * FROM t WHERE id IN (?)')
+        assert fingerprint_statement('INSERT INTO t VALUES (?), (?), (?)')[1] == 'INSERT INTO t VALUES (?)'
+    
+    def test_identifiers_keep_digits(self):
+        """Test digits inside identifiers are not taken for literals."""
+        assert fingerprint_statement('SELECT t1.x FROM t1')[1] == 'SELECT t1.x FROM t1'
+
+class TestQueryProfiler:
+    """Test profiling requests."""
+    
+    def test_flags_repeated_statements(self):
+        """Test a statement run in a loop is reported as N+1."""
+        app, reports = make_app(QUERY_PROFILER_REPEAT_THRESHOLD=3, QUERY_PROFILER_SLOW_THRESHOLD=10.0)
+        client = app.test_client()
+        client.get('/objects/5')
+        client.get('/objects/2')
+        
+        assert [pattern['count'] for pattern in reports[0]['repeated']] == [5]
+        assert reports[0]['repeated'][0]['statement'] == 'SELECT name FROM objects WHERE id = ?'
+        assert reports[1]['repeated'] == []
+        assert app.query_profiler.stats()['repeated_patterns'] == 1
+    
+    def test_explains_slow_statements_once_per_interval(self):
+        """Test slow statements are logged with their plan, explained once per fingerprint."""
+        app, reports = make_app(QUERY_PROFILER_SLOW_THRESHOLD=0.0)
+        app.test_client().get('/objects/2')
+        
+        first, second = reports[0]['slow']
+        assert first['parameters'] == "('OBJ_000',)"
+        assert first['plan'] and 'detail' in first['plan'][0]
+        assert second['plan'] is None
+    
+    def test_unsampled_requests_are_not_profiled(self):
+        """Test requests outside the sample record nothing."""
+        app, reports = make_app(QUERY_PROFILER_SAMPLE_RATE=0.0)
+        app.test_client().get('/objects/5')
+        
+        assert reports == []
+    
+    def test_sampling(self):
+        """Test a request is sampled when the draw falls under the rate."""
+        draws = iter([0.05, 0.5])
+        profiler = QueryProfiler(sample_rate=0.1, random=lambda: next(draws))
+        
+        assert profiler.should_sample() and not profiler.should_sample()
+    
+    def test_non_select_statements_are_not_explained(self):
+        """Test only reads are explained."""
+        profile = QueryProfile()
+        profile.add('DELETE FROM objects', (), 1.0, None, False, 0.5)
+        
+        assert QueryProfiler().finish(profile, 'api.delete')['slow'][0]['plan'] is None
@@ -0,0 +1,147 @@
+"""
+Unit tests for the read paths.
+Tests the 'core' read path builds the same responses from plain rows as
+the 'orm' read path does from model instances, in memory and against a
+seeded SQLite database.
+"""
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+import pytest
+from flask import Flask
+from benchmarks.generator import HISTORY_START, object_id, seed_productline
+from src.models.coordinates import Coordinates
+from src.models.object_history import ObjectHistory
+from src.models.productline_object import ProductlineObject
+from src.services.data_service import DataService, get_read_path
+from src.services.history_service import HistoryService
+
+T0 = datetime(2025, 1, 27, 10, 0, 0)
+
+ObjectRow = namedtuple('ObjectRow', ProductlineObject.ROW_COLUMNS + (
+    'position_x', 'position_y', 'position_z', 'height',
+    'direction_x', 'direction_y', 'direction_z', 'rotation'
+))
+HistoryRow = namedtuple('HistoryRow', ObjectHistory.ROW_COLUMNS)
+
+def make_object():
+    """Build a model instance and the equivalent joined row."""
+    obj = ProductlineObject(id='OBJ_001', name='Robot', status='active', metadata={'line': 'L01'})
+    obj.created_at = obj.updated_at = T0
+    coords = Coordinates('OBJ_001', position_x=1.0, position_y=2.0, position_z=3.0, height=1.5,
+                         direction_x=0.0, direction_y=1.0, direction_z=0.0, rotation=90.0)
+    row = ObjectRow('OBJ_001', 'Robot', 'active', {'line': 'L01'}, T0, T0,
+                    1.0, 2.0, 3.0, 1.5, 0.0, 1.0, 0.0, 90.0)
+    return obj, coords, row
+
+class TestRowResponses:
+    """Test responses built from rows."""
+    
+    def test_matches_model_response(self):
+        """Test a joined row builds the same response as the model instances."""
+        obj, coords, row = make_object()
+        
+        assert DataService.build_row_response(row) == DataService.build_response(obj, coords)
+    
+    def test_row_without_coordinates(self):
+        """Test a row without coordinates gets the default coordinates."""
+        obj, _, row = make_object()
+        row = row._replace(position_x=None, position_y=None, position_z=None, height=None,
+                           direction_x=None, direction_y=None, direction_z=None, rotation=None)
+        
+        assert DataService.build_row_response(row) == DataService.build_response(obj, None)
+
+class TestHistoryReadPaths:
+    """Test HistoryService on both read paths."""
+    
+    @pytest.fixture
+    def lookups(self, monkeypatch):
+        """Serve one object with history and one without, as instances and as rows."""
+        obj, coords, row = make_object()
+        lone = ProductlineObject(id='OBJ_002', name='Lone', status='inactive')
+        lone.created_at = lone.updated_at = T0
+        lone_row = ObjectRow('OBJ_002', 'Lone', 'inactive', None, T0, T0, *([None] * 8))
+        history = ObjectHistory('OBJ_001', T0, position_x=4.0, position_y=5.0, position_z=6.0,
+                                height=1.5, direction_x=1.0, direction_y=0.0, direction_z=0.0,
+                                rotation=45.0, status='processing')
+        history_row = HistoryRow(1, 'OBJ_001', T0, 4.0, 5.0, 6.0, 1.5, 1.0, 0.0, 0.0, 45.0,
+                                 'processing', None)
+        calls = []
+        
+        monkeypatch.setattr(ProductlineObject, 'find_by_ids', lambda ids: [obj, lone])
+        monkeypatch.setattr(Coordinates, 'find_by_object_ids', lambda ids: [])
+        monkeypatch.setattr(ObjectHistory, 'find_latest_before_timestamp',
+                            lambda ids, timestamp: calls.append('orm') or [history])
+        monkeypatch.setattr(ProductlineObject, 'find_rows_by_ids', lambda ids: [row, lone_row])
+        monkeypatch.setattr(ProductlineObject, 'find_rows_with_coordinates', lambda ids: [lone_row])
+        monkeypatch.setattr(ObjectHistory, 'find_latest_rows_before_timestamp',
+                            lambda ids, timestamp: calls.append('core') or [history_row])
+        return calls
+    
+    def test_same_responses(self, lookups):
+        """Test both read paths answer alike, the core path from rows."""
+        orm = HistoryService(read_path='orm').get_objects_at_timestamp(['OBJ_001', 'OBJ_002'], T0)
+        core = HistoryService(read_path='core').get_objects_at_timestamp(['OBJ_001', 'OBJ_002'], T0)
+        
+        assert lookups == ['orm', 'core']
+        assert core == orm
+        assert core['OBJ_001']['status'] == 'processing'
+        assert core['OBJ_002']['coordinates']['position'] == {'x': 0.0, 'y': 0.0, 'z': 0.0}
+
+class TestHistoryReadPathsDatabase:
+    """Test HistoryService on both read paths against a seeded SQLite database."""
+    
+    @pytest.fixture
+    def object_ids(self, database, monkeypatch):
+        """Seed a small productline and read it without the snapshot cache."""
+        seed_productline(5, 10)
+        monkeypatch.setattr(database, 'history_cache', None)
+        return [object_id(index) for index in range(5)] + ['OBJ_404']
+    
+    def lookup(self, object_ids, moment, interpolate=None):
+        """Look a moment up on both read paths."""
+        return [HistoryService(read_path=read_path).get_objects_at_timestamp(
+                    object_ids, moment, interpolate=interpolate)
+                for read_path in ('orm', 'core')]
+    
+    def test_as_of(self, object_ids):
+        """Test as-of lookups answer alike from the latest earlier record."""
+        orm, core = self.lookup(object_ids, HISTORY_START + timedelta(minutes=5, seconds=30))
+        
+        assert core == orm
+        assert sorted(core) == object_ids[:5]
+        assert all(response['updated_at'] < '2025-01-01T00:05:31' for response in core.values())
+        assert not any('timestamp' in response for response in core.values())
+    
+    def test_interpolated(self, object_ids):
+        """Test interpolated lookups answer alike between the bracketing records."""
+        for mode in ('linear', 'slerp'):
+            orm, core = self.lookup(object_ids, HISTORY_START + timedelta(minutes=5, seconds=30), mode)
+            
+            assert core == orm
+            assert all(0.0 <= response['interpolation']['fraction'] < 1.0 for response in core.values())
+    
+    def test_missing_history(self, object_ids):
+        """Test moments before any history fall back to the current data alike."""
+        moment = HISTORY_START - timedelta(days=1)
+        orm, core = self.lookup(object_ids, moment)
+        
+        assert core == orm
+        assert sorted(core) == object_ids[:5]
+        assert all(response['timestamp'] == moment.isoformat() + 'Z' for response in core.values())
+
+class TestReadPathSetting:
+    """Test read path configuration."""
+    
+    def test_configured_read_path(self):
+        """Test the read path comes from the app config and defaults to 'orm'."""
+        app = Flask(__name__)
+        assert get_read_path() == 'orm'
+        
+        with app.app_context():
+            app.config['READ_PATH'] = 'core'
+            assert DataService().read_path == 'core'
+            
+            app.config['READ_PATH'] = 'raw'
+            with pytest.raises(ValueError):
+                get_read_path()
@@ -0,0 +1,276 @@
+"""
+Unit tests for scene checkpoints and replay.
+Tests the checkpoint encoding, the replay merge and checkpoint scheduling
+without a database.
+"""
+
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from src.models.object_history import ObjectHistory
+from src.models.productline_object import ProductlineObject
+from src.models.scene_checkpoint import SceneCheckpoint
+from src.services import scene_replay
+from src.services.scene_replay import (
+    HistoryState, SceneCheckpointManager, align_down, apply_history, decode_state, encode_state
+)
+from src.services.scene_service import SceneService
+
+T0 = datetime(2025, 1, 27, 10, 0, 0)
+
+def make_state(object_id, timestamp, x=1.0, status='active', metadata=None):
+    """Build a history state row."""
+    return HistoryState(object_id, timestamp, x, 2.0, 3.0, 1.5, 1.0, 0.0, 0.0, 90.0,
+                        status, metadata)
+
+class TestCheckpointEncoding:
+    """Test checkpoint payload encoding."""
+    
+    def test_round_trip(self):
+        """Test states survive encoding, including missing values."""
+        states = {
+            'OBJ_001': make_state('OBJ_001', T0 + timedelta(microseconds=123456),
+                                  metadata={'type': 'robot'}),
+            'OBJ_002': HistoryState('OBJ_002', T0, None, None, None, None, None, None, None,
+                                    None, 'error', None)
+        }
+        decoded = decode_state(encode_state(states))
+        
+        assert decoded == states
+    
+    def test_empty_state(self):
+        """Test an empty scene encodes."""
+        assert decode_state(encode_state({})) == {}
+    
+    def test_unknown_format(self):
+        """Test payloads of another format are rejected."""
+        import msgpack
+        import zlib
+        with pytest.raises(ValueError):
+            decode_state(zlib.compress(msgpack.packb({'format': 99})))
+    
+    def test_align_down(self):
+        """Test moments round down to interval boundaries."""
+        assert align_down(datetime(2025, 1, 27, 10, 14, 59), 900) == datetime(2025, 1, 27, 10, 0)
+        assert align_down(datetime(2025, 1, 27, 10, 15), 900) == datetime(2025, 1, 27, 10, 15)
+
+class TestReplay:
+    """Test SceneCheckpointManager replay."""
+    
+    @pytest.fixture
+    def history(self, monkeypatch):
+        """Serve one checkpoint and the history after it from memory."""
+        checkpoint = SimpleNamespace(id=1, taken_at=T0, payload=encode_state({
+            'OBJ_001': make_state('OBJ_001', T0 - timedelta(minutes=5), x=1.0),
+            'OBJ_002': make_state('OBJ_002', T0 - timedelta(minutes=1), x=2.0)
+        }))
+        windows = []
+        
+        def find_latest_at_or_before(timestamp):
+            return checkpoint if timestamp >= T0 else None
+        
+        def find_latest_in_range(after=None, until=None):
+            windows.append((after, until))
+            return [tuple(make_state('OBJ_002', T0 + timedelta(minutes=2), x=20.0)),
+                    tuple(make_state('OBJ_003', T0 + timedelta(minutes=3), x=30.0))]
+        
+        monkeypatch.setattr(SceneCheckpoint, 'find_latest_at_or_before', find_latest_at_or_before)
+        monkeypatch.setattr(ObjectHistory, 'find_latest_in_range', find_latest_in_range)
+        return windows
+    
+    def test_replays_from_checkpoint(self, history):
+        """Test the checkpoint state is updated with the history after it."""
+        moment = T0 + timedelta(minutes=4)
+        states, taken_at = SceneCheckpointManager().state_at(moment)
+        
+        assert taken_at == T0
+        assert history == [(T0, moment)]
+        assert states['OBJ_001'].position_x == 1.0
+        assert states['OBJ_002'].position_x == 20.0
+        assert states['OBJ_003'].position_x == 30.0
+    
+    def test_without_checkpoint_folds_windows(self, history, monkeypatch):
+        """Test a moment before every checkpoint folds the history in bounded windows."""
+        monkeypatch.setattr(ObjectHistory, 'find_first_timestamp',
+                            lambda since=None: since or T0 - timedelta(hours=2))
+        moment = T0 - timedelta(hours=1)
+        states, taken_at = SceneCheckpointManager(build_window=1800).state_at(moment)
+        
+        assert taken_at is None
+        assert history == [(None, T0 - timedelta(minutes=90)), (T0 - timedelta(minutes=90), moment)]
+        assert set(states) == {'OBJ_002', 'OBJ_003'}
+    
+    def test_cached_state_is_not_modified(self, history):
+        """Test replays do not change the decoded checkpoint they start from."""
+        manager = SceneCheckpointManager()
+        manager.state_at(T0 + timedelta(minutes=4))
+        cached = manager._decoded[1]
+        
+        assert set(cached) == {'OBJ_001', 'OBJ_002'}
+        assert cached['OBJ_002'].position_x == 2.0
+    
+    def test_apply_history(self):
+        """Test newer rows replace and add states."""
+        states = {'OBJ_001': make_state('OBJ_001', T0)}
+        merged = apply_history(states, [tuple(make_state('OBJ_001', T0, x=5.0))])
+        
+        assert merged['OBJ_001'].position_x == 5.0
+        assert states['OBJ_001'].position_x == 1.0
+
+class TestEnsureCheckpoints:
+    """Test checkpoint scheduling."""
+    
+    @pytest.fixture
+    def created(self, monkeypatch):
+        """Record the moments checkpoints are created at, with no earlier history."""
+        moments = []
+        monkeypatch.setattr(SceneCheckpointManager, 'create_checkpoint',
+                            lambda self, taken_at, states=None: moments.append(taken_at) or taken_at)
+        monkeypatch.setattr(SceneCheckpoint, 'find_earliest_taken_at', lambda: T0)
+        monkeypatch.setattr(ObjectHistory, 'find_first_timestamp', lambda since=None: None)
+        return moments
+    
+    @pytest.fixture
+    def earlier_history(self, monkeypatch, created):
+        """Serve history from 10 hours before the only checkpoint, at T0."""
+        windows = []
+        
+        def find_first_timestamp(since=None):
+            first = T0 - timedelta(hours=10)
+            return first if since is None or since <= first else None
+        
+        def find_latest_in_range(after=None, until=None):
+            windows.append((after, until))
+            return []
+        
+        monkeypatch.setattr(SceneCheckpoint, 'find_latest_taken_at', lambda: T0)
+        monkeypatch.setattr(ObjectHistory, 'find_first_timestamp', find_first_timestamp)
+        monkeypatch.setattr(ObjectHistory, 'find_latest_in_range', find_latest_in_range)
+        return windows
+    
+    def test_first_checkpoint(self, monkeypatch, created):
+        """Test only the latest due checkpoint is created without any earlier one."""
+        monkeypatch.setattr(SceneCheckpoint, 'find_latest_taken_at', lambda: None)
+        monkeypatch.setattr(ObjectHistory, 'find_first_timestamp', lambda since=None: None)
+        manager = SceneCheckpointManager(interval=900, mutable_horizon=300)
+        
+        assert manager.ensure_checkpoints(now=T0 + timedelta(minutes=19)) == 1
+        assert created == [T0]
+    
+    def test_initial_state_reads_bounded_windows(self, monkeypatch):
+        """Test the first state is folded from windows that skip stretches without history."""
+        timestamps = [T0, T0 + timedelta(hours=1), T0 + timedelta(days=3)]
+        windows = []
+        
+        def find_first_timestamp(since=None):
+            return next((t for t in timestamps if since is None or t >= since), None)
+        
+        def find_latest_in_range(after=None, until=None):
+            windows.append((after, until))
+            return [tuple(make_state('OBJ_001', t, x=float(i))) for i, t in enumerate(timestamps)
+                    if (after is None or t > after) and t <= until]
+        
+        monkeypatch.setattr(ObjectHistory, 'find_first_timestamp', find_first_timestamp)
+        monkeypatch.setattr(ObjectHistory, 'find_latest_in_range', find_latest_in_range)
+        manager = SceneCheckpointManager(build_window=86400)
+        states = manager.initial_state(T0 + timedelta(days=10))
+        
+        assert windows == [(None, T0 + timedelta(days=1)),
+                           (T0 + timedelta(days=1), T0 + timedelta(days=4))]
+        assert states['OBJ_001'].position_x == 2.0
+    
+    def test_backfills_in_order(self, monkeypatch, created):
+        """Test missing checkpoints are created oldest first."""
+        monkeypatch.setattr(SceneCheckpoint, 'find_latest_taken_at', lambda: T0)
+        manager = SceneCheckpointManager(interval=900, mutable_horizon=0)
+        manager.ensure_checkpoints(now=T0 + timedelta(minutes=50))
+        
+        assert created == [T0 + timedelta(minutes=15), T0 + timedelta(minutes=30),
+                           T0 + timedelta(minutes=45)]
+    
+    def test_backfill_is_capped(self, monkeypatch, created):
+        """Test a long gap only backfills the most recent checkpoints."""
+        monkeypatch.setattr(SceneCheckpoint, 'find_latest_taken_at', lambda: T0)
+        manager = SceneCheckpointManager(interval=900, mutable_horizon=0, max_backfill=2)
+        manager.ensure_checkpoints(now=T0 + timedelta(hours=10))
+        
+        assert created == [T0 + timedelta(hours=9, minutes=45), T0 + timedelta(hours=10)]
+    
+    def test_nothing_due(self, monkeypatch, created):
+        """Test no checkpoint is created inside the mutable horizon."""
+        monkeypatch.setattr(SceneCheckpoint, 'find_latest_taken_at', lambda: T0)
+        manager = SceneCheckpointManager(interval=900, mutable_horizon=300)
+        
+        assert manager.ensure_checkpoints(now=T0 + timedelta(minutes=19)) == 0
+        assert created == []
+
+    def test_backfills_earlier_checkpoints(self, earlier_history, created):
+        """Test checkpoints before the earliest one are built forward from initial_state."""
+        manager = SceneCheckpointManager(interval=900, mutable_horizon=0, max_backfill=3)
+        
+        assert manager.ensure_checkpoints(now=T0 + timedelta(minutes=5)) == 3
+        assert created == [T0 - timedelta(minutes=45), T0 - timedelta(minutes=30),
+                           T0 - timedelta(minutes=15)]
+        assert earlier_history == [
+            (None, T0 - timedelta(minutes=45)),
+            (T0 - timedelta(minutes=45), T0 - timedelta(minutes=30)),
+            (T0 - timedelta(minutes=30), T0 - timedelta(minutes=15))
+        ]
+    
+    def test_earlier_backfill_stops_at_first_history(self, monkeypatch, earlier_history, created):
+        """Test no checkpoint is backfilled before the interval holding the first history."""
+        monkeypatch.setattr(SceneCheckpoint, 'find_earliest_taken_at',
+                            lambda: T0 - timedelta(hours=9, minutes=30))
+        manager = SceneCheckpointManager(interval=900, mutable_horizon=0)
+        manager.ensure_checkpoints(now=T0)
+        
+        assert created == [T0 - timedelta(hours=10), T0 - timedelta(hours=9, minutes=45)]
+    
+    def test_retention_keeps_covering_checkpoint(self, monkeypatch, earlier_history, created):
+        """Test retention keeps the latest checkpoint at its cutoff and backfills no further."""
+        deleted_before = []
+        monkeypatch.setattr(SceneCheckpoint, 'find_latest_at_or_before',
+                            lambda timestamp: SimpleNamespace(taken_at=align_down(timestamp, 900)))
+        monkeypatch.setattr(SceneCheckpoint, 'delete_older_than',
+                            lambda timestamp: deleted_before.append(timestamp) or 0)
+        monkeypatch.setattr(scene_replay, 'db', SimpleNamespace(
+            session=SimpleNamespace(commit=lambda: None)
+        ))
+        manager = SceneCheckpointManager(interval=900, mutable_horizon=0, retention=3600)
+        manager.ensure_checkpoints(now=T0 + timedelta(minutes=5))
+        
+        assert created[0] == T0 - timedelta(hours=1)
+        assert deleted_before == [T0 - timedelta(hours=1)]
+
+class TestSceneAtTimestamp:
+    """Test streaming a replayed scene."""
+    
+    @pytest.fixture
+    def scene(self, monkeypatch):
+        """Serve two objects and a replayed state for the first one."""
+        rows = [(ProductlineObject(id='OBJ_001', name='Robot'), None),
+                (ProductlineObject(id='OBJ_002', name='Belt'), None)]
+        for obj, coords in rows:
+            obj.created_at = obj.updated_at = T0
+        monkeypatch.setattr(ProductlineObject, 'iter_with_coordinates',
+                            lambda status=None, batch_size=1000: iter(rows))
+        states = {'OBJ_001': make_state('OBJ_001', T0, x=7.0, status='error')}
+        return SimpleNamespace(state_at=lambda timestamp: (states, T0))
+    
+    def test_replayed_states(self, scene):
+        """Test objects with history use it and others their current data."""
+        chunks = SceneService(checkpoints=scene).stream_scene(timestamp=T0)
+        document = json.loads(''.join(chunks))
+        
+        assert document['timestamp'] == T0.isoformat() + 'Z'
+        assert document['objects'][0]['coordinates']['position']['x'] == 7.0
+        assert document['objects'][0]['status'] == 'error'
+        assert document['objects'][1]['coordinates']['position']['x'] == 0.0
+    
+    def test_status_filters_replayed_state(self, scene):
+        """Test the status filter applies to the state at the timestamp."""
+        chunks = SceneService(checkpoints=scene).stream_scene(status='error', timestamp=T0)
+        document = json.loads(''.join(chunks))
+        
+        assert [o['object_id'] for o in document['objects']] == ['OBJ_001']
@@ -0,0 +1,121 @@
+"""
+Unit tests for the streaming scene export.
+Tests chunking and that the streamed document stays valid JSON.
+"""
+
+import json
+import msgpack
+import pytest
+from src.models.productline_object import ProductlineObject
+from src.models.coordinates import Coordinates
+from src.services.scene_service import SceneService
+from src.services.wire_format import FLAG_ERROR, FLAG_FINAL, unpack_frame
+
+def make_rows(count):
+    """Build (object, coordinates) pairs without a database."""
+    rows = []
+    for i in range(count):
+        obj = ProductlineObject(id=f'OBJ_{i:03d}', name=f'Object {i}')
+        coords = Coordinates(object_id=obj.id, position_x=float(i)) if i % 2 == 0 else None
+        rows.append((obj, coords))
+    return rows
+
+class TestSceneService:
+    """Test SceneService functionality."""
+    
+    @pytest.fixture
+    def rows(self, monkeypatch):
+        """Serve the scene query from an in-memory list."""
+        rows = make_rows(5)
+        calls = []
+        
+        def iter_with_coordinates(status=None, batch_size=1000):
+            calls.append((status, batch_size))
+            return iter(rows)
+        
+        monkeypatch.setattr(ProductlineObject, 'iter_with_coordinates', iter_with_coordinates)
+        return calls
+    
+    def test_stream_is_valid_json(self, rows):
+        """Test the joined chunks form one document."""
+        chunks = list(SceneService().stream_scene(chunk_size=2))
+        document = json.loads(''.join(chunks))
+        
+        assert document['count'] == 5
+        assert [o['object_id'] for o in document['objects']] == [f'OBJ_{i:03d}' for i in range(5)]
+        assert document['objects'][0]['coordinates']['position']['x'] == 0.0
+        assert document['objects'][1]['coordinates']['rotation'] == 0.0
+        assert 'error' not in document
+    
+    def test_objects_are_chunked(self, rows):
+        """Test objects are emitted chunk_size at a time."""
+        chunks = list(SceneService().stream_scene(chunk_size=2))
+        
+        # Header, three object chunks and the trailer
+        assert len(chunks) == 5
+        assert chunks[0].endswith('"objects":[')
+    
+    def test_filters_are_passed_to_query(self, rows):
+        """Test status and batch size reach the cursor query."""
+        document = json.loads(''.join(SceneService().stream_scene(status='active', batch_size=50)))
+        
+        assert rows == [('active', 50)]
+        assert document['status'] == 'active'
+    
+    def test_empty_scene(self, monkeypatch):
+        """Test an empty scene is still a complete document."""
+        monkeypatch.setattr(ProductlineObject, 'iter_with_coordinates',
+                            lambda status=None, batch_size=1000: iter(()))
+        document = json.loads(''.join(SceneService().stream_scene()))
+        
+        assert document['objects'] == []
+        assert document['count'] == 0
+    
+    def test_error_closes_document(self, monkeypatch):
+        """Test a failure mid-stream still yields valid JSON with an error."""
+        def failing(status=None, batch_size=1000):
+            yield from make_rows(3)
+            raise RuntimeError('connection lost')
+        
+        monkeypatch.setattr(ProductlineObject, 'iter_with_coordinates', failing)
+        document = json.loads(''.join(SceneService().stream_scene(chunk_size=2)))
+        
+        assert document['count'] == 2
+        assert len(document['objects']) == 2
+        assert document['error']['code'] == 'INTERNAL_ERROR'
+    
+    def test_msgpack_stream(self, rows):
+        """Test MessagePack streams a header, object arrays and a trailer."""
+        unpacker = msgpack.Unpacker()
+        for chunk in SceneService().stream_scene(chunk_size=2, wire_format='msgpack'):
+            unpacker.feed(chunk)
+        values = list(unpacker)
+        
+        assert values[0]['status'] is None
+        assert [len(objects) for objects in values[1:-1]] == [2, 2, 1]
+        assert values[-1] == {'count': 5}
+    
+    def test_packed_stream(self, rows):
+        """Test packed streams end with an empty final frame."""
+        data = b''.join(SceneService().stream_scene(chunk_size=3, wire_format='packed'))
+        
+        frames = []
+        offset = 0
+        while offset < len(data):
+            object_ids, values, flags, offset = unpack_frame(data, offset)
+            frames.append((object_ids, flags))
+        
+        assert frames[0] == (['OBJ_000', 'OBJ_001', 'OBJ_002'], 0)
+        assert frames[1] == (['OBJ_003', 'OBJ_004'], 0)
+        assert frames[2] == ([], FLAG_FINAL)
+    
+    def test_packed_error_flag(self, monkeypatch):
+        """Test a failed packed stream sets the error flag."""
+        def failing(status=None, batch_size=1000):
+            raise RuntimeError('connection lost')
+            yield
+        
+        monkeypatch.setattr(ProductlineObject, 'iter_with_coordinates', failing)
+        data = b''.join(SceneService().stream_scene(wire_format='packed'))
+        
+        assert unpack_frame(data)[2] == FLAG_FINAL | FLAG_ERROR
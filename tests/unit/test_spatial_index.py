@@ -0,0 +1,141 @@
+"""
+Unit tests for the uniform grid spatial index.
+Tests box, nearest-neighbour and vectorized neighbour queries against brute force.
+"""
+
+import math
+import random
+import numpy as np
+import pytest
+from src.services.spatial_index import UniformGridIndex, knn_search
+
+@pytest.fixture
+def points():
+    """Generate a reproducible cloud of positions."""
+    rng = random.Random(42)
+    return {
+        f'OBJ_{i:04d}': (rng.uniform(-50, 50), rng.uniform(-50, 50), rng.uniform(-5, 5))
+        for i in range(500)
+    }
+
+@pytest.fixture
+def index(points):
+    """Build an index over the point cloud."""
+    index = UniformGridIndex(cell_size=4.0)
+    for object_id, (x, y, z) in points.items():
+        index.upsert(object_id, x, y, z)
+    return index
+
+class TestUniformGridIndex:
+    """Test UniformGridIndex functionality."""
+    
+    def test_upsert_and_remove(self):
+        """Test objects can be moved and removed."""
+        index = UniformGridIndex(cell_size=1.0)
+        index.upsert('OBJ_001', 0.5, 0.5, 0.5)
+        index.upsert('OBJ_001', 10.5, 0.5, 0.5)
+        
+        assert len(index) == 1
+        assert index.get('OBJ_001') == (10.5, 0.5, 0.5)
+        assert index.query_box(0, 0, 0, 1, 1, 1) == []
+        
+        index.remove('OBJ_001')
+        index.remove('OBJ_404')
+        assert 'OBJ_001' not in index
+        assert index.nearest(0, 0, 0) == []
+    
+    def test_query_box_matches_brute_force(self, index, points):
+        """Test box queries return exactly the contained objects."""
+        rng = random.Random(7)
+        for _ in range(50):
+            lo = [rng.uniform(-60, 40), rng.uniform(-60, 40), rng.uniform(-6, 4)]
+            hi = [lo[0] + rng.uniform(0, 30), lo[1] + rng.uniform(0, 30), lo[2] + rng.uniform(0, 4)]
+            
+            found = sorted(match[0] for match in index.query_box(*lo, *hi))
+            expected = sorted(
+                object_id for object_id, (x, y, z) in points.items()
+                if lo[0] <= x <= hi[0] and lo[1] <= y <= hi[1] and lo[2] <= z <= hi[2]
+            )
+            assert found == expected
+    
+    def test_query_box_bounds_inclusive(self):
+        """Test objects on the box boundary are included."""
+        index = UniformGridIndex(cell_size=2.0)
+        index.upsert('OBJ_001', 2.0, 2.0, 2.0)
+        
+        assert [match[0] for match in index.query_box(0, 0, 0, 2, 2, 2)] == ['OBJ_001']
+    
+    def test_query_box_limit(self, index):
+        """Test the result limit is honoured."""
+        assert len(index.query_box(-50, -50, -5, 50, 50, 5, limit=7)) == 7
+    
+    def test_nearest_matches_brute_force(self, index, points):
+        """Test nearest queries return the closest objects in order."""
+        rng = random.Random(11)
+        for _ in range(50):
+            point = (rng.uniform(-80, 80), rng.uniform(-80, 80), rng.uniform(-8, 8))
+            n = rng.randint(1, 15)
+            
+            found = [match[0] for match in index.nearest(*point, n=n)]
+            expected = sorted(points, key=lambda o: (math.dist(points[o], point), o))[:n]
+            assert found == expected
+    
+    def test_nearest_max_distance(self, index, points):
+        """Test objects beyond max_distance are not returned."""
+        matches = index.nearest(0, 0, 0, n=100, max_distance=8.0)
+        expected = [o for o, p in points.items() if math.dist(p, (0, 0, 0)) <= 8.0]
+        
+        assert len(matches) == len(expected)
+        assert all(match[4] <= 8.0 for match in matches)
+    
+    def test_nearest_exclude(self):
+        """Test excluded objects are skipped."""
+        index = UniformGridIndex(cell_size=1.0)
+        index.upsert('OBJ_001', 0, 0, 0)
+        index.upsert('OBJ_002', 3, 0, 0)
+        
+        matches = index.nearest(0, 0, 0, n=1, exclude={'OBJ_001'})
+        assert matches[0][0] == 'OBJ_002'
+        assert matches[0][4] == pytest.approx(3.0)
+    
+    def test_invalid_cell_size(self):
+        """Test cell size must be positive."""
+        with pytest.raises(ValueError):
+            UniformGridIndex(cell_size=0)
+
+class TestKnnSearch:
+    """Test vectorized neighbour search."""
+    
+    def test_matches_brute_force(self, points):
+        """Test knn_search agrees with a per-pair Python loop."""
+        object_ids = list(points)
+        positions = np.array([points[o] for o in object_ids])
+        origin = (3.0, -7.0, 1.0)
+        
+        rows, distances = knn_search(positions, origin, k=12)
+        expected = sorted(range(len(object_ids)), key=lambda r: math.dist(positions[r], origin))[:12]
+        
+        assert list(rows) == expected
+        assert list(distances) == pytest.approx([math.dist(positions[r], origin) for r in expected])
+    
+    def test_radius_and_exclude(self):
+        """Test rows beyond the radius and the excluded row are dropped."""
+        positions = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 2.0, 0.0], [5.0, 5.0, 5.0]])
+        
+        rows, distances = knn_search(positions, positions[0], radius=2.0, exclude_row=0)
+        assert list(rows) == [1, 2]
+        assert list(distances) == pytest.approx([1.0, 2.0])
+    
+    def test_k_larger_than_candidates(self):
+        """Test k above the candidate count returns every candidate."""
+        positions = np.array([[0.0, 0.0, 0.0], [3.0, 4.0, 0.0]])
+        
+        rows, distances = knn_search(positions, (0, 0, 0), k=10)
+        assert list(rows) == [0, 1]
+        assert list(distances) == pytest.approx([0.0, 5.0])
+    
+    def test_empty(self):
+        """Test an empty array yields no neighbours."""
+        rows, distances = knn_search(np.empty((0, 3)), (0, 0, 0), k=3)
+        assert len(rows) == 0
+        assert len(distances) == 0
@@ -0,0 +1,160 @@
+"""
+Unit tests for the binary wire formats.
+Tests content negotiation and packed frame round trips.
+"""
+
+import math
+from datetime import datetime
+import msgpack
+import pytest
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+from src.models.coordinates import Coordinates
+from src.models.object_history import ObjectHistory
+from src.services.data_service import default_coordinates
+from src.services.wire_format import (
+    FLAG_ERROR, FLAG_FINAL, PACKED_HEADER, PACKED_FIELDS, coordinates_row, encode_body,
+    model_row, negotiate_format, pack_error_frame, pack_frame, unpack_frame
+)
+
+def accept(value):
+    """Parse an Accept header value."""
+    return parse_accept_header(value, MIMEAccept)
+
+def make_object(object_id, x, rotation=90.0):
+    """Build an object response with the given position."""
+    coordinates = default_coordinates()
+    coordinates['position'] = {'x': x, 'y': 2.0, 'z': 3.0}
+    coordinates['rotation'] = rotation
+    return {'object_id': object_id, 'name': None, 'coordinates': coordinates}
+
+class TestNegotiateFormat:
+    """Test Accept header negotiation."""
+    
+    @pytest.mark.parametrize('header, expected', [
+        ('', 'json'),
+        ('*/*', 'json'),
+        ('application/json', 'json'),
+        ('application/msgpack', 'msgpack'),
+        ('application/x-msgpack', 'msgpack'),
+        ('application/vnd.productline.packed', 'packed'),
+        ('application/vnd.productline.packed, application/json;q=0.5', 'packed'),
+        ('text/html', 'json'),
+    ])
+    def test_negotiate(self, header, expected):
+        """Test each Accept header selects the expected format."""
+        assert negotiate_format(accept(header)) == expected
+
+class TestPackedFrames:
+    """Test packed float32 frames."""
+    
+    def test_round_trip(self):
+        """Test records and IDs survive a round trip."""
+        rows = [coordinates_row(make_object('OBJ_001', 1.5)['coordinates']),
+                coordinates_row(make_object('OBJ_ü', -4.0, rotation=None)['coordinates'])]
+        data = pack_frame(['OBJ_001', 'OBJ_ü'], rows)
+        
+        object_ids, values, flags, end = unpack_frame(data)
+        assert object_ids == ['OBJ_001', 'OBJ_ü']
+        assert values.shape == (2, len(PACKED_FIELDS))
+        assert values.dtype.str == '<f4'
+        assert list(values[0][:3]) == [1.5, 2.0, 3.0]
+        assert math.isnan(values[1][-1])
+        assert flags == FLAG_FINAL
+        assert end == len(data)
+    
+    def test_layout(self):
+        """Test the float block directly follows the 16-byte header."""
+        data = pack_frame(['A'], [(1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0)])
+        
+        assert PACKED_HEADER.size == 16
+        assert data[:4] == b'PLC1'
+        assert len(data) == 16 + 8 * 4 + 4
+        assert data[-1:] == b'\x00'
+        assert data[16:20] == b'\x00\x00\x80\x3f'  # 1.0f little-endian
+    
+    def test_consecutive_frames(self):
+        """Test a stream of frames can be walked by offset."""
+        data = (pack_frame(['A'], [model_row(None)], flags=0)
+                + pack_frame([], [], flags=FLAG_FINAL | FLAG_ERROR))
+        
+        ids, values, flags, offset = unpack_frame(data)
+        assert ids == ['A'] and flags == 0
+        ids, values, flags, offset = unpack_frame(data, offset)
+        assert ids == [] and values.shape == (0, len(PACKED_FIELDS))
+        assert flags == FLAG_FINAL | FLAG_ERROR
+        assert offset == len(data)
+    
+    def test_frames_stay_aligned(self):
+        """Test every frame of a stream starts and keeps its floats 4-byte aligned."""
+        data = pack_frame(['A'], [model_row(None)], flags=0) + pack_frame(['BC'], [model_row(None)])
+        
+        ids, values, flags, offset = unpack_frame(data)
+        assert offset % 4 == 0
+        ids, values, flags, end = unpack_frame(data, offset)
+        assert ids == ['BC'] and end == len(data)
+    
+    def test_error_frame(self):
+        """Test an error frame carries object IDs with their error codes."""
+        data = pack_error_frame([{'object_id': 'OBJ_404', 'code': 'OBJECT_NOT_FOUND'},
+                                 {'object_id': None, 'code': 'INVALID_OBJECT_ID'}])
+        
+        errors, values, flags, end = unpack_frame(data)
+        assert errors == [('OBJ_404', 'OBJECT_NOT_FOUND'), ('', 'INVALID_OBJECT_ID')]
+        assert flags == FLAG_FINAL | FLAG_ERROR
+        assert values.shape == (2, 0)
+        assert end == len(data) and end % 4 == 0
+    
+    def test_rejects_other_data(self):
+        """Test data without the frame magic is rejected."""
+        with pytest.raises(ValueError):
+            unpack_frame(b'{"object_id": "OBJ_001"}')
+    
+    def test_model_row(self):
+        """Test model rows follow the packed field order."""
+        coords = Coordinates(object_id='OBJ_001', position_x=1.0, position_y=2.0,
+                             position_z=3.0, height=4.0, rotation=None)
+        
+        row = model_row(coords)
+        assert row[:7] == (1.0, 2.0, 3.0, 4.0, 1.0, 0.0, 0.0)
+        assert math.isnan(row[7])
+        assert model_row(None) == coordinates_row(default_coordinates())
+        
+        history = ObjectHistory('OBJ_001', datetime(2025, 1, 1), position_x=1.0, position_y=2.0,
+                                position_z=3.0, height=4.0, direction_x=0.0, direction_y=1.0,
+                                direction_z=0.0, rotation=90.0)
+        assert model_row(history) == (1.0, 2.0, 3.0, 4.0, 0.0, 1.0, 0.0, 90.0)
+
+class TestEncodeBody:
+    """Test response body encoding."""
+    
+    def test_msgpack_carries_payload(self):
+        """Test MessagePack encodes the whole payload."""
+        payload = {'objects': [make_object('OBJ_001', 1.0)], 'errors': []}
+        assert msgpack.unpackb(encode_body(payload, payload['objects'], 'msgpack')) == payload
+    
+    def test_packed_carries_objects(self):
+        """Test packed bodies hold one record per object."""
+        objects = [make_object('OBJ_001', 1.0), make_object('OBJ_002', 2.0)]
+        object_ids, values, flags, end = unpack_frame(encode_body({}, objects, 'packed'))
+        
+        assert object_ids == ['OBJ_001', 'OBJ_002']
+        assert list(values[:, 0]) == [1.0, 2.0]
+    
+    def test_packed_carries_errors(self):
+        """Test packed bodies end with an error frame when the payload has errors."""
+        objects = [make_object('OBJ_001', 1.0)]
+        payload = {'objects': objects, 'errors': [{'object_id': 'OBJ_404', 'error': 'Object not found',
+                                                   'code': 'OBJECT_NOT_FOUND'}]}
+        data = encode_body(payload, objects, 'packed')
+        
+        object_ids, values, flags, offset = unpack_frame(data)
+        assert object_ids == ['OBJ_001'] and flags == 0
+        errors, values, flags, end = unpack_frame(data, offset)
+        assert errors == [('OBJ_404', 'OBJECT_NOT_FOUND')]
+        assert flags == FLAG_FINAL | FLAG_ERROR and end == len(data)
+    
+    def test_unknown_format(self):
+        """Test unknown formats are rejected."""
+        with pytest.raises(ValueError):
+            encode_body({}, [], 'xml')
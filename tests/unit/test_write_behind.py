@@ -0,0 +1,169 @@
+"""
+Unit tests for the write-behind queue.
+Tests batching, retries, spilling and replay with in-memory writers.
+"""
+
+import os
+import time
+from datetime import datetime
+import pytest
+from sqlalchemy.exc import OperationalError
+from src.services import write_behind
+from src.services.write_behind import WriteBehindQueue
+
+NOW = datetime(2025, 1, 27, 10, 0, 0)
+
+class RecordingWriter:
+    """Writer that records its batches and fails on demand."""
+    
+    def __init__(self, failures=0, rejects=None):
+        self.batches = []
+        self.failures = failures
+        self.rejects = rejects or []
+    
+    def __call__(self, items, replace=False):
+        if self.failures:
+            self.failures -= 1
+            raise OperationalError('INSERT', {}, Exception('lock wait timeout'))
+        self.batches.append((list(items), replace))
+        rejects, self.rejects = self.rejects, []
+        return len(items) - len(rejects), rejects
+
+def make_queue(tmp_path=None, **options):
+    """Build a queue writing both kinds through one recording writer."""
+    writer = RecordingWriter()
+    options.setdefault('retry_backoff', 0)
+    queue = WriteBehindQueue(
+        writers={'history': writer, 'coordinates': writer},
+        spill_path=str(tmp_path / 'writes.spill') if tmp_path else None,
+        clock=lambda: NOW,
+        **options
+    )
+    return queue, writer
+
+class TestWriteBehindQueue:
+    """Test WriteBehindQueue functionality."""
+    
+    def test_batches_by_size(self):
+        """Test queued writes are written batch_size at a time."""
+        queue, writer = make_queue(batch_size=2)
+        assert queue.enqueue('history', [{'n': i} for i in range(5)]) == {'queued': 5, 'spilled': 0}
+        queue.flush()
+        
+        assert [len(items) for items, _ in writer.batches] == [2, 2, 1]
+        assert queue.stats()['written'] == 5
+        assert queue.stats()['queue_depth'] == 0
+    
+    def test_groups_keep_order_by_kind(self):
+        """Test a batch is split into runs of the same kind and mode."""
+        queue, writer = make_queue()
+        queue.enqueue('history', [{'n': 1}])
+        queue.enqueue('coordinates', [{'n': 2, 'timestamp': 1}], replace=True)
+        queue.enqueue('coordinates', [{'n': 3, 'timestamp': 1}])
+        queue.flush()
+        
+        assert [([item['n'] for item in items], replace) for items, replace in writer.batches] == [
+            ([1], False), ([2], True), ([3], False)
+        ]
+    
+    def test_coordinates_are_stamped_when_accepted(self):
+        """Test updates without a timestamp keep the time they were queued."""
+        queue, writer = make_queue()
+        queue.enqueue('coordinates', [{'object_id': 'OBJ_001'}, {'object_id': 'OBJ_002', 'timestamp': 5}])
+        queue.flush()
+        
+        items, _ = writer.batches[0]
+        assert items[0]['timestamp'] == '2025-01-27T10:00:00Z'
+        assert items[1]['timestamp'] == 5
+    
+    def test_unknown_kind(self):
+        """Test only known write kinds are accepted."""
+        queue, _ = make_queue()
+        with pytest.raises(ValueError):
+            queue.enqueue('objects', [{}])
+    
+    def test_retries_database_errors(self):
+        """Test a failing write is retried until it succeeds."""
+        queue, writer = make_queue(max_retries=3)
+        writer.failures = 2
+        queue.enqueue('history', [{'n': 1}])
+        queue.flush()
+        
+        stats = queue.stats()
+        assert stats['written'] == 1 and stats['retries'] == 2 and stats['spilled'] == 0
+        assert stats['flush_latency_ms']['last'] is not None
+    
+    def test_write_error_rejects_are_retried(self):
+        """Test only rows that failed to write are retried, invalid ones are counted."""
+        queue, writer = make_queue()
+        writer.rejects = [{'index': 0, 'code': 'WRITE_ERROR', 'error': ''},
+                          {'index': 1, 'code': 'INVALID_COORDINATES', 'error': ''}]
+        queue.enqueue('history', [{'n': 1}, {'n': 2}, {'n': 3}])
+        queue.flush()
+        
+        assert [[item['n'] for item in items] for items, _ in writer.batches] == [[1, 2, 3], [1]]
+        assert queue.stats()['rejected'] == 1
+    
+    def test_spills_and_replays_failed_batches(self, tmp_path):
+        """Test batches that keep failing are spilled and written on replay."""
+        queue, writer = make_queue(tmp_path, max_retries=1, max_backoff=0)
+        writer.failures = 2
+        queue.enqueue('history', [{'n': 1}, {'n': 2}])
+        queue.flush()
+        
+        assert writer.batches == []
+        assert queue.stats()['spilled'] == 2 and queue.stats()['spill_bytes'] > 0
+        
+        assert queue.replay_spill() == 2
+        assert queue.replay_spill() == 0
+        assert writer.batches == [([{'n': 1}, {'n': 2}], False)]
+        assert not os.path.exists(queue.spill_path) and not os.path.exists(queue.replay_path)
+    
+    @pytest.mark.skipif(write_behind.fcntl is None, reason="needs fcntl")
+    def test_one_replayer_per_spill_file(self, tmp_path):
+        """Test queues sharing a spill file append to it but only one replays it."""
+        first, first_writer = make_queue(tmp_path, max_size=0)
+        second, second_writer = make_queue(tmp_path, max_size=0)
+        first.enqueue('history', [{'n': 1}])
+        second.enqueue('history', [{'n': 2}])
+        
+        assert first.replay_spill() == 2
+        second.enqueue('history', [{'n': 3}])
+        assert second.replay_spill() == 0
+        assert first.replay_spill() == 1
+        assert [items for items, _ in first_writer.batches] == [[{'n': 1}, {'n': 2}], [{'n': 3}]]
+        
+        first.stop()
+        second.enqueue('history', [{'n': 4}])
+        assert second.replay_spill() == 1
+        assert second_writer.batches == [([{'n': 4}], False)]
+    
+    def test_full_queue_spills_request(self, tmp_path):
+        """Test a request that does not fit is spilled as a whole."""
+        queue, writer = make_queue(tmp_path, max_size=2)
+        queue.enqueue('history', [{'n': 1}])
+        
+        assert queue.enqueue('history', [{'n': 2}, {'n': 3}]) == {'queued': 0, 'spilled': 2}
+        assert queue.stats()['queue_depth'] == 1
+    
+    def test_full_queue_without_spill_drops(self):
+        """Test a request that does not fit is dropped without a spill file."""
+        queue, _ = make_queue(max_size=1)
+        
+        assert queue.enqueue('history', [{'n': 1}, {'n': 2}]) == {'queued': 0, 'spilled': 0}
+        assert queue.stats()['dropped'] == 2
+    
+    def test_flusher_writes_by_time(self):
+        """Test the flusher writes a small batch once it is old enough."""
+        queue, writer = make_queue(batch_size=100, flush_interval=0.05)
+        queue.start()
+        try:
+            queue.enqueue('history', [{'n': 1}])
+            deadline = time.monotonic() + 5
+            while not writer.batches and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            queue.stop()
+        
+        assert writer.batches == [([{'n': 1}], False)]
+        assert not queue.stats()['running']